@@ -17,6 +17,7 @@
 
 import sys
 import socket
+import time
 import six
 from collections import OrderedDict
 
@@ -33,6 +34,8 @@ class XPSException(Exception):
 class XPS:
     # Defines
     MAX_NB_SOCKETS = 100
+    WAIT_TIMEOUT = -1000
+    WAIT_ABORTED = -1001
 
     # Global variables
     __sockets = {}
@@ -874,6 +877,51 @@ class XPS:
         retList.append(eval(returnedString[i:i+j]))
         return retList
 
+    # GroupStatusWait :  Wait until the group status is (or is no longer) one of statusCodes
+    def GroupStatusWait (self, socketId, GroupName, statusCodes, timeOut=None,
+        abortEvent=None, untilIn=True, minInterval=0.001, maxInterval=0.02):
+        """Polls GroupStatusGet until the status is in statusCodes, or with
+        untilIn=False until it isn't. The poll interval starts at minInterval
+        and grows by half each time the status is unchanged, up to
+        maxInterval, so short moves are seen quickly and long moves don't
+        flood the controller. It goes back to minInterval when the status
+        changes. timeOut is a deadline in s from the call, None waits
+        indefinitely. If abortEvent (a threading.Event) is set the wait
+        stops. Returns [error, status], where error is WAIT_TIMEOUT or
+        WAIT_ABORTED if the wait didn't finish, with the last status read."""
+        statusCodes = set(statusCodes)
+        if timeOut is not None:
+            deadline = time.monotonic() + timeOut
+        interval = minInterval
+        lastStatus = None
+
+        while True:
+            error, status = self.GroupStatusGet(socketId, GroupName)
+            if (error != 0):
+                return [error, status]
+            if ((status in statusCodes) == untilIn):
+                return [0, status]
+
+            if (status != lastStatus):
+                interval = minInterval
+                lastStatus = status
+            else:
+                interval = min(interval*1.5, maxInterval)
+
+            if timeOut is not None:
+                remaining = deadline - time.monotonic()
+                if (remaining <= 0):
+                    return [self.WAIT_TIMEOUT, status]
+                delay = min(interval, remaining)
+            else:
+                delay = interval
+
+            if abortEvent is not None:
+                if abortEvent.wait(delay):
+                    return [self.WAIT_ABORTED, status]
+            else:
+                time.sleep(delay)
+
 
     # GroupStatusStringGet :  Return the group status string corresponding to the group status code
     def GroupStatusStringGet (self, socketId, GroupStatusCode):
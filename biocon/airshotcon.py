@@ -41,6 +41,7 @@ except Exception:
     pass
 
 import utils
+import pvpool
 
 class AirShotMotorPanel(utils.DevicePanel):
 
@@ -177,7 +178,7 @@ class AirShotMotorPanel(utils.DevicePanel):
 
         name = self.settings['device_data']['name']
 
-        units = self.motor_egu_pv.get(as_string=True)
+        units = pvpool.pool.get(self.motor_egu_pv, as_string=True)
 
         metadata['{} move with exposure:'.format(name)] = self.auto_move.GetValue()
         metadata['{} move distance ({}):'.format(name, units)] = self.relative_move.GetValue()
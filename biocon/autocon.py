@@ -29,6 +29,8 @@ import sys
 import copy
 import os
 import traceback
+import heapq
+import functools
 
 if __name__ != '__main__':
     logger = logging.getLogger(__name__)
@@ -44,9 +46,17 @@ import autosamplercon
 
 
 class Automator(threading.Thread):
-    def __init__(self, name=None):
+    def __init__(self, name=None, status_poll_interval=0.5,
+        push_poll_interval=10):
         """
         Initializes the custom thread.
+
+        :param str name: The thread name.
+        :param float status_poll_interval: How often (in s) to query the status
+            of busy controls that don't push their status to the automator.
+        :param float push_poll_interval: How often (in s) to query the status
+            of busy controls that do push their status. This is just a safety
+            net in case a status change notification is missed.
         """
         threading.Thread.__init__(self, name=name)
         self.daemon = True
@@ -61,6 +71,7 @@ class Automator(threading.Thread):
 
         self._abort_event = threading.Event()
         self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
 
         self._on_run_cmd_callbacks = []
         self._on_finish_cmd_callbacks = []
@@ -72,11 +83,27 @@ class Automator(threading.Thread):
         self._cmd_id = 0
         self._wait_id = 0
 
+        self._status_poll_interval = status_poll_interval
+        self._push_poll_interval = push_poll_interval
+
+        self._timer_heap = [] # (deadline, seq, name) for time waits
+        self._timer_seq = 0
+        self._dirty_waits = set() # Waits with a participant that changed state
+
+        self._notify_lock = threading.Lock()
+        self._notifications = {} # Pushed status changes not yet processed
+
+        self._completed_cmds = deque() # Results from the control workers
+
         self.check_response_queue = deque()
+        self._pending_checks = [] #Checks waiting on a response, in order
 
     def run(self):
         """
-        Custom run method for the thread.
+        Custom run method for the thread. Rather than polling every control
+        on a fixed period, the thread sleeps until it is woken up by a new
+        command, a status change notification, a state change, or the next
+        time wait or status poll deadline.
         """
         while True:
             if self._abort_event.is_set():
@@ -87,8 +114,6 @@ class Automator(threading.Thread):
                 logger.debug("Stop event detected")
                 break
 
-            status_change = False
-
             with self._state_lock:
                 if self._state == 'run':
                     run_cmds = True
@@ -97,36 +122,215 @@ class Automator(threading.Thread):
 
             if run_cmds:
                 with self._auto_con_lock:
-                    for name, controls in self._auto_cons.items():
-                        state = controls['status']['state']
+                    timeout = self._process_controls()
+            else:
+                # Commands already handed to the workers, such as aborts,
+                # still get finished while paused
+                with self._auto_con_lock:
+                    self._finish_completed_cmds()
+
+                timeout = None
+
+            self._wake_event.wait(timeout)
+            self._wake_event.clear()
+
+        if self._stop_event.is_set():
+            self._stop_event.clear()
+        else:
+            self._abort()
+
+        logger.info("Quitting automator thread: %s", self.name)
 
-                        if not state.startswith('wait'):
+    def _process_controls(self):
+        """
+        Handles everything that is due: expired time waits, status polls,
+        wait conditions whose participants changed state, and starting the
+        next command on idle controls. Returns how long the thread can
+        sleep before something else is due.
+        """
+        with self._notify_lock:
+            notifications = self._notifications
+            self._notifications = {}
+
+        for name, state in notifications.items():
+            controls = self._auto_cons[name]
+
+            with controls['cmd_lock']:
+                if state is not None:
+                    controls['pushed_state'] = state
+
+                controls['poll_now'] = True
+                controls['next_poll'] = 0
+
+        self._finish_completed_cmds()
+
+        self._resolve_checks()
+
+        now = time.monotonic()
+
+        while len(self._timer_heap) > 0 and self._timer_heap[0][0] <= now:
+            deadline, seq, name = heapq.heappop(self._timer_heap)
+            self._check_wait(name)
+
+        for name, controls in self._auto_cons.items():
+            if self._needs_poll(name, controls) and now >= controls['next_poll']:
+                state = controls['status']['state']
+
+                controls['poll_now'] = False
+
+                if state.startswith('wait_cmd'):
+                    self._check_wait(name)
+                elif not state.startswith('wait'):
+                    self._check_status(name)
+                else:
+                    # Control state is held by the automator during a wait,
+                    # the instrument state gets read when the wait ends
+                    controls['pushed_state'] = None
+
+                self._set_next_poll(controls)
+
+        status_change = True
+
+        while status_change:
+            status_change = False
+
+            while len(self._dirty_waits) > 0:
+                name = self._dirty_waits.pop()
+                self._check_wait(name)
+
+            for name, controls in self._auto_cons.items():
+                state = controls['status']['state']
+
+                if state == 'idle' and controls['in_flight'] is None:
+                    with controls['cmd_lock']:
+                        num_cmds = len(controls['cmd_queue'])
+
+                    if num_cmds > 0:
+                        if (time.monotonic() - controls['last_status']
+                            > self._status_poll_interval):
+                            # Cached idle state may be stale, so refresh
+                            # it before dispatching
                             self._check_status(name)
 
-                        elif state.startswith('wait'):
-                            self._check_wait(name)
+                        if controls['status']['state'] == 'idle':
+                            self._run_next_cmd(name)
+                            status_change = True
 
-                        state = controls['status']['state']
+        return self._get_sleep_time()
 
-                        if state == 'idle':
-                            with controls['cmd_lock']:
-                                num_cmds = len(controls['cmd_queue'])
+    def _needs_poll(self, name, controls):
+        """
+        Controls only need to be polled if they're busy (running a command
+        or waiting on their own command to finish), or if another control
+        is waiting on their state. Idle controls and controls in a time,
+        sync, or check wait are never polled.
+        """
+        state = controls['status']['state']
 
-                            if num_cmds > 0:
-                                self._run_next_cmd(name)
-                                status_change = True
+        if controls['in_flight'] is not None:
+            # Worker thread will report the status when the command is done
+            poll = False
 
-            if not status_change:
-                time.sleep(0.5)
-            else:
-                time.sleep(0.005)
+        elif controls['poll_now']:
+            poll = True
+
+        elif state.startswith('wait_cmd'):
+            poll = True
+
+        elif state.startswith('wait'):
+            poll = False
+
+        elif state != 'idle':
+            poll = True
 
-        if self._stop_event.is_set():
-            self._stop_event.clear()
         else:
-            self._abort()
+            poll = name in self._get_wait_participants()
 
-        logger.info("Quitting automator thread: %s", self.name)
+        return poll
+
+    def _get_wait_participants(self):
+        participants = set()
+
+        for controls in self._auto_cons.values():
+            status = controls['status']
+
+            if (status['state'].startswith('wait')
+                and status.get('condition') in ('status', 'check')):
+                for con, state_list in status['inst_conds']:
+                    participants.add(con)
+
+        return participants
+
+    def _set_next_poll(self, controls):
+        if controls['push_status']:
+            interval = self._push_poll_interval
+        else:
+            interval = self._status_poll_interval
+
+        controls['next_poll'] = time.monotonic() + interval
+
+    def _get_sleep_time(self):
+        now = time.monotonic()
+
+        deadlines = []
+
+        if len(self._timer_heap) > 0:
+            deadlines.append(self._timer_heap[0][0])
+
+        for name, controls in self._auto_cons.items():
+            if self._needs_poll(name, controls):
+                deadlines.append(controls['next_poll'])
+
+        if len(deadlines) > 0:
+            sleep_time = max(min(deadlines) - now, 0)
+        else:
+            sleep_time = None
+
+        return sleep_time
+
+    def _on_control_state_change(self, name):
+        """
+        Marks any wait that has the named control as a participant so that
+        its condition gets re-evaluated.
+        """
+        for wait_name, controls in self._auto_cons.items():
+            status = controls['status']
+
+            if (status['state'].startswith('wait')
+                and status.get('condition') in ('status', 'check')):
+                for con, state_list in status['inst_conds']:
+                    if con == name:
+                        self._dirty_waits.add(wait_name)
+                        break
+
+    def _set_status(self, name, status):
+        """
+        Sets the full status dictionary for a control, and handles the
+        bookkeeping for waits and timers that depend on it.
+        """
+        controls = self._auto_cons[name]
+        old_state = controls['status']['state']
+
+        controls['status'] = status
+
+        cond = status.get('condition')
+
+        if status['state'].startswith('wait'):
+            if cond == 'time':
+                deadline = status['t_start'] + status['t_wait']
+                self._timer_seq += 1
+                heapq.heappush(self._timer_heap, (deadline, self._timer_seq,
+                    name))
+
+            elif ((cond == 'status' or cond == 'check')
+                and not status['state'].startswith('wait_cmd')):
+                # wait_cmd states are resolved by polling the control
+                self._dirty_waits.add(name)
+
+        if status['state'] != old_state:
+            self._on_control_state_change(name)
+
+        self._wake_event.set()
 
     def _check_status(self, name):
         with self._auto_con_lock:
@@ -140,6 +344,9 @@ class Automator(threading.Thread):
                 if state is not None:
                     controls['status']['state'] = state
 
+            if state is not None and state != old_state:
+                self._on_control_state_change(name)
+
             if state == 'idle' and old_state != 'idle':
                 with controls['cmd_lock']:
                     prev_cmd_id = copy.copy(controls['run_id'])
@@ -149,33 +356,51 @@ class Automator(threading.Thread):
                 for finish_callback in self._on_finish_cmd_callbacks:
                     finish_callback(prev_cmd_id, queue_name, state)
 
-            # if state == 'idle' and num_cmds > 0:
-            #     logger.info('running next cmd from status')
-            #     self._run_next_cmd(name)
+    def _refresh_status(self, name):
+        """
+        Reads the control's state, unless a command is running on its worker.
+        The instrument only gets one request at a time, so then it's polled
+        after the worker posts the state from the command in
+        :py:meth:`_finish_cmd`.
+        """
+        controls = self._auto_cons[name]
+
+        if controls['in_flight'] is not None:
+            controls['poll_now'] = True
+        else:
+            self._check_status(name)
 
     def _inner_check_status(self, name):
         with self._auto_con_lock:
             controls = self._auto_cons[name]
 
             with controls['cmd_lock']:
-                cmd_func = controls['cmd_func']
+                controls['last_status'] = time.monotonic()
 
-                cmd_name = 'status'
-                cmd_args = []
-                cmd_kwargs = {'inst_name': name}
+                state = controls['pushed_state']
 
-                # Don't know why I did this. Leaving it here until testing
-                # state, success = cmd_func(cmd_name, cmd_args, cmd_kwargs)
+                if state is not None:
+                    controls['pushed_state'] = None
+                    return state
 
-                try:
-                    state, success = cmd_func(cmd_name, cmd_args, cmd_kwargs)
-                except Exception:
-                    logger.exception('Automator: %s failed to get status', name)
-                    success = False
-                    state = None
+                state = self._query_status(name, controls['cmd_func'])
+
+        return state
 
-                    for error_callback in self._on_error_cmd_callbacks:
-                        error_callback(-1, 'status', name)
+    def _query_status(self, name, cmd_func):
+        cmd_name = 'status'
+        cmd_args = []
+        cmd_kwargs = {'inst_name': name}
+
+        try:
+            state, success = cmd_func(cmd_name, cmd_args, cmd_kwargs)
+        except Exception:
+            logger.exception('Automator: %s failed to get status', name)
+            success = False
+            state = None
+
+            for error_callback in self._on_error_cmd_callbacks:
+                error_callback(-1, 'status', name)
 
         return state
 
@@ -186,13 +411,17 @@ class Automator(threading.Thread):
             with controls['cmd_lock']:
                 status = controls['status']
 
+                if not status['state'].startswith('wait'):
+                    # Stale timer or notification, wait already finished
+                    return
+
                 cond = status['condition']
 
                 if cond == 'time':
                     t_wait = status['t_wait']
                     t_start = status['t_start']
 
-                    if time.monotonic() - t_start > t_wait:
+                    if time.monotonic() - t_start >= t_wait:
                         wait_done = True
                     else:
                         wait_done = False
@@ -221,8 +450,8 @@ class Automator(threading.Thread):
 
                         if wait_done:
                             for con, state_list in inst_conds:
-                                self._check_status(con)
-                            self._check_status(name)
+                                self._refresh_status(con)
+                            self._refresh_status(name)
 
                     else:
                         for con, state_list in inst_conds:
@@ -246,7 +475,8 @@ class Automator(threading.Thread):
 
                     wait_done = True
 
-                    if status['state'].startswith('wait_check'):
+                    if (status['state'].startswith('wait_check')
+                        and not self._check_is_pending(status['state'])):
                         all_states = []
 
                         for con, state_list in inst_conds:
@@ -261,31 +491,73 @@ class Automator(threading.Thread):
                             wait_done = False
 
                         if wait_done:
-                            while len(self.check_response_queue) >0:
-                                self.check_response_queue.pop()
+                            self._start_check(name)
 
-                            cmd_id = controls['run_id']
+    def _check_is_pending(self, wait_state):
+        return any([check['state'] == wait_state for check in
+            self._pending_checks])
 
-                            state = self.get_automator_state()
-                            for check_callback in self._on_check_cmd_callbacks:
-                                check_callback(cmd_id, name, state)
+    def _start_check(self, name):
+        """
+        Asks the check callbacks to verify a command before it runs. This
+        doesn't wait for the answer, the check is resolved by
+        :py:meth:`_resolve_checks` once a response is added with
+        :py:meth:`add_check_response`, and in the meantime other queues keep
+        running.
+        """
+        controls = self._auto_cons[name]
+        status = controls['status']
 
-                            while True:
-                                if len(self.check_response_queue) > 0:
-                                    resp = self.check_response_queue.popleft()
-                                    break
-                                time.sleep(0.1)
+        if len(self._pending_checks) == 0:
+            while len(self.check_response_queue) >0:
+                self.check_response_queue.pop()
 
-                            if resp:
-                                for con, state_list in inst_conds:
-                                    self._check_status(con)
-                                self._check_status(name)
+        self._pending_checks.append({'name': name, 'state': status['state'],
+            'inst_conds': status['inst_conds']})
 
-                            else:
-                                self.set_automator_state('pause')
+        cmd_id = controls['run_id']
 
+        state = self.get_automator_state()
+        for check_callback in self._on_check_cmd_callbacks:
+            check_callback(cmd_id, name, state)
 
-    def _run_next_cmd(self, name):
+    def _resolve_checks(self):
+        """
+        Finishes pending checks in the order they were started, using any
+        responses that have come in.
+        """
+        while len(self._pending_checks) > 0 and len(self.check_response_queue) > 0:
+            resp = self.check_response_queue.popleft()
+            check = self._pending_checks.pop(0)
+
+            name = check['name']
+            inst_conds = check['inst_conds']
+
+            if self._auto_cons[name]['status']['state'] != check['state']:
+                # Wait was aborted while the check was pending
+                continue
+
+            if resp:
+                for con, state_list in inst_conds:
+                    self._refresh_status(con)
+                self._refresh_status(name)
+
+            else:
+                # Re-ask when the queue is resumed
+                self._dirty_waits.add(name)
+                self.set_automator_state('pause')
+
+    def _run_next_cmd(self, name, priority=False):
+        """
+        Starts the next command in the control's queue. Wait commands are
+        handled by the automator. Other commands are handed off to the
+        control's worker thread, so a slow command on one instrument doesn't
+        hold up starting commands on the others. Commands for a given control
+        still run in queue order, since each control has a single worker, so
+        the instrument never gets two commands at once. If priority is True
+        the command runs next on the worker, ahead of anything else queued
+        there (used for aborts).
+        """
         with self._auto_con_lock:
             controls = self._auto_cons[name]
 
@@ -310,46 +582,125 @@ class Automator(threading.Thread):
                     run_callback(cmd_id, cmd_name, prev_cmd_id, state)
 
                 if not cmd_name.startswith('wait'):
+                    prev_state = controls['status']['state']
 
-                    try:
-                        ex_state, success = cmd_func(cmd_name, cmd_args, cmd_kwargs)
-                    except Exception:
-                        logger.exception(('Automator: {} failed to run cmd {} with '
-                            'args {} and kwargs {}').format(name, cmd_name,
-                            cmd_args, cmd_kwargs))
-                        success = False
-                        traceback.print_exc()
+                    controls['in_flight'] = cmd_id
+                    controls['status']['state'] = 'running_cmd'
+                    self._on_control_state_change(name)
+
+                    controls['worker'].add_cmd(functools.partial(
+                        self._execute_cmd, name, cmd_func, cmd_id, cmd_name,
+                        cmd_args, cmd_kwargs, prev_state), priority)
+
+                else:
+                    status = cmd_kwargs
+                    status['state'] = cmd_name
+
+                    if status['condition'] == 'time':
+                        status['t_start'] = time.monotonic()
+
+                    self._set_status(name, status)
+
+    def _execute_cmd(self, name, cmd_func, cmd_id, cmd_name, cmd_args,
+        cmd_kwargs, prev_state):
+        """
+        Runs a command and reads back the instrument status. Called in the
+        control's worker thread, so it must not take the automator locks.
+        """
+        state = None
+
+        try:
+            ex_state, success = cmd_func(cmd_name, cmd_args, cmd_kwargs)
+        except Exception:
+            logger.exception(('Automator: {} failed to run cmd {} with '
+                'args {} and kwargs {}').format(name, cmd_name,
+                cmd_args, cmd_kwargs))
+            ex_state = None
+            success = False
+            traceback.print_exc()
+
+            for error_callback in self._on_error_cmd_callbacks:
+                error_callback(cmd_id, cmd_name, name)
+
+        if success:
+            state = self._query_status(name, cmd_func)
+
+        return name, cmd_id, ex_state, success, state, prev_state
+
+    def _finish_completed_cmds(self):
+        while len(self._completed_cmds) > 0:
+            self._finish_cmd(*self._completed_cmds.popleft())
+
+    def _on_cmd_complete(self, result):
+        """
+        Called from a control worker thread when a command finishes.
+        """
+        self._completed_cmds.append(result)
+        self._wake_event.set()
 
-                        for error_callback in self._on_error_cmd_callbacks:
-                            error_callback(cmd_id, cmd_name, name)
+    def _finish_cmd(self, name, cmd_id, ex_state, success, state, prev_state):
+        """
+        Updates the control status once a command has run.
+        """
+        controls = self._auto_cons[name]
+
+        with controls['cmd_lock']:
+            if controls['in_flight'] == cmd_id:
+                controls['in_flight'] = None
 
-                    if success:
-                        state = self._inner_check_status(name)
+            if controls['run_id'] != cmd_id:
+                # Control was aborted while the command was running
+                success = False
 
-                        if state != ex_state:
-                            wait_id = self.get_wait_id()
+            else:
+                controls['last_status'] = time.monotonic()
 
-                            status = {'state': 'wait_cmd_{}'.format(wait_id),
-                                'condition': 'status',
-                                'inst_conds': [[name, [ex_state,]]]}
+            if success:
+                if state != ex_state:
+                    wait_id = self.get_wait_id()
 
-                            controls['status'] = status
+                    status = {'state': 'wait_cmd_{}'.format(wait_id),
+                        'condition': 'status',
+                        'inst_conds': [[name, [ex_state,]]]}
 
-                        else:
-                            queue_name = copy.copy(name)
-                            for finish_callback in self._on_finish_cmd_callbacks:
-                                finish_callback(cmd_id, queue_name, state)
+                    self._set_status(name, status)
+                    self._set_next_poll(controls)
 
                 else:
-                    status = cmd_kwargs
-                    status['state'] = cmd_name
+                    if state is not None and state != controls['status']['state']:
+                        controls['status']['state'] = state
+                        self._on_control_state_change(name)
 
-                    if status['condition'] == 'time':
-                        status['t_start'] = time.monotonic()
+                    queue_name = copy.copy(name)
+                    for finish_callback in self._on_finish_cmd_callbacks:
+                        finish_callback(cmd_id, queue_name, state)
+
+            elif controls['in_flight'] is None:
+                if controls['status']['state'] == 'running_cmd':
+                    if prev_state == 'running_cmd':
+                        prev_state = 'idle'
 
-                    controls['status'] = status
+                    controls['status']['state'] = prev_state
+                    self._on_control_state_change(name)
 
-    def add_control(self, name, con_type, cmd_func, current_state='idle'):
+                controls['poll_now'] = True
+
+    def add_control(self, name, con_type, cmd_func, current_state='idle',
+        push_status=False):
+        """
+        Adds a control to the automator.
+
+        :param str name: The control name, used to refer to the control's
+            command queue.
+        :param str con_type: The control type.
+        :param function cmd_func: Function that runs commands (including
+            'status') for the control.
+        :param str current_state: The starting state of the control.
+        :param bool push_status: If True, the instrument calls
+            :py:meth:`notify_status_change` whenever its state changes, so the
+            automator only needs to poll it as a safety net. Otherwise busy
+            controls are polled every ``status_poll_interval``.
+        """
 
         controls = {
             'type'      : con_type, #Defines control type. E.g. hplc_pump1, hplc_pump2, batch
@@ -358,11 +709,46 @@ class Automator(threading.Thread):
             'status'    : {'state': current_state},
             'cmd_lock'  : threading.RLock(),
             'run_id'    : -1,
+            'push_status'   : push_status,
+            'pushed_state'  : None, #Most recent state pushed by the instrument
+            'next_poll'     : time.monotonic(),
+            'poll_now'      : False, #Set when the instrument notifies a change
+            'last_status'   : 0,
+            'in_flight'     : None, #ID of the command running in the worker
+            'worker'        : ControlWorker(self._on_cmd_complete,
+                                name='{}_worker'.format(name)),
             }
 
+        controls['worker'].start()
+
         with self._auto_con_lock:
             self._auto_cons[name] = controls
 
+        self._wake_event.set()
+
+    def notify_status_change(self, name, state=None):
+        """
+        Called by an instrument (from any thread) to tell the automator that
+        its state changed. If the new state is provided the automator uses
+        it directly, otherwise it queries the instrument status once on the
+        next pass of the automator thread.
+        """
+        # Doesn't take the control lock, so the instrument never blocks
+        # on a slow command running in the automator thread
+        with self._notify_lock:
+            self._notifications[name] = state
+
+        self._wake_event.set()
+
+    def add_check_response(self, response):
+        """
+        Answers the oldest pending check. A response of True lets the queues
+        continue past the check wait, False pauses the automator. Safe to call
+        from any thread.
+        """
+        self.check_response_queue.append(response)
+        self._wake_event.set()
+
     def add_cmd(self, name, cmd_name, cmd_args, cmd_kwargs, at_start=False):
         """
         Special commands include:
@@ -406,6 +792,8 @@ class Automator(threading.Thread):
         with self._auto_con_lock:
             self._cmd_id += 1
 
+        self._wake_event.set()
+
         return cur_id
 
     def remove_cmd(self, name, cmd_id):
@@ -480,6 +868,8 @@ class Automator(threading.Thread):
                 for state_callback in self._on_state_change_callbacks:
                     state_callback(state)
 
+        self._wake_event.set()
+
     def set_control_status(self, name, status_dict):
         """
         Can be used to directly set the control state if needed. Expects
@@ -487,7 +877,7 @@ class Automator(threading.Thread):
         automator
         """
         with self._auto_con_lock:
-            self._auto_cons[name]['status'] = status_dict
+            self._set_status(name, status_dict)
 
     def add_on_run_cmd_callback(self, callback_func):
         self._on_run_cmd_callbacks.append(callback_func)
@@ -542,10 +932,14 @@ class Automator(threading.Thread):
 
         if state.startswith('wait_t') or state.startswith('wait_sync'):
             controls['status']['state'] = 'idle'
+            self._on_control_state_change(name)
+            self._wake_event.set()
 
         else:
+            # The abort goes through the worker, so it doesn't run on the
+            # instrument at the same time as a command that's still running
             self.add_cmd(name, 'abort', [], {'inst_name': name}, at_start=True)
-            self._run_next_cmd(name)
+            self._run_next_cmd(name, priority=True)
 
         for abort_callback in self._on_abort_callbacks:
             abort_callback(old_id,  name)
@@ -558,6 +952,7 @@ class Automator(threading.Thread):
 
     def abort(self):
         self._abort_event.set()
+        self._wake_event.set()
 
     def _abort(self):
 
@@ -568,6 +963,52 @@ class Automator(threading.Thread):
         """Stops the thread cleanly."""
         logger.info("Starting to clean up and shut down automator thread: %s", self.name)
         self._stop_event.set()
+        self._wake_event.set()
+
+        with self._auto_con_lock:
+            for controls in self._auto_cons.values():
+                controls['worker'].stop()
+
+class ControlWorker(threading.Thread):
+    """
+    Runs commands for a single automator control, in the order they are
+    added, and reports the result back to the automator.
+    """
+    def __init__(self, on_complete, name=None):
+        """
+        :param function on_complete: Called with the return value of each
+            command once it finishes.
+        """
+        threading.Thread.__init__(self, name=name)
+        self.daemon = True
+
+        self._on_complete = on_complete
+
+        self._cmd_queue = deque()
+        self._cmd_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._cmd_event.wait()
+            self._cmd_event.clear()
+
+            while len(self._cmd_queue) > 0 and not self._stop_event.is_set():
+                cmd = self._cmd_queue.popleft()
+                result = cmd()
+                self._on_complete(result)
+
+    def add_cmd(self, cmd, at_start=False):
+        if at_start:
+            self._cmd_queue.appendleft(cmd)
+        else:
+            self._cmd_queue.append(cmd)
+
+        self._cmd_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._cmd_event.set()
 
 class AutoCommand(object):
     """
@@ -633,9 +1074,9 @@ class AutoCommand(object):
                 for cb_func in self._check_cmd_callbacks:
                     wx.CallAfter(cb_func, self.cmd_info)
             elif state == 'run' and len(self._check_cmd_callbacks) == 0:
-                self.automator.check_response_queue.append(True)
+                self.automator.add_check_response(True)
             else:
-                self.automator.check_response_queue.append(False)
+                self.automator.add_check_response(False)
 
     def set_command_status(self, aid, status, state):
         if aid in self.auto_ids:
@@ -1506,8 +1947,15 @@ class AutoPanel(wx.Panel):
                     self.automator.add_control(name, name,
                         inst_settings['automator_callback'])
             else:
+                push_status = 'add_status_callback' in inst_settings
+
                 self.automator.add_control(inst, inst,
-                    inst_settings['automator_callback'])
+                    inst_settings['automator_callback'],
+                    push_status=push_status)
+
+                if push_status:
+                    inst_settings['add_status_callback'](functools.partial(
+                        self.automator.notify_status_change, inst))
 
     def _create_layout(self):
 
@@ -4730,7 +5178,7 @@ class AutoList(utils.ItemList):
             elif ret == wx.ID_NO:
                 check_response = False
 
-        self.automator.check_response_queue.append(check_response)
+        self.automator.add_check_response(check_response)
 
     def _check_exposure_cmd(self, cmd_info):
         exp_panel = wx.FindWindowByName('exposure')
@@ -4767,7 +5215,7 @@ class AutoList(utils.ItemList):
             wx.CallAfter(self._show_check_dialog, msg, 'Exposure Warning')
 
         else:
-            self.automator.check_response_queue.append(True)
+            self.automator.add_check_response(True)
 
 
     def _add_item(self, item_info):
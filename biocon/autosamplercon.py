@@ -337,6 +337,11 @@ class Autosampler(object):
         self.coflow_y_motor = motorcon.EpicsMotor(self.device_settings['coflow_y_motor']['name'],
             *coflow_args, **coflow_kwargs)
 
+        # The coflow y position only changes when the cell is realigned, so
+        # it is tracked with a monitor instead of read before every needle move
+        self._coflow_y_pos = self.coflow_y_motor.position
+        self.coflow_y_motor.get_pv('readback').add_callback(self._on_coflow_y_move)
+
         self.set_base_position(self.settings['base_position']['plate_x'],
             self.settings['base_position']['plate_z'],
             self.settings['base_position']['needle_y'])
@@ -481,58 +486,31 @@ class Autosampler(object):
                 plate_z_pos = position[1]
                 needle_y_pos = position[2]
 
-                coflow_y_pos = self.coflow_y_motor.position
-                if y_offset:
-                    offset = coflow_y_pos - self.coflow_y_ref
-                else:
-                    offset = 0
-                needle_y_pos += offset
+                needle_y_pos += self._get_needle_y_offset(y_offset)
 
                 self.plate_x_motor.move_absolute(plate_x_pos)
                 self.plate_z_motor.move_absolute(plate_z_pos)
                 self.needle_y_motor.move_absolute(needle_y_pos)
-                self._sleep(0.05)
 
-                while (self.plate_x_motor.is_moving()
-                    or self.needle_y_motor.is_moving()
-                    or self.plate_z_motor.is_moving()):
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.plate_x_motor,
+                    self.plate_z_motor, self.needle_y_motor])
 
             elif motor == 'plate_x':
                 self.plate_x_motor.move_absolute(position)
-                self._sleep(0.05)
 
-                while self.plate_x_motor.is_moving():
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.plate_x_motor])
 
             elif motor == 'plate_z':
                 self.plate_z_motor.move_absolute(position)
-                self._sleep(0.05)
 
-                while self.plate_z_motor.is_moving():
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.plate_z_motor])
 
             elif motor == 'needle_y':
-                coflow_y_pos = self.coflow_y_motor.position
-                if y_offset:
-                    offset = coflow_y_pos - self.coflow_y_ref
-                else:
-                    offset = 0
-                position += offset
+                position += self._get_needle_y_offset(y_offset)
 
                 self.needle_y_motor.move_absolute(position)
-                self._sleep(0.05)
 
-                while self.needle_y_motor.is_moving():
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.needle_y_motor])
 
         self._dec_active()
 
@@ -549,46 +527,115 @@ class Autosampler(object):
                 self.plate_x_motor.move_relative(position[0])
                 self.plate_z_motor.move_relative(position[1])
                 self.needle_y_motor.move_relative(position[2])
-                self._sleep(0.05)
 
-                while (self.plate_x_motor.is_moving()
-                    or self.needle_y_motor.is_moving()
-                    or self.plate_z_motor.is_moving()):
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.plate_x_motor,
+                    self.plate_z_motor, self.needle_y_motor])
 
             elif motor == 'plate_x':
                 self.plate_x_motor.move_relative(position)
-                self._sleep(0.05)
 
-                while self.plate_x_motor.is_moving():
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.plate_x_motor])
 
             elif motor == 'plate_z':
                 self.plate_z_motor.move_relative(position)
-                self._sleep(0.05)
 
-                while self.plate_z_motor.is_moving():
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.plate_z_motor])
 
             elif motor == 'needle_y':
                 self.needle_y_motor.move_relative(position)
-                self._sleep(0.05)
 
-                while self.needle_y_motor.is_moving():
-                    abort = self._sleep(0.02)
-                    if abort:
-                        break
+                abort = self._wait_for_motors([self.needle_y_motor])
+
+        self._dec_active()
+
+        return not abort
+
+    def _move_plate_needle_out(self, plate_x, plate_z=None):
+        """
+        Moves the needle to the out position and the plate to the given
+        position. Rather than waiting for the needle to finish retracting,
+        the plate starts moving as soon as the needle tip is the
+        needle_clear_height above the top of the plate, so the two moves
+        overlap.
+
+        :param float plate_x: Plate x position to move to.
+        :param float plate_z: Plate z position to move to. If None, the
+            plate z position isn't changed.
+
+        :returns: True if the move completed, False if it was aborted.
+        :rtype: bool
+        """
+        self._inc_active()
+
+        abort = self._check_abort()
+
+        if not abort:
+            offset = self._get_needle_y_offset()
+            clear_y = (self.base_position[2] + self.well_plate.plate_height
+                + self.settings['needle_clear_height'] + offset)
+
+            self.needle_y_motor.move_absolute(self.needle_out_position + offset)
+
+            while not self.needle_y_motor.wait_for_position(clear_y,
+                timeout=0.05):
+                abort = self._check_abort()
+
+                if abort or self.needle_y_motor.wait_for_move(0):
+                    # Aborted, or the needle stopped short of the clear height
+                    break
+
+        if not abort:
+            motors = [self.plate_x_motor, self.needle_y_motor]
+
+            self.plate_x_motor.move_absolute(plate_x)
+
+            if plate_z is not None:
+                self.plate_z_motor.move_absolute(plate_z)
+                motors.append(self.plate_z_motor)
+
+            abort = self._wait_for_motors(motors)
 
         self._dec_active()
 
         return not abort
 
+    def _wait_for_motors(self, motors):
+        """
+        Waits for all of the motors to finish moving, checking for an abort
+        while waiting.
+
+        :param list motors: The motors to wait for.
+
+        :returns: True if the move was aborted, False otherwise.
+        :rtype: bool
+        """
+        abort = False
+
+        for motor in motors:
+            while not motor.wait_for_move(0.05):
+                abort = self._check_abort()
+                if abort:
+                    break
+
+            if abort:
+                break
+
+        if not abort:
+            abort = self._check_abort()
+
+        return abort
+
+    def _get_needle_y_offset(self, y_offset=True):
+        if y_offset:
+            offset = self._coflow_y_pos - self.coflow_y_ref
+        else:
+            offset = 0
+
+        return offset
+
+    def _on_coflow_y_move(self, value, **kwargs):
+        self._coflow_y_pos = float(value)
+
     def set_motor_velocity(self, velocity, motor='all'):
         if motor == 'all':
             self.x_velocity = float(velocity[0])
@@ -813,14 +860,8 @@ class Autosampler(object):
         if self._active_count == 1:
             self._status = 'Moving to clean'
 
-        success = self.move_motors_absolute(self.needle_out_position, 'needle_y')
-        if success:
-            abort = self._sleep(1)
-            if not abort:
-                success = self.move_motors_absolute([self.clean_position[0],
-                    self.clean_position[1], self.needle_out_position])
-            else:
-                success = False
+        success = self._move_plate_needle_out(self.clean_position[0],
+            self.clean_position[1])
 
         if success:
             abort = self._sleep(1)
@@ -903,16 +944,9 @@ class Autosampler(object):
         cur_plate_x = self.plate_x_motor.position
 
         if cur_plate_x != self.plate_x_load:
-            success = self.move_needle_out(False)
+            success = self._move_plate_needle_out(self.plate_x_out)
         else:
-            success =  True
-
-        if success:
-            abort = self._sleep(1)
-            if not abort:
-                success = self.move_motors_absolute(self.plate_x_out, 'plate_x')
-            else:
-                success = False
+            success = self.move_motors_absolute(self.plate_x_out, 'plate_x')
 
         self._dec_active()
 
@@ -938,16 +972,11 @@ class Autosampler(object):
         cur_plate_x = self.plate_x_motor.position
 
         if cur_plate_x != self.plate_x_out:
-            success = self.move_motors_absolute(self.needle_out_position, 'needle_y')
-            if success:
-                abort = self._sleep(1)
-                success = not abort
+            success = self._move_plate_needle_out(self.plate_x_load,
+                self.plate_z_load)
         else:
-            success = True
-
-        if success:
             success = self.move_motors_absolute([self.plate_x_load,
-                self.plate_z_load, self.needle_y_motor.position])
+                self.plate_z_load, self.needle_y_motor.position], y_offset=False)
 
         self._dec_active()
 
@@ -971,14 +1000,8 @@ class Autosampler(object):
 
         well_position = self.get_well_position(row, column)
 
-        success = self.move_motors_absolute(self.needle_out_position, 'needle_y')
-
-        if success:
-            abort = self._check_abort()
-            success = not abort
-            if success:
-                success = self.move_motors_absolute([well_position[0],
-                    well_position[1], self.needle_out_position])
+        success = self._move_plate_needle_out(well_position[0],
+            well_position[1])
 
         self._dec_active()
 
@@ -3493,6 +3516,7 @@ default_autosampler_settings = {
     'base_position'         : {'plate_x': 328.5, 'plate_z': -68.0, 'needle_y': 114.0}, # A1 well position, needle height at chiller plate top
     'clean_offsets'         : {'plate_x': 99.4, 'plate_z': -21.4, 'needle_y': -10}, # Relative to base position
     'needle_out_offset'     : 5, # mm
+    'needle_clear_height'   : 2, # mm above the plate top the needle must be before the plate can move
     'needle_in_position'    : -2.3,
     'plate_out_position'    : {'plate_x': -31, 'plate_z': 0}, # Relative
     'plate_load_position'   : {'plate_x': 0, 'plate_z': -80.4}, # Absolute
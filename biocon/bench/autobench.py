@@ -0,0 +1,552 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless benchmark for the automator. Drives an :py:class:`autocon.Automator`
+with simulated HPLC, coflow, autosampler and exposure controls running SEC or
+batch sample commands, and reports how long the automator takes to dispatch
+commands and resolve waits, independent of how long the (simulated)
+instruments take to do the work. Useful for comparing scheduler changes
+without beam time.
+
+Run from the biocon folder, e.g.:
+    python bench/autobench.py --mode batch --samples 96
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import numpy as np
+
+import autocon
+
+
+# Instrument simulation settings. Durations are in s before scaling, busy
+# states are what the real controls report while running the command.
+sim_instruments = {
+    'hplc'          : {
+        'durations'     : {'inject': 30, 'stop_flow': 1},
+        'busy_states'   : {'inject': 'run', 'stop_flow': 'run'},
+        },
+    'coflow'        : {
+        'durations'     : {},
+        'busy_states'   : {},
+        },
+    'autosampler'   : {
+        'durations'     : {'load_and_move_to_inject': 60, 'load_sample': 50,
+                            'move_to_inject': 10, 'inject': 20,},
+        'busy_states'   : {'load_and_move_to_inject': 'load',
+                            'load_sample': 'load',
+                            'move_to_inject': 'move_to_inject',
+                            'inject': 'inject'},
+        },
+    'exp'           : {
+        'durations'     : {},
+        'busy_states'   : {'expose': 'exposing'},
+        },
+    }
+
+
+class SimInstrument(object):
+    """
+    A simulated automator control. Each command puts the instrument into
+    a busy state for a fixed (scaled) time, then it returns to idle.
+    """
+    def __init__(self, name, durations, busy_states, time_scale=1.,
+        automator=None, trigger_target=None):
+        """
+        :param str name: The automator control name.
+        :param dict durations: Command durations in s, keyed by command name.
+        :param dict busy_states: State reported while a command runs, keyed
+            by command name. Commands not in the dictionary finish instantly.
+        :param float time_scale: Multiplier applied to all durations.
+        :param autocon.Automator automator: If provided, the instrument pushes
+            its status to the automator when a command finishes.
+        :param SimInstrument trigger_target: If provided, an inject command
+            triggers this instrument (used to start the exposure).
+        """
+        self.name = name
+        self.durations = durations
+        self.busy_states = busy_states
+        self.time_scale = time_scale
+        self.automator = automator
+        self.trigger_target = trigger_target
+
+        self.history = [] # [cmd_name, busy_state, t_start, t_done]
+        self.status_calls = 0
+
+        self._busy_state = 'idle'
+        self._t_done = 0
+        self._trig_duration = None
+        self._lock = threading.Lock()
+
+    def _get_duration(self, cmd_name, cmd_kwargs):
+        if cmd_name == 'expose':
+            duration = (float(cmd_kwargs['num_frames'])
+                *float(cmd_kwargs['exp_period']))
+        elif cmd_name == 'inject' and 'elution_vol' in cmd_kwargs:
+            duration = (float(cmd_kwargs['elution_vol'])
+                /float(cmd_kwargs['flow_rate'])*60)
+        else:
+            duration = self.durations.get(cmd_name, 0)
+
+        return duration*self.time_scale
+
+    def _get_state(self):
+        if time.monotonic() >= self._t_done:
+            self._busy_state = 'idle'
+
+        return self._busy_state
+
+    def is_idle(self):
+        with self._lock:
+            idle = self._get_state() == 'idle'
+
+        return idle
+
+    def _on_cmd_done(self):
+        if self.automator is not None:
+            self.automator.notify_status_change(self.name)
+
+    def _start_timer(self, duration):
+        timer = threading.Timer(duration, self._on_cmd_done)
+        timer.daemon = True
+        timer.start()
+
+    def trigger(self):
+        """
+        Starts a command that is waiting for a trigger.
+        """
+        with self._lock:
+            if self._trig_duration is not None:
+                t_start = time.monotonic()
+                self._t_done = t_start + self._trig_duration
+                self.history[-1][3] = self._t_done
+                self._start_timer(self._trig_duration)
+                self._trig_duration = None
+
+    def automator_callback(self, cmd_name, cmd_args, cmd_kwargs):
+        with self._lock:
+            if cmd_name == 'status':
+                self.status_calls += 1
+                state = self._get_state()
+
+            elif cmd_name == 'abort':
+                self._t_done = 0
+                state = self._get_state()
+
+            else:
+                duration = self._get_duration(cmd_name, cmd_kwargs)
+                busy_state = self.busy_states.get(cmd_name, 'idle')
+
+                t_start = time.monotonic()
+
+                if duration > 0 and busy_state != 'idle':
+                    self._busy_state = busy_state
+
+                    if (cmd_name == 'expose'
+                        and cmd_kwargs.get('wait_for_trig', False)):
+                        self._t_done = float('inf')
+                        self._trig_duration = duration
+                    else:
+                        self._t_done = t_start + duration
+                        self._start_timer(duration)
+
+                else:
+                    duration = 0
+
+                self.history.append([cmd_name, busy_state, t_start,
+                    self._t_done if duration > 0 else t_start])
+
+                state = self._get_state()
+
+        if (cmd_name == 'inject' and self.trigger_target is not None):
+            self.trigger_target.trigger()
+
+        return state, True
+
+
+class BenchAutomator(autocon.Automator):
+    """
+    Automator that keeps a record of every command added to it.
+    """
+    def __init__(self, *args, **kwargs):
+        autocon.Automator.__init__(self, *args, **kwargs)
+
+        self.cmd_info = {} # aid: (queue, cmd_name, cmd_kwargs)
+
+    def add_cmd(self, name, cmd_name, cmd_args, cmd_kwargs, at_start=False):
+        cmd_id = autocon.Automator.add_cmd(self, name, cmd_name, cmd_args,
+            cmd_kwargs, at_start)
+
+        self.cmd_info[cmd_id] = (name, cmd_name, cmd_kwargs)
+
+        return cmd_id
+
+class AutomatorRecorder(object):
+    """
+    Records automator run and finish callbacks, and works out the dispatch
+    and wait resolution latencies once the run is over.
+    """
+    def __init__(self, automator):
+        self.automator = automator
+
+        self.cmd_info = automator.cmd_info
+        self.run_times = {}
+        self.end_times = {}
+
+        self._lock = threading.Lock()
+
+        automator.add_on_run_cmd_callback(self._on_run)
+        automator.add_on_finish_cmd_callback(self._on_finish)
+
+    def _on_run(self, aid, cmd_name, prev_aid, state):
+        t = time.monotonic()
+
+        with self._lock:
+            self.run_times[aid] = t
+
+            if prev_aid not in self.end_times:
+                self.end_times[prev_aid] = t
+
+    def _on_finish(self, aid, queue_name, state):
+        t = time.monotonic()
+
+        with self._lock:
+            if aid not in self.end_times:
+                self.end_times[aid] = t
+
+    def is_done(self, instruments):
+        with self._lock:
+            done = all([aid in self.run_times and (aid in self.end_times
+                or not self.cmd_info[aid][1].startswith('wait'))
+                for aid in self.cmd_info])
+
+        if done:
+            done = all([inst.is_idle() for inst in instruments.values()])
+
+        return done
+
+    def analyze(self, instruments, t_start):
+        """
+        Returns the dispatch latency of every queue item (time from the
+        previous item in the queue finishing to the item starting) and the
+        resolution latency of every wait (time from the wait condition being
+        met to the wait ending), where those can be determined.
+        """
+        queues = {}
+        for aid in sorted(self.cmd_info):
+            queues.setdefault(self.cmd_info[aid][0], []).append(aid)
+
+        wait_starts = {}
+        for aid, (queue, cmd_name, kwargs) in self.cmd_info.items():
+            if cmd_name.startswith('wait') and aid in self.run_times:
+                wait_starts[(queue, cmd_name)] = self.run_times[aid]
+
+        dispatch = []
+        wait_res = []
+
+        for queue, aids in queues.items():
+            history = list(instruments[queue].history)
+            prev_ready = t_start
+
+            for aid in aids:
+                queue, cmd_name, kwargs = self.cmd_info[aid]
+
+                if aid not in self.run_times:
+                    break
+
+                t_run = self.run_times[aid]
+
+                if prev_ready is not None:
+                    # Time from the previous queue item actually finishing
+                    # to the automator starting this one
+                    dispatch.append(max(t_run - prev_ready, 0))
+
+                if not cmd_name.startswith('wait'):
+                    if len(history) > 0:
+                        prev_ready = history.pop(0)[3]
+                    else:
+                        prev_ready = None
+
+                elif aid in self.end_times:
+                    t_end = self.end_times[aid]
+                    ready = self._get_wait_ready(t_run, t_end, kwargs,
+                        wait_starts, instruments)
+
+                    if ready is not None:
+                        wait_res.append(max(t_end - ready, 0))
+
+                    prev_ready = ready
+
+                else:
+                    break
+
+        return np.array(dispatch), np.array(wait_res)
+
+    def _get_wait_ready(self, t_run, t_end, kwargs, wait_starts, instruments):
+        cond = kwargs['condition']
+
+        if cond == 'time':
+            ready = t_run + kwargs['t_wait']
+
+        else:
+            ready = t_run
+
+            for con, state_list in kwargs['inst_conds']:
+                con_ready = None
+
+                for state in state_list:
+                    if state.startswith('wait'):
+                        con_ready = wait_starts.get((con, state), None)
+
+                    else:
+                        for cmd in instruments[con].history:
+                            if cmd[1] == state and cmd[2] <= t_end:
+                                con_ready = cmd[2]
+
+                if con_ready is None:
+                    return None
+
+                ready = max(ready, con_ready)
+
+        return ready
+
+
+def make_sec_cmd_info(sample_num):
+    cmd_info = {
+        'inst'          : 'hplc_pump1',
+        'filename'      : 'sample_{:03d}'.format(sample_num),
+        'acq_method'    : 'sim',
+        'sample_loc'    : 'D1F-A{}'.format(sample_num%8+1),
+        'inj_vol'       : 50,
+        'flow_rate'     : 0.6,
+        'elution_vol'   : 24,
+        'flow_accel'    : 0.1,
+        'pressure_lim'  : 60,
+        'result_path'   : '',
+        'sp_method'     : '',
+        'wait_for_flow_ramp'    : True,
+        'settle_time'   : 0,
+        'stop_flow'     : False,
+        'start_coflow'  : True,
+        'stop_coflow'   : False,
+        'coflow_fr'     : 0.6,
+        'num_frames'    : int(24/0.6*60),
+        'exp_period'    : 1,
+        'wait_for_trig' : True,
+        }
+
+    return cmd_info
+
+def make_batch_cmd_info(sample_num):
+    cmd_info = {
+        'filename'      : 'sample_{:03d}'.format(sample_num),
+        'pre_buf_exp'   : sample_num % 2 == 0,
+        'pre_buf_exp_time'  : 10,
+        'start_coflow'  : True,
+        'stop_coflow'   : False,
+        'coflow_fr'     : 0.6,
+        'num_frames'    : 20,
+        'exp_period'    : 1,
+        'wait_for_trig' : True,
+        }
+
+    return cmd_info
+
+def run_benchmark(mode='batch', num_samples=96, time_scale=0.002,
+    push_status=True, status_poll_interval=0.5, timeout=None):
+    """
+    Runs the automator benchmark.
+
+    :param str mode: Either 'sec' or 'batch'.
+    :param int num_samples: Number of sample commands to queue.
+    :param float time_scale: Multiplier applied to simulated instrument
+        durations, so a plate can be run in a reasonable time.
+    :param bool push_status: Whether the simulated instruments push status
+        changes to the automator or are polled.
+    :param float status_poll_interval: Automator poll interval for controls
+        that don't push their status.
+    :param float timeout: Maximum time in s to wait for the run to finish.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    automator = BenchAutomator(name='BenchAutomator',
+        status_poll_interval=status_poll_interval)
+    automator.set_automator_state('pause')
+    automator.start()
+
+    if mode == 'sec':
+        inst_names = {'hplc_pump1': 'hplc', 'coflow': 'coflow', 'exp': 'exp'}
+        cmd_class = autocon.SecSampleCommand
+        make_cmd_info = make_sec_cmd_info
+    else:
+        inst_names = {'autosampler': 'autosampler', 'coflow': 'coflow',
+            'exp': 'exp'}
+        cmd_class = autocon.BatchSampleCommand
+        make_cmd_info = make_batch_cmd_info
+
+    instruments = {}
+
+    if push_status:
+        push_automator = automator
+    else:
+        push_automator = None
+
+    # Exposure is created first so the injecting instrument can trigger it
+    for name in sorted(inst_names, key=lambda name: name != 'exp'):
+        sim_type = inst_names[name]
+
+        inst = SimInstrument(name, sim_instruments[sim_type]['durations'],
+            sim_instruments[sim_type]['busy_states'], time_scale,
+            push_automator, instruments.get('exp', None))
+
+        instruments[name] = inst
+
+        automator.add_control(name, name, inst.automator_callback,
+            push_status=push_status)
+
+    recorder = AutomatorRecorder(automator)
+
+    for i in range(num_samples):
+        cmd = cmd_class(automator, make_cmd_info(i))
+        cmd.initialize()
+
+    num_cmds = len(recorder.cmd_info)
+
+    t_start = time.monotonic()
+    automator.set_automator_state('run')
+
+    while not recorder.is_done(instruments):
+        time.sleep(0.05)
+
+        if timeout is not None and time.monotonic() - t_start > timeout:
+            logger.warning('Automator benchmark timed out')
+            break
+
+    t_end = max(max(recorder.end_times.values()),
+        max([inst.history[-1][3] for inst in instruments.values()
+        if len(inst.history) > 0]))
+
+    automator.stop()
+    automator.join(5)
+
+    dispatch, wait_res = recorder.analyze(instruments, t_start)
+
+    ideal_time = _get_ideal_time(instruments, recorder)
+
+    results = {
+        'mode'              : mode,
+        'num_samples'       : num_samples,
+        'num_cmds'          : num_cmds,
+        'push_status'       : push_status,
+        'plate_time'        : t_end - t_start,
+        'instrument_time'   : ideal_time,
+        'dispatch_latency'  : dispatch,
+        'wait_latency'      : wait_res,
+        'status_calls'      : sum([inst.status_calls for inst in
+                                instruments.values()]),
+        }
+
+    return results
+
+def _get_ideal_time(instruments, recorder):
+    """
+    Time the instruments actually spent busy on the critical path is not
+    known exactly, so this reports the union of all instrument busy
+    intervals and time waits, which is a lower bound on the plate time.
+    """
+    intervals = [(cmd[2], cmd[3]) for inst in instruments.values()
+        for cmd in inst.history if cmd[3] > cmd[2]]
+
+    for aid, (queue, cmd_name, kwargs) in recorder.cmd_info.items():
+        if (cmd_name.startswith('wait') and kwargs['condition'] == 'time'
+            and aid in recorder.run_times):
+            t_run = recorder.run_times[aid]
+            intervals.append((t_run, t_run + kwargs['t_wait']))
+
+    intervals.sort()
+
+    busy = 0
+    cur_start = None
+    cur_end = None
+
+    for start, end in intervals:
+        if cur_end is None or start > cur_end:
+            if cur_end is not None:
+                busy += cur_end - cur_start
+            cur_start = start
+            cur_end = end
+        else:
+            cur_end = max(cur_end, end)
+
+    if cur_end is not None:
+        busy += cur_end - cur_start
+
+    return busy
+
+def format_results(results):
+    lines = ['Automator benchmark: {} mode, {} samples, {} automator commands, '
+        'status {}'.format(results['mode'], results['num_samples'],
+        results['num_cmds'], 'pushed' if results['push_status'] else 'polled')]
+
+    for key, label in [('dispatch_latency', 'Queue item dispatch latency'),
+        ('wait_latency', 'Wait resolution latency')]:
+        vals = results[key]*1000
+
+        if len(vals) > 0:
+            lines.append(('{} (ms, n={}): mean {:.2f}, median {:.2f}, '
+                '95% {:.2f}, max {:.2f}').format(label, len(vals),
+                np.mean(vals), np.median(vals), np.percentile(vals, 95),
+                np.max(vals)))
+
+    lines.append('Total plate time: {:.2f} s (instruments busy {:.2f} s, '
+        'overhead {:.2f} s)'.format(results['plate_time'],
+        results['instrument_time'],
+        results['plate_time']-results['instrument_time']))
+    lines.append('Status queries: {}'.format(results['status_calls']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Automator throughput benchmark')
+    parser.add_argument('--mode', choices=['sec', 'batch'], default='batch')
+    parser.add_argument('--samples', type=int, default=96)
+    parser.add_argument('--time-scale', type=float, default=0.002)
+    parser.add_argument('--poll', action='store_true',
+        help='Poll instrument status instead of pushing it')
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.mode, args.samples, args.time_scale,
+        not args.poll, args.poll_interval)
+
+    print(format_results(results))
@@ -0,0 +1,345 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of automator check waits. Simulated exposure and coflow
+controls share a check wait before they start, as for a sample, while a
+simulated HPLC runs a series of commands in its own queue. The check is
+left unanswered until the HPLC queue is finished, and the test checks that
+the HPLC kept running while the check was pending, and that the exposure
+and coflow only start once the check is answered. A second check is then
+answered with False, which should pause the automator and ask again when
+it's resumed. Last, a check that also depends on a control running a long
+command is answered while the command runs, and the test checks that the
+control isn't sent a status query until its command is done.
+
+Run from the biocon folder, e.g.:
+    python bench/checkbench.py --steps 10
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import autocon
+
+from autobench import SimInstrument
+
+
+class BlockingInstrument(SimInstrument):
+    """
+    Simulated control whose commands block in the command function, as for
+    an instrument that only returns once the command is done. Counts any
+    call made while a command is still running.
+    """
+    def __init__(self, name, block_time, automator):
+        SimInstrument.__init__(self, name, {}, {}, 1., automator)
+
+        self.block_time = block_time
+        self.overlaps = 0
+        self.running = threading.Event()
+
+        self._call_lock = threading.Lock()
+
+    def automator_callback(self, cmd_name, cmd_args, cmd_kwargs):
+        with self._call_lock:
+            if self.running.is_set():
+                self.overlaps += 1
+
+            blocking = cmd_name not in ('status', 'abort')
+
+            if blocking:
+                self.running.set()
+
+        try:
+            if blocking:
+                time.sleep(self.block_time)
+
+            ret = SimInstrument.automator_callback(self, cmd_name, cmd_args,
+                cmd_kwargs)
+
+        finally:
+            if blocking:
+                self.running.clear()
+
+        return ret
+
+class CheckRecorder(object):
+    """
+    Records the check callbacks, without answering them.
+    """
+    def __init__(self, automator):
+        self.checks = []
+        self._event = threading.Event()
+
+        automator.add_on_check_cmd_callback(self._on_check)
+
+    def _on_check(self, cmd_id, name, state):
+        self.checks.append((time.monotonic(), name))
+        self._event.set()
+
+    def wait(self, num_checks, timeout):
+        start = time.monotonic()
+
+        while (len(self.checks) < num_checks
+            and time.monotonic() - start < timeout):
+            self._event.wait(0.01)
+            self._event.clear()
+
+        return len(self.checks) >= num_checks
+
+
+def wait_for(condition, timeout):
+    start = time.monotonic()
+
+    while not condition() and time.monotonic() - start < timeout:
+        time.sleep(0.005)
+
+    return condition()
+
+def get_cmd_times(inst, cmd_name):
+    return [cmd[2] for cmd in inst.history if cmd[0] == cmd_name]
+
+def add_sample(automator, check_num):
+    check_wait_cmd = 'wait_check_{}'.format(automator.get_wait_id())
+    check_conds = [['exp', [check_wait_cmd,]], ['coflow', [check_wait_cmd,]],]
+
+    automator.add_cmd('exp', check_wait_cmd, [], {'condition': 'check',
+        'inst_conds': check_conds})
+    automator.add_cmd('exp', 'expose', [], {'num_frames': 1,
+        'exp_period': 0.05})
+
+    automator.add_cmd('coflow', check_wait_cmd, [], {'condition': 'check',
+        'inst_conds': check_conds})
+    automator.add_cmd('coflow', 'start', [], {'check_num': check_num})
+
+def run_test(num_steps=10, step_time=0.05, timeout=10., block_time=0.5):
+    """
+    Runs the check wait scenario.
+
+    :param int num_steps: Number of HPLC commands run while the first check
+        is pending.
+    :param float step_time: Duration of each HPLC command in s.
+    :param float timeout: Maximum time in s to wait for each stage.
+    :param float block_time: Duration of the blocking command in s.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    automator = autocon.Automator(name='CheckAutomator')
+    automator.start()
+
+    instruments = {
+        'exp'       : SimInstrument('exp', {}, {'expose': 'exposing'}, 1.,
+                        automator),
+        'coflow'    : SimInstrument('coflow', {'start': step_time},
+                        {'start': 'start'}, 1., automator),
+        'hplc'      : SimInstrument('hplc', {'inject': step_time},
+                        {'inject': 'run'}, 1., automator),
+        }
+
+    instruments['pump'] = BlockingInstrument('pump', block_time, automator)
+
+    for name, inst in instruments.items():
+        automator.add_control(name, name, inst.automator_callback,
+            push_status=True)
+
+    recorder = CheckRecorder(automator)
+
+    exp = instruments['exp']
+    coflow = instruments['coflow']
+    hplc = instruments['hplc']
+    pump = instruments['pump']
+
+    results = {'num_steps': num_steps}
+
+    try:
+        # First check, answered after the HPLC queue finishes
+        add_sample(automator, 1)
+
+        for num in range(num_steps):
+            automator.add_cmd('hplc', 'inject', [], {})
+
+        results['check_started'] = recorder.wait(1, timeout)
+
+        if not results['check_started']:
+            return results
+
+        results['hplc_finished'] = wait_for(lambda: len(hplc.history) == num_steps
+            and hplc.is_idle(), timeout)
+        results['hplc_time'] = time.monotonic() - recorder.checks[0][0]
+        results['started_while_pending'] = (len(get_cmd_times(exp, 'expose'))
+            + len(get_cmd_times(coflow, 'start')))
+
+        response_time = time.monotonic()
+        automator.add_check_response(True)
+
+        results['started_after_check'] = wait_for(lambda:
+            len(get_cmd_times(exp, 'expose')) == 1
+            and len(get_cmd_times(coflow, 'start')) == 1, timeout)
+
+        if results['started_after_check']:
+            results['start_latency'] = max(get_cmd_times(exp, 'expose')[0],
+                get_cmd_times(coflow, 'start')[0]) - response_time
+        else:
+            results['start_latency'] = None
+
+        # Second check, refused, then asked again on resume
+        add_sample(automator, 2)
+
+        results['second_check_started'] = recorder.wait(2, timeout)
+        automator.add_check_response(False)
+
+        results['paused'] = wait_for(lambda:
+            automator.get_automator_state() == 'pause', timeout)
+        time.sleep(0.1)
+        results['started_after_refusal'] = (len(get_cmd_times(exp, 'expose'))
+            + len(get_cmd_times(coflow, 'start')) - 2)
+
+        automator.set_automator_state('run')
+        results['check_asked_again'] = recorder.wait(3, timeout)
+        automator.add_check_response(True)
+
+        results['started_after_resume'] = wait_for(lambda:
+            len(get_cmd_times(exp, 'expose')) == 2
+            and len(get_cmd_times(coflow, 'start')) == 2, timeout)
+
+        # Third check, answered while a participant's command is running
+        automator.add_cmd('pump', 'flush', [], {})
+
+        results['pump_started'] = wait_for(pump.running.is_set, timeout)
+
+        check_wait_cmd = 'wait_check_{}'.format(automator.get_wait_id())
+        automator.add_cmd('exp', check_wait_cmd, [], {'condition': 'check',
+            'inst_conds': [['exp', [check_wait_cmd,]],
+            ['pump', ['idle', 'running_cmd']]]})
+        automator.add_cmd('exp', 'expose', [], {'num_frames': 1,
+            'exp_period': 0.05})
+
+        results['running_check_started'] = recorder.wait(4, timeout)
+        results['answered_while_running'] = pump.running.is_set()
+        automator.add_check_response(True)
+
+        results['started_after_running_check'] = wait_for(lambda:
+            len(get_cmd_times(exp, 'expose')) == 3, timeout)
+        results['pump_finished'] = wait_for(lambda: not pump.running.is_set(),
+            timeout)
+        time.sleep(0.1)
+        results['overlaps'] = pump.overlaps
+
+    finally:
+        automator.stop()
+        automator.join(5)
+
+    return results
+
+def check_results(results):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if not results['check_started']:
+        failed.append('The check callback was not called')
+        return failed
+
+    if not results['hplc_finished']:
+        failed.append('The HPLC queue did not finish while the check was pending')
+
+    if results['started_while_pending'] > 0:
+        failed.append('{} commands ran past the check before it was '
+            'answered'.format(results['started_while_pending']))
+
+    if not results['started_after_check']:
+        failed.append('The exposure and coflow did not start after the check')
+
+    if not results['second_check_started']:
+        failed.append('The second check callback was not called')
+        return failed
+
+    if not results['paused']:
+        failed.append('The automator did not pause on a refused check')
+
+    if results['started_after_refusal'] > 0:
+        failed.append('Commands ran past a refused check')
+
+    if not results['check_asked_again']:
+        failed.append('The check was not asked again on resume')
+
+    if not results['started_after_resume']:
+        failed.append('The exposure and coflow did not start after the '
+            'check was accepted on resume')
+
+    if not results['running_check_started']:
+        failed.append('The check with a running participant was not asked')
+        return failed
+
+    if not results['answered_while_running']:
+        failed.append('The check was answered after the participant\'s '
+            'command finished, increase --block-time')
+
+    if not results['started_after_running_check']:
+        failed.append('The exposure did not start after the check with a '
+            'running participant')
+
+    if results['overlaps'] > 0:
+        failed.append('{} calls were sent to a control while its command was '
+            'running'.format(results['overlaps']))
+
+    return failed
+
+def format_results(results):
+    lines = ['Check wait: {} HPLC commands run in {:.2f} s while the check '
+        'was pending'.format(results['num_steps'], results['hplc_time'])]
+
+    if results.get('start_latency', None) is not None:
+        lines.append('Exposure and coflow started {:.1f} ms after the check '
+            'was answered'.format(1000*results['start_latency']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Automator check wait test')
+    parser.add_argument('--steps', type=int, default=10,
+        help='HPLC commands run while the check is pending')
+    parser.add_argument('--step-time', type=float, default=0.05,
+        help='Duration of each HPLC command in s')
+    parser.add_argument('--block-time', type=float, default=0.5,
+        help='Duration of the blocking command in s')
+    args = parser.parse_args()
+
+    results = run_test(args.steps, args.step_time, block_time=args.block_time)
+
+    if results['check_started']:
+        print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
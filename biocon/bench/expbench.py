@@ -0,0 +1,232 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of the exposure status stream. A simulated exposure thread
+posts the same status events as :py:class:`expcon.ExpCommThread` (exposure
+state, scan numbers, trigger waits and frame counts) to an
+:py:class:`expcon.ExpStatusStream`, which is followed the same way the
+:py:class:`expcon.ExpPanel` does it, without a GUI. It checks that every
+state change is delivered in order, that the final frame count arrives, and
+that deliveries are limited to the refresh rate, and reports the CPU time
+used by the monitor thread.
+
+Run from the biocon folder, e.g.:
+    python bench/expbench.py --scans 5 --frames 2000 --exp-period 0.001
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import expcon
+
+
+class SimExposure(threading.Thread):
+    """
+    Posts status events for a simulated multi-scan exposure with a given
+    frame period.
+    """
+    def __init__(self, status, exp_event, num_scans, num_frames, exp_period,
+        wait_for_trig=True):
+        threading.Thread.__init__(self, name='SimExposure')
+        self.daemon = True
+
+        self.status = status
+        self.exp_event = exp_event
+        self.num_scans = num_scans
+        self.num_frames = num_frames
+        self.exp_period = exp_period
+        self.wait_for_trig = wait_for_trig
+
+        self.state_events = []
+        self.run_time = 0
+
+    def run(self):
+        start = time.monotonic()
+
+        self._set_exp_state(True)
+
+        for scan in range(1, self.num_scans+1):
+            self._post('scan', scan)
+
+            if self.wait_for_trig:
+                self._post('waiting', None)
+                time.sleep(self.exp_period*10)
+                self._post('exposing', None)
+
+            scan_start = time.monotonic()
+
+            for frame in range(1, self.num_frames+1):
+                # Frame timing is kept with the clock, not the sleep
+                delay = scan_start + frame*self.exp_period - time.monotonic()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+                self.status.post('frames', (scan-1)*self.num_frames+frame)
+
+        self._set_exp_state(False)
+
+        self.run_time = time.monotonic() - start
+
+    def _set_exp_state(self, exposing):
+        if exposing:
+            self.exp_event.set()
+        else:
+            self.exp_event.clear()
+
+        self._post('exp_state', exposing)
+
+    def _post(self, status, val):
+        self.state_events.append((status, val))
+        self.status.post(status, val)
+
+
+class MonitorRecorder(object):
+    """
+    Records what the monitor delivers and the CPU time its thread uses.
+    """
+    def __init__(self):
+        self.events = []
+        self.deliveries = 0
+        self.cpu_time = 0
+
+    def callback(self, events):
+        self.deliveries += 1
+        self.events.extend(events)
+
+    def follow_stream(self, stream, exp_event, abort_event, interval):
+        cpu_start = time.thread_time()
+        stream.follow_exposure(exp_event, abort_event, self.callback, interval)
+        self.cpu_time = time.thread_time() - cpu_start
+
+def run_test(num_scans=5, num_frames=2000, exp_period=0.001, interval=0.1):
+    """
+    Runs a simulated exposure and follows its status.
+
+    :param int num_scans: Number of scans.
+    :param int num_frames: Frames per scan.
+    :param float exp_period: Frame period in s.
+    :param float interval: Status refresh interval in s.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    exp_event = threading.Event()
+    abort_event = threading.Event()
+    recorder = MonitorRecorder()
+
+    status = expcon.ExpStatusStream()
+    monitor = threading.Thread(target=recorder.follow_stream,
+        args=(status, exp_event, abort_event, interval))
+
+    sim = SimExposure(status, exp_event, num_scans, num_frames, exp_period)
+
+    cpu_start = time.process_time()
+
+    monitor.start()
+    time.sleep(0.05)
+    sim.start()
+
+    sim.join()
+    monitor.join(5)
+
+    process_cpu = time.process_time() - cpu_start
+
+    state_events = [event for event in recorder.events if event[0] != 'frames']
+    frames = [event[1] for event in recorder.events if event[0] == 'frames']
+
+    results = {
+        'run_time'          : sim.run_time,
+        'num_posted'        : len(sim.state_events) + num_scans*num_frames,
+        'num_delivered'     : len(recorder.events),
+        'deliveries'        : recorder.deliveries,
+        'max_deliveries'    : int(sim.run_time/interval) + 5,
+        'state_in_order'    : state_events == sim.state_events,
+        'final_frames'      : frames[-1] if len(frames) > 0 else None,
+        'expected_frames'   : num_scans*num_frames,
+        'monitor_cpu'       : recorder.cpu_time,
+        'process_cpu'       : process_cpu,
+        'monitor_finished'  : not monitor.is_alive(),
+        }
+
+    return results
+
+def check_results(results):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if not results['monitor_finished']:
+        failed.append('Monitor did not finish after the exposure')
+
+    if not results['state_in_order']:
+        failed.append('State events were lost or out of order')
+
+    if results['final_frames'] != results['expected_frames']:
+        failed.append('Final frame count {} instead of {}'.format(
+            results['final_frames'], results['expected_frames']))
+
+    if results['deliveries'] > results['max_deliveries']:
+        failed.append('{} deliveries, more than the refresh rate allows '
+            '({})'.format(results['deliveries'], results['max_deliveries']))
+
+    return failed
+
+def format_results(results):
+    lines = ['Exposure status stream: {:.2f} s exposure'.format(
+        results['run_time'])]
+    lines.append('Events posted {}, delivered {} in {} GUI updates'.format(
+        results['num_posted'], results['num_delivered'], results['deliveries']))
+    lines.append('Monitor thread CPU {:.3f} s ({:.1f}% of one core), '
+        'process CPU {:.3f} s'.format(results['monitor_cpu'],
+        100*results['monitor_cpu']/results['run_time'], results['process_cpu']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Exposure status stream test')
+    parser.add_argument('--scans', type=int, default=5)
+    parser.add_argument('--frames', type=int, default=2000,
+        help='Frames per scan')
+    parser.add_argument('--exp-period', type=float, default=0.001)
+    parser.add_argument('--interval', type=float,
+        default=expcon.default_exposure_settings['status_refresh_interval'],
+        help='Status refresh interval in s')
+    args = parser.parse_args()
+
+    results = run_test(args.scans, args.frames, args.exp_period, args.interval)
+    print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
@@ -0,0 +1,84 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Shared setup for the headless tests and benchmarks in this folder. Importing
+it puts the biocon folder on the path, so the tests import the control
+modules the same way the modules import each other. Each test imports this
+first, then the modules it tests.
+
+Each test runs from the command line, e.g.:
+    python bench/snapbench.py --local
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import argparse
+import logging
+import os
+import sys
+
+biocon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if biocon_dir not in sys.path:
+    sys.path.insert(1, biocon_dir)
+
+
+def setup_logging(level=logging.WARNING):
+    """
+    Sends log messages at or above the level to stdout, with the same format
+    as the control software.
+    """
+    logger = logging.getLogger()
+    logger.setLevel(level)
+    h1 = logging.StreamHandler(sys.stdout)
+    h1.setLevel(level)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s')
+    h1.setFormatter(formatter)
+    logger.addHandler(h1)
+
+def get_parser(description):
+    """
+    Sets up logging and returns a parser for the test's arguments.
+
+    :param str description: The test description for the help.
+
+    :rtype: argparse.ArgumentParser
+    """
+    setup_logging()
+
+    return argparse.ArgumentParser(description=description)
+
+def finish(failed):
+    """
+    Prints the failed checks and exits, with status 1 if any check failed.
+
+    :param list failed: Messages for the failed checks, empty if everything
+        passed.
+    """
+    for msg in failed:
+        print('FAILED: {}'.format(msg))
+
+    if len(failed) > 0:
+        sys.exit(1)
+    else:
+        print('PASSED')
+        sys.exit(0)
@@ -0,0 +1,176 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of :py:class:`utils.VolumeLedger`, used by the buffer monitor
+and the soft pumps. Random piecewise constant flow profiles are run through
+a ledger on a simulated clock and the volume is compared to the closed form
+sum of rate times duration for each segment. Then fixed volume moves are
+run in real time, with flow rate changes partway through, and the test
+checks when the ledger's timer ends each move against the predicted time.
+
+Run from the biocon folder, e.g.:
+    python bench/ledgerbench.py --profiles 100 --moves 5
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import random
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import utils
+
+
+class SimClock(object):
+    """A clock that only moves when it's set."""
+    def __init__(self):
+        self.time = 0.
+
+    def __call__(self):
+        return self.time
+
+
+def run_profile_test(num_profiles=100, num_segments=20, seed=0):
+    """
+    Runs random piecewise constant flow profiles through a ledger.
+
+    :returns: The largest volume error against the closed form volume.
+    :rtype: float
+    """
+    rand = random.Random(seed)
+    max_error = 0
+
+    for num in range(num_profiles):
+        clock = SimClock()
+        start_vol = rand.uniform(10, 1000)
+        ledger = utils.VolumeLedger(start_vol, time_fn=clock)
+
+        expected = start_vol
+
+        for seg in range(num_segments):
+            rate = rand.uniform(-1, 5)
+            duration = rand.uniform(0, 30)
+
+            ledger.set_flow_rate(rate)
+            clock.time += duration
+            expected -= rate*duration
+
+            max_error = max(max_error, abs(ledger.get_volume() - expected))
+
+    return max_error
+
+def ledger_move(volume, rates, change_time):
+    done = threading.Event()
+
+    ledger = utils.VolumeLedger(volume)
+    ledger.set_flow_rate(rates[0])
+    ledger.call_at_volume(0, done.set, hold=True)
+
+    time.sleep(change_time)
+    ledger.set_flow_rate(rates[1])
+
+    done.wait()
+    return time.monotonic()
+
+def run_move_test(num_moves=5, volume=0.1, rates=(0.5, 0.25), change_time=0.1):
+    """
+    Runs fixed volume moves with one flow rate change partway through.
+
+    :param int num_moves: Number of moves.
+    :param float volume: Volume of each move.
+    :param tuple rates: The flow rate before and after the change, in volume
+        units/s.
+    :param float change_time: Time in s from the start to the rate change.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    expected = change_time + (volume - rates[0]*change_time)/rates[1]
+
+    errors = []
+
+    for num in range(num_moves):
+        start = time.monotonic()
+
+        end = ledger_move(volume, rates, change_time)
+
+        errors.append(end - start - expected)
+
+    results = {
+        'num_moves'     : num_moves,
+        'expected_time' : expected,
+        'error_mean'    : sum(errors)/len(errors),
+        'error_max'     : max(abs(err) for err in errors),
+        }
+
+    return results
+
+def check_results(profile_error, results, max_time_error=0.02):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if profile_error > 1e-6:
+        failed.append('Ledger volume differs from the closed form by {}'.format(
+            profile_error))
+
+    if results['error_max'] > max_time_error:
+        failed.append('Move ended {:.1f} ms from the predicted time'.format(
+            1000*results['error_max']))
+
+    return failed
+
+def format_results(results):
+    lines = ['Fixed volume moves: {} moves, {:.3f} s expected'.format(
+        results['num_moves'], results['expected_time'])]
+    lines.append('End time error {:.1f} ms mean, {:.1f} ms max'.format(
+        1000*results['error_mean'], 1000*results['error_max']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Volume ledger test')
+    parser.add_argument('--profiles', type=int, default=100,
+        help='Number of random flow profiles')
+    parser.add_argument('--moves', type=int, default=5,
+        help='Number of fixed volume moves')
+    args = parser.parse_args()
+
+    profile_error = run_profile_test(args.profiles)
+    print('Flow profiles: {}, max volume error {:.3g}'.format(args.profiles,
+        profile_error))
+
+    results = run_move_test(args.moves)
+    print(format_results(results))
+
+    failed = check_results(profile_error, results)
+
+    harness.finish(failed)
@@ -0,0 +1,337 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of the mono tune optimizer. A
+:py:class:`monotunecon.MonoAutoTune` is connected to soft PVs: an analog
+output that takes a set time to change the voltage, and a scaler that
+counts a Gaussian rocking curve of the voltage in OneShot (CNT) and
+AutoCount (CONT) modes. Each count averages the intensity at the voltages
+at the start and end of the count, so counts taken while the voltage
+changes are wrong, as on the real scaler. Each optimize method is run from
+the same start voltage, and the test checks the final voltage is within
+the error of the peak, the number of measurements, and that the shutter and
+scaler are left as they were.
+
+Run from the biocon folder, e.g.:
+    python bench/monotunebench.py --peak 5.037 --width 0.05
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import copy
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import numpy as np
+
+import monotunecon
+
+
+class SoftPV(object):
+    """
+    Simulated epics.PV with monitors.
+    """
+    def __init__(self, name, value=0):
+        self.pvname = name
+        self.value = value
+
+        self._callbacks = {}
+        self._next_id = 1
+
+    def wait_for_connection(self, timeout=None):
+        return True
+
+    def get(self, use_monitor=True):
+        return self.value
+
+    def put(self, value, wait=False):
+        self.value = value
+        self.post(value)
+
+    def post(self, value):
+        for callback in list(self._callbacks.values()):
+            callback(pvname=self.pvname, value=value)
+
+    def add_callback(self, callback):
+        cbid = self._next_id
+        self._next_id += 1
+        self._callbacks[cbid] = callback
+
+        return cbid
+
+    def remove_callback(self, cbid):
+        self._callbacks.pop(cbid, None)
+
+class SoftAO(SoftPV):
+    """
+    Simulated analog output, where a put takes put_time to finish.
+    """
+    def __init__(self, name, value=0, put_time=0.005):
+        SoftPV.__init__(self, name, value)
+        self.put_time = put_time
+        self.num_puts = 0
+
+    def put(self, value, wait=False):
+        time.sleep(self.put_time)
+        self.num_puts += 1
+        SoftPV.put(self, float(value), wait)
+
+class SoftScaler(object):
+    """
+    Simulated scaler record counting a Gaussian rocking curve of the analog
+    output voltage.
+    """
+    def __init__(self, prefix, ao, peak, width, max_rate):
+        self.ao = ao
+        self.peak = peak
+        self.width = width
+        self.max_rate = max_rate
+
+        self.num_counts = 0
+        self.num_mixed = 0
+
+        self.tp = SoftPV('{}.TP'.format(prefix), 1.)
+        self.val = SoftPV('{}.S3'.format(prefix), 0)
+        self.tp1 = SoftPV('{}.TP1'.format(prefix), 1.)
+        self.dly1 = SoftPV('{}.DLY1'.format(prefix), 0.1)
+        self.rate = SoftPV('{}.RATE'.format(prefix), 10)
+
+        self.cnt = SoftPV('{}.CNT'.format(prefix), 0)
+        self.cnt.put = self._put_cnt
+
+        self.cont = SoftPV('{}.CONT'.format(prefix), 0)
+        self.cont.put = self._put_cont
+
+        self._auto_thread = None
+
+    def get_pvs(self):
+        return [self.tp, self.val, self.tp1, self.dly1, self.rate, self.cnt,
+            self.cont]
+
+    def get_rate(self, v):
+        return self.max_rate*np.exp(-(v-self.peak)**2/(2*self.width**2))
+
+    def _count(self, count_time):
+        v_start = self.ao.value
+        time.sleep(count_time)
+        v_end = self.ao.value
+
+        self.num_counts += 1
+
+        if v_start != v_end:
+            self.num_mixed += 1
+
+        return (self.get_rate(v_start) + self.get_rate(v_end))/2.*count_time
+
+    def _put_cnt(self, value, wait=False):
+        if value != 1:
+            self.cnt.value = 0
+            return
+
+        self.cnt.value = 1
+
+        def count():
+            self.val.value = self._count(self.tp.value)
+            self.cnt.value = 0
+
+        if wait:
+            count()
+        else:
+            thread = threading.Thread(target=count)
+            thread.daemon = True
+            thread.start()
+
+    def _put_cont(self, value, wait=False):
+        self.cont.value = value
+
+        if value == 1 and self._auto_thread is None:
+            self._auto_thread = threading.Thread(target=self._auto_count)
+            self._auto_thread.daemon = True
+            self._auto_thread.start()
+
+        elif value != 1 and self._auto_thread is not None:
+            self._auto_thread.join()
+            self._auto_thread = None
+
+    def _auto_count(self):
+        while self.cont.value == 1:
+            value = self._count(self.tp1.value)
+
+            if self.cont.value != 1:
+                break
+
+            # With RATE 0 the count is only posted at the end of the period
+            self.val.put(value)
+
+            time.sleep(self.dly1.value)
+
+class SoftPVs(object):
+    def __init__(self, pvs):
+        self.pvs = {pv.pvname: pv for pv in pvs}
+
+    def get_pv(self, name):
+        return self.pvs[name]
+
+
+def run_test(method, peak=5.037, width=0.05, v_start=5., max_rate=1e6,
+    put_time=0.005):
+    """
+    Optimizes the mono tune with one method.
+
+    :param str method: The optimize method, 'model', 'scan' or 'search'.
+    :param float peak: Rocking curve peak voltage.
+    :param float width: Rocking curve standard deviation in V.
+    :param float v_start: Start voltage.
+    :param float max_rate: Peak count rate in counts/s.
+    :param float put_time: Time for each analog output put in s.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    settings = copy.deepcopy(monotunecon.default_mono_tune_settings)
+    settings['optimize_method'] = method
+
+    kwargs = settings['device_init'][0]['kwargs']
+    ao_name = kwargs['output']
+    scaler_name = kwargs['ct_start'].rsplit('.', 1)[0]
+
+    ao = SoftAO('{}.VAL'.format(ao_name), v_start, put_time)
+    scaler = SoftScaler(scaler_name, ao, peak, width, max_rate)
+    shutter = SoftPV(settings['exp_slow_shtr1'], 1)
+
+    pvs = [ao, SoftPV('{}.LOPR'.format(ao_name), 0.),
+        SoftPV('{}.HOPR'.format(ao_name), 10.), shutter]
+    pvs.extend(scaler.get_pvs())
+
+    monotunecon.epics.get_pv = SoftPVs(pvs).get_pv
+
+    tuner = monotunecon.MonoAutoTune(settings)
+
+    old_rate = scaler.rate.value
+    old_delay = scaler.dly1.value
+
+    start = time.monotonic()
+    tuner.optimize_intensity()
+    elapsed = time.monotonic() - start
+
+    results = {
+        'method'            : method,
+        'peak'              : peak,
+        'v_start'           : v_start,
+        'v_final'           : ao.value,
+        'error'             : ao.value - peak,
+        'num_measurements'  : tuner._num_measurements,
+        'max_meas'          : settings['optimize_max_meas'],
+        'scan_points'       : settings['optimize_scan_points'],
+        'num_counts'        : scaler.num_counts,
+        'num_mixed'         : scaler.num_mixed,
+        'elapsed'           : elapsed,
+        'shutter'           : shutter.value,
+        'scaler_restored'   : (scaler.cont.value == 0 and scaler.rate.value == old_rate
+            and scaler.dly1.value == old_delay),
+        }
+
+    return results
+
+def check_results(results, max_error, max_search_meas):
+    """
+    :param float max_error: Maximum final voltage error in V.
+    :param int max_search_meas: Maximum measurements for the search method,
+        which has no set limit.
+
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    method = results['method']
+
+    if abs(results['error']) > max_error:
+        failed.append('{}: final voltage {:.4f} V is {:.4f} V from the peak, '
+            'more than {:.4f} V'.format(method, results['v_final'],
+            results['error'], max_error))
+
+    # The start measurement is counted, and the scan measures the fit peak
+    if method == 'model':
+        max_meas = results['max_meas']
+    elif method == 'scan':
+        max_meas = results['scan_points'] + 2
+    else:
+        max_meas = max_search_meas
+
+    if results['num_measurements'] > max_meas:
+        failed.append('{}: {} measurements, more than {}'.format(method,
+            results['num_measurements'], max_meas))
+
+    if results['shutter'] != 1:
+        failed.append('{}: the I0 shutter was left open'.format(method))
+
+    if not results['scaler_restored']:
+        failed.append('{}: the scaler was not returned to OneShot with the '
+            'old rate and delay'.format(method))
+
+    return failed
+
+def format_results(results):
+    return ('{:<7} final {:.4f} V ({:+.4f} V from the peak), {} measurements, '
+        '{} counts ({} with the voltage changing), {:.2f} s').format(
+        results['method'], results['v_final'], results['error'],
+        results['num_measurements'], results['num_counts'],
+        results['num_mixed'], results['elapsed'])
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Mono tune optimizer test')
+    parser.add_argument('--methods', default='model,scan,search',
+        help='Comma separated optimize methods')
+    parser.add_argument('--peak', type=float, default=5.037,
+        help='Rocking curve peak voltage')
+    parser.add_argument('--width', type=float, default=0.05,
+        help='Rocking curve standard deviation in V')
+    parser.add_argument('--start', type=float, default=5.,
+        help='Start voltage')
+    parser.add_argument('--put-time', type=float, default=0.005,
+        help='Analog output put time in s')
+    parser.add_argument('--max-error', type=float, default=0.005,
+        help='Maximum final voltage error in V')
+    parser.add_argument('--max-search-meas', type=int, default=30,
+        help='Maximum measurements for the search method')
+    args = parser.parse_args()
+
+    failed = []
+
+    for method in args.methods.split(','):
+        results = run_test(method, args.peak, args.width, args.start,
+            put_time=args.put_time)
+
+        print(format_results(results))
+
+        failed.extend(check_results(results, args.max_error,
+            args.max_search_meas))
+
+    harness.finish(failed)
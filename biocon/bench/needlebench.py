@@ -0,0 +1,315 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless benchmark of the autosampler needle out and plate move. The
+autosampler runs on EpicsMotors backed by simulated EPICS motors, which move
+at a constant speed and send readback monitors at a fixed interval, like an
+IOC. For each sample the needle is retracted and the plate moved, and the
+test measures how long after the needle crossed the clear height the plate
+started moving, and how many times the needle position was read.
+
+Run from the biocon folder, e.g.:
+    python bench/needlebench.py --samples 20
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import numpy as np
+
+import motorcon
+import autosamplercon
+
+
+class SimPV(object):
+    """
+    Simulated PV that only supports monitors.
+    """
+    def __init__(self):
+        self._callbacks = []
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+        return len(self._callbacks)
+
+    def post(self, value):
+        for callback in self._callbacks:
+            callback(value=value)
+
+class SimEpicsMotor(object):
+    """
+    Simulated epics.Motor, which moves at a constant velocity and posts
+    readback monitors every update_time s while moving.
+    """
+    update_time = 0.01
+
+    def __init__(self, pv, velocity=50.):
+        self.pv = pv
+        self.velocity = velocity
+
+        self.readback = 0.
+        self.done_moving = 1
+        self.position_reads = 0
+        self.history = []
+
+        self._pvs = {'readback': SimPV(), 'done_moving': SimPV()}
+        self._stop_event = threading.Event()
+        self._move_thread = None
+
+    def get_pv(self, name):
+        return self._pvs[name]
+
+    def get(self, name):
+        return getattr(self, name)
+
+    def get_position(self):
+        self.position_reads += 1
+        return self.readback
+
+    def move(self, position, relative=False, wait=False):
+        self.stop()
+
+        if relative:
+            position = self.readback + position
+
+        self.history.append((time.monotonic(), self.readback, position))
+
+        self.done_moving = 0
+        self._pvs['done_moving'].post(0)
+
+        self._stop_event.clear()
+        self._move_thread = threading.Thread(target=self._move,
+            args=(position,))
+        self._move_thread.daemon = True
+        self._move_thread.start()
+
+        if wait:
+            self._move_thread.join()
+
+    def _move(self, position):
+        start = self.readback
+        start_time = time.monotonic()
+        direction = np.sign(position - start)
+        move_time = abs(position - start)/self.velocity
+
+        while not self._stop_event.wait(self.update_time):
+            elapsed = time.monotonic() - start_time
+
+            if elapsed >= move_time:
+                self.readback = position
+            else:
+                self.readback = start + direction*self.velocity*elapsed
+
+            self._pvs['readback'].post(self.readback)
+
+            if self.readback == position:
+                break
+
+        self.done_moving = 1
+        self._pvs['done_moving'].post(1)
+
+    def stop(self):
+        if self._move_thread is not None:
+            self._stop_event.set()
+            self._move_thread.join()
+            self._move_thread = None
+
+class WellPlate(object):
+    plate_height = 14.
+
+class BenchAutosampler(autosamplercon.Autosampler):
+    """
+    Autosampler with just the motors used to move between wells.
+    """
+    def __init__(self, clear_height=2., needle_out=30.):
+        self.name = 'needlebench'
+        self.settings = {'needle_clear_height': clear_height}
+
+        self._active_count = 0
+        self._active_lock = threading.Lock()
+
+        self.abort_event = threading.Event()
+
+        self.base_position = [0., 0., 0.]
+        self.well_plate = WellPlate()
+        self.needle_out_position = needle_out
+
+        self._coflow_y_pos = 0.
+        self.coflow_y_ref = 0.
+
+        self.plate_x_motor = motorcon.EpicsMotor('plate_x', 'BENCH:plate_x')
+        self.plate_z_motor = motorcon.EpicsMotor('plate_z', 'BENCH:plate_z')
+        self.needle_y_motor = motorcon.EpicsMotor('needle_y', 'BENCH:needle_y')
+
+    def _check_abort(self):
+        if self.abort_event.is_set():
+            self.plate_x_motor.stop()
+            self.plate_z_motor.stop()
+            self.needle_y_motor.stop()
+
+            self.abort_event.clear()
+
+            abort = True
+
+        else:
+            abort = False
+
+        return abort
+
+
+def run_test(num_samples=10, update_time=0.01, velocity=50.):
+    """
+    Retracts the needle and moves the plate for each sample.
+
+    :param int num_samples: Number of samples.
+    :param float update_time: Readback monitor interval of the simulated
+        motors in s.
+    :param float velocity: Simulated motor velocity in mm/s.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    SimEpicsMotor.update_time = update_time
+    motorcon.epics.Motor = lambda pv: SimEpicsMotor(pv, velocity)
+
+    autosampler = BenchAutosampler()
+
+    needle = autosampler.needle_y_motor.epics_motor
+    plate_x = autosampler.plate_x_motor.epics_motor
+
+    clear_y = (autosampler.base_position[2]
+        + autosampler.well_plate.plate_height
+        + autosampler.settings['needle_clear_height'])
+
+    results = {'num_samples': num_samples, 'update_time': update_time,
+        'delays': [], 'reads': [], 'clear_positions': [], 'completed': 0}
+
+    plate_move = plate_x.move
+
+    def move_plate(position, relative=False, wait=False):
+        # Records where the needle was when the plate started moving
+        results['clear_positions'].append(needle.readback)
+        plate_move(position, relative, wait)
+
+    plate_x.move = move_plate
+
+    crossings = []
+
+    def on_readback(value, **kwargs):
+        if value >= clear_y and len(crossings) == 0:
+            crossings.append(time.monotonic())
+
+    needle.get_pv('readback').add_callback(on_readback)
+
+    for num in range(num_samples):
+        # Put the needle back down in the well
+        needle.move(0, wait=True)
+
+        del crossings[:]
+        needle.position_reads = 0
+        num_plate_moves = len(plate_x.history)
+
+        if autosampler._move_plate_needle_out(5.*((num+1)%2)):
+            results['completed'] += 1
+
+        if len(crossings) > 0 and len(plate_x.history) > num_plate_moves:
+            plate_start = plate_x.history[num_plate_moves][0]
+            results['delays'].append(plate_start - crossings[0])
+
+        results['reads'].append(needle.position_reads)
+
+    results['clear_y'] = clear_y
+
+    return results
+
+def check_results(results, max_delay):
+    """
+    :param float max_delay: Maximum mean time in s between the needle
+        crossing the clear height and the plate starting to move.
+
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if results['completed'] != results['num_samples']:
+        failed.append('{} of {} moves did not complete'.format(
+            results['num_samples']-results['completed'], results['num_samples']))
+
+    low = [pos for pos in results['clear_positions'] if pos < results['clear_y']]
+
+    if len(low) > 0:
+        failed.append('The plate moved with the needle below the clear '
+            'height {} times, lowest at {:.2f}'.format(len(low), min(low)))
+
+    if len(results['delays']) != results['num_samples']:
+        failed.append('The plate did not move after the needle cleared for '
+            '{} samples'.format(results['num_samples']-len(results['delays'])))
+
+    elif np.mean(results['delays']) > max_delay:
+        failed.append('Mean plate start delay {:.1f} ms is more than '
+            '{:.1f} ms'.format(1000*np.mean(results['delays']), 1000*max_delay))
+
+    return failed
+
+def format_results(results):
+    lines = ['Needle out and plate move: {} samples, readback monitors every '
+        '{:.0f} ms'.format(results['num_samples'], 1000*results['update_time'])]
+
+    if len(results['delays']) > 0:
+        lines.append('Plate start after needle clear: mean {:.2f} ms, max '
+            '{:.2f} ms per sample'.format(1000*np.mean(results['delays']),
+            1000*np.max(results['delays'])))
+
+    lines.append('Needle position reads: mean {:.1f} per sample'.format(
+        np.mean(results['reads'])))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Autosampler needle out benchmark')
+    parser.add_argument('--samples', type=int, default=10,
+        help='Number of samples')
+    parser.add_argument('--update-time', type=float, default=0.01,
+        help='Readback monitor interval of the simulated motors in s')
+    parser.add_argument('--velocity', type=float, default=50.,
+        help='Simulated motor velocity in mm/s')
+    parser.add_argument('--max-delay', type=float, default=0.005,
+        help='Maximum mean plate start delay in s')
+    args = parser.parse_args()
+
+    results = run_test(args.samples, args.update_time, args.velocity)
+
+    print(format_results(results))
+
+    failed = check_results(results, args.max_delay)
+
+    harness.finish(failed)
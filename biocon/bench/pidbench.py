@@ -0,0 +1,342 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of the pressure to flow PID loop of
+:py:class:`pumpcon.OB1Pump`. A :py:class:`SimPlant` stands in for an OB1
+channel and BFS flow meter: the flow follows the pressure as a first order
+system, each flow reading takes a random time, like the BFS readout, and the
+density drops while a bubble passes. The pump's own PID loop is run with its
+flow meter readings and pressure settings going to the plant, for a step in
+the flow setpoint. Partway through there's a bubble, and the loop is paused
+and restarted. The test checks the settling time, that the pressure is never
+set from a reading in or just after the bubble, that the first tick after
+the restart updates the PID without a time step, and the loop timing, and
+reports the jitter, latency and tick interval statistics.
+
+Run from the biocon folder, e.g.:
+    python bench/pidbench.py --duration 10 --period 0.1
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import math
+import random
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import pid
+import pumpcon
+
+
+class SimPlant(object):
+    """
+    A first order pressure to flow model. After a pressure change the flow
+    approaches gain*pressure with time constant tau. Reading the flow meter
+    takes a random time between the readout time limits. During the bubbles
+    the density reads low.
+    """
+    def __init__(self, gain=1., tau=0.5, readout_time=(0.02, 0.06),
+        bubbles=None, density=1000., bubble_density=300., seed=0):
+        """
+        :param float gain: Steady state flow per unit pressure.
+        :param float tau: Time constant in s.
+        :param tuple readout_time: The lower and upper limits in s of the
+            time a flow reading takes.
+        :param list bubbles: (start, end) times in s from when the plant is
+            made when a bubble is in the flow meter. If None, there are
+            no bubbles.
+        :param float density: The liquid density.
+        :param float bubble_density: The density read during a bubble.
+        :param int seed: Seed for the readout times.
+        """
+        self.gain = gain
+        self.tau = tau
+        self.readout_time = readout_time
+        self.bubbles = bubbles if bubbles is not None else []
+        self.density = density
+        self.bubble_density = bubble_density
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._pressure = 0
+        self._flow = 0
+        self._time = time.monotonic()
+        self._start_time = self._time
+
+        self._densities = [0, 0]
+
+        self.history = []
+        self.pressure_history = []
+
+    def _update(self):
+        now = time.monotonic()
+        target = self.gain*self._pressure
+        self._flow = target + (self._flow - target)*math.exp(-(now - self._time)/self.tau)
+        self._time = now
+
+    def in_bubble(self, read_time):
+        elapsed = read_time - self._start_time
+
+        return any(start <= elapsed < end for start, end in self.bubbles)
+
+    def set_pressure(self, pressure):
+        with self._lock:
+            self._update()
+            self._pressure = pressure
+
+            # Whether the last two density readings were both liquid
+            valid = all(dens == self.density for dens in self._densities)
+            self.pressure_history.append((self._time, pressure, valid))
+
+    def get_fm_values(self):
+        time.sleep(self._random.uniform(*self.readout_time))
+
+        with self._lock:
+            self._update()
+
+            if self.in_bubble(self._time):
+                density = self.bubble_density
+            else:
+                density = self.density
+
+            self._densities = [self._densities[-1], density]
+            self.history.append((self._time, self._flow, density))
+
+            return self._flow, density, 20.
+
+class PIDRecorder(object):
+    """
+    Records the time step of each call to a PID controller.
+    """
+    def __init__(self, controller):
+        self.controller = controller
+        self.calls = []
+
+    def __call__(self, input_, dt=None):
+        self.calls.append((time.monotonic(), dt))
+
+        return self.controller(input_, dt)
+
+class BenchOB1Pump(pumpcon.OB1Pump):
+    """
+    OB1 pump with just the PID loop, reading the flow meter from and setting
+    the pressure on a :py:class:`SimPlant`.
+    """
+    def __init__(self, plant, P, I, D, pid_sample_time, max_pressure=1000):
+        self.name = 'pidbench'
+        self._plant = plant
+
+        self._min_pressure = 0
+        self._max_pressure = max_pressure
+
+        self._P = P
+        self._I = I
+        self._D = D
+        self._pid_sample_time = pid_sample_time
+
+        self._PID = pid.PID(self._P, self._I, self._D, 0)
+        self._PID.sample_time = self._pid_sample_time
+        self._PID.output_limits = (self._min_pressure, self._max_pressure)
+
+        self._pid_executor = pid.FixedRateExecutor(self._pid_sample_time)
+        self._prev_dens = 0
+
+        self._pid_on_evt = threading.Event()
+        self._abort_pid_evt = threading.Event()
+
+    def get_fm_values(self):
+        return self._plant.get_fm_values()
+
+    def _inner_set_pressure(self, pressure):
+        self._plant.set_pressure(pressure)
+
+
+def get_settling_time(history, start_time, setpoint, band=0.02):
+    """
+    :returns: The time from the start until the flow last entered the band
+        around the setpoint, or None if it's outside the band at the end.
+    :rtype: float
+    """
+    settled_time = None
+
+    for flow_time, flow, density in history:
+        if abs(flow - setpoint) > band*abs(setpoint):
+            settled_time = None
+        elif settled_time is None:
+            settled_time = flow_time
+
+    if settled_time is None:
+        return None
+
+    return max(0, settled_time - start_time)
+
+def run_test(duration=10., period=0.1, setpoint=100., readout_time=(0.02, 0.06),
+    bubble=(4., 4.5), pause=(6., 6.5)):
+    """
+    Runs the pump PID loop on a simulated plant for a step in the setpoint
+    from 0 when the loop starts.
+
+    :param float duration: Run time in s.
+    :param float period: The loop period in s.
+    :param float setpoint: The flow setpoint.
+    :param tuple readout_time: The flow reading time limits in s.
+    :param tuple bubble: Start and end time in s of a bubble.
+    :param tuple pause: Start and end time in s of a pause in the loop.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    plant = SimPlant(readout_time=readout_time, bubbles=[bubble])
+
+    pump = BenchOB1Pump(plant, 0.5, 5., 0, period)
+    pump._PID.setpoint = setpoint
+    pump._PID = PIDRecorder(pump._PID)
+
+    timers = [
+        threading.Timer(duration, pump._abort_pid_evt.set),
+        threading.Timer(pause[0], pump._pid_on_evt.clear),
+        threading.Timer(pause[1], pump._pid_on_evt.set),
+        ]
+
+    start = time.monotonic()
+    pump._pid_on_evt.set()
+
+    for timer in timers:
+        timer.start()
+
+    pump.run_PID()
+    stats = pump.get_PID_stats()
+
+    for timer in timers:
+        timer.join()
+
+    resume_time = start + pause[1]
+
+    results = {
+        'period'        : period,
+        'duration'      : duration,
+        'settling_time' : get_settling_time(plant.history, start, setpoint),
+        'final_flow'    : plant.history[-1][1],
+        'bubble_reads'  : len([read for read in plant.history if read[2] != plant.density]),
+        'gated_sets'    : len([item for item in plant.pressure_history if not item[2]]),
+        'no_dt_calls'   : len([call for call in pump._PID.calls if call[1] is None]),
+        'resume_calls'  : len([call for call in pump._PID.calls if call[0] > resume_time]),
+        'zero_dt_calls' : len([call for call in pump._PID.calls if call[1] is not None
+            and call[1] <= 0]),
+        }
+    results.update(stats)
+
+    return results
+
+def check_results(results, max_settling_time=3.):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if results['bubble_reads'] == 0:
+        failed.append('No flow meter readings during the bubble')
+
+    if results['gated_sets'] > 0:
+        failed.append('Pressure set {} times from readings in or just after '
+            'the bubble'.format(results['gated_sets']))
+
+    if results['zero_dt_calls'] > 0:
+        failed.append('PID called {} times with a time step of 0'.format(
+            results['zero_dt_calls']))
+
+    # The first tick after the restart, the first tick of the start is
+    # skipped since there's no previous density
+    if results['no_dt_calls'] != 1:
+        failed.append('PID called {} times without a time step, expected 1 '
+            'after the restart'.format(results['no_dt_calls']))
+
+    if results['resume_calls'] == 0:
+        failed.append('The loop did not run after the restart')
+
+    if results['settling_time'] is None:
+        failed.append('Flow did not settle, final flow {:.2f}'.format(
+            results['final_flow']))
+
+    elif results['settling_time'] > max_settling_time:
+        failed.append('Flow took {:.2f} s to settle'.format(
+            results['settling_time']))
+
+    if abs(results['interval_mean'] - results['period']) > 0.01*results['period']:
+        failed.append('Mean tick interval {:.4f} s instead of {:.4f} s'.format(
+            results['interval_mean'], results['period']))
+
+    if results['jitter_max'] > 0.1*results['period']:
+        failed.append('Max jitter {:.1f} ms'.format(1000*results['jitter_max']))
+
+    if results['overruns'] > 0:
+        failed.append('{} overruns'.format(results['overruns']))
+
+    return failed
+
+def format_results(results):
+    lines = ['PID loop: {:.3f} s period for {:.0f} s'.format(
+        results['period'], results['duration'])]
+
+    if results['settling_time'] is not None:
+        lines.append('Settled in {:.2f} s, final flow {:.2f}'.format(
+            results['settling_time'], results['final_flow']))
+    else:
+        lines.append('Did not settle, final flow {:.2f}'.format(results['final_flow']))
+
+    lines.append('Flow meter readings in the bubble {}, pressure set from '
+        'them {}'.format(results['bubble_reads'], results['gated_sets']))
+
+    lines.append('Ticks {}, tick interval {:.1f} ms mean, {:.1f} ms std, '
+        '{:.1f} ms max'.format(results['ticks'], 1000*results['interval_mean'],
+        1000*results['interval_std'], 1000*results['interval_max']))
+
+    lines.append('Jitter {:.2f} ms mean, {:.2f} ms max, latency {:.1f} ms '
+        'mean, {:.1f} ms max, overruns {}'.format(1000*results['jitter_mean'],
+        1000*results['jitter_max'], 1000*results['latency_mean'],
+        1000*results['latency_max'], results['overruns']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='PID loop timing test')
+    parser.add_argument('--duration', type=float, default=10.,
+        help='Run time in s')
+    parser.add_argument('--period', type=float, default=0.1,
+        help='Loop period in s')
+    args = parser.parse_args()
+
+    results = run_test(args.duration, args.period)
+    print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
@@ -0,0 +1,330 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of SSI pump flow ramps. Two :py:class:`pumpcon.SSINextGenPump`
+are connected to a :py:class:`SoftSSIComm`, a simulated serial link that
+takes the transmission time for each command and reply at the set baud
+rate, answers the SSI commands used by the pump, and records each flow rate
+setpoint with the time it was received. One pump is started and ramped up
+to a flow rate while the other has its status read every 0.1 s, as the pump
+panels do. The test checks that the planned and the received setpoints
+stay within the error bound of the ideal ramp and that the ramp ends on
+time, and reports the number of setpoints sent and the delay of the status
+reads of the other pump.
+
+Run from the biocon folder, e.g.:
+    python bench/pumpbench.py --target 0.2 --accel 1
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import pumpcon
+
+
+class SoftSSIComm(object):
+    """
+    A simulated serial link to SSI Next Gen pumps. Each write takes the time
+    to send the command and the reply at the baud rate plus a processing
+    time, so pumps sharing a link and comm lock wait for each other as on a
+    real link. Flow rate (FI) commands are recorded with the time the pump
+    received them.
+    """
+    def __init__(self, baudrate=9600, process_time=0.002):
+        self.char_time = 10./baudrate
+        self.process_time = process_time
+
+        self.flow_rate = 0
+        self.running = False
+        self.decimals = 3
+
+        self.setpoints = []
+        self.commands = []
+
+    def write(self, data, get_response=False, send_term_char='\r\n',
+        term_char='>'):
+        if not isinstance(data, str):
+            data = data.decode()
+
+        cmd = data.strip()
+
+        time.sleep((len(cmd)+1)*self.char_time)
+        received = time.monotonic()
+        self.commands.append((received, cmd))
+
+        reply = self._get_reply(cmd, received)
+
+        if not get_response:
+            return ''
+
+        time.sleep(self.process_time + len(reply)*self.char_time)
+
+        return reply
+
+    def _get_reply(self, cmd, received):
+        if cmd == 'MF':
+            reply = 'OK,MF:10.{}/'.format('0'*self.decimals)
+        elif cmd == 'PU':
+            reply = 'OK,psi/'
+        elif cmd == 'MP':
+            reply = 'OK,MP:6000/'
+        elif cmd == 'LP':
+            reply = 'OK,LP:0/'
+        elif cmd == 'UP':
+            reply = 'OK,UP:6000/'
+        elif cmd == 'CS':
+            reply = 'OK,{:.{dec}f},6000,0,psi,0,{},0/'.format(self.flow_rate,
+                int(self.running), dec=self.decimals)
+        elif cmd == 'RF':
+            reply = 'OK,0,0,0/'
+        elif cmd == 'LS':
+            reply = 'OK,LS:0/'
+        elif cmd.startswith('FI'):
+            self.flow_rate = int(cmd[2:])/10**self.decimals
+            self.setpoints.append((received, self.flow_rate))
+            reply = 'OK/'
+        elif cmd == 'RU':
+            self.running = True
+            reply = 'OK/'
+        elif cmd == 'ST':
+            self.running = False
+            reply = 'OK/'
+        else:
+            reply = 'OK/'
+
+        return reply
+
+
+class BenchSSIPump(pumpcon.SSINextGenPump):
+    """
+    An SSI pump on a :py:class:`SoftSSIComm` link.
+    """
+    def __init__(self, name, link, comm_lock, **kwargs):
+        self._link = link
+
+        pumpcon.SSINextGenPump.__init__(self, name, 'Soft', comm_lock=comm_lock,
+            **kwargs)
+
+    def connect(self):
+        if not self.connected:
+            self.pump_comm = self._link
+            self.connected = True
+
+        return self.connected
+
+
+def get_ramp_error(setpoints, start_time, start_rate, target_rate, accel, end_time):
+    """
+    Gets the largest difference between the set flow rate and the ideal
+    ramp, over the time from the first setpoint to the end time.
+    """
+    def ideal(t):
+        rate = start_rate + accel*(t - start_time)/60.
+        return min(max(rate, start_rate), target_rate)
+
+    error = 0
+
+    for num, (set_time, rate) in enumerate(setpoints):
+        if num < len(setpoints) - 1:
+            next_time = setpoints[num+1][0]
+        else:
+            next_time = end_time
+
+        error = max(error, abs(rate - ideal(set_time)),
+            abs(rate - ideal(next_time)))
+
+    return error
+
+def run_test(target=0.2, accel=1., baudrate=9600, max_error=None):
+    """
+    Ramps one pump from 0 to the target flow rate while reading the status
+    of a second pump on the same link.
+
+    :param float target: Target flow rate in mL/min.
+    :param float accel: Flow rate acceleration in mL/min/min.
+    :param int baudrate: The simulated link baud rate.
+    :param float max_error: The ramp error bound in mL/min. If None, the
+        pump default is used.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    link = SoftSSIComm(baudrate)
+    comm_lock = threading.Lock()
+
+    pump = BenchSSIPump('Ramp', link, comm_lock, ramp_max_error=max_error)
+    other_pump = BenchSSIPump('Other', link, comm_lock)
+
+    pump.flow_rate_acceleration = accel
+    pump.flow_rate = target
+
+    # Records the planned steps, to check the plan itself against the bound
+    plans = []
+    get_steps = pump._ramp_scheduler.get_steps
+
+    def record_steps(start_rate, target_rate, accel, rtt=0):
+        steps = get_steps(start_rate, target_rate, accel, rtt)
+        plans.append((rtt, steps))
+        return steps
+
+    pump._ramp_scheduler.get_steps = record_steps
+
+    status_delays = []
+    stop_event = threading.Event()
+
+    def read_status():
+        while not stop_event.is_set():
+            start = time.monotonic()
+            other_pump.get_status()
+            status_delays.append(time.monotonic() - start)
+            stop_event.wait(0.1)
+
+    status_thread = threading.Thread(target=read_status)
+    status_thread.daemon = True
+    status_thread.start()
+
+    pump.start_flow()
+
+    # start_flow returns once the pump is running and the ramp has started
+    ramp_start = time.monotonic()
+
+    time.sleep(0.05)
+    while pump.is_ramping():
+        time.sleep(0.01)
+
+    ramp_end = time.monotonic()
+    stop_event.set()
+    status_thread.join()
+
+    run_time = [cmd_time for cmd_time, cmd in link.commands if cmd == 'RU'][-1]
+    setpoints = [setpoint for setpoint in link.setpoints if setpoint[0] > run_time]
+    ramp_time = setpoints[-1][0] - ramp_start
+    ideal_time = target/accel*60.
+
+    resolution = 10**-link.decimals
+
+    if max_error is None:
+        max_error = resolution
+
+    max_error = max(max_error, resolution)
+
+    # Each planned step arrives at the pump half a round trip after it's
+    # sent, and the plan ends when the ideal ramp does
+    rtt, steps = plans[-1]
+    planned = [(step_time + rtt/2., rate) for step_time, rate in steps]
+    plan_error = get_ramp_error(planned, 0, 0, target, accel, ideal_time)
+
+    # The bound is raised if the link doesn't allow enough steps
+    scheduler = pump._ramp_scheduler
+    min_interval = max(scheduler.min_interval, rtt/scheduler.max_link_use)
+    link_steps = max(1, int(ideal_time/min_interval))
+    error_bound = max(max_error, target/link_steps/2. + resolution/2.)
+
+    results = {
+        'target'        : target,
+        'accel'         : accel,
+        'error_bound'   : error_bound,
+        'num_setpoints' : len(setpoints),
+        'plan_error'    : plan_error,
+        'final_rate'    : setpoints[-1][1],
+        'ramp_error'    : get_ramp_error(setpoints, ramp_start, 0, target,
+            accel, ramp_end),
+        'ramp_time'     : ramp_time,
+        'ideal_time'    : ideal_time,
+        'rtt'           : pump._cmd_rtt,
+        'status_mean'   : sum(status_delays)/len(status_delays),
+        'status_max'    : max(status_delays),
+        }
+
+    return results
+
+def check_results(results):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if results['final_rate'] != results['target']:
+        failed.append('Ramp ended at {} instead of {}'.format(
+            results['final_rate'], results['target']))
+
+    # Only allows for the float rounding of the flow rates
+    if results['plan_error'] > results['error_bound'] + 1e-9:
+        failed.append('Planned ramp error {:.4f} mL/min is more than {:.4f}'.format(
+            results['plan_error'], results['error_bound']))
+
+    # A command can also wait for a status read of the other pump to
+    # finish, while the ideal ramp keeps going
+    allowed = (results['error_bound']
+        + results['accel']*results['status_max']/60.)
+
+    if results['ramp_error'] > allowed:
+        failed.append('Ramp error {:.4f} mL/min is more than {:.4f}'.format(
+            results['ramp_error'], allowed))
+
+    if abs(results['ramp_time'] - results['ideal_time']) > 0.05*results['ideal_time']:
+        failed.append('Ramp took {:.2f} s instead of {:.2f} s'.format(
+            results['ramp_time'], results['ideal_time']))
+
+    return failed
+
+def format_results(results):
+    lines = ['Flow ramp: 0 to {} mL/min at {} mL/min/min'.format(
+        results['target'], results['accel'])]
+    lines.append('Setpoints sent {}, ramp took {:.2f} s ({:.2f} s ideal), '
+        'max error {:.4f} mL/min planned, {:.4f} mL/min measured (bound '
+        '{:.4f})'.format(results['num_setpoints'], results['ramp_time'],
+        results['ideal_time'], results['plan_error'], results['ramp_error'],
+        results['error_bound']))
+    lines.append('Other pump status read took {:.1f} ms mean, {:.1f} ms max '
+        '(command round trip {:.1f} ms)'.format(1000*results['status_mean'],
+        1000*results['status_max'], 1000*results['rtt']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='SSI pump flow ramp test')
+    parser.add_argument('--target', type=float, default=0.2,
+        help='Target flow rate in mL/min')
+    parser.add_argument('--accel', type=float, default=1.,
+        help='Flow rate acceleration in mL/min/min')
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--max-error', type=float, default=None,
+        help='Ramp error bound in mL/min')
+    args = parser.parse_args()
+
+    results = run_test(args.target, args.accel, args.baud, args.max_error)
+    print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
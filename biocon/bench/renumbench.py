@@ -0,0 +1,208 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless benchmark of the frame renamer. A writer thread writes frames into a
+temporary directory like a detector, each in two pieces, while a
+FileRenamer job renames them. It runs with and without inotify, and checks
+that every frame ends up under its new name with all of its data, that no
+old names are left, and how long after the last frame the job finished.
+
+Run from the biocon folder, e.g.:
+    python bench/renumbench.py --frames 2000
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import renumber
+
+
+def get_frame_data(num, frame_size):
+    header = '{:06d}'.format(num).encode()
+
+    return header + b'\1'*(frame_size-len(header))
+
+def write_frames(data_dir, num_frames, frame_period, frame_size, end_time):
+    for i in range(num_frames):
+        fname = os.path.join(data_dir, 'bench_{:06d}.tif'.format(i+1))
+        data = get_frame_data(i+1, frame_size)
+
+        time.sleep(frame_period/2)
+
+        with open(fname, 'wb') as f:
+            f.write(data[:frame_size//2])
+            f.flush()
+            time.sleep(frame_period/2)
+            f.write(data[frame_size//2:])
+
+    end_time.append(time.monotonic())
+
+def run_test(num_frames=2000, frame_period=0.0005, frame_size=1024,
+    use_inotify=True):
+    """
+    Writes frames and renames them as they're written.
+
+    :param int num_frames: Number of frames.
+    :param float frame_period: Time in s to write each frame.
+    :param int frame_size: Frame size in bytes.
+    :param bool use_inotify: Whether the renamer uses inotify.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    data_dir = tempfile.mkdtemp()
+
+    renamer = renumber.FileRenamer(use_inotify=use_inotify)
+    renamer.start()
+
+    name_map = {'bench_{:06d}.tif'.format(i+1): 'bench_0001_{:06d}.tif'.format(i+1)
+        for i in range(num_frames)}
+
+    writer_end = []
+
+    try:
+        writer = threading.Thread(target=write_frames, args=(data_dir,
+            num_frames, frame_period, frame_size, writer_end))
+        writer.daemon = True
+        writer.start()
+
+        job = renamer.submit(data_dir, name_map)
+        job.wait()
+        writer.join()
+
+        # Catches any frame renamed before the writer finished it
+        bad_data = 0
+
+        for old_name, new_name in name_map.items():
+            fname = os.path.join(data_dir, new_name)
+
+            if os.path.exists(fname):
+                with open(fname, 'rb') as f:
+                    data = f.read()
+
+                num = int(old_name.split('_')[-1].split('.')[0])
+
+                if data != get_frame_data(num, frame_size):
+                    bad_data += 1
+
+        present = set(os.listdir(data_dir))
+
+    finally:
+        renamer.stop()
+        renamer.join()
+        shutil.rmtree(data_dir)
+
+    results = {
+        'num_frames'    : num_frames,
+        'use_inotify'   : renamer.use_inotify,
+        'num_renamed'   : job.num_renamed,
+        'missing'       : len(set(name_map.values()) - present),
+        'not_renamed'   : len(set(name_map.keys()) & present),
+        'num_files'     : len(present),
+        'bad_data'      : bad_data,
+        'timed_out'     : job.timed_out,
+        'throughput'    : job.throughput,
+        'lag'           : job.end_time - writer_end[0],
+        }
+
+    return results
+
+def check_results(results, max_lag):
+    """
+    :param float max_lag: Maximum time in s from the last frame being
+        written to the job finishing.
+
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    mode = 'inotify' if results['use_inotify'] else 'polling'
+
+    if results['timed_out']:
+        failed.append('{}: the job timed out'.format(mode))
+
+    if results['missing'] > 0 or results['not_renamed'] > 0:
+        failed.append('{}: {} frames missing their new name, {} left with the '
+            'old name'.format(mode, results['missing'], results['not_renamed']))
+
+    if results['num_files'] != results['num_frames']:
+        failed.append('{}: {} files in the directory for {} frames'.format(mode,
+            results['num_files'], results['num_frames']))
+
+    if results['num_renamed'] != results['num_frames']:
+        failed.append('{}: job counted {} of {} frames renamed'.format(mode,
+            results['num_renamed'], results['num_frames']))
+
+    if results['bad_data'] > 0:
+        failed.append('{}: {} renamed frames have the wrong data'.format(mode,
+            results['bad_data']))
+
+    if results['lag'] > max_lag:
+        failed.append('{}: the job finished {:.0f} ms after the last frame, '
+            'more than {:.0f} ms'.format(mode, 1000*results['lag'],
+            1000*max_lag))
+
+    return failed
+
+def format_results(results):
+    mode = 'inotify' if results['use_inotify'] else 'polling'
+
+    return ('Renamer ({}): {} of {} frames renamed, {:.0f} files/s, finished '
+        '{:.1f} ms after the last frame').format(mode, results['num_renamed'],
+        results['num_frames'], results['throughput'], 1000*results['lag'])
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Frame renamer benchmark')
+    parser.add_argument('--frames', type=int, default=2000,
+        help='Number of frames')
+    parser.add_argument('--frame-period', type=float, default=0.0005,
+        help='Time to write each frame in s')
+    parser.add_argument('--frame-size', type=int, default=1024,
+        help='Frame size in bytes')
+    parser.add_argument('--max-lag', type=float, default=0.5,
+        help='Maximum time from the last frame to the job finishing in s')
+    args = parser.parse_args()
+
+    failed = []
+
+    for use_inotify in [True, False]:
+        results = run_test(args.frames, args.frame_period, args.frame_size,
+            use_inotify)
+
+        print(format_results(results))
+
+        failed.extend(check_results(results, args.max_lag))
+
+    harness.finish(failed)
@@ -0,0 +1,150 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of the :py:class:`npscan.ScanProcess` command loop while idle.
+Starts the scan process with the same manager queues as the scan panel,
+leaves it idle for a while, then stops it, and checks that the process
+used little CPU time while idle and exited promptly when stopped. The
+process CPU time is read from the child process resource usage once it's
+joined, so this runs on Linux and macOS but not Windows.
+
+Needs Mp, since npscan imports it. Run from the biocon folder, e.g.:
+    python bench/scanidlebench.py --idle-time 5
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import multiprocessing
+import resource
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import npscan
+
+
+def get_children_cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def run_test(idle_time=3.):
+    """
+    Runs the scan process idle, then stops it.
+
+    :param float idle_time: Time in s to leave the process idle.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    manager = multiprocessing.Manager()
+    cmd_q = manager.Queue()
+    return_q = manager.Queue()
+    return_val_q = manager.Queue()
+    abort_event = manager.Event()
+
+    results = {'idle_time': idle_time}
+
+    try:
+        # The manager process isn't joined until it's shut down, so only
+        # the scan process is counted here
+        start_cpu = get_children_cpu_time()
+
+        scan_proc = npscan.ScanProcess(cmd_q, return_q, return_val_q,
+            abort_event)
+        scan_proc.start()
+
+        time.sleep(idle_time)
+
+        stop_time = time.monotonic()
+        scan_proc.stop()
+        scan_proc.join(5)
+
+        results['stopped'] = not scan_proc.is_alive()
+        results['stop_time'] = time.monotonic() - stop_time
+
+        if results['stopped']:
+            results['cpu_time'] = get_children_cpu_time() - start_cpu
+        else:
+            scan_proc.terminate()
+            results['cpu_time'] = None
+
+    finally:
+        manager.shutdown()
+
+    return results
+
+def check_results(results, max_cpu):
+    """
+    :param float max_cpu: Maximum CPU time used while idle, as a fraction
+        of the idle time.
+
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if not results['stopped']:
+        failed.append('The scan process did not exit within 5 s of stop')
+        return failed
+
+    if results['stop_time'] > 0.5:
+        failed.append('The scan process took {:.2f} s to exit after '
+            'stop'.format(results['stop_time']))
+
+    if results['cpu_time'] > max_cpu*results['idle_time']:
+        failed.append('The scan process used {:.3f} s of CPU time in {:.1f} s '
+            'idle, more than {:.0%}'.format(results['cpu_time'],
+            results['idle_time'], max_cpu))
+
+    return failed
+
+def format_results(results):
+    lines = ['Scan process idle for {:.1f} s, exited {:.1f} ms after '
+        'stop'.format(results['idle_time'], 1000*results['stop_time'])]
+
+    if results['cpu_time'] is not None:
+        lines.append('CPU time used: {:.3f} s ({:.2%} of the idle '
+            'time)'.format(results['cpu_time'],
+            results['cpu_time']/results['idle_time']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Scan process idle CPU test')
+    parser.add_argument('--idle-time', type=float, default=3.,
+        help='Time in s to leave the scan process idle')
+    parser.add_argument('--max-cpu', type=float, default=0.05,
+        help='Maximum CPU time used while idle, as a fraction of the idle time')
+    args = parser.parse_args()
+
+    results = run_test(args.idle_time)
+
+    print(format_results(results))
+
+    failed = check_results(results, args.max_cpu)
+
+    harness.finish(failed)
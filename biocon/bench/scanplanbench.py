@@ -0,0 +1,323 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of the scan planner. A two axis grid is planned and run on
+soft motors, with backlash correction on the outer axis, which scans against
+the backlash direction. The test checks the point order with and without
+serpentine, that every move against the backlash direction overshoots and
+comes back, that the points are split into segments that fit nframes_max,
+and that the actual dead time of each point is recorded next to the
+estimate. It also aborts a long move and checks the motor is stopped.
+
+Run from the biocon folder, e.g.:
+    python bench/scanplanbench.py --outer 3 --inner 4
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import numpy as np
+
+import scanplan
+
+
+def get_expected_indices(num_outer, num_inner, serpentine):
+    indices = []
+
+    for i in range(num_outer):
+        if serpentine and i % 2 == 1:
+            inner = range(num_inner-1, -1, -1)
+        else:
+            inner = range(num_inner)
+
+        for j in inner:
+            indices.append((i, j))
+
+    return indices
+
+def make_planner(num_outer, num_inner, serpentine, backlash, speed,
+    point_overhead):
+    m1 = scanplan.SoftMotor('m1', speed=speed)
+    m2 = scanplan.SoftMotor('m2', speed=speed)
+
+    axes = [
+        scanplan.ScanAxis('m1', m1, scanplan.get_axis_positions(
+            0.1*(num_outer-1), 0, 0.1), backlash=backlash),
+        scanplan.ScanAxis('m2', m2, scanplan.get_axis_positions(0,
+            0.1*(num_inner-1), 0.1)),
+        ]
+
+    planner = scanplan.ScanPlanner(axes, serpentine, point_overhead)
+    planner.plan()
+
+    return planner, m1, m2
+
+def check_backlash(motor, start, backlash):
+    """
+    Checks every move in the motor history that ends on a target was made in
+    the backlash direction.
+
+    :returns: The number of moves against the backlash direction, and the
+        number of overshoot moves.
+    :rtype: tuple
+    """
+    wrong_direction = 0
+    overshoots = 0
+
+    current = start
+    history = motor.move_history
+    i = 0
+
+    while i < len(history):
+        pos = history[i]
+
+        if (i+1 < len(history) and np.isclose(history[i+1], pos + backlash)):
+            # Overshoot, then back to the target
+            overshoots += 1
+            current = pos
+            pos = history[i+1]
+            i += 1
+
+        if np.sign(pos - current) == -np.sign(backlash):
+            wrong_direction += 1
+
+        current = pos
+        i += 1
+
+    return wrong_direction, overshoots
+
+def run_test(num_outer=3, num_inner=4, backlash=0.05, speed=10.,
+    point_overhead=0.001, frames_per_point=2, max_frames=5):
+    """
+    Plans and runs the grid with and without serpentine, splits it into
+    segments, and aborts a long move.
+
+    :param int num_outer: Number of outer axis points.
+    :param int num_inner: Number of inner axis points.
+    :param float backlash: Outer axis backlash distance.
+    :param float speed: Soft motor speed.
+    :param float point_overhead: Fixed dead time per point in s.
+    :param int frames_per_point: Frames collected at each point.
+    :param int max_frames: Maximum frames per acquisition.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    results = {'num_outer': num_outer, 'num_inner': num_inner,
+        'backlash': backlash, 'frames_per_point': frames_per_point,
+        'max_frames': max_frames}
+
+    for serpentine in [False, True]:
+        planner, m1, m2 = make_planner(num_outer, num_inner, serpentine,
+            backlash, speed, point_overhead)
+
+        name = 'serpentine' if serpentine else 'raster'
+
+        results[name] = {
+            'indices'   : [point.indices for point in planner.points],
+            'expected'  : get_expected_indices(num_outer, num_inner, serpentine),
+            }
+
+        exp_end = time.monotonic()
+        completed = 0
+
+        for point in planner.points:
+            if planner.move_to(point):
+                completed += 1
+
+            exp_start = time.monotonic()
+            planner.set_dead_time(point, exp_start - exp_end)
+            exp_end = time.monotonic()
+
+        planner.return_to_start()
+
+        wrong_direction, overshoots = check_backlash(m1, 0, backlash)
+
+        results[name]['completed'] = completed
+        results[name]['num_points'] = len(planner.points)
+        results[name]['wrong_direction'] = wrong_direction
+        results[name]['overshoots'] = overshoots
+        results[name]['m2_moves'] = len(m2.move_history)
+        results[name]['end_positions'] = [m1.get_position(), m2.get_position()]
+        results[name]['dead_time'] = planner.get_dead_time_summary()
+
+    segments = planner.get_segments(frames_per_point, max_frames)
+    results['segments'] = [[point.index for point in segment] for segment in segments]
+    results['unsplit'] = len(planner.get_segments(frames_per_point))
+
+    # Aborts a move that would take 10 s
+    motor = scanplan.SoftMotor('m3', speed=1)
+    axis = scanplan.ScanAxis('m3', motor, [10.])
+    planner = scanplan.ScanPlanner([axis])
+    planner.plan([0.])
+
+    abort_event = threading.Event()
+    timer = threading.Timer(0.05, abort_event.set)
+
+    start = time.monotonic()
+    timer.start()
+    results['abort_return'] = planner.move_to(planner.points[0], abort_event)
+    results['abort_time'] = time.monotonic() - start
+    results['abort_busy'] = motor.is_busy()
+
+    return results
+
+def check_results(results, max_error):
+    """
+    :param float max_error: Maximum difference in s between the mean actual
+        and estimated dead time per point.
+
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    for name in ['raster', 'serpentine']:
+        res = results[name]
+
+        if res['indices'] != res['expected']:
+            failed.append('{} point order is {}, expected {}'.format(name,
+                res['indices'], res['expected']))
+
+        if res['completed'] != res['num_points']:
+            failed.append('{} completed {} of {} points'.format(name,
+                res['completed'], res['num_points']))
+
+        if res['wrong_direction'] > 0:
+            failed.append('{} outer axis finished {} moves against the '
+                'backlash direction'.format(name, res['wrong_direction']))
+
+        # The outer axis runs backwards, so every move after the first
+        # should overshoot
+        if res['overshoots'] != results['num_outer'] - 1:
+            failed.append('{} outer axis overshot {} times, expected {}'.format(
+                name, res['overshoots'], results['num_outer'] - 1))
+
+        if not np.allclose(res['end_positions'], [0, 0]):
+            failed.append('{} scan ended at {} instead of the start'.format(name,
+                res['end_positions']))
+
+        dead_time = res['dead_time']
+
+        if dead_time['num_measured'] != dead_time['num_points']:
+            failed.append('{} recorded dead time for {} of {} points'.format(name,
+                dead_time['num_measured'], dead_time['num_points']))
+
+        elif (abs(dead_time['actual_per_point'] - dead_time['estimated_per_point'])
+            > max_error):
+            failed.append(('{} actual dead time {:.2f} ms/point is more than '
+                '{:.2f} ms from the estimate {:.2f} ms/point').format(name,
+                1000*dead_time['actual_per_point'], 1000*max_error,
+                1000*dead_time['estimated_per_point']))
+
+    # The raster scan returns the inner axis to its start every line, the
+    # serpentine scan doesn't
+    if results['serpentine']['m2_moves'] >= results['raster']['m2_moves']:
+        failed.append('Serpentine inner axis moves {} not fewer than raster '
+            '{}'.format(results['serpentine']['m2_moves'],
+            results['raster']['m2_moves']))
+
+    num_points = results['num_outer']*results['num_inner']
+    points_per_segment = max(1, results['max_frames']//results['frames_per_point'])
+    flat = [index for segment in results['segments'] for index in segment]
+
+    if flat != list(range(num_points)):
+        failed.append('Segments {} do not cover the points in order'.format(
+            results['segments']))
+
+    if max([len(segment) for segment in results['segments']]) > points_per_segment:
+        failed.append('A segment has more than {} frames'.format(
+            results['max_frames']))
+
+    if len(results['segments']) != int(np.ceil(num_points/points_per_segment)):
+        failed.append('{} segments, expected {}'.format(len(results['segments']),
+            int(np.ceil(num_points/points_per_segment))))
+
+    if results['unsplit'] != 1:
+        failed.append('Scan without nframes_max split into {} segments'.format(
+            results['unsplit']))
+
+    if results['abort_return'] or results['abort_busy']:
+        failed.append('Aborted move did not stop the motor')
+
+    elif results['abort_time'] > 0.5:
+        failed.append('Aborted move took {:.2f} s to return'.format(
+            results['abort_time']))
+
+    return failed
+
+def format_results(results):
+    lines = ['Scan plan: {} x {} grid, {} frames per point, nframes_max {}'.format(
+        results['num_outer'], results['num_inner'], results['frames_per_point'],
+        results['max_frames'])]
+
+    for name in ['raster', 'serpentine']:
+        dead_time = results[name]['dead_time']
+
+        lines.append(('{}: {} inner axis moves, {} backlash overshoots, dead '
+            'time estimated {:.2f} ms/point, actual {:.2f} ms/point').format(
+            name.capitalize(), results[name]['m2_moves'],
+            results[name]['overshoots'], 1000*dead_time['estimated_per_point'],
+            1000*dead_time['actual_per_point']))
+
+    lines.append('Segments: {}'.format([len(segment) for segment in
+        results['segments']]))
+    lines.append('Abort returned after {:.1f} ms'.format(
+        1000*results['abort_time']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Scan planner test')
+    parser.add_argument('--outer', type=int, default=3,
+        help='Number of outer axis points')
+    parser.add_argument('--inner', type=int, default=4,
+        help='Number of inner axis points')
+    parser.add_argument('--backlash', type=float, default=0.05,
+        help='Outer axis backlash distance')
+    parser.add_argument('--speed', type=float, default=10.,
+        help='Soft motor speed')
+    parser.add_argument('--frames-per-point', type=int, default=2,
+        help='Frames collected at each point')
+    parser.add_argument('--max-frames', type=int, default=5,
+        help='Maximum frames per acquisition')
+    parser.add_argument('--max-error', type=float, default=0.005,
+        help='Maximum dead time estimate error per point in s')
+    args = parser.parse_args()
+
+    results = run_test(args.outer, args.inner, args.backlash, args.speed,
+        frames_per_point=args.frames_per_point, max_frames=args.max_frames)
+
+    print(format_results(results))
+
+    failed = check_results(results, args.max_error)
+
+    harness.finish(failed)
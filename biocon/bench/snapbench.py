@@ -0,0 +1,263 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of the device snapshot command used by
+:py:class:`trcon.TRFlowPanel`. Soft pumps, a soft flow meter and soft valves
+are connected behind a :py:class:`server.ControlServer` on the local host,
+as for the TR-SAXS flow setup, and read through a
+:py:class:`client.ControlClient`. The test sets a pump flowing and a valve
+position, checks that one snapshot returns the state of every device, and
+reports the round trips and time for each status update. With --local the
+communication threads are used directly, without the server.
+
+Run from the biocon folder, e.g.:
+    python bench/snapbench.py --cycles 20
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+from collections import deque
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import utils
+import pumpcon
+import fmcon
+import valvecon
+
+
+# Device type: connect commands for the soft devices
+bench_devices = {
+    'pump'  : [('connect', ['{}'.format(name), 'Soft', None], {})
+        for name in ['Buffer 1', 'Sample', 'Buffer 2']],
+    'fm'    : [('connect', ['outlet', 'Soft', None], {})],
+    'valve' : [('connect', ['{}'.format(name), 'Soft', None], {'positions': 6})
+        for name in ['Injection', 'Sample', 'Buffer 1', 'Buffer 2']],
+    }
+
+
+class BenchLink(object):
+    """
+    Sends commands to the devices, either through a control server and
+    client on the local host or straight to the communication threads, and
+    counts the round trips.
+    """
+    def __init__(self, local=False, port='5599'):
+        self.local = local
+        self.round_trips = 0
+
+        self._timeout_event = threading.Event()
+        self._abort_event = threading.Event()
+        self._queues = {}
+
+        if local:
+            self.threads = {
+                'pump'  : pumpcon.PumpCommThread('PumpCon'),
+                'fm'    : fmcon.FlowMeterCommThread('FMCon'),
+                'valve' : valvecon.ValveCommThread('ValveCon'),
+                }
+
+            for dev_type, thread in self.threads.items():
+                thread.start()
+
+                queues = (deque(), deque(), deque(), threading.Lock())
+                thread.add_new_communication('bench', *queues[:3])
+                self._queues[dev_type] = queues
+
+        else:
+            import client
+            import server
+
+            self.server = server.ControlServer('127.0.0.1', port,
+                name='BenchControlServer', start_pump=True, start_fm=True,
+                start_valve=True)
+            self.server.start()
+            self.server.ready_event.wait()
+
+            self.threads = {dev_type: self.server.get_comm_thread(dev_type)
+                for dev_type in bench_devices}
+
+            self.server.add_snapshot_group('bench', {dev_type: (thread, None)
+                for dev_type, thread in self.threads.items()})
+
+            queues = (deque(), deque(), deque(), threading.Lock())
+
+            self.client = client.ControlClient('127.0.0.1', port, queues[0],
+                queues[1], self._abort_event, self._timeout_event,
+                name='BenchControlClient', status_queue=queues[2])
+            self.client.start()
+
+            for dev_type in list(bench_devices.keys()) + ['server']:
+                self._queues[dev_type] = queues
+
+    def send(self, dev_type, cmd, response=True):
+        cmd_q, return_q, status_q, return_lock = self._queues[dev_type]
+
+        self.round_trips += 1
+
+        return utils.send_cmd(cmd, cmd_q, return_q, self._timeout_event,
+            return_lock, not self.local, dev_type, response)
+
+    def snapshot(self, names=None):
+        if self.local:
+            if names is None:
+                names = {dev_type: None for dev_type in self.threads}
+
+            self.round_trips += 1
+
+            return utils.get_snapshot({dev_type: (self.threads[dev_type],
+                dev_names) for dev_type, dev_names in names.items()})
+
+        else:
+            return self.send('server', ('snapshot', ('bench',),
+                {'names': names}))
+
+    def stop(self):
+        if self.local:
+            for thread in self.threads.values():
+                thread.stop()
+                thread.join(5)
+
+        else:
+            self.client.stop()
+            self.client.join(5)
+            self.server.stop()
+            self.server.join(5)
+
+
+def run_test(cycles=20, local=False):
+    """
+    Connects the soft devices, sets their state and reads them back for a
+    number of status updates.
+
+    :param int cycles: The number of status updates.
+    :param bool local: Use the communication threads without the server.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    link = BenchLink(local)
+
+    names = {}
+
+    try:
+        for dev_type, connect_cmds in bench_devices.items():
+            names[dev_type] = [cmd[1][0] for cmd in connect_cmds]
+
+            for cmd in connect_cmds:
+                link.send(dev_type, cmd)
+
+        link.send('pump', ('set_flow_rate', ('Sample', 1.), {}))
+        link.send('pump', ('start_flow', ('Sample',), {}))
+        link.send('valve', ('set_position', ('Injection', 2), {}))
+
+        link.round_trips = 0
+        update_times = []
+
+        for num in range(cycles):
+            start = time.monotonic()
+
+            states = link.snapshot(names)
+
+            update_times.append(time.monotonic() - start)
+
+    finally:
+        link.stop()
+
+    results = {
+        'local'         : local,
+        'cycles'        : cycles,
+        'num_devices'   : sum(len(dev_names) for dev_names in names.values()),
+        'round_trips'   : link.round_trips/cycles,
+        'update_mean'   : sum(update_times)/len(update_times),
+        'update_max'    : max(update_times),
+        'states'        : states,
+        'names'         : names,
+        }
+
+    return results
+
+def check_results(results):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    states = results['states']
+
+    if states is None:
+        failed.append('No response to the status update')
+        return failed
+
+    for dev_type, dev_names in results['names'].items():
+        for name in dev_names:
+            if states.get(dev_type, {}).get(name, None) is None:
+                failed.append('No state for {} {}'.format(dev_type, name))
+
+    if len(failed) > 0:
+        return failed
+
+    sample = states['pump']['Sample']
+    if not sample['is_moving'] or sample['flow_rate'] != 1.:
+        failed.append('Sample pump state {} is not flowing at 1'.format(sample))
+
+    injection = states['valve']['Injection']['position']
+    if int(injection) != 2:
+        failed.append('Injection valve at {} instead of 2'.format(injection))
+
+    if results['round_trips'] != 1:
+        failed.append('{} round trips per update'.format(results['round_trips']))
+
+    return failed
+
+def format_results(results):
+    lines = ['Status update snapshot ({}): {} devices, {} updates'.format(
+        'local threads' if results['local'] else 'local server',
+        results['num_devices'], results['cycles'])]
+    lines.append('Round trips per update {:.0f}, update took {:.1f} ms mean, '
+        '{:.1f} ms max'.format(results['round_trips'],
+        1000*results['update_mean'], 1000*results['update_max']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='Device snapshot test')
+    parser.add_argument('--cycles', type=int, default=20,
+        help='Number of status updates')
+    parser.add_argument('--local', action='store_true',
+        help='Use the communication threads without the server')
+    args = parser.parse_args()
+
+    results = run_test(args.cycles, args.local)
+    print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
@@ -0,0 +1,219 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Startup benchmark for :py:class:`biocon.BioFrame`. Launches the control
+software with a set of components using simulated devices, and reports the
+time until the window is ready, broken down by module import, device
+connection and panel construction for each component. It checks that the
+window ready mark was recorded, that each component's panel or device was
+timed, and that the modules of the components that aren't started were
+never imported.
+
+Components without a simulated device mode (e.g. exposure) need their
+hardware or remote servers. Run from the biocon folder; without a display
+use a virtual one, e.g.:
+    xvfb-run python bench/startbench.py --components coflow,metadata
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+# First, so the startup timing starts at launch
+import harness
+import startup
+
+import logging
+import sys
+from collections import OrderedDict
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import wx
+
+import biocon
+
+# Component: module, default settings name
+default_settings = {
+    'exposure'      : ('expcon', 'default_exposure_settings'),
+    'coflow'        : ('coflowcon', 'default_coflow_settings'),
+    'trsaxs_scan'   : ('trcon', 'default_trsaxs_settings'),
+    'trsaxs_flow'   : ('trcon', 'default_trsaxs_settings'),
+    'metadata'      : ('metadata', 'default_metadata_settings'),
+    'uv'            : ('spectrometercon', 'default_spectrometer_settings'),
+    'hplc'          : ('biohplccon', 'default_hplc_2pump_settings'),
+    'automator'     : ('autocon', 'default_automator_settings'),
+    'autosampler'   : ('autosamplercon', 'default_autosampler_settings'),
+    'toaster'       : ('toastcon', 'default_toaster_settings'),
+    'mono_auto_tune': ('monotunecon', 'default_mono_tune_settings'),
+    'airshot'       : ('airshotcon', 'default_airshot_settings'),
+    }
+
+
+def get_settings(component_keys):
+    """
+    Makes the BioFrame settings for the components, with simulated devices
+    where the component supports them.
+
+    :param list component_keys: The components to set up.
+
+    :returns: The settings, a list of communication threads that need
+        to be stopped on exit, and the names of the modules imported for
+        the components, including the ones they import.
+    :rtype: tuple
+    """
+    components = OrderedDict((key, biocon.known_components[key])
+        for key in component_keys)
+
+    settings = {
+        'components'    : components,
+        'biocon'        : {},
+        }
+
+    com_threads = []
+    component_modules = set()
+
+    for key in component_keys:
+        module_name, settings_name = default_settings[key]
+
+        loaded = set(sys.modules)
+        module = startup.profiler.import_module(module_name, key)
+        component_modules.update(set(sys.modules) - loaded)
+
+        comp_settings = getattr(module, settings_name)
+
+        if key == 'coflow':
+            com_thread = module.CoflowCommThread('CoflowCon')
+            com_thread.start()
+            com_threads.append(com_thread)
+
+            comp_settings['device_communication'] = 'local'
+            comp_settings['com_thread'] = com_thread
+
+            device_kwargs = comp_settings['device_init'][0]['kwargs']
+            device_kwargs['use_overflow_control'] = False
+
+            for dev in ['sheath_pump', 'outlet_pump', 'sheath_fm', 'outlet_fm',
+                'sheath_valve']:
+                device_kwargs[dev]['args'] = ['Soft', None]
+                device_kwargs[dev]['kwargs'] = {}
+
+            device_kwargs['sheath_valve']['kwargs']['positions'] = 10
+
+        settings[key] = comp_settings
+
+    keys = list(components.keys())
+    keys.append('biocon')
+
+    for key in settings:
+        if key != 'components' and key != 'biocon':
+            settings[key]['components'] = keys
+
+    return settings, com_threads, component_modules
+
+def run_test(component_keys):
+    """
+    Starts the BioFrame, waits until the window is ready and closes it.
+
+    :param list component_keys: The components to start.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    settings, com_threads, component_modules = get_settings(component_keys)
+
+    app = wx.App()
+
+    frame = biocon.BioFrame(settings, None, title='BioCAT Control',
+        name='biocon')
+    frame.Show()
+
+    results = {'components': component_keys}
+
+    def on_ready():
+        # Queued after the BioFrame's own startup callback
+        results['report'] = startup.profiler.get_report()
+        frame.Close()
+
+    wx.CallAfter(on_ready)
+    app.MainLoop()
+
+    for com_thread in com_threads:
+        com_thread.stop()
+        com_thread.join(5)
+
+    disabled = set(component.split('.')[0] for key, component in
+        biocon.known_components.items() if key not in component_keys)
+
+    results['marks'] = dict(startup.profiler.marks)
+    results['times'] = dict(startup.profiler.times)
+    results['loaded'] = sorted(name for name in disabled if name in sys.modules
+        and name not in component_modules)
+
+    return results
+
+def check_results(results):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if 'Window ready' not in results['marks']:
+        failed.append('The Window ready mark was not recorded')
+
+    if 'report' not in results:
+        failed.append('The event loop did not run after startup')
+
+    if len(results['loaded']) > 0:
+        failed.append('Modules of disabled components were imported: {}'.format(
+            ', '.join(results['loaded'])))
+
+    for key in results['components']:
+        comp_times = results['times'].get(key, {})
+
+        if comp_times.get('panel', 0) + comp_times.get('device', 0) <= 0:
+            failed.append('No panel or device time recorded for {}'.format(key))
+
+    return failed
+
+def format_results(results):
+    lines = ['Startup: {}'.format(', '.join(results['components']))]
+
+    if 'report' in results:
+        lines.append(results['report'])
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='BioFrame startup benchmark')
+    parser.add_argument('--components', default='coflow,metadata',
+        help='Comma separated components to start')
+    args = parser.parse_args()
+
+    results = run_test(args.components.split(','))
+
+    print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
@@ -0,0 +1,377 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless test of waiting for Newport XPS group states. A
+:py:class:`FakeXPSServer` answers the subset of the XPS TCP API used by
+:py:class:`motorcon.NewportXPSMotor` for waits and moves, with moves that
+take a set time, and counts the status queries. Moves are run through
+:py:class:`XPS_C8_drivers.XPS` the same way the motor does it, with the
+blocking move on one socket and the wait on another, and the test checks
+that :py:meth:`XPS_C8_drivers.XPS.GroupStatusWait` sees the end of each
+move promptly, and that timeouts and aborts end the wait. It reports the
+number of status queries and the CPU time used by the waiting thread.
+
+Run from the biocon folder, e.g.:
+    python bench/xpsbench.py --moves 20 --move-time 0.2
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import threading
+import time
+import socketserver
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import harness
+
+import XPS_C8_drivers as xps_drivers
+
+
+class FakeXPSServer(socketserver.ThreadingTCPServer):
+    """
+    A local stand in for an XPS controller. Each group moves at a constant
+    speed, and GroupMoveAbsolute blocks until the move is done or aborted,
+    as on the controller. Groups are ready (12) when stopped and moving (44)
+    during a move.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    READY = 12
+    MOVING = 44
+
+    def __init__(self, groups, speed=1, port=0):
+        """
+        :param dict groups: Dictionary of group name: number of axes.
+        :param float speed: Move speed in units/s.
+        :param int port: The port to listen on, 0 picks a free port.
+        """
+        socketserver.ThreadingTCPServer.__init__(self, ('127.0.0.1', port),
+            FakeXPSHandler)
+
+        self.speed = speed
+
+        self._lock = threading.Lock()
+        self._positions = {name: [0.]*num_axes for name, num_axes in groups.items()}
+        self._moves = {}
+
+        self.status_queries = 0
+        self.move_end_times = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='FakeXPS')
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def get_status(self, group):
+        with self._lock:
+            self.status_queries += 1
+            moving = self._update(group)
+
+        if moving:
+            return self.MOVING
+
+        return self.READY
+
+    def get_positions(self, group):
+        with self._lock:
+            self._update(group)
+            return list(self._positions[group])
+
+    def move(self, group, targets):
+        with self._lock:
+            self._update(group)
+            distance = max(abs(t-p) for t, p in zip(targets, self._positions[group]))
+
+            done = threading.Event()
+            start = time.monotonic()
+            end = start + distance/self.speed
+            self._moves[group] = (start, end, list(self._positions[group]),
+                targets, done)
+
+        while not done.wait(max(end - time.monotonic(), 0.001)):
+            with self._lock:
+                if not self._update(group):
+                    break
+
+    def abort(self, group):
+        with self._lock:
+            self._update(group)
+
+            if group in self._moves:
+                self._moves.pop(group)[4].set()
+
+    def _update(self, group):
+        # Returns whether the group is still moving
+        if group not in self._moves:
+            return False
+
+        start, end, start_pos, targets, done = self._moves[group]
+        now = time.monotonic()
+
+        if now >= end:
+            self._positions[group] = list(targets)
+            self.move_end_times.append(end)
+            del self._moves[group]
+            done.set()
+            return False
+
+        frac = (now - start)/(end - start)
+        self._positions[group] = [p + (t-p)*frac for p, t in zip(start_pos, targets)]
+
+        return True
+
+
+class FakeXPSHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                data = self.request.recv(1024)
+            except OSError:
+                break
+
+            if not data:
+                break
+
+            reply = self.get_reply(data.decode().strip())
+
+            try:
+                self.request.sendall('{},EndOfAPI'.format(reply).encode())
+            except OSError:
+                break
+
+    def get_reply(self, cmd):
+        name, args = cmd.split('(', 1)
+        args = [arg.strip() for arg in args.rstrip(')').split(',')]
+        server = self.server
+
+        if name == 'ErrorListGet':
+            reply = '0,Error 0 : Successful command;Error -1 : Busy socket'
+
+        elif name == 'ErrorStringGet':
+            reply = '0,Error {}'.format(args[0])
+
+        elif name == 'ControllerStatusGet':
+            reply = '0,0'
+
+        elif name == 'ControllerStatusStringGet':
+            reply = '0,Controller status OK'
+
+        elif name == 'GroupStatusGet':
+            reply = '0,{}'.format(server.get_status(args[0]))
+
+        elif name == 'GroupStatusStringGet':
+            if int(args[0]) == server.MOVING:
+                reply = '0,Moving state'
+            else:
+                reply = '0,Ready state from motion'
+
+        elif name == 'GroupMoveAbsolute':
+            server.move(args[0], [float(arg) for arg in args[1:]])
+            reply = '0'
+
+        elif name == 'GroupMoveAbort':
+            server.abort(args[0])
+            reply = '0'
+
+        elif name == 'GroupPositionCurrentGet':
+            reply = '0,' + ','.join(str(pos) for pos in server.get_positions(args[0]))
+
+        else:
+            # Not implemented in the fake controller
+            reply = '-3'
+
+        return reply
+
+
+def run_test(num_moves=20, move_time=0.2, port=0):
+    """
+    Makes a series of moves on a fake controller and waits for each one.
+
+    :param int num_moves: Number of moves.
+    :param float move_time: Duration of each move in s.
+    :param int port: The fake controller port, 0 picks a free port.
+
+    :returns: A dictionary of results.
+    :rtype: dict
+    """
+    group = 'XY'
+    server = FakeXPSServer({group: 2}, speed=1, port=port)
+    server.start()
+
+    xps = xps_drivers.XPS()
+    move_socket = xps.TCP_ConnectToServer('127.0.0.1', server.port, 5)
+    status_socket = xps.TCP_ConnectToServer('127.0.0.1', server.port, 5)
+
+    moving_states = (43, 44, 45, 47)
+
+    latencies = []
+    errors = []
+    queries = 0
+    cpu_time = 0
+    wait_time = 0
+
+    try:
+        for num in range(num_moves):
+            target = (num+1)*move_time
+            mover = threading.Thread(target=xps.GroupMoveAbsolute,
+                args=(move_socket, group, [target, target]))
+            mover.start()
+
+            # Same as the start wait in the TR scan
+            xps.GroupStatusWait(status_socket, group, moving_states, 0.1)
+
+            server.status_queries = 0
+            cpu_start = time.thread_time()
+            start = time.monotonic()
+
+            error, status = xps.GroupStatusWait(status_socket, group,
+                moving_states, untilIn=False)
+
+            done = time.monotonic()
+            cpu_time += time.thread_time() - cpu_start
+            wait_time += done - start
+            queries += server.status_queries
+
+            mover.join()
+
+            if error != 0 or status != FakeXPSServer.READY:
+                errors.append((error, status))
+
+            latencies.append(done - server.move_end_times[-1])
+
+        # The deadline and the abort event each end a long move early
+        timed_out = _check_interrupt(xps, server, move_socket, status_socket,
+            group, 0.25, None)
+        aborted = _check_interrupt(xps, server, move_socket, status_socket,
+            group, 0.25, threading.Event())
+
+    finally:
+        xps.TCP_CloseSocket(move_socket)
+        xps.TCP_CloseSocket(status_socket)
+        server.stop()
+
+    results = {
+        'num_moves'         : num_moves,
+        'move_time'         : move_time,
+        'errors'            : errors,
+        'queries_per_move'  : queries/num_moves,
+        'mean_latency'      : sum(latencies)/len(latencies),
+        'max_latency'       : max(latencies),
+        'wait_cpu'          : cpu_time,
+        'wait_time'         : wait_time,
+        'timed_out'         : timed_out,
+        'aborted'           : aborted,
+        }
+
+    return results
+
+def _check_interrupt(xps, server, move_socket, status_socket, group,
+    wait_time, abort_event):
+    # Starts a 5 s move and checks the wait ends after about wait_time
+    target = server.get_positions(group)[0] + 5*server.speed
+
+    mover = threading.Thread(target=xps.GroupMoveAbsolute,
+        args=(move_socket, group, [target, target]))
+    mover.start()
+    xps.GroupStatusWait(status_socket, group, (44,), 0.1)
+
+    start = time.monotonic()
+
+    if abort_event is not None:
+        timer = threading.Timer(wait_time, abort_event.set)
+        timer.start()
+        error, status = xps.GroupStatusWait(status_socket, group, (12,),
+            abortEvent=abort_event)
+        expected = xps.WAIT_ABORTED
+    else:
+        error, status = xps.GroupStatusWait(status_socket, group, (12,),
+            wait_time)
+        expected = xps.WAIT_TIMEOUT
+
+    elapsed = time.monotonic() - start
+
+    xps.GroupMoveAbort(status_socket, group)
+    mover.join()
+
+    return error == expected and status == 44 and abs(elapsed - wait_time) < 0.06
+
+def check_results(results):
+    """
+    :returns: A list of failed checks, empty if everything passed.
+    :rtype: list
+    """
+    failed = []
+
+    if len(results['errors']) > 0:
+        failed.append('Waits ended with errors: {}'.format(results['errors']))
+
+    if results['max_latency'] > 0.06:
+        failed.append('End of move seen {:.3f} s late'.format(
+            results['max_latency']))
+
+    if not results['timed_out']:
+        failed.append('Wait did not time out at the deadline')
+
+    if not results['aborted']:
+        failed.append('Wait did not stop on abort')
+
+    return failed
+
+def format_results(results):
+    lines = ['Group state wait: {} moves of {:.3f} s'.format(
+        results['num_moves'], results['move_time'])]
+    lines.append('Status queries per move {:.0f}, end of move seen after '
+        '{:.1f} ms mean, {:.1f} ms max'.format(results['queries_per_move'],
+        1000*results['mean_latency'], 1000*results['max_latency']))
+    lines.append('Waiting thread CPU {:.3f} s ({:.1f}% of one core while '
+        'waiting)'.format(results['wait_cpu'],
+        100*results['wait_cpu']/results['wait_time']))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = harness.get_parser(description='XPS group state wait test')
+    parser.add_argument('--moves', type=int, default=20)
+    parser.add_argument('--move-time', type=float, default=0.2,
+        help='Duration of each move in s')
+    args = parser.parse_args()
+
+    results = run_test(args.moves, args.move_time)
+    print(format_results(results))
+
+    failed = check_results(results)
+
+    harness.finish(failed)
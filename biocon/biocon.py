@@ -30,21 +30,31 @@ from collections import OrderedDict
 if __name__ != '__main__':
     logger = logging.getLogger(__name__)
 
+# First, so the startup timing starts at launch
+import startup
+
 import wx
 import wx.lib.scrolledpanel as scrolled
 
-import expcon
-import coflowcon
-import trcon
-import metadata
-import pipeline_ctrl
-import spectrometercon
-import biohplccon
-import autocon
-import autosamplercon
-import toastcon
-import monotunecon
-import airshotcon
+# The component classes, as module.class. Component modules are only
+# imported when the component is set up, so a station doesn't pay for
+# modules it doesn't use.
+known_components = OrderedDict([
+    ('exposure',        'expcon.ExpPanel'),
+    ('coflow',          'coflowcon.CoflowPanel'),
+    ('trsaxs_scan',     'trcon.TRScanPanel'),
+    ('trsaxs_flow',     'trcon.TRFlowPanel'),
+    ('scan',            'scancon.ScanPanel'),
+    ('metadata',        'metadata.ParamPanel'),
+    ('pipeline',        'pipeline_ctrl.PipelineControl'),
+    ('uv',              'spectrometercon.UVPanel'),
+    ('hplc',            'biohplccon.HPLCPanel'),
+    ('automator',       'autocon.AutoPanel'),
+    ('autosampler',     'autosamplercon.AutosamplerPanel'),
+    ('toaster',         'toastcon.ToasterPanel'),
+    ('mono_auto_tune',  'monotunecon.MonoAutoTune'),
+    ('airshot',         'airshotcon.AirShotPanel'),
+    ])
 
 class BioFrame(wx.Frame):
     """
@@ -72,6 +82,9 @@ class BioFrame(wx.Frame):
         self.Fit()
         self.Raise()
 
+        # Runs once the window is shown and the event loop is running
+        wx.CallAfter(self._on_startup_done)
+
     def _FromDIP(self, size):
         # This is a hack to provide easy back compatibility with wxpython < 4.1
         try:
@@ -79,6 +92,22 @@ class BioFrame(wx.Frame):
         except Exception:
             return size
 
+    def _get_component(self, key):
+        """
+        Gets the class for a component, importing its module the first time.
+        Components can be given in the settings as a class or as a
+        'module.class' string.
+        """
+        component = self.settings['components'][key]
+
+        if isinstance(component, str):
+            module_name, class_name = component.rsplit('.', 1)
+            module = startup.profiler.import_module(module_name, key)
+            component = getattr(module, class_name)
+            self.settings['components'][key] = component
+
+        return component
+
     def _create_layout(self):
         """Creates the layout"""
 
@@ -246,7 +275,8 @@ class BioFrame(wx.Frame):
         if 'exposure' in self.settings['components']:
             exposure_panel = self.component_panels['exposure']
             exposure_automator_callback = exposure_panel.automator_callback
-            inst_settings['exp'] = {'automator_callback': exposure_automator_callback}
+            inst_settings['exp'] = {'automator_callback': exposure_automator_callback,
+                'add_status_callback': exposure_panel.add_automator_status_callback}
 
         if 'autosampler' in self.settings['components']:
             autosampler_panel = self.component_panels['autosampler']
@@ -258,8 +288,11 @@ class BioFrame(wx.Frame):
         label = key.capitalize()
         box_panel = wx.Panel(self.top_notebook)
         box = wx.StaticBox(box_panel, label=label)
-        component_panel = self.settings['components'][key](self.settings[key],
-            box, name=key)
+        component = self._get_component(key)
+
+        with startup.profiler.measure(key, 'panel'):
+            component_panel = component(self.settings[key], box, name=key)
+
         self.component_panels[key] = component_panel
 
         automator_sizer = wx.StaticBoxSizer(box, wx.VERTICAL)
@@ -370,13 +403,16 @@ class BioFrame(wx.Frame):
                 box = wx.StaticBox(box_panel, label=label)
                 # box.SetOwnForegroundColour(wx.Colour('firebrick'))
 
-                if (key != 'uv' and key != 'hplc' and key != 'coflow'
-                    and key != 'autosampler'):
-                    component_panel = self.settings['components'][key](self.settings[key],
-                        box, name=key)
-                else:
-                    component_panel = self.settings['components'][key](box, wx.ID_ANY,
-                        self.settings[key], name=key)
+                component = self._get_component(key)
+
+                with startup.profiler.measure(key, 'panel'):
+                    if (key != 'uv' and key != 'hplc' and key != 'coflow'
+                        and key != 'autosampler'):
+                        component_panel = component(self.settings[key], box,
+                            name=key)
+                    else:
+                        component_panel = component(box, wx.ID_ANY,
+                            self.settings[key], name=key)
 
                 component_sizer = wx.StaticBoxSizer(box, wx.VERTICAL)
                 component_sizer.Add(component_panel, proportion=1,
@@ -394,17 +430,26 @@ class BioFrame(wx.Frame):
 
             elif key == 'pipeline':
                 logger.info('Setting up pipeline')
-                ctrl = self.settings['components'][key](self.settings[key])
+                component = self._get_component(key)
+                with startup.profiler.measure(key, 'device'):
+                    ctrl = component(self.settings[key])
                 self.component_controls[key] = ctrl
             elif key == 'mono_auto_tune':
                 logger.info('Setting up mono auto tune')
-                ctrl = self.settings['components'][key](self.settings[key])
+                component = self._get_component(key)
+                with startup.profiler.measure(key, 'device'):
+                    ctrl = component(self.settings[key])
                 self.component_controls[key] = ctrl
             else:
                 pass
 
         return component_sizers
 
+    def _on_startup_done(self):
+        startup.profiler.mark('Window ready')
+        startup.profiler.finish()
+        startup.profiler.log_report()
+
     def _on_exit(self, evt):
         """Stops all current pump motions and then closes the frame."""
         logger.debug('Closing the BioFrame')
@@ -440,198 +485,228 @@ if __name__ == '__main__':
     logger.addHandler(h1)
 
 
+    biocon_settings = {}
+
+    # Only the modules for the components used here are imported
+    component_keys = [
+        'exposure',
+        # 'coflow',
+        # 'trsaxs_scan',
+        # 'trsaxs_flow',
+        # 'scan',
+        'metadata',
+        # 'pipeline',
+        # 'uv',
+        # 'hplc',
+        # 'automator',
+        # 'autosampler',
+        'toaster',
+        'mono_auto_tune',
+        'airshot',
+        ]
+
+    components = OrderedDict((key, known_components[key])
+        for key in component_keys)
+
+    settings = {
+        'components'    : components,
+        'biocon'        : biocon_settings,
+        }
+
+
     ###################################################################
     # Exposure settings
-    exposure_settings = expcon.default_exposure_settings
-
-    # # Fast in-air shutters
-    # exposure_settings['shutter_speed_open'] = 0.001
-    # exposure_settings['shutter_speed_close'] = 0.001
-    # exposure_settings['shutter_pad'] = 0.00
-    # exposure_settings['shutter_cycle'] = 0.002
-
-    # Normal vacuum shutter (uniblitz)
-    exposure_settings['shutter_speed_open'] = 0.0045
-    exposure_settings['shutter_speed_close'] = 0.004
-    exposure_settings['shutter_pad'] = 0.002
-    exposure_settings['shutter_cycle'] = 0.1
-
-    # # EIGER2 XE 9M
-    # exposure_settings['det_args'] =  {'use_tiff_writer': False,
-    #     'use_file_writer': True, 'photon_energy' : 12.0,
-    #     'images_per_file': 1000} #1 image/file for TR, 300 for eq SAXS, 1000 for muscle
-
-    # Muscle settings
-    exposure_settings['struck_measurement_time'] = '0.001'
-    exposure_settings['tr_muscle_exp'] = False
-    exposure_settings['open_shutter_before_trig_cont_exp'] = False
-
-    #Other settings
-    exposure_settings['wait_for_trig'] = True
-    exposure_settings['mcs_log_vals'] = [
-        # Format: (mx_record_name, struck_channel, header_name,
-        # scale, offset, use_dark_current, normalize_by_exp_time)
-        {'mx_record': 'mcs3', 'channel': 2, 'name': 'I0',
-        'scale': 1, 'offset': 0, 'dark': True, 'norm_time': False},
-        {'mx_record': 'mcs4', 'channel': 3, 'name': 'I1', 'scale': 1,
-        'offset': 0, 'dark': True, 'norm_time': False},
-        # {'mx_record': 'mcs5', 'channel': 4, 'name': 'I2', 'scale': 1,
-        # 'offset': 0, 'dark': True, 'norm_time': False},
-        # {'mx_record': 'mcs6', 'channel': 5, 'name': 'I3', 'scale': 1,
-        # 'offset': 0, 'dark': True, 'norm_time': False},
-        # {'mx_record': 'mcs7', 'channel': 6, 'name': 'Detector_Enable',
-        # 'scale': 2.5e6, 'offset': 0, 'dark': True, 'norm_time': True},
-        # {'mx_record': 'mcs12', 'channel': 11, 'name': 'Length_Out',
-        # 'scale': 10e6, 'offset': 0, 'dark': False, 'norm_time': True},
-        # {'mx_record': 'mcs13', 'channel': 12, 'name': 'Force',
-        # 'scale': 10e6, 'offset': 0, 'dark': False, 'norm_time': True},
-        # {'mx_record': 'mcs14', 'channel': 13, 'name': 'Length',
-        # 'scale': 10e6, 'offset': 0, 'dark': False, 'norm_time': True},
-        ]
-    exposure_settings['warnings'] = {'shutter' : True, 'col_vac' : {'check': True,
-        'thresh': 0.04}, 'guard_vac' : {'check': True, 'thresh': 0.04},
-        'sample_vac': {'check': True, 'thresh': 0.04}, 'sc_vac':
-        {'check': True, 'thresh':0.04}}
-    exposure_settings['base_data_dir'] = '/nas_data/MarCCD/2026_Run2/' #CHANGE ME and pipeline local_basedir
-    exposure_settings['data_dir'] = exposure_settings['base_data_dir']
+    if 'exposure' in components:
+        expcon = startup.profiler.import_module('expcon', 'exposure')
+        exposure_settings = expcon.default_exposure_settings
+
+        # # Fast in-air shutters
+        # exposure_settings['shutter_speed_open'] = 0.001
+        # exposure_settings['shutter_speed_close'] = 0.001
+        # exposure_settings['shutter_pad'] = 0.00
+        # exposure_settings['shutter_cycle'] = 0.002
+
+        # Normal vacuum shutter (uniblitz)
+        exposure_settings['shutter_speed_open'] = 0.0045
+        exposure_settings['shutter_speed_close'] = 0.004
+        exposure_settings['shutter_pad'] = 0.002
+        exposure_settings['shutter_cycle'] = 0.1
+
+        # # EIGER2 XE 9M
+        # exposure_settings['det_args'] =  {'use_tiff_writer': False,
+        #     'use_file_writer': True, 'photon_energy' : 12.0,
+        #     'images_per_file': 1000} #1 image/file for TR, 300 for eq SAXS, 1000 for muscle
+
+        # Muscle settings
+        exposure_settings['struck_measurement_time'] = '0.001'
+        exposure_settings['tr_muscle_exp'] = False
+        exposure_settings['open_shutter_before_trig_cont_exp'] = False
+
+        #Other settings
+        exposure_settings['wait_for_trig'] = True
+        exposure_settings['mcs_log_vals'] = [
+            # Format: (mx_record_name, struck_channel, header_name,
+            # scale, offset, use_dark_current, normalize_by_exp_time)
+            {'mx_record': 'mcs3', 'channel': 2, 'name': 'I0',
+            'scale': 1, 'offset': 0, 'dark': True, 'norm_time': False},
+            {'mx_record': 'mcs4', 'channel': 3, 'name': 'I1', 'scale': 1,
+            'offset': 0, 'dark': True, 'norm_time': False},
+            # {'mx_record': 'mcs5', 'channel': 4, 'name': 'I2', 'scale': 1,
+            # 'offset': 0, 'dark': True, 'norm_time': False},
+            # {'mx_record': 'mcs6', 'channel': 5, 'name': 'I3', 'scale': 1,
+            # 'offset': 0, 'dark': True, 'norm_time': False},
+            # {'mx_record': 'mcs7', 'channel': 6, 'name': 'Detector_Enable',
+            # 'scale': 2.5e6, 'offset': 0, 'dark': True, 'norm_time': True},
+            # {'mx_record': 'mcs12', 'channel': 11, 'name': 'Length_Out',
+            # 'scale': 10e6, 'offset': 0, 'dark': False, 'norm_time': True},
+            # {'mx_record': 'mcs13', 'channel': 12, 'name': 'Force',
+            # 'scale': 10e6, 'offset': 0, 'dark': False, 'norm_time': True},
+            # {'mx_record': 'mcs14', 'channel': 13, 'name': 'Length',
+            # 'scale': 10e6, 'offset': 0, 'dark': False, 'norm_time': True},
+            ]
+        exposure_settings['warnings'] = {'shutter' : True, 'col_vac' : {'check': True,
+            'thresh': 0.04}, 'guard_vac' : {'check': True, 'thresh': 0.04},
+            'sample_vac': {'check': True, 'thresh': 0.04}, 'sc_vac':
+            {'check': True, 'thresh':0.04}}
+        exposure_settings['base_data_dir'] = '/nas_data/MarCCD/2026_Run2/' #CHANGE ME and pipeline local_basedir
+        exposure_settings['data_dir'] = exposure_settings['base_data_dir']
+        settings['exposure'] = exposure_settings
 
 
     ###################################################################
     # Coflow settings
-    coflow_settings = coflowcon.default_coflow_settings
+    if 'coflow' in components:
+        coflowcon = startup.profiler.import_module('coflowcon', 'coflow')
+        coflow_settings = coflowcon.default_coflow_settings
+        settings['coflow'] = coflow_settings
 
 
     ###################################################################
     # TR-SAXS settings
-    trsaxs_settings = trcon.default_trsaxs_settings
+    if 'trsaxs_scan' in components or 'trsaxs_flow' in components:
+        trcon = startup.profiler.import_module('trcon', 'trsaxs_scan')
+        trsaxs_settings = trcon.default_trsaxs_settings
+        settings['trsaxs_scan'] = trsaxs_settings
+        settings['trsaxs_flow'] = trsaxs_settings
 
 
     ###################################################################
     # Scan Settings
-    scan_settings = {
-        'components'            : ['scan'],
-        'newport_ip'            : '164.54.204.76',
-        'newport_port'          : '5001',
-        'show_advanced_options' : True,
-        'motor_group_name'      : 'XY',
-        }
+    if 'scan' in components:
+        scan_settings = {
+            'components'            : ['scan'],
+            'newport_ip'            : '164.54.204.76',
+            'newport_port'          : '5001',
+            'show_advanced_options' : True,
+            'motor_group_name'      : 'XY',
+            'serpentine'            : False, #Inner motors reverse direction on alternate lines
+            'point_overhead'        : 0.02, #Estimated dead time per point not from motion, in s
+            }
+        settings['scan'] = scan_settings
 
 
     ###################################################################
     # Metadata Settings
-    metadata_settings = metadata.default_metadata_settings
-    # metadata_settings['metadata_type'] = 'auto'
-    metadata_settings['metadata_type'] = 'muscle'
+    if 'metadata' in components:
+        metadata = startup.profiler.import_module('metadata', 'metadata')
+        metadata_settings = metadata.default_metadata_settings
+        # metadata_settings['metadata_type'] = 'auto'
+        metadata_settings['metadata_type'] = 'muscle'
+        settings['metadata'] = metadata_settings
 
 
     ###################################################################
     # Pipeline Settings
-    pipeline_settings = {
-        'components'    : ['pipeline'],
-        'output_basedir': '/nas_data/SAXS',
-        'server_port'   : '5556',
-        'server_ip'     : '164.54.204.142', #EPU
-        # 'server_ip'     : '164.54.204.144', #Marvin
-
-        # # EIGER settings
-        'local_basedir' : '/nas_data/Eiger2x',
-        'data_basedir'  : '/nas_data/Eiger2x',
-        'data_source'   : 'Stream', #File or stream
-        'detector'      : 'Eiger',
-
-        # Pilatus settings
-        # 'local_basedir' : '/nas_data/Pilatus1M/2026_1M',
-        # 'data_basedir'  : '/nas_data/Pilatus1M/2026_1M',
-        # 'data_source'   : 'File', #File or stream
-        # 'detector'      : 'Pilatus',
-        }
+    if 'pipeline' in components:
+        pipeline_settings = {
+            'components'    : ['pipeline'],
+            'output_basedir': '/nas_data/SAXS',
+            'server_port'   : '5556',
+            'server_ip'     : '164.54.204.142', #EPU
+            # 'server_ip'     : '164.54.204.144', #Marvin
+
+            # # EIGER settings
+            'local_basedir' : '/nas_data/Eiger2x',
+            'data_basedir'  : '/nas_data/Eiger2x',
+            'data_source'   : 'Stream', #File or stream
+            'detector'      : 'Eiger',
+
+            # Pilatus settings
+            # 'local_basedir' : '/nas_data/Pilatus1M/2026_1M',
+            # 'data_basedir'  : '/nas_data/Pilatus1M/2026_1M',
+            # 'data_source'   : 'File', #File or stream
+            # 'detector'      : 'Pilatus',
+            }
+        settings['pipeline'] = pipeline_settings
 
 
     ###################################################################
     # UV Settings
-    spectrometer_settings = spectrometercon.default_spectrometer_settings
-    spectrometer_settings['inline_panel'] = True
-    spectrometer_settings['device_communication'] = 'remote'
-    spectrometer_settings['remote_dir_prefix'] = {'local' : '/nas_data', 'remote' : 'Z:\\'}
+    if 'uv' in components:
+        spectrometercon = startup.profiler.import_module('spectrometercon', 'uv')
+        spectrometer_settings = spectrometercon.default_spectrometer_settings
+        spectrometer_settings['inline_panel'] = True
+        spectrometer_settings['device_communication'] = 'remote'
+        spectrometer_settings['remote_dir_prefix'] = {'local' : '/nas_data', 'remote' : 'Z:\\'}
+        settings['uv'] = spectrometer_settings
 
 
     ###################################################################
     # HPLC Settings
-    hplc_settings = biohplccon.default_hplc_2pump_settings
-    hplc_settings['com_thread'] = None
-    hplc_settings['remote'] = True
-    hplc_settings['remote_device'] = 'hplc'
-    hplc_settings['remote_ip'] = '164.54.204.113'
-    hplc_settings['remote_port'] = '5556'
-    hplc_settings['device_data'] = hplc_settings['device_init'][0]
+    if 'hplc' in components:
+        biohplccon = startup.profiler.import_module('biohplccon', 'hplc')
+        hplc_settings = biohplccon.default_hplc_2pump_settings
+        hplc_settings['com_thread'] = None
+        hplc_settings['remote'] = True
+        hplc_settings['remote_device'] = 'hplc'
+        hplc_settings['remote_ip'] = '164.54.204.113'
+        hplc_settings['remote_port'] = '5556'
+        hplc_settings['device_data'] = hplc_settings['device_init'][0]
+        settings['hplc'] = hplc_settings
 
 
     ###################################################################
     # Automator Settings
-    automator_settings = autocon.default_automator_settings
+    if 'automator' in components:
+        autocon = startup.profiler.import_module('autocon', 'automator')
+        automator_settings = autocon.default_automator_settings
+        settings['automator'] = automator_settings
 
     ###################################################################
     # Autosampler Settings
-    autosampler_settings = autosamplercon.default_autosampler_settings
-    autosampler_settings['com_thread'] = None
-    autosampler_settings['device_communication'] = 'remote'
-    autosampler_settings['remote'] = True
-    autosampler_settings['remote_device'] = 'autosampler'
-    autosampler_settings['remote_ip'] = '164.54.204.53'
-    autosampler_settings['remote_port'] = '5557'
-    autosampler_settings['device_data'] = autosampler_settings['device_init'][0]
-    autosampler_settings['inline_panel'] = True
+    if 'autosampler' in components:
+        autosamplercon = startup.profiler.import_module('autosamplercon', 'autosampler')
+        autosampler_settings = autosamplercon.default_autosampler_settings
+        autosampler_settings['com_thread'] = None
+        autosampler_settings['device_communication'] = 'remote'
+        autosampler_settings['remote'] = True
+        autosampler_settings['remote_device'] = 'autosampler'
+        autosampler_settings['remote_ip'] = '164.54.204.53'
+        autosampler_settings['remote_port'] = '5557'
+        autosampler_settings['device_data'] = autosampler_settings['device_init'][0]
+        autosampler_settings['inline_panel'] = True
+        settings['autosampler'] = autosampler_settings
 
     ###################################################################
     # Toaster Settings
-    toaster_settings = toastcon.default_toaster_settings
+    if 'toaster' in components:
+        toastcon = startup.profiler.import_module('toastcon', 'toaster')
+        toaster_settings = toastcon.default_toaster_settings
+        settings['toaster'] = toaster_settings
 
     ###################################################################
     # Mono Auto Tune Settings
-    mono_auto_tune_settings = monotunecon.default_mono_tune_settings
+    if 'mono_auto_tune' in components:
+        monotunecon = startup.profiler.import_module('monotunecon', 'mono_auto_tune')
+        mono_auto_tune_settings = monotunecon.default_mono_tune_settings
+        settings['mono_auto_tune'] = mono_auto_tune_settings
 
     ###################################################################
     # Air Shot Settings
-    airshot_settings = airshotcon.default_airshot_settings
-
-    biocon_settings = {}
-
-    components = OrderedDict([
-        ('exposure', expcon.ExpPanel),
-        # ('coflow', coflowcon.CoflowPanel),
-        # ('trsaxs_scan', trcon.TRScanPanel),
-        # ('trsaxs_flow', trcon.TRFlowPanel),
-        # ('scan',    scancon.ScanPanel),
-        ('metadata', metadata.ParamPanel),
-        # ('pipeline', pipeline_ctrl.PipelineControl),
-        # ('uv', spectrometercon.UVPanel),
-        # ('hplc', biohplccon.HPLCPanel),
-        # ('automator', autocon.AutoPanel),
-        # ('autosampler', autosamplercon.AutosamplerPanel),
-        ('toaster', toastcon.ToasterPanel),
-        ('mono_auto_tune', monotunecon.MonoAutoTune),
-        ('airshot', airshotcon.AirShotPanel),
-        ])
-
-    settings = {
-        'coflow'        : coflow_settings,
-        'exposure'      : exposure_settings,
-        'trsaxs_scan'   : trsaxs_settings,
-        'trsaxs_flow'   : trsaxs_settings,
-        'scan'          : scan_settings,
-        'metadata'      : metadata_settings,
-        'pipeline'      : pipeline_settings,
-        'uv'            : spectrometer_settings,
-        'hplc'          : hplc_settings,
-        'automator'     : automator_settings,
-        'autosampler'   : autosampler_settings,
-        'toaster'       : toaster_settings,
-        'mono_auto_tune': mono_auto_tune_settings,
-        'airshot'       : airshot_settings,
-        'components'    : components,
-        'biocon'        : biocon_settings,
-        }
-
+    if 'airshot' in components:
+        airshotcon = startup.profiler.import_module('airshotcon', 'airshot')
+        airshot_settings = airshotcon.default_airshot_settings
+        settings['airshot'] = airshot_settings
 
     keys = list(settings['components'].keys())
     keys.append('biocon')
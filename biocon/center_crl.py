@@ -20,6 +20,9 @@ def do_centering_scan(scan_settings):
     fw_height = scan_settings['fw_height']
     center_offset = scan_settings['center_offset']
     shutter_pvs = scan_settings['shutter_pvs']
+    adaptive = scan_settings.get('adaptive', False)
+    tolerance = scan_settings.get('center_tolerance', None)
+    fly = scan_settings.get('fly_scan', False)
 
     motor = scan_settings['motor']
     scan_positioner = scan_settings['scan_positioner']
@@ -30,82 +33,239 @@ def do_centering_scan(scan_settings):
     start += initial_pos
     stop += initial_pos
 
-    motor.move_positioner_absolute(scan_positioner, scan_mindex, start)
+    if fly:
+        for shutter in shutter_pvs:
+            open_val = shutter['open']
+            pv = shutter['pv']
+            pv.put(open_val)
+
+        fly_start = time.time()
+
+        mtr1_positions, scaler_vals = fly_scan(motor, scan_positioner,
+            scan_mindex, start, stop, step, meas_time,
+            scan_settings['mcs_pv_name'], scan_settings['mcs_channel'],
+            motor.get_acceleration(scan_positioner, scan_mindex))
+
+        print('Fly scan measured {} points in {:.1f} s'.format(
+            len(mtr1_positions), time.time()-fly_start))
+
+        for shutter in shutter_pvs:
+            close_val = shutter['close']
+            pv = shutter['pv']
+            pv.put(close_val)
 
-    if start < stop:
-        mtr1_positions = np.arange(start, stop+step, step)
     else:
-        mtr1_positions = np.arange(stop, start+step, step)
-        mtr1_positions = mtr1_positions[::-1]
+        motor.move_positioner_absolute(scan_positioner, scan_mindex, start)
+
+        if adaptive:
+            scan = AdaptiveScan(start, stop, step, fw_height, tolerance)
+            positions = scan.get_next_positions()
+        else:
+            if start < stop:
+                mtr1_positions = np.arange(start, stop+step, step)
+            else:
+                mtr1_positions = np.arange(stop, start+step, step)
+                mtr1_positions = mtr1_positions[::-1]
 
-    count_time.put(meas_time)
+            scaler_vals = np.zeros_like(mtr1_positions)
+            positions = list(enumerate(mtr1_positions))
 
-    scaler_vals = np.zeros_like(mtr1_positions)
+        count_time.put(meas_time)
 
-    for shutter in shutter_pvs:
-        open_val = shutter['open']
-        pv = shutter['pv']
-        pv.put(open_val)
+        for shutter in shutter_pvs:
+            open_val = shutter['open']
+            pv = shutter['pv']
+            pv.put(open_val)
 
-    for num, mtr1_pos in enumerate(mtr1_positions):
-        if mtr1_pos != mtr1_positions[0]:
-            # logger.info('Moving motor 1 position to {}'.format(mtr1_pos))
-            motor.move_positioner_absolute(scan_positioner,
-                scan_mindex, mtr1_pos)
-        # mtr1.wait_for_motor_stop()
-        # if not motor.is_moving():
-        #     while not motor.is_moving():
-        #         time.sleep(0.01)
-        #         if self._centering_abort_event.is_set():
-        #             motor.stop()
-        #             for shutter in shutter_pvs:
-        #                 close_val = shutter['close']
-        #                 pv = shutter['pv']
-        #                 pv.put(close_val)
-        #             wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
-        #             return
+        first_point = True
 
+        while len(positions) > 0:
+            for index, mtr1_pos in positions:
+                if not first_point:
+                    # logger.info('Moving motor 1 position to {}'.format(mtr1_pos))
+                    motor.move_positioner_absolute(scan_positioner,
+                        scan_mindex, mtr1_pos)
+                first_point = False
 
-        while motor.is_moving():
-            time.sleep(0.01)
+                motor.wait_for_move()
 
-        count_start.put(1,wait=True)
+                count_start.put(1,wait=True)
 
-        while count_start.get() != 0:
-            time.sleep(0.01)
+                while count_start.get() != 0:
+                    time.sleep(0.01)
 
-        counts = meas_pv.get()
-        scaler_vals[num] = counts
-        print('Mtr: {} Cts: {}'.format(mtr1_pos, counts))
+                counts = meas_pv.get()
 
-    for shutter in shutter_pvs:
-        close_val = shutter['close']
-        pv = shutter['pv']
-        pv.put(close_val)
+                if adaptive:
+                    scan.add_point(index, counts)
+                else:
+                    scaler_vals[index] = counts
 
-    center, fwhm = calc_fw_position(mtr1_positions, scaler_vals,
-        fw_height)
+                print('Mtr: {} Cts: {}'.format(mtr1_pos, counts))
 
-    print('Found {} center at: {}'.format(scan_positioner, center))
+            if adaptive:
+                positions = scan.get_next_positions()
+            else:
+                positions = []
+
+        for shutter in shutter_pvs:
+            close_val = shutter['close']
+            pv = shutter['pv']
+            pv.put(close_val)
+
+    if adaptive and not fly:
+        center, fwhm = scan.center, scan.fwhm
+        print(scan.get_summary())
+
+        if center is None or fwhm == 0:
+            # Too few points for the adaptive fit, or the peak isn't
+            # bracketed, so fit the measured points as for a uniform scan
+            center, fwhm = calc_fw_position(*scan.get_data(),
+                fw_height=fw_height)
+    else:
+        center, fwhm = calc_fw_position(mtr1_positions, scaler_vals,
+            fw_height)
+
+    if center is None:
+        print('Too few points to find the {} center, returning to the '
+            'start'.format(scan_positioner))
+
+        center = initial_pos
+
+    else:
+        print('Found {} center at: {}'.format(scan_positioner, center))
 
-    center += center_offset
-    center = round(center, 6)
+        center += center_offset
+        center = round(center, 6)
 
     print('Setting {} center at: {}'.format(scan_positioner, center))
 
     motor.move_positioner_absolute(scan_positioner, scan_mindex, center)
-
-    while motor.is_moving():
-        time.sleep(0.01)
+    motor.wait_for_move()
 
     return center
 
+def fly_scan(motor, positioner, mindex, start, stop, step, meas_time,
+    mcs_pv_name, mcs_channel, acceleration, max_speed=None, abort_event=None):
+    """
+    Measures a 1D profile in a single constant velocity pass. The XPS
+    position compare output fires a pulse every step between start and stop,
+    and each pulse advances the channel of the MCS (Struck SIS3820), so each
+    MCS channel holds the counts for one step of the scan. This requires the
+    XPS position compare output to be wired to the MCS channel advance (LNE)
+    input.
+
+    :param motorcon.NewportXPSMotor motor: The XPS motor.
+    :param str positioner: The positioner to scan.
+    :param int mindex: The positioner index in the motor group.
+    :param float start: The absolute scan start position.
+    :param float stop: The absolute scan stop position. This is adjusted
+        so the range is a whole number of steps.
+    :param float step: The position step for each MCS channel.
+    :param float meas_time: The time to spend on each step. Sets the scan
+        velocity.
+    :param str mcs_pv_name: The MCS PV prefix, e.g. 18ID:mcs
+    :param str mcs_channel: The MCS mca record for the measured signal,
+        e.g. mca4
+    :param float acceleration: The positioner acceleration, used to start
+        the move far enough back that the velocity is constant over the
+        scan range.
+    :param float max_speed: The maximum scan velocity.
+    :param threading.Event abort_event: If set during the scan, the scan is
+        stopped.
+
+    :returns: The center position of each step and the counts for each
+        step. Both are None if the scan was aborted.
+    :rtype: tuple
+    """
+    step = abs(step)
+    num_steps = int(round(abs(stop-start)/step))
+
+    if stop < start:
+        direction = -1
+    else:
+        direction = 1
+
+    stop = start + direction*num_steps*step
+
+    speed = step/meas_time
+    if max_speed is not None:
+        speed = min(speed, max_speed)
+
+    # Acceleration distance plus one step of margin
+    ramp = speed**2/(2*acceleration) + step
+
+    erase_start = epics.get_pv('{}:EraseStart'.format(mcs_pv_name))
+    stop_all = epics.get_pv('{}:StopAll'.format(mcs_pv_name))
+    read_all = epics.get_pv('{}:ReadAll'.format(mcs_pv_name))
+    num_channels = epics.get_pv('{}:NuseAll'.format(mcs_pv_name))
+    channel_advance = epics.get_pv('{}:ChannelAdvance'.format(mcs_pv_name))
+    mca = epics.get_pv('{}:{}'.format(mcs_pv_name, mcs_channel))
+
+    old_speed = motor.get_velocity(positioner, mindex)
+
+    motor.move_positioner_absolute(positioner, mindex, start-direction*ramp)
+
+    motor.stop_position_compare(positioner)
+    motor.set_position_compare(positioner, mindex, min(start, stop),
+        max(start, stop), step)
+
+    # Channel 0 counts until the first pulse and the last channel counts
+    # after the final pulse, so there are two more channels than steps
+    channel_advance.put(1, wait=True)   # External
+    num_channels.put(num_steps+2, wait=True)
+
+    motor.wait_for_move(abort_event=abort_event)
+
+    if abort_event is not None and abort_event.is_set():
+        motor.stop()
+        return None, None
+
+    motor.set_velocity(speed, positioner, mindex)
+
+    erase_start.put(1, wait=True)
+    motor.start_position_compare(positioner)
+
+    motor.move_positioner_absolute(positioner, mindex, stop+direction*ramp)
+
+    motor.wait_for_move(abort_event=abort_event)
+
+    if abort_event is not None and abort_event.is_set():
+        motor.stop()
+        aborted = True
+    else:
+        aborted = False
+
+    motor.stop_position_compare(positioner)
+    stop_all.put(1, wait=True)
+
+    if old_speed is not None:
+        motor.set_velocity(old_speed, positioner, mindex)
+
+    if aborted:
+        return None, None
+
+    read_all.put(1, wait=True)
+    counts = np.array(mca.get(count=num_steps+2, use_monitor=False),
+        dtype=float)
+
+    scaler_vals = counts[1:num_steps+1]
+    mtr_positions = start + direction*(np.arange(num_steps)+0.5)*step
+
+    return mtr_positions, scaler_vals
+
 def calc_fw_position(mtr_pos, scaler_vals, fw_height):
     """
     FW height is the value at which to calulcate the FW. So fw_height
     of 0.5 calcultes FW half max, a fw_height of 0.25 would be FW quarter max,
     and so on.
+
+    Returns None for the center and width if there are too few points to
+    fit.
     """
+    center = None
+    fwhm = None
+
     if mtr_pos is not None and len(mtr_pos)>3:
         y = scaler_vals - np.max(scaler_vals)*fw_height
         if mtr_pos[0]>mtr_pos[1]:
@@ -185,6 +345,203 @@ def calc_fw_position(mtr_pos, scaler_vals, fw_height):
 
     return center, fwhm
 
+class AdaptiveScan(object):
+    """
+    Chooses the positions for a 1D centering scan. A coarse pass over every
+    ``coarse_factor`` point of the uniform grid is measured first. Each
+    following pass bisects only the measured intervals that bracket a
+    ``fw_height`` crossing or the peak, so the points end up where the edges
+    are instead of on the flat baseline. Positions are always taken from the
+    uniform ``start``/``stop``/``step`` grid.
+
+    The scan is done when the center moves by less than ``tolerance``
+    for two passes in a row, or when there are no intervals left to split.
+
+    The center is found by linear interpolation of the crossings on either
+    side of the peak. The interpolating spline in :func:`calc_fw_position`
+    rings at sharp edges when the points are unevenly spaced.
+    """
+    def __init__(self, start, stop, step, fw_height, tolerance=None,
+        coarse_factor=4):
+        """
+        :param float start: The absolute scan start position.
+        :param float stop: The absolute scan stop position.
+        :param float step: The step size of the equivalent uniform scan.
+        :param float fw_height: The fraction of the maximum at which the
+            full width (and so the center) is calculated.
+        :param float tolerance: The center convergence tolerance. Defaults
+            to half the step size.
+        :param int coarse_factor: The coarse pass measures every
+            coarse_factor point of the uniform grid.
+        """
+        step = abs(step)
+
+        if start < stop:
+            self.grid = np.arange(start, stop+step, step)
+        else:
+            self.grid = np.arange(stop, start+step, step)
+            self.grid = self.grid[::-1]
+
+        self.fw_height = fw_height
+
+        if tolerance is None:
+            tolerance = step/2.
+        self.tolerance = tolerance
+
+        # Keep enough coarse points to find the peak
+        self.coarse_factor = max(1, min(int(coarse_factor),
+            (len(self.grid)-1)//7))
+
+        self._values = np.full(len(self.grid), np.nan)
+
+        self.center = None
+        self.fwhm = None
+        self.passes = 0
+        self.converged = False
+        self._stable_passes = 0
+
+    def get_next_positions(self):
+        """
+        Gets the positions to measure in the next pass. Passes alternate
+        direction, so the motor doesn't return to the same end each time.
+
+        :returns: A list of (index, position) tuples. The index is used
+            with :meth:`add_point`. The list is empty when the scan is done.
+        :rtype: list
+        """
+        if self.passes == 0:
+            indices = list(range(0, len(self.grid), self.coarse_factor))
+            if indices[-1] != len(self.grid)-1:
+                indices.append(len(self.grid)-1)
+        else:
+            self._update_center()
+
+            if self.converged:
+                indices = []
+            else:
+                indices = self._get_refine_indices()
+
+        if len(indices) == 0:
+            return []
+
+        if self.passes % 2 == 1:
+            indices = indices[::-1]
+
+        self.passes += 1
+
+        return [(index, self.grid[index]) for index in indices]
+
+    def add_point(self, index, value):
+        """
+        Records a measured value.
+
+        :param int index: The grid index returned by
+            :meth:`get_next_positions`.
+        :param float value: The measured value.
+        """
+        self._values[index] = value
+
+    def get_data(self):
+        """
+        :returns: The measured positions and values, in scan order.
+        :rtype: tuple
+        """
+        measured = np.flatnonzero(np.isfinite(self._values))
+
+        return self.grid[measured], self._values[measured]
+
+    @property
+    def num_points(self):
+        return int(np.count_nonzero(np.isfinite(self._values)))
+
+    @property
+    def num_uniform(self):
+        return len(self.grid)
+
+    def get_summary(self):
+        """
+        :returns: A one line report of the points used compared to the
+            uniform scan.
+        :rtype: str
+        """
+        saved = self.num_uniform - self.num_points
+
+        if self.converged:
+            status = 'converged'
+        else:
+            status = 'fully refined'
+
+        return ('Adaptive scan {} after {} passes: measured {} of {} points '
+            '({} saved, {:.0f}%)'.format(status, self.passes, self.num_points,
+            self.num_uniform, saved, 100.*saved/self.num_uniform))
+
+    def _update_center(self):
+        if self.num_points <= 3:
+            return
+
+        center, fwhm = self._calc_fw_position()
+
+        if (self.center is not None and fwhm > 0 and self.fwhm > 0
+            and abs(center - self.center) < self.tolerance):
+            self._stable_passes += 1
+        else:
+            self._stable_passes = 0
+
+        # A single agreeing pass can happen by chance while the edges are
+        # still only bracketed by coarse points
+        if self._stable_passes >= 2:
+            self.converged = True
+
+        self.center = center
+        self.fwhm = fwhm
+
+    def _calc_fw_position(self):
+        mtr_pos, scaler_vals = self.get_data()
+
+        y = scaler_vals - np.max(scaler_vals)*self.fw_height
+        peak = np.argmax(scaler_vals)
+
+        low = peak
+        while low > 0 and y[low-1] > 0:
+            low -= 1
+
+        high = peak
+        while high < len(y)-1 and y[high+1] > 0:
+            high += 1
+
+        if low == 0 or high == len(y)-1:
+            # The peak isn't bracketed by the scan range
+            return 0, 0
+
+        r1 = (mtr_pos[low-1] + (mtr_pos[low]-mtr_pos[low-1])*(-y[low-1])
+            /(y[low]-y[low-1]))
+        r2 = (mtr_pos[high] + (mtr_pos[high+1]-mtr_pos[high])*y[high]
+            /(y[high]-y[high+1]))
+
+        fwhm = np.fabs(r2-r1)
+        center = (r1+r2)/2.
+
+        return center, fwhm
+
+    def _get_refine_indices(self):
+        measured = np.flatnonzero(np.isfinite(self._values))
+        values = self._values[measured]
+
+        above = values > np.max(values)*self.fw_height
+        peak = np.argmax(values)
+
+        indices = []
+
+        for k in range(len(measured)-1):
+            index1 = measured[k]
+            index2 = measured[k+1]
+
+            if (index2 - index1 > 1 and (above[k] != above[k+1]
+                or k == peak or k+1 == peak)):
+                indices.append((index1 + index2)//2)
+
+        return indices
+
 
 if __name__ == '__main__':
 
@@ -220,6 +577,10 @@ if __name__ == '__main__':
         'meas_time'     : 0.1,
         'fw_height'     : 0.5,
         'center_offset' : 0,
+        'adaptive'      : False,
+        'fly_scan'      : False,
+        'mcs_pv_name'   : '18ID:mcs',
+        'mcs_channel'   : 'mca5',
         'motor'         : np_motor,
         'shutter_pvs'   : [{'name': '18ID:LJT4:2:Bo6', 'open': 0, 'close': 1},
                                 {'name': '18ID:LJT4:2:Bo9', 'open': 1, 'close': 0}],
@@ -84,7 +84,7 @@ class CoflowControl(object):
         self.sheath_fr_mult = settings['sheath_fr_mult']
         self.outlet_fr_mult = settings['outlet_fr_mult']
 
-        self._buffer_monitor = utils.BufferMonitor(self._get_buffer_monitor_flow_rate)
+        self._buffer_monitor = utils.BufferMonitor()
 
         self._buffer_change_seq = []
         self._buffer_change_remain = 0
@@ -534,6 +534,7 @@ class CoflowControl(object):
             ret_type = 'flow_rate'
             ret_val = ret*self.sheath_fr_mult
             self._sheath_flow_rate = ret_val
+            self._buffer_monitor.set_flow_rate(ret_val)
         else:
             ret_type = None
             ret_val = None
@@ -783,9 +784,6 @@ class CoflowControl(object):
             self._flow_timer = False
             self._remaining_flow_time = 0
 
-    def _get_buffer_monitor_flow_rate(self):
-        return self._sheath_flow_rate
-
     def get_sheath_oob_error(self):
         """
         Gets the sheath flow out of bounds error
@@ -29,6 +29,7 @@ import six
 import epics, epics.wx, epics.wx.wxlib
 
 import utils
+import pvpool
 
 ##########################
 ##########################
@@ -144,8 +145,7 @@ class PVButton2(wx.Button, epics.wx.wxlib.PVCtrlMixin):
         self.pushValue = pushValue
         self.Bind(wx.EVT_BUTTON, self.OnPress)
         if isinstance(disablePV, six.string_types):
-            disablePV = epics.get_pv(disablePV)
-            disablePV.connect()
+            disablePV = pvpool.pool.get_pv(disablePV)
         self.disablePV = disablePV
         self.disableValue = disableValue
         if disablePV is not None:
@@ -166,7 +166,7 @@ class PVButton2(wx.Button, epics.wx.wxlib.PVCtrlMixin):
         "epics function, called by event handler"
         enableValue = self.maskedEnabled
         if self.disablePV is not None and \
-           (self.disablePV.get() == self.disableValue):
+           (pvpool.pool.get(self.disablePV) == self.disableValue):
             enableValue = False
         if (self.pv is not None and (self.pv.get() == self.pushValue)
             and self.disableOnPushVal):
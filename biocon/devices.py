@@ -31,6 +31,7 @@ from epics import Device, poll
 from epics.devices import srs570
 
 import utils
+import pvpool
 
 utils.set_mppath() #This must be done before importing any Mp Modules.
 import Mp as mp
@@ -1113,7 +1114,7 @@ class EPICSPVWrapper(object):
     """
     def __init__(self, pv_name):
         self._pv_name = pv_name
-        self.pv = epics.get_pv(pv_name)
+        self.pv = pvpool.pool.get_pv(pv_name, None)
 
     def write(self, val, wait=False):
         self.pv.put(val, wait=wait)
@@ -1143,13 +1144,9 @@ class Attenuator(object):
             self.atten_pvs[atten] = {}
 
             for pv_name in huber_pv_list:
-                pv = epics.get_pv(pv_name)
-                connected = pv.wait_for_connection(5)
+                pv = pvpool.pool.get_pv(pv_name, 5)
 
-                if not connected:
-                    logger.error('Failed to connect to EPICS PV %s on startup', pv_name)
-
-                else:
+                if pv.connected:
                     if 'Out' in pv_name:
                         self.atten_pvs[atten]['ctrl'] = pv
                     elif 'T{}'.format(atten) in pv_name:
@@ -29,7 +29,6 @@ import decimal
 from decimal import Decimal as D
 import datetime
 import copy
-import shutil
 import subprocess
 
 if __name__ != '__main__':
@@ -42,17 +41,132 @@ import epics
 import motorcon
 import devices
 import utils
+import renumber
+import scanplan
+import pvpool
+import startup
 import XPS_C8_drivers as xps_drivers
 
 utils.set_mppath() #This must be done before importing any Mp Modules.
 import Mp as mp
 
+class ExpStatusStream(object):
+    """
+    Status events pushed from the exposure thread to the exposure panel. Each
+    event is a (status, value) pair, e.g. ('scan', 2) or ('exp_state', True).
+    State changes are delivered in the order they were posted. Progress
+    events, such as frame counts, only keep the newest value until they're
+    read, so a reader that runs at the GUI refresh rate gets at most one of
+    each per read no matter how fast the exposure is.
+    """
+
+    coalesced = ('frames',)
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._events = deque()
+        self._pending = {}
+
+        self.num_posted = 0
+        self.num_delivered = 0
+
+    def post(self, status, val=None):
+        """
+        Adds an event and wakes any reader.
+
+        :param str status: The event type.
+        :param val: The event value.
+        """
+        with self._cond:
+            self.num_posted += 1
+
+            if status in self._pending:
+                self._pending[status][1] = val
+
+            else:
+                event = [status, val]
+                self._events.append(event)
+
+                if status in self.coalesced:
+                    self._pending[status] = event
+
+            self._cond.notify_all()
+
+    def get_events(self, timeout=None):
+        """
+        Waits for events, then returns and removes all of them.
+
+        :param float timeout: Maximum time to wait in s. 0 doesn't wait.
+
+        :returns: A list of (status, value) events, which is empty if the
+            wait timed out.
+        :rtype: list
+        """
+        with self._cond:
+            if len(self._events) == 0 and timeout != 0:
+                self._cond.wait(timeout)
+
+            events = [tuple(event) for event in self._events]
+            self._events.clear()
+            self._pending.clear()
+
+            self.num_delivered += len(events)
+
+        return events
+
+    def clear(self):
+        with self._cond:
+            self._events.clear()
+            self._pending.clear()
+
+    def follow_exposure(self, exp_event, abort_event, callback, interval):
+        """
+        Passes events to the callback until the exposure finishes. The
+        exposure is finished when ``exp_event`` has been set and is cleared
+        again, or if ``abort_event`` is set before it started. The thread
+        only wakes up when there are events or once per interval, and
+        after each delivery it waits for the interval so events arriving
+        in the meantime are coalesced into the next delivery.
+
+        :param threading.Event exp_event: Set while exposing.
+        :param threading.Event abort_event: Set on abort.
+        :param callable callback: Called with a list of events.
+        :param float interval: Minimum time between deliveries in s.
+        """
+        started = False
+
+        while True:
+            events = self.get_events(interval)
+
+            if len(events) > 0:
+                callback(events)
+
+            if exp_event.is_set():
+                started = True
+
+            elif started or abort_event.is_set():
+                break
+
+            if len(events) > 0:
+                abort_event.wait(interval)
+
+        events = self.get_events(0)
+
+        if len(events) > 0:
+            callback(events)
+
+
 class ExpCommThread(threading.Thread):
 
-    def __init__(self, command_queue, return_queue, abort_event, exp_event,
+    def __init__(self, command_queue, status_stream, abort_event, exp_event,
         timeout_event, settings, mar_trigger, name=None):
         """
         Initializes the custom thread.
+
+        :param collections.deque command_queue: The queue used to pass
+            commands to the thread.
+        :param ExpStatusStream status_stream: Where the thread posts
+            exposure status events.
         """
         threading.Thread.__init__(self, name=name)
 
@@ -61,7 +175,7 @@ class ExpCommThread(threading.Thread):
         self.daemon = True
 
         self.command_queue = command_queue
-        self.return_queue = return_queue
+        self.status_stream = status_stream
         self._abort_event = abort_event
         self._exp_event = exp_event
         self._timeout_event = timeout_event
@@ -70,6 +184,10 @@ class ExpCommThread(threading.Thread):
         self._mar_trigger = mar_trigger
 
         self.xps = None
+        self._np_motors = {}
+
+        self._renamer = renumber.FileRenamer()
+        self._renamer.start()
 
         self._commands = {
             'start_exp'         : self._start_exp,
@@ -263,8 +381,21 @@ class ExpCommThread(threading.Thread):
         else:
             self._abort()
 
+        self._renamer.stop()
+
         logger.info("Quitting exposure control thread: %s", self.name)
 
+    def _set_exp_state(self, exposing):
+        changed = exposing != self._exp_event.is_set()
+
+        if exposing:
+            self._exp_event.set()
+        else:
+            self._exp_event.clear()
+
+        if changed:
+            self.status_stream.post('exp_state', exposing)
+
     def _start_exp(self, data_dir, fprefix, num_frames, exp_time, exp_period,
         **kwargs):
         kwargs['metadata'] = self._add_metadata(kwargs['metadata'])
@@ -577,7 +708,7 @@ class ExpCommThread(threading.Thread):
 
                 logger.info('Scan %s started', current_run)
 
-                self.return_queue.append(['scan', current_run])
+                self.status_stream.post('scan', current_run)
 
                 self._inner_tr_exp(det, exp_time, exp_period, exp_settings,
                     data_dir, fprefix, num_frames, current_run, struck, ab_burst, slow_shutter,
@@ -638,23 +769,14 @@ class ExpCommThread(threading.Thread):
                 mtr_positions = gridpoints
 
             for current_run in range(1,num_runs+1):
-                start = time.monotonic()
-                timeout = False
-                while not motor.is_moving() and not timeout:
-                    time.sleep(0.001) #Waits for motion to start
-                    if time.monotonic()-start>0.1:
-                        timeout = True
-
-                while motor.is_moving():
-                    if self._abort_event.is_set():
-                        break
-                    time.sleep(0.001)
+                motor.wait_for_move_start(0.1, self._abort_event)
+                motor.wait_for_move(abort_event=self._abort_event)
 
                 if self._abort_event.is_set():
                     break
 
                 logger.info('Scan %s started', current_run)
-                self.return_queue.append(['scan', current_run])
+                self.status_stream.post('scan', current_run)
 
                 for step_num, pos in enumerate(mtr_positions):
                     if self._abort_event.is_set():
@@ -713,20 +835,12 @@ class ExpCommThread(threading.Thread):
 
 
 
-        start = time.monotonic()
-        timeout = False
-        while not motor.is_moving() and not timeout:
-            time.sleep(0.001) #Waits for motion to start
-            if time.monotonic()-start>0.5:
-                timeout = True
+        motor.wait_for_move_start(0.5, self._abort_event)
+        motor.wait_for_move(abort_event=self._abort_event)
 
-        while motor.is_moving():
-            if self._abort_event.is_set():
-                self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
-                    comp_settings, exp_time)
-                break
-
-            time.sleep(0.001)
+        if self._abort_event.is_set():
+            self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
+                comp_settings, exp_time)
 
         motor_con.stop()
         try:
@@ -766,7 +880,7 @@ class ExpCommThread(threading.Thread):
                 self.renum_scan_files(data_dir, fprefix, num_frames,
                     current_run, det, wait=False)
 
-        self._exp_event.clear()
+        self._set_exp_state(False)
 
     def _inner_tr_exp(self, det, exp_time, exp_period, exp_settings,
         data_dir, fprefix, num_frames, current_run, struck, ab_burst, slow_shutter,
@@ -810,25 +924,15 @@ class ExpCommThread(threading.Thread):
             det.set_filename(new_fname)
             det.arm()
 
-        start = time.monotonic()
-        timeout = False
         x, y = motor.position
 
         # logger.info(x)
         # logger.info(y)
 
         if x != x_start and y != y_start:
-            while not motor.is_moving() and not timeout:
-                time.sleep(0.001) #Waits for motion to start
-                if time.monotonic()-start>0.1:
-                    timeout = True
+            motor.wait_for_move_start(0.1, self._abort_event)
 
-        while motor.is_moving():
-            if self._abort_event.is_set():
-                self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
-                    comp_settings, exp_time)
-                break
-            time.sleep(0.001)
+        motor.wait_for_move(abort_event=self._abort_event)
 
         if self._abort_event.is_set():
             self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
@@ -836,26 +940,20 @@ class ExpCommThread(threading.Thread):
             return
 
         if motor_type == 'Newport_XPS':
-            if pco_direction == 'x':
-                wait_for_motor = True
-                while wait_for_motor:
-                    status, descrip = motor.get_group_status(tr_scan_settings['motor_group_name'])
-                    # logger.debug(status)
-                    if status == 12:
-                        wait_for_motor = False
+            # Position compare can only be started with the group ready (12)
+            motor.wait_for_group_state([12], tr_scan_settings['motor_group_name'],
+                abort_event=self._abort_event)
 
+            if self._abort_event.is_set():
+                self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
+                    comp_settings, exp_time)
+                return
+
+            if pco_direction == 'x':
                 logger.debug('starting x pco')
                 motor.start_position_compare(x_motor)
             else:
-                wait_for_motor = True
-                while wait_for_motor:
-                    status, descrip = motor.get_group_status(tr_scan_settings['motor_group_name'])
-                    # logger.debug(status)
-                    if status == 12:
-                        wait_for_motor = False
-
                 logger.debug('starting Y pco')
-
                 motor.start_position_compare(y_motor)
 
             if vect_scan_speed[0] != 0:
@@ -874,22 +972,14 @@ class ExpCommThread(threading.Thread):
 
         motor_cmd_q.append(('move_absolute', ('TR_motor', (x_end, y_end)), {}))
 
-        self._exp_event.set()
-
-        start = time.monotonic()
-        timeout = False
-        while not motor.is_moving() and not timeout:
-            time.sleep(0.001) #Waits for motion to start
-            if time.monotonic()-start>0.5:
-                timeout = True
+        self._set_exp_state(True)
 
-        while motor.is_moving():
-            if self._abort_event.is_set():
-                self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
-                    comp_settings, exp_time)
-                break
+        motor.wait_for_move_start(0.5, self._abort_event)
+        motor.wait_for_move(abort_event=self._abort_event)
 
-            time.sleep(0.001)
+        if self._abort_event.is_set():
+            self.tr_abort_cleanup(det, struck, ab_burst, dio_out9, slow_shutter,
+                comp_settings, exp_time)
 
         slow_shutter.write(1) #Close the slow shutter
 
@@ -994,43 +1084,29 @@ class ExpCommThread(threading.Thread):
                 time.sleep(0.1)
 
         if not timeout:
-            timeout = False
+            name_map = {}
 
             for i, f in enumerate(f_list):
-                full_path = os.path.join(data_dir, f)
-
                 if self._settings['detector'] == '18ID:EIG2:_epics':
                     new_name = '{}_{:04d}_data_{:06d}.h5'.format(fprefix, int(current_run), i+1)
                 elif (self._settings['detector'] == '18IDpil1M:_epics'
                     or self._settings['detector'] == 'pilatus_mx'):
                     new_name = '{}_{:04d}_{:06d}.tif'.format(fprefix, int(current_run), i+1)
 
-                full_new = os.path.join(data_dir, new_name)
+                name_map[f] = new_name
 
-                if wait:
-                    if not os.path.exists(full_path):
-                        start = time.monotonic()
-
-                    while not os.path.exists(full_path):
-                        if time.monotonic() - start > 10:
-                            timeout = True
-                            break
-                            logger.debug('Timeout waiting for %s', full_path)
-
-                        if self._abort_event.is_set():
-                            timeout = True
-                            break
+            # Without wait, only files that are already there are renamed
+            if wait:
+                rename_timeout = 10
+            else:
+                rename_timeout = 0
 
-                        time.sleep(0.1)
+            job = self._renamer.submit(data_dir, name_map, rename_timeout,
+                self._abort_event)
+            job.wait()
 
-                    if timeout:
-                        break
-                        logger.debug('Aborting rename thread due to timeout')
-
-                if os.path.exists(full_path):
-                    logger.debug('Moving %s to %s', full_path, full_new)
-                    shutil.move(full_path, full_new)
-                    # logger.debug('Moved %s to %s', full_path, full_new)
+            logger.debug('Renumbered %i of %i files for scan %s at %.0f files/s',
+                job.num_renamed, job.num_files, current_run, job.throughput)
 
 
     def scan_exposure(self, exp_settings, comp_settings):
@@ -1136,15 +1212,62 @@ class ExpCommThread(threading.Thread):
         # struck.set_num_measurements(tot_num_frames)
         struck.set_trigger_mode(0x8|0x2)    #Sets 'autotrigger' mode, i.e. counting as soon as armed
 
+        scan_motors = self._get_scan_motors(scan_settings)
+
         for current_run in range(1,num_scans+1):
-            scan_motors = copy.deepcopy(scan_settings['motors'])
+            planner = self._plan_scan(exp_settings, scan_settings, scan_motors)
+
+            self.status_stream.post('scan', current_run)
+
+            finished = self._inner_scan_exp2(exp_settings, planner, current_run,
+                dark_counts)
+
+            if not finished:
+                break
+
+        self._set_exp_state(False)
+
+    def _get_scan_motors(self, scan_settings):
+        scan_motors = OrderedDict()
+
+        for motor_num, motor_params in scan_settings['motors'].items():
+            motor_get_params = copy.deepcopy(motor_params)
+
+            if motor_params['type'] == 'Newport':
+                motor_get_params['motor_ip'] = scan_settings['motor_ip']
+                motor_get_params['motor_port'] = scan_settings['motor_port']
 
-            self.return_queue.append(['scan', current_run])
+            scan_motors[motor_num] = self.get_motor(motor_params['motor'],
+                motor_params['type'], motor_get_params)
 
-            self._inner_scan_exp2(exp_settings, scan_settings,
-                scan_motors, OrderedDict(), current_run, dark_counts)
+        return scan_motors
 
-        self._exp_event.clear()
+    def _plan_scan(self, exp_settings, scan_settings, scan_motors):
+        axes = []
+
+        for motor_num, motor_params in scan_settings['motors'].items():
+            motor = scan_motors[motor_num]
+
+            mtr_positions = scanplan.get_axis_positions(motor_params['start'],
+                motor_params['stop'], motor_params['step'])
+
+            if 'relative' == motor_params['scan_type'].lower():
+                mtr_positions += float(motor.get_position())
+
+                if exp_settings is not None:
+                    exp_settings['metadata']['Motor {} absolute start:'.format(motor_num)] = mtr_positions[0]
+                    exp_settings['metadata']['Motor {} absolute stop:'.format(motor_num)] = mtr_positions[-1]
+
+            axes.append(scanplan.ScanAxis('m{}'.format(motor_num), motor,
+                mtr_positions, motor_params['backlash']))
+
+        planner = scanplan.ScanPlanner(axes, scan_settings['serpentine'],
+            scan_settings['point_overhead'])
+        planner.plan()
+
+        logger.debug('Planned scan of %i points', len(planner.points))
+
+        return planner
 
     # def _inner_scan_exp(self, exp_settings, scan_settings, scan_motors,
     #     motor_positions, current_run):
@@ -1300,117 +1423,58 @@ class ExpCommThread(threading.Thread):
     #         if self._abort_event.is_set():
     #             motor.stop()
 
-    def _inner_scan_exp2(self, exp_settings, scan_settings, scan_motors,
-        motor_positions, current_run, dark_counts):
-        motor_num, motor_params = scan_motors.popitem(False)
-
-        motor_name = motor_params['motor']
-        start = motor_params['start']
-        stop = motor_params['stop']
-        step_size = motor_params['step']
-        motor_type = motor_params['type']
-        scan_type = motor_params['scan_type']
-
-        if motor_type == 'Newport':
-            motor_get_params = copy.deepcopy(motor_params)
-            motor_get_params['motor_ip'] = scan_settings['motor_ip']
-            motor_get_params['motor_port'] = scan_settings['motor_port']
-
-        motor = self.get_motor(motor_name, motor_type, motor_params)
-
-        initial_motor_position = float(motor.get_position())
-
-        if start < stop:
-            mtr_positions = np.arange(start, stop+step_size, step_size)
-
-            if mtr_positions[-1] > stop:
-                mtr_positions = mtr_positions[:-1]
-        else:
-            mtr_positions = np.arange(stop, start+step_size, step_size)
-
-            if mtr_positions[-1] > start:
-                mtr_positions = mtr_positions[:-1]
-
-            mtr_positions = mtr_positions[::-1]
+    def _inner_scan_exp2(self, exp_settings, planner, current_run, dark_counts):
+        det = self._mx_data['det']          #Detector
 
-        if 'relative' == scan_type.lower():
-            mtr_positions += initial_motor_position
+        struck = self._mx_data['struck']    #Struck SIS3820
 
-            exp_settings['metadata']['Motor {} absolute start:'.format(motor_num)] = mtr_positions[0]
-            exp_settings['metadata']['Motor {} absolute stop:'.format(motor_num)] = mtr_positions[-1]
+        ab_burst = self._mx_data['ab_burst']   #Shutter control signal
+        ab_burst_2 = None
 
-        if len(scan_motors) == 0: # Recursive base case
-            det = self._mx_data['det']          #Detector
+        slow_shutter = self._mx_data['slow_shutter']#Huber or Xia/wharberton shutter N.C.
+        dio_out9 = self._mx_data['dio'][9]      #Shutter control signal (alt.)
+        dio_out10 = self._mx_data['dio'][10]    #SRS DG645 trigger
 
-            struck = self._mx_data['struck']    #Struck SIS3820
-            s_counters = self._mx_data['struck_ctrs']
+        exp_period = exp_settings['exp_period']
+        exp_time = exp_settings['exp_time']
+        data_dir = exp_settings['data_dir']
+        fprefix = exp_settings['fprefix']
+        num_frames = exp_settings['num_frames']
 
-            ab_burst = self._mx_data['ab_burst']   #Shutter control signal
-            cd_burst = self._mx_data['cd_burst']   #Struck LNE/channel advance signal
-            ef_burst = self._mx_data['ef_burst']   #Pilatus trigger signal
-            gh_burst = self._mx_data['gh_burst']
-            # dg645_trigger_source = self._mx_data['dg645_trigger_source']
+        shutter_speed_open = exp_settings['shutter_speed_open']
+        shutter_speed_close = exp_settings['shutter_speed_close']
+        shutter_pad = exp_settings['shutter_pad']
+        shutter_cycle = exp_settings['shutter_cycle']
 
-            ab_burst_2 = None
+        #Values for the wait_for_trigger that aren't used in this function
+        wait_for_trig = False
+        cur_trig = 0
+        kwargs = exp_settings
 
-            slow_shutter = self._mx_data['slow_shutter']#Huber or Xia/wharberton shutter N.C.
-            dio_out9 = self._mx_data['dio'][9]      #Shutter control signal (alt.)
-            dio_out10 = self._mx_data['dio'][10]    #SRS DG645 trigger
+        total_shutter_speed = shutter_speed_open+shutter_speed_close+shutter_pad
 
-            exp_period = exp_settings['exp_period']
-            exp_time = exp_settings['exp_time']
-            data_dir = exp_settings['data_dir']
-            fprefix = exp_settings['fprefix']
-            num_frames = exp_settings['num_frames']
+        if exp_period > exp_time+total_shutter_speed and exp_period >= shutter_cycle:
+            logger.info('Shuttered mode')
+            continuous_exp = False
+        else:
+            logger.info('Continuous mode')
+            continuous_exp = True
 
-            shutter_speed_open = exp_settings['shutter_speed_open']
-            shutter_speed_close = exp_settings['shutter_speed_close']
-            shutter_pad = exp_settings['shutter_pad']
-            shutter_cycle = exp_settings['shutter_cycle']
+        log_vals = exp_settings['mcs_log_vals']
 
-            #Values for the _inner_fast_exp that aren't used in this function
-            wait_for_trig = False
-            exp_type = 'scan'
-            cur_trig = 0
-            struck_num_meas = 0
-            struck_meas_time = 0
-            kwargs = exp_settings
+        # The detector and struck are set up once per segment, which is the
+        # whole scan unless it has more frames than they can take at once
+        segments = planner.get_segments(num_frames, self._settings['nframes_max'])
 
+        aborted = False
+        initial_start_time = None
+        exp_start_times = []
 
-            total_shutter_speed = shutter_speed_open+shutter_speed_close+shutter_pad
-            s_open_time = shutter_speed_open + shutter_pad
+        for seg_num, seg_points in enumerate(segments):
+            if self._abort_event.is_set():
+                break
 
-            if exp_period > exp_time+total_shutter_speed and exp_period >= shutter_cycle:
-                logger.info('Shuttered mode')
-                continuous_exp = False
-            else:
-                logger.info('Continuous mode')
-                continuous_exp = True
-
-            log_vals = exp_settings['mcs_log_vals']
-
-            # dark_counts = []
-            # for i in range(len(s_counters)):
-            #     if log_vals[i]['dark']:
-            #         dark_counts.append(s_counters[i].get_dark_current())
-            #     else:
-            #         dark_counts.append(0)
-
-            # dg645_trigger_source.put(1)
-
-            # if not continuous_exp:
-            #     #Shutter opens and closes, Takes 4 ms for open and close
-            #     ab_burst.setup(exp_period, exp_time+s_open_time, num_frames, 0, 1, 2)
-            #     cd_burst.setup(exp_period, 0.0001, num_frames, exp_time+s_open_time, 1, 2)
-            #     ef_burst.setup(exp_period, exp_time, num_frames, s_open_time, 1, 2)
-            #     gh_burst.setup(exp_period, exp_time, num_frames, 0, 1, 2)
-            # else:
-            #     #Shutter will be open continuously, via dio_out9
-            #     ab_burst.setup(exp_period, exp_time, num_frames, 0, 1, 2) #Irrelevant
-            #     cd_burst.setup(exp_period, 0.0001, num_frames, exp_time+0.00015, 1, 2)
-            #     ef_burst.setup(exp_period, exp_time, num_frames, 0, 1, 2)
-            #     gh_burst.setup(exp_period, exp_time, num_frames, 0, 1, 2)
-            #     continuous_exp = True
+            setup_start = time.monotonic()
 
             if det.get_status() !=0:
                 try:
@@ -1422,34 +1486,21 @@ class ExpCommThread(threading.Thread):
                 except (mp.Device_Action_Failed_Error, mp.Unparseable_String_Error):
                     pass
 
-            aborted = False
-
             struck.stop()
             ab_burst.stop()
 
-            if exp_type == 'muscle':
-                ab_burst_2.stop()
-
             dio_out9.write(0) # Make sure the NM shutter is closed
             dio_out10.write(0) # Make sure the trigger is off
 
-            tot_num_frames = num_frames*len(mtr_positions)
+            tot_num_frames = num_frames*len(seg_points)
 
             det.set_num_frames(tot_num_frames)
-            # det.set_trigger_mode('ext_enable')
-            # det.set_exp_time(exp_time)
-            # det.set_exp_period(exp_period)
-
-            # struck.set_measurement_time(exp_time)   #Ignored for external LNE of Struck
             struck.set_num_measurements(tot_num_frames)
-            # struck.set_trigger_mode(0x8|0x2)    #Sets 'autotrigger' mode, i.e. counting as soon as armed
-
-            cur_fprefix = '{}_{:04}'.format(fprefix, current_run)
 
-
-            logger.debug(motor_positions)
-            for mprefix, pos in motor_positions.items():
-                cur_fprefix = cur_fprefix + '_{}_{}'.format(mprefix, pos)
+            if len(segments) > 1:
+                cur_fprefix = '{}_{:04}_{:03}'.format(fprefix, current_run, seg_num+1)
+            else:
+                cur_fprefix = '{}_{:04}'.format(fprefix, current_run)
 
             exp_start_num = '000001'
 
@@ -1458,98 +1509,75 @@ class ExpCommThread(threading.Thread):
             else:
                 new_fname = cur_fprefix
 
-            # det.set_data_dir(data_dir)
             det.set_filename(new_fname)
 
-            extra_vals = [['real_start_time', []],]
-            for mprefix, pos in motor_positions.items():
-                extra_vals.append([mprefix, np.ones(tot_num_frames)*float(pos)])
+            exp_start_times = []
 
-            log_positions = []
+            extra_vals = [['real_start_time', exp_start_times],]
+            for axis in planner.axes:
+                log_positions = []
 
-            for pos in mtr_positions:
-                log_positions.extend([pos]*num_frames)
+                for point in seg_points:
+                    log_positions.extend([point.positions[axis.name]]*num_frames)
 
-            extra_vals.append(['m{}'.format(motor_num), np.array(log_positions)])
+                extra_vals.append([axis.name, np.array(log_positions)])
 
             slow_shutter.write(0) #Open the slow shutter
 
             ab_burst.get_status() #Maybe need to clear this status?
 
-            motor.move_absolute(mtr_positions[0])
-
             det.arm()
             struck.start()
 
-            if continuous_exp:
-                if not exp_type == 'muscle' and not wait_for_trig:
-                    dio_out9.write(1)
-
-            if exp_type != 'muscle':
-                self.write_log_header(data_dir, cur_fprefix, log_vals,
-                    kwargs['metadata'], extra_vals)
+            self.write_log_header(data_dir, cur_fprefix, log_vals,
+                kwargs['metadata'], extra_vals)
 
             last_meas = 0
 
             timeouts = 0
 
-            exp_start_times = []
+            exp_end_time = time.monotonic()
 
-        for position in mtr_positions:
-            logger.debug('Position: {}'.format(position))
-            if self._abort_event.is_set():
-                break
+            logger.debug('Scan segment %i setup took %.3f s', seg_num+1,
+                exp_end_time - setup_start)
 
-            motor.move_absolute(position)
+            for point in seg_points:
+                logger.debug('Position: {}'.format(dict(point.positions)))
 
-            while motor.is_busy():
-                time.sleep(0.01)
                 if self._abort_event.is_set():
-                    motor.stop()
-                    motor.move_absolute(initial_motor_position)
                     break
 
-            if self._abort_event.is_set():
-                break
-
-            if len(scan_motors) > 0: # Recursive case
-                motor_positions['m{}'.format(motor_num)] = position
-
-                my_scan_motors = copy.deepcopy(scan_motors)
-
-                self._inner_scan_exp2(exp_settings, scan_settings, my_scan_motors,
-                    motor_positions, current_run, dark_counts)
+                if not planner.move_to(point, self._abort_event):
+                    break
 
-            else:   # Base case for recursion:
                 ab_burst.arm()
 
-                if exp_type == 'muscle':
-                    ab_burst_2.arm()
+                if continuous_exp:
+                    dio_out9.write(1)
 
                 self.wait_for_trigger(wait_for_trig, cur_trig, exp_time, ab_burst,
                     ab_burst_2, det, struck, slow_shutter, dio_out9, dio_out10, kwargs)
 
                 start_time = time.monotonic()
 
-                if position == mtr_positions[0]:
+                planner.set_dead_time(point, start_time - exp_end_time)
+
+                if initial_start_time is None:
                     initial_start_time = start_time
-                    exp_start_time = 0
 
-                else:
-                    exp_start_time = start_time - initial_start_time
+                exp_start_time = start_time - initial_start_time
 
                 new_exp_start_times = np.cumsum(np.array([exp_period]*num_frames))-exp_period+exp_start_time
                 exp_start_times.extend(new_exp_start_times)
-                extra_vals[0] = ['real_start_time', exp_start_times]
 
                 if self._abort_event.is_set():
                     self.fast_mode_abort_cleanup(det, struck, ab_burst, ab_burst_2,
                         dio_out9, slow_shutter, exp_time, kwargs)
                     aborted = True
-                    return False
+                    break
 
                 logger.debug('Exposures started')
-                self._exp_event.set()
+                self._set_exp_state(True)
 
                 while True:
                     #Struck is_busy doesn't work in thread! So have to go elsewhere
@@ -1569,26 +1597,24 @@ class ExpCommThread(threading.Thread):
                         aborted = True
                         break
 
-                    if exp_type != 'muscle':
-                        current_meas = struck.get_last_measurement_number()
+                    current_meas = struck.get_last_measurement_number()
 
-                        if current_meas != last_meas and current_meas != -1:
-                            cvals = struck.read_all()
+                    if current_meas != last_meas and current_meas != -1:
+                        cvals = struck.read_all()
 
-                            if last_meas == 0:
-                                prev_meas = -1
-                            else:
-                                prev_meas = last_meas
+                        if last_meas == 0:
+                            prev_meas = -1
+                        else:
+                            prev_meas = last_meas
 
-                            self.append_log_counters(cvals, prev_meas, current_meas,
-                                data_dir, cur_fprefix, exp_period, num_frames,
-                                dark_counts, log_vals, extra_vals)
+                        self.append_log_counters(cvals, prev_meas, current_meas,
+                            data_dir, cur_fprefix, exp_period, num_frames,
+                            dark_counts, log_vals, extra_vals)
 
-                            last_meas = current_meas
+                        last_meas = current_meas
 
                     time.sleep(0.01)
 
-
                 if continuous_exp:
                     dio_out9.write(0)
 
@@ -1596,40 +1622,33 @@ class ExpCommThread(threading.Thread):
                     break
 
                 while time.monotonic() - start_time < num_frames*exp_period:
-                    if self._abort_event.is_set() and not aborted:
+                    if self._abort_event.is_set():
                         self.fast_mode_abort_cleanup(det, struck, ab_burst, ab_burst_2,
                             dio_out9, slow_shutter, exp_time, kwargs)
                         aborted = True
                         break
 
+                    time.sleep(0.001)
+
                 if aborted:
                     break
 
-        if len(scan_motors) == 0: # Base case
-            slow_shutter.write(1) #Close the slow shutter
+                exp_end_time = time.monotonic()
 
-            if exp_type != 'muscle':
-                current_meas = struck.get_last_measurement_number()
-                if current_meas != last_meas or (current_meas == last_meas and current_meas == 0):
-                    cvals = struck.read_all()
-
-                    if last_meas == 0:
-                        prev_meas = -1
-                    else:
-                        prev_meas = last_meas
+            slow_shutter.write(1) #Close the slow shutter
 
-                    self.append_log_counters(cvals, prev_meas, current_meas,
-                        data_dir, cur_fprefix, exp_period, num_frames, dark_counts,
-                        log_vals, extra_vals)
+            current_meas = struck.get_last_measurement_number()
+            if current_meas != last_meas or (current_meas == last_meas and current_meas == 0):
+                cvals = struck.read_all()
 
-            else:
-                struck.stop()
-                measurement = struck.read_all()
+                if last_meas == 0:
+                    prev_meas = -1
+                else:
+                    prev_meas = last_meas
 
-                logger.info('Writing counters')
-                self.write_counters_muscle(measurement, struck_num_meas, data_dir,
-                    cur_fprefix, struck_meas_time, dark_counts, log_vals,
-                    kwargs['metadata'])
+                self.append_log_counters(cvals, prev_meas, current_meas,
+                    data_dir, cur_fprefix, exp_period, num_frames, dark_counts,
+                    log_vals, extra_vals)
 
             ab_burst.get_status() #Maybe need to clear this status?
 
@@ -1641,21 +1660,24 @@ class ExpCommThread(threading.Thread):
                     aborted = True
                     break
 
-            logger.info('Exposures done')
+            if aborted:
+                break
 
-            if self._abort_event.is_set():
-                if not aborted:
-                    self.fast_mode_abort_cleanup(det, struck, ab_burst, ab_burst_2,
-                        dio_out9, slow_shutter, exp_time, kwargs)
-                    aborted = True
-                return False
+        logger.info('Exposures done')
+        planner.log_dead_time()
 
-        motor.move_absolute(initial_motor_position)
+        if self._abort_event.is_set():
+            if not aborted:
+                self.fast_mode_abort_cleanup(det, struck, ab_burst, ab_burst_2,
+                    dio_out9, slow_shutter, exp_time, kwargs)
 
-        while motor.is_busy():
-            time.sleep(0.01)
-            if self._abort_event.is_set():
-                motor.stop()
+            planner.return_to_start(wait=False)
+
+            return False
+
+        planner.return_to_start(self._abort_event)
+
+        return True
 
     def fast_exposure(self, data_dir, fprefix, num_frames, exp_time, exp_period,
         exp_type='standard', **kwargs):
@@ -1858,7 +1880,7 @@ class ExpCommThread(threading.Thread):
 
         for cur_trig in range(1,num_trig+1):
             #Runs a loop for each expected trigger signal (internal or external)
-            self.return_queue.append(['scan', cur_trig])
+            self.status_stream.post('scan', cur_trig)
 
             exp_start_num = '000001'
 
@@ -1882,7 +1904,7 @@ class ExpCommThread(threading.Thread):
                 #Abort happened in the inner function
                 break
 
-        self._exp_event.clear()
+        self._set_exp_state(False)
 
     def wait_for_trigger(self, wait_for_trig, cur_trig, exp_time, ab_burst,
         ab_burst_2, det, struck, slow_shutter, dio_out9, dio_out10, kwargs):
@@ -1894,7 +1916,7 @@ class ExpCommThread(threading.Thread):
             real_start_time = datetime.datetime.now().isoformat(str(' '))
         else:
             logger.info("Waiting for trigger {}".format(cur_trig))
-            self.return_queue.append(['waiting', None])
+            self.status_stream.post('waiting')
             ab_burst.get_status() #Maybe need to clear this status?
             waiting = True
             while waiting:
@@ -1912,7 +1934,7 @@ class ExpCommThread(threading.Thread):
 
             real_start_time = datetime.datetime.now().isoformat(str(' '))
 
-            self.return_queue.append(['exposing', None])
+            self.status_stream.post('exposing')
 
         return real_start_time
 
@@ -2069,7 +2091,7 @@ class ExpCommThread(threading.Thread):
                 metadata, extra_vals)
 
         logger.debug('Exposures started')
-        self._exp_event.set()
+        self._set_exp_state(True)
 
         last_meas = 0
 
@@ -2113,6 +2135,8 @@ class ExpCommThread(threading.Thread):
 
                     last_meas = current_meas
 
+                    self.status_stream.post('frames', current_meas+1)
+
                     header_readout_time = time.monotonic()
 
             time.sleep(0.1)
@@ -2209,7 +2233,7 @@ class ExpCommThread(threading.Thread):
 
         if take_dark and not self._abort_event.is_set():
             logger.info('Collecting dark image')
-            self.return_queue.append(['dark', None])
+            self.status_stream.post('dark')
             slow_shutter.write(1) #Close the slow shutter
 
             if det.get_status() !=0:
@@ -2271,7 +2295,7 @@ class ExpCommThread(threading.Thread):
 
 
         slow_shutter.write(1) #Close the slow shutter
-        self._exp_event.clear()
+        self._set_exp_state(False)
         logger.debug('Done with mar data collection')
 
     def _inner_mar_exposure(self, det, slow_shutter, dio_out9, data_dir, fprefix,
@@ -2370,7 +2394,7 @@ class ExpCommThread(threading.Thread):
 
         if wait_for_trig:
             logger.info("Waiting for trigger")
-            self.return_queue.append(['waiting', None])
+            self.status_stream.post('waiting')
             while not self._mar_trigger.is_set():
                 time.sleep(0.001)
                 if self._abort_event.is_set():
@@ -2410,7 +2434,7 @@ class ExpCommThread(threading.Thread):
                     metadata, extra_vals)
 
                 logger.debug('Exposures started')
-                self._exp_event.set()
+                self._set_exp_state(True)
 
             else:
                 cur_img_time = time.monotonic()
@@ -2474,6 +2498,8 @@ class ExpCommThread(threading.Thread):
                 data_dir, cur_fprefix, exp_period, num_frames,
                 dark_counts, log_vals, extra_vals, exp_time, act_start_time)
 
+            self.status_stream.post('frames', i+1)
+
         slow_shutter.write(1) #Close the slow shutter
 
         if 'airshot' in kwargs:
@@ -2507,7 +2533,7 @@ class ExpCommThread(threading.Thread):
                 subprocess.check_call(['test', '-d', data_dir], timeout=30)
             except Exception:
                 self._timeout_event.set()
-                self.return_queue.append(['timeout', [data_dir, os.path.expanduser('~')]])
+                self.status_stream.post('timeout', [data_dir, os.path.expanduser('~')])
                 data_dir = os.path.expanduser('~')
 
 
@@ -2537,7 +2563,7 @@ class ExpCommThread(threading.Thread):
                 subprocess.check_call(['test', '-d', data_dir], timeout=30)
             except Exception:
                 self._timeout_event.set()
-                self.return_queue.append(['timeout', [data_dir, os.path.expanduser('~')]])
+                self.status_stream.post('timeout', [data_dir, os.path.expanduser('~')])
                 data_dir = os.path.expanduser('~')
 
         zpad = 6 #CHANGE ME?
@@ -2568,7 +2594,7 @@ class ExpCommThread(threading.Thread):
                 subprocess.check_call(['test', '-d', data_dir], timeout=30)
             except Exception:
                 self._timeout_event.set()
-                self.return_queue.append(['timeout', [data_dir, os.path.expanduser('~')]])
+                self.status_stream.post('timeout', [data_dir, os.path.expanduser('~')])
                 data_dir = os.path.expanduser('~')
 
         header = self.format_log_header(metadata, log_vals, extra_vals)
@@ -2648,7 +2674,7 @@ class ExpCommThread(threading.Thread):
                 subprocess.check_call(['test', '-d', data_dir], timeout=30)
             except Exception:
                 self._timeout_event.set()
-                self.return_queue.append(['timeout', [data_dir, os.path.expanduser('~')]])
+                self.status_stream.post('timeout', [data_dir, os.path.expanduser('~')])
                 data_dir = os.path.expanduser('~')
 
         header = self._get_header(metadata, log_vals)
@@ -2847,98 +2873,57 @@ class ExpCommThread(threading.Thread):
                 self._mx_data['motors'][motor_name] = motor
 
         elif motor_type == 'Newport':
-            if self.xps is None:
+            if motor_name in self._np_motors:
+                motor = self._np_motors[motor_name]
+            else:
                 np_group = motor_params['np_group']
                 np_index = motor_params['np_index']
                 np_axes = motor_params['np_axes']
                 motor_ip = motor_params['motor_ip']
                 motor_port = int(motor_params['motor_port'])
-                self.xps = xps_drivers.XPS()
+
+                if self.xps is None:
+                    self.xps = xps_drivers.XPS()
+
                 motor = motorcon.NewportXPSSingleAxis('Scan', self.xps,
                     motor_ip, motor_port, 20, np_group, np_axes,
                     motor_name, np_index)
+                self._np_motors[motor_name] = motor
 
         return motor
 
     def run_test_scan(self, scan_settings, abort_event, end_callback):
         num_scans = scan_settings['num_scans']
 
-        for current_run in range(1,num_scans+1):
-            scan_motors = copy.deepcopy(scan_settings['motors'])
-
-            self._inner_scan_test(scan_settings,
-                scan_motors, OrderedDict(), current_run, abort_event)
-
-        end_callback()
-
-    def _inner_scan_test(self, scan_settings, scan_motors,
-        motor_positions, current_run, abort_event):
-        motor_num, motor_params = scan_motors.popitem(False)
-
-        motor_name = motor_params['motor']
-        start = motor_params['start']
-        stop = motor_params['stop']
-        step_size = motor_params['step']
-        motor_type = motor_params['type']
-        scan_type = motor_params['scan_type']
-
-        if motor_type == 'Newport':
-            motor_get_params = copy.deepcopy(motor_params)
-            motor_get_params['motor_ip'] = scan_settings['motor_ip']
-            motor_get_params['motor_port'] = scan_settings['motor_port']
-
-        motor = self.get_motor(motor_name, motor_type, motor_params)
-
-        initial_motor_position = float(motor.get_position())
-
-        if start < stop:
-            mtr_positions = np.arange(start, stop+step_size, step_size)
-
-            if mtr_positions[-1] > stop:
-                mtr_positions = mtr_positions[:-1]
-        else:
-            mtr_positions = np.arange(stop, start+step_size, step_size)
-
-            if mtr_positions[-1] > start:
-                mtr_positions = mtr_positions[:-1]
-
-            mtr_positions = mtr_positions[::-1]
-
-        if 'relative' == scan_type.lower():
-            mtr_positions += initial_motor_position
+        scan_motors = self._get_scan_motors(scan_settings)
 
-        for position in mtr_positions:
-            logger.debug('Position: {}'.format(position))
-            if abort_event.is_set():
-                break
+        for current_run in range(1,num_scans+1):
+            planner = self._plan_scan(None, scan_settings, scan_motors)
 
-            motor.move_absolute(position)
+            for point in planner.points:
+                logger.debug('Position: {}'.format(dict(point.positions)))
 
-            while motor.is_busy():
-                time.sleep(0.01)
                 if abort_event.is_set():
-                    motor.stop()
-                    motor.move_absolute(initial_motor_position)
                     break
 
-            if abort_event.is_set():
-                break
+                exp_end_time = time.monotonic()
 
-            motor_positions['m{}'.format(motor_num)] = position
+                if not planner.move_to(point, abort_event):
+                    break
 
-            if len(scan_motors) > 0: # Recursive case
-                my_scan_motors = copy.deepcopy(scan_motors)
+                planner.set_dead_time(point, time.monotonic() - exp_end_time)
 
-                self._inner_scan_test(scan_settings, my_scan_motors,
-                    motor_positions, current_run, abort_event)
+                time.sleep(0.1)
 
-            else:   # Base case for recursion:
+            planner.log_dead_time()
 
-                time.sleep(0.1)
+            if abort_event.is_set():
+                planner.return_to_start(wait=False)
+                break
 
-        motor.move_absolute(initial_motor_position)
+            planner.return_to_start(abort_event)
 
-        self.test_scan_running = False
+        end_callback()
 
 
     def fast_mode_abort_cleanup(self, det, struck, ab_burst, ab_burst_2, dio_out9,
@@ -3103,7 +3088,7 @@ class ExpCommThread(threading.Thread):
         dio_out11.write(0)
 
         self._abort_event.set()
-        self._exp_event.clear()
+        self._set_exp_state(False)
 
         try:
             while len(self.command_queue) > 0:
@@ -3112,14 +3097,13 @@ class ExpCommThread(threading.Thread):
             pass
 
         try:
-            while len(self.return_queue) > 0:
-                self.return_queue.pop()
+            self.status_stream.clear()
         except Exception:
             pass
 
     def _abort(self):
         """
-        Clears the ``command_queue`` and the ``return_queue``.
+        Clears the ``command_queue`` and the ``status_stream``.
         """
         logger.info("Aborting exposure control thread %s current and future commands", self.name)
 
@@ -3130,8 +3114,7 @@ class ExpCommThread(threading.Thread):
             pass
 
         try:
-            while len(self.return_queue) > 0:
-                self.return_queue.pop()
+            self.status_stream.clear()
         except Exception:
             pass
 
@@ -3156,12 +3139,15 @@ class ExpPanel(wx.Panel):
 
         self.settings = settings
         self._exp_status = 'Ready'
+        self._automator_status_callbacks = []
         self._time_remaining = 0
+        self._frames_collected = 0
+        self._frames_total = 0
         self.run_number = '_{:04d}'.format(self.settings['run_num'])
         self._preparing_exposure = False
 
         self.exp_cmd_q = deque()
-        self.exp_ret_q = deque()
+        self.exp_status_stream = ExpStatusStream()
         self.abort_event = threading.Event()
         self.exp_event = threading.Event()
         self.timeout_event = threading.Event()
@@ -3180,10 +3166,11 @@ class ExpPanel(wx.Panel):
 
         self.SetMinSize(self._FromDIP((625, -1)))
 
-        self._initialize()
+        with startup.profiler.measure(stage='device'):
+            self._initialize()
 
         # Initialize the exposur thread after connecting PVs in the main thread
-        self.exp_con = ExpCommThread(self.exp_cmd_q, self.exp_ret_q, self.abort_event,
+        self.exp_con = ExpCommThread(self.exp_cmd_q, self.exp_status_stream, self.abort_event,
             self.exp_event, self.timeout_event, self.settings, self.mar_trigger, 'ExpCon')
         self.exp_con.start()
 
@@ -3362,6 +3349,10 @@ class ExpPanel(wx.Panel):
             size=self._FromDIP((100, -1)))
         self.time_remaining.SetFont(font)
 
+        self.frames_collected = wx.StaticText(self, label='0 of 0',
+            style=wx.ST_NO_AUTORESIZE, size=self._FromDIP((100, -1)))
+        self.frames_collected.SetFont(font)
+
         self.scan_number = wx.StaticText(self, label='1', style=wx.ST_NO_AUTORESIZE,
             size=self._FromDIP((30, -1)))
         self.scan_number.SetFont(font)
@@ -3385,6 +3376,11 @@ class ExpPanel(wx.Panel):
             flag=wx.ALIGN_CENTER_VERTICAL|wx.LEFT|wx.TOP|wx.BOTTOM)
         self.exp_status_sizer.Add(self.time_remaining, border=self._FromDIP(5),
             flag=wx.ALIGN_CENTER_VERTICAL|wx.LEFT|wx.TOP|wx.BOTTOM)
+        self.exp_status_sizer.Add(wx.StaticText(self, label='Frames:'),
+            border=self._FromDIP(5),
+            flag=wx.ALIGN_CENTER_VERTICAL|wx.LEFT|wx.TOP|wx.BOTTOM)
+        self.exp_status_sizer.Add(self.frames_collected, border=self._FromDIP(5),
+            flag=wx.ALIGN_CENTER_VERTICAL|wx.LEFT|wx.TOP|wx.BOTTOM)
         self.exp_status_sizer.Add(self.scan_num_sizer, border=self._FromDIP(5),
             flag=wx.ALIGN_CENTER_VERTICAL|wx.ALL|wx.RESERVE_SPACE_EVEN_IF_HIDDEN)
         self.exp_status_sizer.AddStretchSpacer(1)
@@ -3530,13 +3526,9 @@ class ExpPanel(wx.Panel):
         self.mono_auto_tune_ctrl = None
 
     def _initialize_pv(self, pv_name):
-        pv = epics.get_pv(pv_name)
-        connected = pv.wait_for_connection(5)
+        pv = pvpool.pool.get_pv(pv_name, 5)
 
-        if not connected:
-            logger.error('Failed to connect to EPICS PV %s on startup', pv_name)
-
-        return pv, connected
+        return pv, pv.connected
 
 
     def _on_change_dir(self, evt):
@@ -3623,6 +3615,8 @@ class ExpPanel(wx.Panel):
         self.exp_event.clear()
         self.timeout_event.clear()
         self.mar_trigger.clear()
+        self.exp_status_stream.clear()
+        self._frames_collected = 0
 
         warnings_valid, shutter_msg, vac_msg = self.check_warnings(verbose)
 
@@ -3723,6 +3717,7 @@ class ExpPanel(wx.Panel):
         wx.CallAfter(self.dark_exp_btn.Disable)
         wx.CallAfter(self.stop_exp_btn.Enable)
         self.total_time = exp_values['num_frames']*exp_values['exp_period']
+        self._frames_total = exp_values['num_frames']
 
         if self.settings['tr_muscle_exp']:
             exp_values['exp_type'] = 'muscle'
@@ -3753,6 +3748,7 @@ class ExpPanel(wx.Panel):
             self.exp_cmd_q.append(('start_exp', (), exp_values))
 
         self.set_time_remaining(self.total_time)
+        self.set_frames_collected(0)
 
         if (('trsaxs_scan' in self.settings['components'] and not exp_only) or exp_values['wait_for_trig']
             or ('scan' in self.settings['components'] and not exp_only)):
@@ -3811,8 +3807,24 @@ class ExpPanel(wx.Panel):
 
     def set_status(self, status):
         wx.CallAfter(self.status.SetLabel, status)
+        old_status = self._exp_status
         self._exp_status = status
 
+        if old_status != status:
+            for callback in self._automator_status_callbacks:
+                callback()
+
+    def add_automator_status_callback(self, callback_func):
+        """
+        Registers a function that is called with no arguments whenever the
+        exposure status changes, so the automator doesn't have to poll.
+        """
+        self._automator_status_callbacks.append(callback_func)
+
+    def remove_automator_status_callback(self, callback_func):
+        if callback_func in self._automator_status_callbacks:
+            self._automator_status_callbacks.remove(callback_func)
+
     def set_time_remaining(self, tr):
         if tr < 3600:
             tr_str = time.strftime('%M:%S', time.gmtime(tr))
@@ -3824,6 +3836,11 @@ class ExpPanel(wx.Panel):
         self._time_remaining = tr
         wx.CallAfter(self.time_remaining.SetLabel, tr_str)
 
+    def set_frames_collected(self, val):
+        self._frames_collected = val
+        wx.CallAfter(self.frames_collected.SetLabel, '{} of {}'.format(val,
+            self._frames_total))
+
     def set_scan_number(self, val):
         self.scan_number.SetLabel(str(val))
 
@@ -3837,58 +3854,56 @@ class ExpPanel(wx.Panel):
             self.set_time_remaining(tr)
 
     def monitor_exp_status(self):
-        while not self.exp_event.is_set() and not self.abort_event.is_set():
-            time.sleep(0.001)
-            self._check_exp_status()
+        self.exp_status_stream.follow_exposure(self.exp_event, self.abort_event,
+            self._on_exp_status_events, self.settings['status_refresh_interval'])
 
-        if self.exp_event.is_set():
-            self.initial_time = time.monotonic()
-            wx.CallAfter(self.tr_timer.Start, 1000)
-            wx.CallAfter(self.set_status, 'Exposing')
+        wx.CallAfter(self._on_exp_finish)
 
-            while self.exp_event.is_set():
-                status, val = self._check_exp_status()
-                if status is not None and status == 'scan':
-                    if val is not None and int(val) > 1:
+        return
 
-                        if self.pipeline_ctrl is not None:
-                            self.pipeline_ctrl.stop_current_experiment()
+    def _on_exp_status_events(self, events):
+        # Called in the monitor thread, the GUI is updated once per batch
+        for status, val in events:
+            if status == 'exp_state' and val:
+                self.initial_time = time.monotonic()
 
-                        self._pipeline_start_exp(int(val))
+            elif status == 'scan':
+                if val is not None and int(val) > 1:
 
-                        if 'uv' in self.settings['components']:
-                            wx.CallAfter(self._start_uv_in_scan, val)
+                    if self.pipeline_ctrl is not None:
+                        self.pipeline_ctrl.stop_current_experiment()
 
-                time.sleep(0.01)
+                    self._pipeline_start_exp(int(val))
 
-        wx.CallAfter(self._on_exp_finish)
+                    if 'uv' in self.settings['components']:
+                        wx.CallAfter(self._start_uv_in_scan, val)
 
-        return
+            elif status == 'frames':
+                self._frames_collected = val
 
-    def _check_exp_status(self):
-        status = None
-        val = None
+        wx.CallAfter(self._update_exp_status, events)
 
-        if len(self.exp_ret_q) > 0:
-            try:
-                status, val = self.exp_ret_q.popleft()
-            except Exception:
-                pass
+    def _update_exp_status(self, events):
+        for status, val in events:
+            if status == 'exp_state':
+                if val:
+                    self.tr_timer.Start(1000)
+                    self.set_status('Exposing')
 
-            if status == 'scan':
-                wx.CallAfter(self.set_scan_number, val)
+            elif status == 'scan':
+                self.set_scan_number(val)
+            elif status == 'frames':
+                self.set_frames_collected(self._frames_collected)
             elif status == 'timeout':
-                wx.CallAfter(self._show_timeout_dialog, val)
+                self._show_timeout_dialog(val)
             elif status == 'waiting':
-                wx.CallAfter(self.set_status, 'Waiting for Trigger')
-                wx.CallAfter(self.soft_trig.Enable)
+                self.set_status('Waiting for Trigger')
+                self.soft_trig.Enable()
             elif status == 'exposing':
-                wx.CallAfter(self.set_status, 'Exposing')
-                wx.CallAfter(self.soft_trig.Disable)
+                self.set_status('Exposing')
+                self.soft_trig.Disable()
             elif status == 'dark':
-                wx.CallAfter(self.set_status, 'Collecting dark')
-
-        return status, val
+                self.set_status('Collecting dark')
 
     def _start_uv_in_scan(self, val):
         uv_panel = wx.FindWindowByName('uv')
@@ -4051,7 +4066,7 @@ class ExpPanel(wx.Panel):
 
     def _get_hutch_shutter_status(self):
         if self.fe_shutter_pv is not None:
-            fes_val = self.fe_shutter_pv.get(timeout=2)
+            fes_val = pvpool.pool.get(self.fe_shutter_pv)
 
             if fes_val is not None:
                 if fes_val == 0:
@@ -4064,7 +4079,7 @@ class ExpPanel(wx.Panel):
             fes = True
 
         if self.d_shutter_pv is not None:
-            ds_val = self.d_shutter_pv.get(timeout=2)
+            ds_val = pvpool.pool.get(self.d_shutter_pv)
 
             if ds_val is not None:
                 if ds_val == 0:
@@ -4086,7 +4101,7 @@ class ExpPanel(wx.Panel):
             thresh = self.settings['warnings']['col_vac']['thresh']
 
             if self.col_vac_pv is not None:
-                vac = self.col_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.col_vac_pv)
                 if vac is None:
                     vac = 0
             else:
@@ -4100,7 +4115,7 @@ class ExpPanel(wx.Panel):
             thresh = self.settings['warnings']['guard_vac']['thresh']
 
             if self.guard_vac_pv is not None:
-                vac = self.guard_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.guard_vac_pv)
                 if vac is None:
                     vac = 0
             else:
@@ -4114,7 +4129,7 @@ class ExpPanel(wx.Panel):
             thresh = self.settings['warnings']['sample_vac']['thresh']
 
             if self.sample_vac_pv is not None:
-                vac = self.sample_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.sample_vac_pv)
                 if vac is None:
                     vac = 0
             else:
@@ -4128,7 +4143,7 @@ class ExpPanel(wx.Panel):
             thresh = self.settings['warnings']['sc_vac']['thresh']
 
             if self.sc_vac_pv is not None:
-                vac = self.sc_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.sc_vac_pv)
                 if vac is None:
                     vac = 0
             else:
@@ -4661,7 +4676,7 @@ class ExpPanel(wx.Panel):
                 metadata['Number of images per file:'] = self.settings['det_args']['images_per_file']
 
             if self.beam_current_pv is not None:
-                bc_val = self.beam_current_pv.get(timeout=2)
+                bc_val = pvpool.pool.get(self.beam_current_pv)
 
                 if bc_val is not None:
                     try:
@@ -4671,7 +4686,7 @@ class ExpPanel(wx.Panel):
                     metadata['Starting storage ring current [mA]:'] = bc_val
 
             if self.fe_shutter_pv is not None:
-                fes_val = self.fe_shutter_pv.get(timeout=2)
+                fes_val = pvpool.pool.get(self.fe_shutter_pv)
 
                 if fes_val is not None:
                     if fes_val == 0:
@@ -4682,7 +4697,7 @@ class ExpPanel(wx.Panel):
                     metadata['Front end shutter open:'] = fes
 
             if self.d_shutter_pv is not None:
-                ds_val = self.d_shutter_pv.get(timeout=2)
+                ds_val = pvpool.pool.get(self.d_shutter_pv)
 
                 if ds_val is not None:
                     if ds_val == 0:
@@ -4693,7 +4708,7 @@ class ExpPanel(wx.Panel):
                     metadata['D hutch shutter open:'] = ds
 
             if self.col_vac_pv is not None:
-                vac = self.col_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.col_vac_pv)
 
                 if vac is not None:
                     vac = round(vac*1000, 1)
@@ -4701,7 +4716,7 @@ class ExpPanel(wx.Panel):
                     metadata['Collimator vacuum [mtorr]:'] = vac
 
             if self.guard_vac_pv is not None:
-                vac = self.guard_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.guard_vac_pv)
 
                 if vac is not None:
                     vac = round(vac*1000, 1)
@@ -4709,7 +4724,7 @@ class ExpPanel(wx.Panel):
                     metadata['Guard slit vacuum [mtorr]:'] = vac
 
             if self.sample_vac_pv is not None:
-                vac = self.sample_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.sample_vac_pv)
 
                 if vac is not None:
                     vac = round(vac*1000, 1)
@@ -4717,7 +4732,7 @@ class ExpPanel(wx.Panel):
                     metadata['Sample vacuum [mtorr]:'] = vac
 
             if self.sc_vac_pv is not None:
-                vac = self.sc_vac_pv.get(timeout=2)
+                vac = pvpool.pool.get(self.sc_vac_pv)
 
                 if vac is not None:
                     vac = round(vac*1000, 1)
@@ -4725,37 +4740,37 @@ class ExpPanel(wx.Panel):
                     metadata['Flight tube vacuum [mtorr]:'] = vac
 
             if self.a_hutch_T_pv is not None:
-                env = self.a_hutch_T_pv.get(timeout=2)
+                env = pvpool.pool.get(self.a_hutch_T_pv)
 
                 if env is not None:
                     metadata['A hutch temperature [C]:'] = env
 
             if self.a_hutch_H_pv is not None:
-                env = self.a_hutch_H_pv.get(timeout=2)
+                env = pvpool.pool.get(self.a_hutch_H_pv)
 
                 if env is not None:
                     metadata['A hutch humidity [%]:'] = env
 
             if self.c_hutch_T_pv is not None:
-                env = self.c_hutch_T_pv.get(timeout=2)
+                env = pvpool.pool.get(self.c_hutch_T_pv)
 
                 if env is not None:
                     metadata['C hutch temperature [C]:'] = env
 
             if self.c_hutch_H_pv is not None:
-                env = self.c_hutch_H_pv.get(timeout=2)
+                env = pvpool.pool.get(self.c_hutch_H_pv)
 
                 if env is not None:
                     metadata['C hutch humidity [%]:'] = env
 
             if self.d_hutch_T_pv is not None:
-                env = self.d_hutch_T_pv.get(timeout=2)
+                env = pvpool.pool.get(self.d_hutch_T_pv)
 
                 if env is not None:
                     metadata['D hutch temperature [C]:'] = env
 
             if self.d_hutch_H_pv is not None:
-                env = self.d_hutch_H_pv.get(timeout=2)
+                env = pvpool.pool.get(self.d_hutch_H_pv)
 
                 if env is not None:
                     metadata['D hutch humidity [%]:'] = env
@@ -5219,6 +5234,7 @@ default_exposure_settings = {
     'shutter_cycle'         : 0.1, #In 1/Hz, i.e. minimum time between shutter openings in a continuous duty cycle
 
     'struck_measurement_time' : '0.001', #in s
+    'status_refresh_interval' : 0.1, #in s, how often exposure status is updated in the GUI
     'tr_muscle_exp'         : False,
     'wait_for_trig'         : True,
     'num_trig'              : '1',
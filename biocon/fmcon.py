@@ -702,6 +702,25 @@ class FlowMeterCommThread(utils.CommManager):
 
         self._return_value((names, cmd, [names, vals]), comm_name)
 
+    def _get_device_snapshot(self, device, den_T=True):
+        state = {'flow_rate': device.flow_rate}
+
+        if den_T:
+            # Not all flow meters measure density and temperature
+            state['density'] = getattr(device, 'density', None)
+            state['temperature'] = getattr(device, 'temperature', None)
+
+        return state
+
+    def _get_snapshot_status(self, state):
+        status_vals = [('get_flow_rate', state['flow_rate'])]
+
+        if 'density' in state:
+            status_vals.append(('get_density_and_temperature',
+                [state['density'], state['temperature']]))
+
+        return status_vals
+
     def _get_density_and_temperature(self, name, **kwargs):
         logger.debug('Getting density and temperature')
 
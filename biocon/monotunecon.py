@@ -23,6 +23,7 @@ import time
 import logging
 import sys
 import copy
+import queue
 
 if __name__ != '__main__':
     logger = logging.getLogger(__name__)
@@ -66,6 +67,14 @@ class MonoAutoTune(object):
         self.i0_shutter_pv, connected = self._initialize_pv('{}'.format(
             self.settings['exp_slow_shtr1']))
 
+        # Scaler record fields for continuous (AutoCount) counting
+        scaler = self.settings['device_data']['kwargs']['ct_start'].rsplit('.', 1)[0]
+
+        self.ct_mode_pv, connected = self._initialize_pv('{}.CONT'.format(scaler))
+        self.ct_auto_time_pv, connected = self._initialize_pv('{}.TP1'.format(scaler))
+        self.ct_auto_delay_pv, connected = self._initialize_pv('{}.DLY1'.format(scaler))
+        self.ct_rate_pv, connected = self._initialize_pv('{}.RATE'.format(scaler))
+
     def _initialize_pv(self, pv_name):
         pv = epics.get_pv(pv_name)
         connected = pv.wait_for_connection(5)
@@ -79,6 +88,9 @@ class MonoAutoTune(object):
         self.step_start = self.settings['optimize_step']
         self.step_min = self.settings['optimize_min_step']
         self.step_scale = self.settings['optimize_step_scale']
+        self.max_meas = self.settings['optimize_max_meas']
+
+        self._num_measurements = 0
 
         self.low_lim = self.ao_low_lim_pv.get()
         self.high_lim = self.ao_high_lim_pv.get()
@@ -96,9 +108,30 @@ class MonoAutoTune(object):
         val = self.ct_val_pv.get(use_monitor=False)
         # logger.debug(val)
 
+        self._num_measurements += 1
+
         return val
 
+    def _measure_at(self, v):
+        self.ao_pv.put(v, wait=True)
+
+        return self._measure_intensity()
+
     def optimize_intensity(self):
+        """
+        Moves the mono tune output to the voltage with the highest I0
+        intensity. The method is set by the optimize_method setting:
+
+        * 'model' - Measures three points around the current voltage, then
+          repeatedly fits a Gaussian (a quadratic in log intensity) to the
+          points nearest the best one and measures at the predicted peak.
+        * 'scan' - Sweeps the voltage once with the counter in AutoCount mode,
+          fits a Gaussian to the profile and moves to the peak.
+        * 'search' - Line search with a shrinking step size.
+        """
+        method = self.settings['optimize_method']
+        self._num_measurements = 0
+
         self.ct_time_pv.put(self.settings['optimize_ct_time'], wait=True)
         self.i0_shutter_pv.put(0, wait=True)
         time.sleep(0.15) #Waits for shutter to open
@@ -106,9 +139,23 @@ class MonoAutoTune(object):
         v_start = self.ao_pv.get()
         i_start = self._measure_intensity()
 
-        logger.info('Starting optimizing I0 intensity. Initial: %s cts/s at %s V',
-            i_start/self.settings['optimize_ct_time'], v_start)
+        logger.info('Starting optimizing I0 intensity (%s). Initial: %s cts/s at %s V',
+            method, i_start/self.settings['optimize_ct_time'], v_start)
+
+        if method == 'model':
+            i_best, v_best = self._optimize_model(i_start, v_start)
+        elif method == 'scan':
+            i_best, v_best = self._optimize_scan(i_start, v_start)
+        else:
+            i_best, v_best = self._optimize_search(i_start, v_start)
+
+        self.i0_shutter_pv.put(1)
+
+        logger.info('Finished optimizing I0 intensity. Final: %s cts/s at %s V '
+            'after %i measurements', i_best/self.settings['optimize_ct_time'],
+            v_best, self._num_measurements)
 
+    def _optimize_search(self, i_start, v_start):
         logger.debug("Initial step %s V", self.step_start)
 
         i_best, v_best, improved = self._search_up(self.step_start, i_start, v_start)
@@ -148,10 +195,183 @@ class MonoAutoTune(object):
             logger.debug('Search improved: %s, V new: %s V, I0 new: %s ct/s',
                 improved, v_best, i_best/self.settings['optimize_ct_time'])
 
-        self.i0_shutter_pv.put(1)
+        return i_best, v_best
+
+    def _optimize_model(self, i_start, v_start):
+        v_meas = [v_start]
+        i_meas = [i_start]
+
+        for v in (v_start - self.step_start, v_start + self.step_start):
+            v = min(max(v, self.low_lim), self.high_lim)
+
+            if v not in v_meas:
+                v_meas.append(v)
+                i_meas.append(self._measure_at(v))
+
+        while self._num_measurements < self.max_meas:
+            best = int(np.argmax(i_meas))
+            v_best = v_meas[best]
+
+            v_pred = self._predict_peak(v_meas, i_meas, v_best)
+
+            logger.debug('Best %s ct/s at %s V, predicted peak at %s V',
+                i_meas[best]/self.settings['optimize_ct_time'], v_best, v_pred)
+
+            if min(abs(v_pred - v) for v in v_meas) < self.step_min:
+                break
+
+            v_meas.append(v_pred)
+            i_meas.append(self._measure_at(v_pred))
+
+        best = int(np.argmax(i_meas))
+        i_best = i_meas[best]
+        v_best = v_meas[best]
+
+        self.ao_pv.put(v_best, wait=True)
+
+        return i_best, v_best
+
+    def _predict_peak(self, v_meas, i_meas, v_best):
+        """
+        Fits a parabola to the log of the intensities closest to the current
+        best voltage, which is a Gaussian fit to the intensity. Returns the
+        voltage at the fit peak, limited to a jump of at most twice the
+        initial step. If the points don't bracket a peak, returns the largest
+        allowed jump toward the higher side.
+        """
+        v_meas = np.array(v_meas, dtype=float)
+        i_meas = np.array(i_meas, dtype=float)
+
+        nearest = np.argsort(np.abs(v_meas - v_best))[:5]
+        x = v_meas[nearest] - v_best
+        y = i_meas[nearest]
+
+        if np.all(y > 0):
+            y = np.log(y)
+
+        max_jump = 2*self.step_start
+
+        a = 0
+
+        if len(np.unique(x)) >= 3:
+            try:
+                a, b, c = np.polyfit(x, y, 2)
+            except Exception:
+                a = 0
+
+        if a < 0:
+            jump = min(max(-b/(2*a), -max_jump), max_jump)
+        else:
+            # No peak between the points, so keep going toward the higher side
+            upper = y[x > 0]
+            lower = y[x < 0]
+
+            if len(upper) == 0:
+                jump = max_jump
+            elif len(lower) == 0:
+                jump = -max_jump
+            elif np.max(upper) >= np.max(lower):
+                jump = max_jump
+            else:
+                jump = -max_jump
+
+        return min(max(v_best + jump, self.low_lim), self.high_lim)
+
+    def _optimize_scan(self, i_start, v_start):
+        scan_range = self.settings['optimize_scan_range']
+        num_points = self.settings['optimize_scan_points']
+        ct_time = self.settings['optimize_ct_time']
+
+        v_scan = np.linspace(max(v_start - scan_range, self.low_lim),
+            min(v_start + scan_range, self.high_lim), num_points)
+
+        counts = queue.Queue()
+
+        def on_count(value, **kwargs):
+            counts.put((time.monotonic(), value))
+
+        old_rate = self.ct_rate_pv.get()
+        old_delay = self.ct_auto_delay_pv.get()
+
+        # Times the move to the first voltage, which is at least as far as
+        # any scan step, so the gap between periods is long enough to set
+        # the next voltage in
+        put_start = time.monotonic()
+        self.ao_pv.put(v_scan[0], wait=True)
+        put_time = time.monotonic() - put_start
+
+        delay = max(self.settings['optimize_scan_delay'], 2*put_time)
+
+        logger.debug('Voltage put took %s s, using a %s s gap between counts',
+            put_time, delay)
+
+        # Only post the count at the end of each period, and leave a gap
+        # between periods to change the voltage in
+        self.ct_rate_pv.put(0, wait=True)
+        self.ct_auto_time_pv.put(ct_time, wait=True)
+        self.ct_auto_delay_pv.put(delay, wait=True)
+
+        cbid = self.ct_val_pv.add_callback(on_count)
+        self.ct_mode_pv.put(1, wait=True)   # AutoCount
+
+        i_scan = []
+        num_late = 0
+
+        set_time = put_start + put_time
+
+        try:
+            for num, v in enumerate(v_scan):
+                if num > 0:
+                    self.ao_pv.put(v, wait=True)
+                    set_time = time.monotonic()
+
+                count_time, value = counts.get(timeout=ct_time+5)
+
+                while count_time - set_time < ct_time:
+                    # The period started before the voltage was set, so
+                    # use the next one
+                    num_late += 1
+                    count_time, value = counts.get(timeout=ct_time+5)
+
+                i_scan.append(value)
+                self._num_measurements += 1
+
+        except queue.Empty:
+            logger.error('Timed out waiting for AutoCount counts')
+
+        finally:
+            self.ct_mode_pv.put(0, wait=True)   # OneShot
+            self.ct_val_pv.remove_callback(cbid)
+            self.ct_rate_pv.put(old_rate, wait=True)
+            self.ct_auto_delay_pv.put(old_delay, wait=True)
+
+        if num_late > 0:
+            logger.debug('Skipped %s counts started before the voltage was '
+                'set', num_late)
+
+        v_scan = v_scan[:len(i_scan)]
+
+        if len(i_scan) == 0:
+            self.ao_pv.put(v_start, wait=True)
+            return i_start, v_start
+
+        best = int(np.argmax(i_scan))
+        v_best = v_scan[best]
+        i_best = i_scan[best]
+
+        v_pred = self._predict_peak(v_scan, i_scan, v_best)
+        i_pred = self._measure_at(v_pred)
+
+        logger.debug('Scan best %s ct/s at %s V, fit peak %s ct/s at %s V',
+            i_best/ct_time, v_best, i_pred/ct_time, v_pred)
+
+        if i_pred >= i_best:
+            i_best = i_pred
+            v_best = v_pred
+        else:
+            self.ao_pv.put(v_best, wait=True)
 
-        logger.info('Finished optimizing I0 intensity. Final: %s cts/s at %s V',
-            i_best/self.settings['optimize_ct_time'], v_best)
+        return i_best, v_best
 
     def _search_up(self, step, i_start, v_start, final=False):
         i_new = np.inf
@@ -267,6 +487,11 @@ default_mono_tune_settings = {
     'optimize_min_step'     : 0.005, #Minimum optimize step size in V
     'optimize_step_scale'   : 3.1, #Scaling factor for reducing step size in search
     'optimize_ct_time'      : 0.05, #Joerger count time or optimize
+    'optimize_method'       : 'model', #'model', 'scan', or 'search'
+    'optimize_max_meas'     : 10, #Maximum measurements for the model optimizer
+    'optimize_scan_range'   : 0.15, #Scan optimizer range, +/- in V
+    'optimize_scan_points'  : 16, #Scan optimizer number of points
+    'optimize_scan_delay'   : 0.01, #Scan optimizer minimum gap between counts in s
     'fe_shutter'            : 'PA:18ID:STA_A_FES_OPEN_PL',
     'd_shutter'             : 'PA:18ID:STA_D_SDS_OPEN_PL',
     'fe_shutter_open'       : '18ID:rshtr:A:OPEN',
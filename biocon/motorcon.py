@@ -157,6 +157,93 @@ class Motor(object):
     def move_absolute(self):
         pass #Should be implimented in each subclass
 
+    def wait_for_move(self, timeout=None, abort_event=None):
+        """
+        Waits for the current move to finish. Subclasses that get move done
+        notifications from the device should override this, the default
+        polls ``is_moving``.
+
+        :param float timeout: Maximum time to wait in s. If None, waits
+            until the move is done.
+        :param threading.Event abort_event: If set, the wait stops. The
+            motor isn't stopped.
+
+        :returns: True if the motor is done moving, False if the timeout
+            expired or the wait was aborted first.
+        :rtype: bool
+        """
+        start = time.monotonic()
+
+        while self.is_moving():
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return False
+
+            if abort_event is not None:
+                if abort_event.wait(0.01):
+                    return False
+            else:
+                time.sleep(0.01)
+
+        return True
+
+    def wait_for_move_start(self, timeout, abort_event=None):
+        """
+        Waits for a commanded move to start, e.g. one sent from another
+        thread. A move that is short enough may be over before it's seen,
+        so the timeout should be short.
+
+        :param float timeout: Maximum time to wait in s.
+        :param threading.Event abort_event: If set, the wait stops.
+
+        :returns: True if the motor started moving, False otherwise.
+        :rtype: bool
+        """
+        start = time.monotonic()
+
+        while not self.is_moving():
+            if time.monotonic() - start >= timeout:
+                return False
+
+            if abort_event is not None:
+                if abort_event.wait(0.001):
+                    return False
+            else:
+                time.sleep(0.001)
+
+        return True
+
+    def wait_for_position(self, position, increasing=True, timeout=None):
+        """
+        Waits for a moving motor to reach a position. Subclasses that get
+        position updates from the device should override this, the default
+        polls ``position``.
+
+        :param float position: The position to wait for.
+        :param bool increasing: If True, waits for the motor to be at or above
+            the position, otherwise at or below it.
+        :param float timeout: Maximum time to wait in s. If None, waits
+            until the position is reached or the motor stops.
+
+        :returns: True if the motor reached the position, False if the
+            timeout expired or the motor stopped first.
+        :rtype: bool
+        """
+        start = time.monotonic()
+
+        while True:
+            pos = self.position
+
+            if (increasing and pos >= position) or (not increasing and pos <= position):
+                return True
+
+            if not self.is_moving():
+                return False
+
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return False
+
+            time.sleep(0.01)
+
     def home(self):
         pass #should be implimented in each subclass
 
@@ -202,6 +289,9 @@ class NewportXPSMotor(Motor):
     """
     """
 
+    # Group states during a move, jog or analog tracking
+    MOVING_STATES = (43, 44, 45, 47)
+
     def __init__(self, name, xps, ip_address, port, timeout, group, num_axes,
         is_hxp=False):
         """
@@ -456,6 +546,73 @@ class NewportXPSMotor(Motor):
 
         return result
 
+    def wait_for_group_state(self, states, positioner=None, timeout=None,
+        abort_event=None, until_in=True):
+        """
+        Waits for the group status to be one of the given states, polling
+        the controller with adaptive backoff (see
+        :py:meth:`XPS_C8_drivers.XPS.GroupStatusWait`) on the status socket.
+
+        :param list states: The XPS group status codes to wait for.
+        :param str positioner: The group or positioner. If None, the motor
+            group is used.
+        :param float timeout: Maximum time to wait in s. If None, waits
+            until the state is reached.
+        :param threading.Event abort_event: If set, the wait stops.
+        :param bool until_in: If False, waits until the status is not one
+            of the states instead.
+
+        :returns: True if the state was reached, False on timeout, abort or
+            a controller error.
+        :rtype: bool
+        """
+        if positioner is None:
+            positioner = self.group
+
+        error, status = self.xps.GroupStatusWait(self.sockets['status'],
+            positioner, states, timeout, abort_event, until_in)
+
+        if error == self.xps.WAIT_TIMEOUT:
+            logger.debug('%s timed out waiting for %s state %s, status %s',
+                self.name, positioner, states, status)
+        elif error != 0 and error != self.xps.WAIT_ABORTED:
+            self.get_error('status', self.sockets['status'], error, status)
+
+        return error == 0
+
+    def wait_for_move(self, timeout=None, abort_event=None, positioner=None):
+        """
+        Waits for the current move of the group or positioner to finish.
+
+        :param float timeout: Maximum time to wait in s. If None, waits
+            until the move is done.
+        :param threading.Event abort_event: If set, the wait stops. The
+            motor isn't stopped.
+        :param str positioner: The group or positioner. If None, the motor
+            group is used.
+
+        :returns: True if the motor is done moving, False if the timeout
+            expired or the wait was aborted first.
+        :rtype: bool
+        """
+        return self.wait_for_group_state(self.MOVING_STATES, positioner,
+            timeout, abort_event, until_in=False)
+
+    def wait_for_move_start(self, timeout, abort_event=None, positioner=None):
+        """
+        Waits for a commanded move of the group or positioner to start.
+
+        :param float timeout: Maximum time to wait in s.
+        :param threading.Event abort_event: If set, the wait stops.
+        :param str positioner: The group or positioner. If None, the motor
+            group is used.
+
+        :returns: True if the motor started moving, False otherwise.
+        :rtype: bool
+        """
+        return self.wait_for_group_state(self.MOVING_STATES, positioner,
+            timeout, abort_event)
+
     def move_relative(self, displacements, positioner=None, index=0):
         if positioner is None:
             positioner = self.group
@@ -976,6 +1133,10 @@ class NewportXPSSingleAxis(object):
     def is_busy(self):
         return self.newport_motor.positioner_is_moving(self.axis)
 
+    def wait_for_move(self, timeout=None, abort_event=None):
+        return self.newport_motor.wait_for_move(timeout, abort_event,
+            self.axis)
+
     def stop(self):
         self.newport_motor.stop(self.axis)
 
@@ -1343,6 +1504,32 @@ class EpicsMotor(Motor):
         self._scale = 1.
         self._units = 'mm/s'
 
+        # Set by a monitor on the done moving PV, so waiting on a move
+        # doesn't require polling the motor
+        self._move_done = threading.Event()
+        self._move_start = 0.
+
+        if not self.is_moving():
+            self._move_done.set()
+
+        # Set by the readback and done moving monitors, so waiting for a
+        # position doesn't require polling the motor either
+        self._position_changed = threading.Event()
+
+        self.epics_motor.get_pv('done_moving').add_callback(self._on_done_moving)
+        self.epics_motor.get_pv('readback').add_callback(self._on_readback)
+
+    def _on_done_moving(self, value, **kwargs):
+        if value:
+            self._move_done.set()
+        else:
+            self._move_done.clear()
+
+        self._position_changed.set()
+
+    def _on_readback(self, value, **kwargs):
+        self._position_changed.set()
+
     @property
     def position(self):
         pos = self.epics_motor.get_position()
@@ -1402,11 +1589,104 @@ class EpicsMotor(Motor):
         return mov
 
     def move_relative(self, displacement, wait=False):
+        self._move_done.clear()
+        self._move_start = time.time()
         self.epics_motor.move(displacement, relative=True, wait=wait)
 
     def move_absolute(self, position, wait=False):
+        self._move_done.clear()
+        self._move_start = time.time()
         self.epics_motor.move(position, wait=wait)
 
+    def wait_for_move(self, timeout=None, abort_event=None):
+        """
+        Waits for the current move to finish, using the done moving
+        monitor rather than polling the motor.
+
+        :param float timeout: Maximum time to wait in s. If None, waits
+            until the move is done.
+        :param threading.Event abort_event: If set, the wait stops. The
+            motor isn't stopped.
+
+        :returns: True if the motor is done moving, False if the timeout
+            expired or the wait was aborted first.
+        :rtype: bool
+        """
+        if timeout is None or abort_event is not None:
+            # Waits in short pieces to check the abort event
+            if timeout is not None:
+                deadline = time.monotonic() + timeout
+
+            while True:
+                if timeout is None:
+                    wait_time = 0.1
+                else:
+                    wait_time = min(0.1, max(deadline - time.monotonic(), 0))
+
+                if self.wait_for_move(wait_time):
+                    return True
+
+                if abort_event is not None and abort_event.is_set():
+                    return False
+
+                if timeout is not None and time.monotonic() >= deadline:
+                    return False
+
+        done = self._move_done.wait(timeout)
+
+        if not done and time.time() - self._move_start > 0.1:
+            # A move too short to ever drop done moving doesn't send a
+            # monitor, so fall back to checking the motor directly.
+            done = not self.is_moving()
+
+            if done:
+                self._move_done.set()
+
+        return done
+
+    def wait_for_position(self, position, increasing=True, timeout=None):
+        """
+        Waits for a moving motor to reach a position, using the readback
+        monitor rather than polling the motor.
+
+        :param float position: The position to wait for.
+        :param bool increasing: If True, waits for the motor to be at or above
+            the position, otherwise at or below it.
+        :param float timeout: Maximum time to wait in s. If None, waits
+            until the position is reached or the motor stops.
+
+        :returns: True if the motor reached the position, False if the
+            timeout expired or the motor stopped first.
+        :rtype: bool
+        """
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        while True:
+            self._position_changed.clear()
+
+            pos = self.position
+
+            if (increasing and pos >= position) or (not increasing and pos <= position):
+                return True
+
+            if self._move_done.is_set():
+                return False
+
+            if timeout is None:
+                wait_time = 0.1
+            else:
+                wait_time = min(0.1, deadline - time.monotonic())
+
+                if wait_time <= 0:
+                    return False
+
+            if not self._position_changed.wait(wait_time):
+                # No monitor in a while, wait_for_move falls back to
+                # checking whether the motor stopped, and the next pass
+                # returns if it did
+                self.wait_for_move(0)
+
     def home(self):
         pass #should be implimented in each subclass
 
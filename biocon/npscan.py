@@ -136,8 +136,15 @@ class ScanProcess(multiprocessing.Process):
 
         while True:
             try:
-                cmd, args, kwargs = self.command_queue.get_nowait()
+                # Blocks rather than spinning, the timeout keeps the abort and
+                # stop events responsive. A None is put in the queue by stop.
+                cmd_item = self.command_queue.get(timeout=0.1)
             except queue.Empty:
+                cmd_item = None
+
+            if cmd_item is not None:
+                cmd, args, kwargs = cmd_item
+            else:
                 cmd = None
 
             if self._abort_event.is_set():
@@ -556,14 +563,15 @@ class ScanProcess(multiprocessing.Process):
                 # logger.info('Moving motor 1 position to {}'.format(mtr1_pos))
                 self.np_motor.move_positioner_absolute(self.device, m1_index, mtr1_pos)
             # mtr1.wait_for_motor_stop()
-            while self.np_motor.positioner_is_moving(self.positioner):
-                time.sleep(0.01)
-                if self._abort_event.is_set():
-                    if self.detector == 'Eiger2 XE 9M' or self.detector == 'Pilatus3 X 1M':
-                        self.det.abort()
-                    self.np_motor.stop()
-                    self.return_queue.put_nowait(['stop_live_plotting'])
-                    return
+            self.np_motor.wait_for_move(abort_event=self._abort_event,
+                positioner=self.positioner)
+
+            if self._abort_event.is_set():
+                if self.detector == 'Eiger2 XE 9M' or self.detector == 'Pilatus3 X 1M':
+                    self.det.abort()
+                self.np_motor.stop()
+                self.return_queue.put_nowait(['stop_live_plotting'])
+                return
 
             if self.scan_dim == '1D':
                 self._measure(scalers, timer, mtr1_pos, num)
@@ -583,14 +591,15 @@ class ScanProcess(multiprocessing.Process):
                     if mtr2_pos != mtr2_positions[0]:
                         self.np_motor.move_positioner_absolute(self.device2, m2_index, mtr2_pos)
                     # mtr1.wait_for_motor2_stop()
-                    while self.np_motor.positioner_is_moving(self.positioner):
-                        time.sleep(0.01)
-                        if self._abort_event.is_set():
-                            if self.detector == 'Eiger2 XE 9M' or self.detector == 'Pilatus3 X 1M':
-                                self.det.abort()
-                            self.np_motor.stop()
-                            self.return_queue.put_nowait(['stop_live_plotting'])
-                            return
+                    self.np_motor.wait_for_move(abort_event=self._abort_event,
+                        positioner=self.positioner)
+
+                    if self._abort_event.is_set():
+                        if self.detector == 'Eiger2 XE 9M' or self.detector == 'Pilatus3 X 1M':
+                            self.det.abort()
+                        self.np_motor.stop()
+                        self.return_queue.put_nowait(['stop_live_plotting'])
+                        return
 
                     self._measure(scalers, timer, mtr1_pos, num, mtr2_pos, num2)
 
@@ -713,6 +722,7 @@ class ScanProcess(multiprocessing.Process):
     def stop(self):
         """Stops the thread cleanly."""
         self._stop_event.set()
+        self.command_queue.put_nowait(None)
 
     def _stop_scan(self):
         """
@@ -768,6 +778,14 @@ class ScanPanel(wx.Panel):
 
         self.live_plt_evt = threading.Event()
 
+        # Fits and FWHMs of the live plot are calculated on a separate
+        # thread, at most once per analysis_interval (s)
+        self.analysis_interval = 0.5
+        self._analysis_evt = threading.Event()
+        self._analysis_thread = threading.Thread(target=self._analysis_worker)
+        self._analysis_thread.daemon = True
+        self._analysis_thread.start()
+
         self._start_scan_mxdb()
         self._get_devices()
         self._initialize_variables()
@@ -1093,6 +1111,12 @@ class ScanPanel(wx.Panel):
         self.com = None
         self.der_com = None
 
+        self._fit_choices = {'plt': 'None', 'der': 'None'}
+        self._live_scan_id = 0
+        self._com_sums = {'plt': [0., 0.], 'der': [0., 0.]}
+        self._der_buffer = np.zeros(0)
+        self._redraw_pending = False
+
         self.det_scan = False
         self.scan_dimension = 1
 
@@ -1683,7 +1707,8 @@ class ScanPanel(wx.Panel):
             if (self.plt_x is not None and self.plt_y is not None and
                 len(self.plt_x) == len(self.plt_y)) and len(self.plt_x) > 0:
 
-                self.plot.set_ylim(min(self.plt_y)*0.98, max(self.plt_y)*1.02)
+                self.plot.set_ylim(self._get_ylim(self.plot.get_ylim(),
+                    self.plt_y))
 
 
             if self.show_der.GetValue():
@@ -1698,7 +1723,8 @@ class ScanPanel(wx.Panel):
                 if (self.plt_x is not None and self.der_y is not None and
                     len(self.plt_x) == len(self.der_y) and len(self.plt_x) > 1):
 
-                    self.der_plot.set_ylim(min(self.der_y)*0.98, max(self.der_y)*1.02)
+                    self.der_plot.set_ylim(self._get_ylim(self.der_plot.get_ylim(),
+                        self.der_y))
 
 
         if (old_xlim != self.plot.get_xlim() or old_ylim != self.plot.get_ylim()
@@ -1707,6 +1733,24 @@ class ScanPanel(wx.Panel):
 
         return redraw
 
+    def _get_ylim(self, ylim, ydata):
+        """
+        Gets the y limits for the data. The current limits are kept while the
+        data fits in them and they aren't much larger than needed, and new
+        limits get some extra room. This keeps the full redraws needed for a
+        limit change rare, so the live plot can update by blitting.
+        """
+        low = min(ydata)*0.98
+        high = max(ydata)*1.02
+        span = high - low
+
+        if ylim[0] <= low and ylim[1] >= high and ylim[1] - ylim[0] <= 2*span:
+            new_ylim = ylim
+        else:
+            new_ylim = (low - 0.1*span, high + 0.1*span)
+
+        return new_ylim
+
     def _autoscale_plot_2d(self):
         redraw = False
 
@@ -1808,6 +1852,12 @@ class ScanPanel(wx.Panel):
         self.com = None
         self.der_com = None
 
+        self._fit_choices = {'plt': self.plt_fit.GetStringSelection(),
+            'der': self.der_fit.GetStringSelection()}
+        self._live_scan_id += 1
+        self._com_sums = {'plt': [0., 0.], 'der': [0., 0.]}
+        self._der_buffer = np.zeros(100)
+
         self.update_plot()
         self._update_results()
         wx.Yield()
@@ -1830,7 +1880,7 @@ class ScanPanel(wx.Panel):
             if self.live_plt_evt.is_set():
                 break
             try:
-                val = self.return_val_q.get_nowait()
+                val = self.return_val_q.get(timeout=0.1)
             except queue.Empty:
                 val = None
 
@@ -1868,24 +1918,138 @@ class ScanPanel(wx.Panel):
             self.plt_z.append(float(z))
 
         if self.scan_dimension == 1:
-            self._calc_fit('plt', self.plt_fit.GetStringSelection(), False)
-            self._calc_fwhm('plt', False)
-            self._calc_com('plt', False)
-
-            if len(self.plt_y) > 1:
-                self.der_y_orig = np.gradient(self.plt_y, self.plt_x)
-                self.der_y_orig[np.isnan(self.der_y_orig)] = 0
-                if self.flip_der.IsChecked():
-                    self.der_y = self.der_y_orig*-1
+            self._update_live_analysis()
+            self._analysis_evt.set()
+
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            wx.CallAfter(self._live_redraw)
+
+    def _update_live_analysis(self):
+        """
+        Updates the derivative and COMs for the newest point. Adding a point
+        only changes the last two derivative values, and the COMs are kept
+        as running sums, so this doesn't depend on the scan length.
+        """
+        n = len(self.plt_x)
+        x = self.plt_x[-1]
+        y = self.plt_y[-1]
+
+        self._com_sums['plt'][0] += y
+        self._com_sums['plt'][1] += x*y
+        self.com = self._get_com(*self._com_sums['plt'])
+
+        if n > 1:
+            if n > len(self._der_buffer):
+                self._der_buffer = np.concatenate((self._der_buffer,
+                    np.zeros(len(self._der_buffer))))
+
+            new_der = np.gradient(self.plt_y[-3:], self.plt_x[-3:])
+            # Also zero infinite values from repeated positions, which would
+            # otherwise never drop out of the COM sums
+            new_der[~np.isfinite(new_der)] = 0
+
+            if n > 2:
+                old_der = self._der_buffer[n-2]
+                self._com_sums['der'][0] -= old_der
+                self._com_sums['der'][1] -= self.plt_x[-2]*old_der
+                new_der = new_der[1:]
+                indices = [n-2, n-1]
+            else:
+                indices = [0, 1]
+
+            self._der_buffer[indices] = new_der
+
+            for i, der in zip(indices, new_der):
+                self._com_sums['der'][0] += der
+                self._com_sums['der'][1] += self.plt_x[i]*der
+
+            self.der_y_orig = self._der_buffer[:n]
+
+            if self.flip_der.IsChecked():
+                self.der_y = self.der_y_orig*-1
+                self.der_com = self._get_com(-self._com_sums['der'][0],
+                    -self._com_sums['der'][1])
+            else:
+                self.der_y = self.der_y_orig
+                self.der_com = self._get_com(*self._com_sums['der'])
+
+    def _get_com(self, y_sum, xy_sum):
+        scale = 1/y_sum if y_sum != 0 else np.inf
+        if not np.isfinite(scale):
+            scale = 1
+
+        return scale*xy_sum
+
+    def _live_redraw(self):
+        self._redraw_pending = False
+        self.update_plot()
+        self._update_results()
+
+    def _analysis_worker(self):
+        """
+        Calculates the fits and FWHMs for the live plot. Runs in its own
+        thread, and waits at least analysis_interval between calculations,
+        so points that arrive in the meantime are handled by one calculation.
+        """
+        last_time = 0
+
+        while True:
+            self._analysis_evt.wait()
+
+            wait_time = self.analysis_interval - (time.time() - last_time)
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+            self._analysis_evt.clear()
+
+            scan_id = self._live_scan_id
+            fit_choices = dict(self._fit_choices)
+            n = min(len(self.plt_x), len(self.plt_y), len(self.der_y))
+            x = list(self.plt_x[:n])
+            data = {'plt': list(self.plt_y[:n]), 'der': np.array(self.der_y[:n])}
+
+            results = {}
+
+            try:
+                for plot in ['plt', 'der']:
+                    if fit_choices[plot] == 'Gaussian' and n > 2:
+                        fit = fit_gaussian(x, data[plot])
+                    else:
+                        fit = None
+
+                    if n > 3:
+                        fwhm = calc_fwhm(x, data[plot])
+                    else:
+                        fwhm = None
+
+                    results[plot] = (fit, fwhm)
+
+            except Exception:
+                traceback.print_exc()
+                results = None
+
+            last_time = time.time()
+
+            if results is not None:
+                wx.CallAfter(self._set_analysis_results, scan_id, results)
+
+    def _set_analysis_results(self, scan_id, results):
+        if scan_id != self._live_scan_id:
+            return
+
+        for plot, (fit, fwhm) in results.items():
+            if fit is not None and self._fit_choices[plot] == 'Gaussian':
+                self._set_fit(plot, *fit)
+
+            if fwhm is not None:
+                if plot == 'plt':
+                    self.fwhm = fwhm
                 else:
-                    self.der_y = self.der_y_orig
-                self._calc_fit('der', self.der_fit.GetStringSelection(), False)
-                self._calc_fwhm('der', False)
-                self._calc_com('der', False)
+                    self.der_fwhm = fwhm
 
-        wx.CallAfter(self.update_plot)
-        wx.CallAfter(self._update_results)
-        wx.Yield()
+        self.update_plot()
+        self._update_results()
 
     def _on_mousemotion(self, event):
         """
@@ -2048,25 +2212,11 @@ class ScanPanel(wx.Panel):
         else:
             ydata = self.der_y
 
+        self._fit_choices[plot] = fit
+
         if fit == 'Gaussian':
             if self.plt_x is not None and len(self.plt_x) > 2:
-                npts = int(100*(self.plt_x[-1] - self.plt_x[0])/(self.plt_x[1] - self.plt_x[0]))
-                self.plt_fit_x = np.linspace(self.plt_x[0], self.plt_x[-1], npts)
-
-                try:
-                    opt, cov = scipy.optimize.curve_fit(gaussian, self.plt_x, ydata)
-                    if plot == 'plt':
-                        self.plt_fit_y = gaussian(self.plt_fit_x, opt[0], opt[1], opt[2])
-                        self.plt_fitparams = [opt, cov]
-                    else:
-                        self.der_fit_y = gaussian(self.plt_fit_x, opt[0], opt[1], opt[2])
-                        self.der_fitparams = [opt, cov]
-
-                except RuntimeError:
-                    if plot == 'plt':
-                        self.plt_fit_y = np.zeros_like(self.plt_fit_x)
-                    else:
-                        self.der_fit_y = np.zeros_like(self.plt_fit_x)
+                self._set_fit(plot, *fit_gaussian(self.plt_x, ydata))
 
 
         elif fit == 'None':
@@ -2085,6 +2235,18 @@ class ScanPanel(wx.Panel):
             self.update_plot()
             wx.CallAfter(self._update_results)
 
+    def _set_fit(self, plot, fit_x, fit_y, fitparams):
+        self.plt_fit_x = fit_x
+
+        if plot == 'plt':
+            self.plt_fit_y = fit_y
+            if fitparams is not None:
+                self.plt_fitparams = fitparams
+        else:
+            self.der_fit_y = fit_y
+            if fitparams is not None:
+                self.der_fitparams = fitparams
+
     def _on_showfwhm(self, event):
         """
         Called when the user decides to show/hide the FWHM on the plot.
@@ -2111,91 +2273,17 @@ class ScanPanel(wx.Panel):
             ydata = self.der_y
 
         if self.plt_x is not None and len(self.plt_x)>3:
-            y = ydata - np.max(ydata)/2
-            if self.plt_x[0]>self.plt_x[1]:
-                spline = scipy.interpolate.UnivariateSpline(self.plt_x[::-1], y[::-1], s=0)
-            else:
-                spline = scipy.interpolate.UnivariateSpline(self.plt_x, y, s=0)
-
-            try:
-                roots = spline.roots()
-                if roots.size == 2:
-                    r1 = roots[0]
-                    r2 = roots[1]
-
-                    if self.plt_x[1]>self.plt_x[0]:
-                        if r1>r2:
-                            index1 = np.searchsorted(self.plt_x, r1, side='right')
-                            index2 = np.searchsorted(self.plt_x, r2, side='right')
-                        else:
-                            index1 = np.searchsorted(self.plt_x, r2, side='right')
-                            index2 = np.searchsorted(self.plt_x, r1, side='right')
-
-                        mean = np.mean(y[index1:index2])
-                    else:
-                        if r1>r2:
-                            index1 = np.searchsorted(self.plt_x[::-1], r1, side='right')
-                            index2 = np.searchsorted(self.plt_x[::-1], r2, side='right')
-                        else:
-                            index1 = np.searchsorted(self.plt_x[::-1], r2, side='right')
-                            index2 = np.searchsorted(self.plt_x[::-1], r1, side='right')
-
-                        mean = np.mean(y[::-1][index1:index2])
-
-                    if mean<=0:
-                        r1 = 0
-                        r2 = 0
-
-                elif roots.size>2:
-                    max_diffs = np.argsort(abs(np.diff(roots)))[::-1]
-                    for rmax in max_diffs:
-                        r1 = roots[rmax]
-                        r2 = roots[rmax+1]
-
-                        if self.plt_x[1]>self.plt_x[0]:
-                            if r1<r2:
-                                index1 = np.searchsorted(self.plt_x, r1, side='right')
-                                index2 = np.searchsorted(self.plt_x, r2, side='right')
-                            else:
-                                index1 = np.searchsorted(self.plt_x, r2, side='right')
-                                index2 = np.searchsorted(self.plt_x, r1, side='right')
-
-                            mean = np.mean(y[index1:index2])
-                        else:
-                            if r1<r2:
-                                index1 = np.searchsorted(self.plt_x[::-1], r1, side='right')
-                                index2 = np.searchsorted(self.plt_x[::-1], r2, side='right')
-                            else:
-                                index1 = np.searchsorted(self.plt_x[::-1], r2, side='right')
-                                index2 = np.searchsorted(self.plt_x[::-1], r1, side='right')
-
-                            mean = np.mean(y[::-1][index1:index2])
-
-                        if mean>0:
-                            break
-                else:
-                    r1 = 0
-                    r2 = 0
-            except Exception:
-              r1 = 0
-              r2 = 0
-
-            fwhm = np.fabs(r2-r1)
+            fwhm = calc_fwhm(self.plt_x, ydata)
 
             if plot == 'plt':
-                if r1 < r2:
-                    self.fwhm = (fwhm, r1, r2)
-                else:
-                    self.fwhm = (fwhm, r2, r1)
+                self.fwhm = fwhm
 
                 if not self.show_fwhm.IsChecked() and self.fwhm_line is not None:
                     self.fwhm_line.remove()
                     self.fwhm_line = None
             else:
-                if r1 < r2:
-                    self.der_fwhm = (fwhm, r1, r2)
-                else:
-                    self.der_fwhm = (fwhm, r2, r1)
+                self.der_fwhm = fwhm
+
                 if not self.show_der_fwhm.IsChecked() and self.der_fwhm_line is not None:
                     self.der_fwhm_line.remove()
                     self.der_fwhm_line = None
@@ -2278,7 +2366,8 @@ class ScanPanel(wx.Panel):
             self.disp_fit_p1.SetLabel('')
             self.disp_fit_p2.SetLabel('')
 
-        elif self.plt_fit.GetStringSelection() == 'Gaussian':
+        elif (self.plt_fit.GetStringSelection() == 'Gaussian'
+            and self.plt_fitparams is not None):
             self.disp_fit_label1.SetLabel('Fit Center:')
             self.disp_fit_label2.SetLabel('Fit Std.:')
             self.disp_fit_p1.SetLabel(str(round(self.plt_fitparams[0][1],4)))
@@ -2290,7 +2379,8 @@ class ScanPanel(wx.Panel):
             self.disp_der_fit_p1.SetLabel('')
             self.disp_der_fit_p2.SetLabel('')
 
-        elif self.der_fit.GetStringSelection() == 'Gaussian':
+        elif (self.der_fit.GetStringSelection() == 'Gaussian'
+            and self.der_fitparams is not None):
             self.disp_der_fit_label1.SetLabel('Fit Center:')
             self.disp_der_fit_label2.SetLabel('Fit Std.:')
             self.disp_der_fit_p1.SetLabel(str(round(self.der_fitparams[0][1],4)))
@@ -2413,6 +2503,121 @@ def gaussian(x, A, cen, std):
     """
     return A*np.exp(-(x-cen)**2/(2*std**2))
 
+def calc_fwhm(x, ydata):
+    """
+    Calculates the full width at half max of a peak, using the roots of a
+    spline through the data at half of the maximum value.
+
+    :param list x: The x values.
+    :param list ydata: The y values.
+
+    :returns: The FWHM and the low and high positions of the half max points.
+        All are 0 if the FWHM couldn't be found.
+    :rtype: tuple
+    """
+    x = np.asarray(x)
+    ydata = np.asarray(ydata)
+    y = ydata - np.max(ydata)/2
+    if x[0]>x[1]:
+        spline = scipy.interpolate.UnivariateSpline(x[::-1], y[::-1], s=0)
+    else:
+        spline = scipy.interpolate.UnivariateSpline(x, y, s=0)
+
+    try:
+        roots = spline.roots()
+        if roots.size == 2:
+            r1 = roots[0]
+            r2 = roots[1]
+
+            if x[1]>x[0]:
+                if r1>r2:
+                    index1 = np.searchsorted(x, r1, side='right')
+                    index2 = np.searchsorted(x, r2, side='right')
+                else:
+                    index1 = np.searchsorted(x, r2, side='right')
+                    index2 = np.searchsorted(x, r1, side='right')
+
+                mean = np.mean(y[index1:index2])
+            else:
+                if r1>r2:
+                    index1 = np.searchsorted(x[::-1], r1, side='right')
+                    index2 = np.searchsorted(x[::-1], r2, side='right')
+                else:
+                    index1 = np.searchsorted(x[::-1], r2, side='right')
+                    index2 = np.searchsorted(x[::-1], r1, side='right')
+
+                mean = np.mean(y[::-1][index1:index2])
+
+            if mean<=0:
+                r1 = 0
+                r2 = 0
+
+        elif roots.size>2:
+            max_diffs = np.argsort(abs(np.diff(roots)))[::-1]
+            for rmax in max_diffs:
+                r1 = roots[rmax]
+                r2 = roots[rmax+1]
+
+                if x[1]>x[0]:
+                    if r1<r2:
+                        index1 = np.searchsorted(x, r1, side='right')
+                        index2 = np.searchsorted(x, r2, side='right')
+                    else:
+                        index1 = np.searchsorted(x, r2, side='right')
+                        index2 = np.searchsorted(x, r1, side='right')
+
+                    mean = np.mean(y[index1:index2])
+                else:
+                    if r1<r2:
+                        index1 = np.searchsorted(x[::-1], r1, side='right')
+                        index2 = np.searchsorted(x[::-1], r2, side='right')
+                    else:
+                        index1 = np.searchsorted(x[::-1], r2, side='right')
+                        index2 = np.searchsorted(x[::-1], r1, side='right')
+
+                    mean = np.mean(y[::-1][index1:index2])
+
+                if mean>0:
+                    break
+        else:
+            r1 = 0
+            r2 = 0
+    except Exception:
+        r1 = 0
+        r2 = 0
+
+    fwhm = np.fabs(r2-r1)
+
+    if r1 < r2:
+        return (fwhm, r1, r2)
+    else:
+        return (fwhm, r2, r1)
+
+def fit_gaussian(x, ydata):
+    """
+    Fits a gaussian to the data.
+
+    :param list x: The x values.
+    :param list ydata: The y values.
+
+    :returns: The x values of the fit curve, the fit curve, and the fit
+        parameters and covariance as a list, which is None if the fit failed.
+    :rtype: np.array, np.array, list
+    """
+    npts = int(100*(x[-1] - x[0])/(x[1] - x[0]))
+    fit_x = np.linspace(x[0], x[-1], npts)
+
+    try:
+        opt, cov = scipy.optimize.curve_fit(gaussian, x, ydata)
+        fit_y = gaussian(fit_x, opt[0], opt[1], opt[2])
+        fitparams = [opt, cov]
+
+    except RuntimeError:
+        fit_y = np.zeros_like(fit_x)
+        fitparams = None
+
+    return fit_x, fit_y, fitparams
+
 class CustomPlotToolbar(NavigationToolbar2WxAgg):
     """
     A custom plot toolbar that displays the cursor position on the plot
@@ -41,6 +41,7 @@ from io import open
 
 import time
 import logging
+from collections import deque
 
 if __name__ != '__main__':
     logger = logging.getLogger(__name__)
@@ -315,3 +316,177 @@ class PID(object):
         self._last_output = None
         self._last_input = None
         self._last_error = None
+
+
+class FixedRateExecutor(object):
+    """
+    Runs a control loop at a fixed rate. Tick deadlines are absolute,
+    counted from the start of the loop, so time spent in the loop body
+    doesn't add up as drift. If the body runs past one or more deadlines,
+    the missed ticks are skipped and the loop picks up at the next deadline.
+    Each tick records the jitter (how late the loop woke up after the
+    deadline) and the latency (how long the body took), and
+    :py:meth:`get_stats` gives statistics over the recent ticks.
+    """
+
+    def __init__(self, period, history=1000):
+        """
+        :param period: The loop period in s.
+        :param history: The number of recent ticks kept for the statistics.
+        """
+        self.period = period
+
+        self._jitter = deque(maxlen=history)
+        self._latency = deque(maxlen=history)
+        self._intervals = deque(maxlen=history)
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+
+        self._start_time = None
+        self._tick_num = 0
+        self._tick_time = None
+
+    def start(self):
+        """
+        Sets the current time as the first tick deadline, e.g. when the loop
+        is started or restarted after a pause.
+        """
+        self._start_time = time.monotonic()
+        self._tick_num = 0
+        self._tick_time = None
+
+    def wait_next(self, abort_event=None):
+        """
+        Waits for the next tick deadline.
+
+        :param threading.Event abort_event: If set, the wait ends early.
+
+        :returns: The time in s between the deadlines of the previous and
+            this tick, a whole number of periods, or 0 for the first tick
+            after :py:meth:`start`. None if aborted.
+        :rtype: float
+        """
+        if self._start_time is None:
+            self.start()
+
+        now = time.monotonic()
+
+        if self._tick_time is not None:
+            self._latency.append(now - self._tick_time)
+
+            next_num = self._tick_num + 1
+            deadline = self._start_time + next_num*self.period
+
+            if now > deadline:
+                # Overrun, skip to the next deadline not yet passed
+                missed = int((now - self._start_time)/self.period) + 1 - next_num
+                self.overruns += 1
+                self.skipped += missed
+                next_num += missed
+                deadline = self._start_time + next_num*self.period
+
+        else:
+            next_num = 0
+            deadline = self._start_time
+
+        remaining = deadline - time.monotonic()
+
+        if remaining > 0:
+            if abort_event is not None:
+                if abort_event.wait(remaining):
+                    return None
+            else:
+                time.sleep(remaining)
+
+        elif abort_event is not None and abort_event.is_set():
+            return None
+
+        now = time.monotonic()
+        self._jitter.append(now - deadline)
+
+        if self._tick_time is not None:
+            self._intervals.append(now - self._tick_time)
+            dt = (next_num - self._tick_num)*self.period
+        else:
+            dt = 0
+
+        self._tick_num = next_num
+        self._tick_time = now
+        self.ticks += 1
+
+        return dt
+
+    def run(self, step, abort_event, enable_event=None):
+        """
+        Runs the loop until aborted.
+
+        :param step: Function called every tick, with the time since the
+            previous tick as returned by :py:meth:`wait_next`.
+        :param threading.Event abort_event: Stops the loop when set.
+        :param threading.Event enable_event: If given, the loop is paused
+            while this isn't set, and restarts from a new first tick when it
+            is set again.
+        """
+        running = False
+
+        while not abort_event.is_set():
+            if enable_event is not None and not enable_event.is_set():
+                running = False
+                enable_event.wait(0.1)
+                continue
+
+            if not running:
+                self.start()
+                running = True
+
+            dt = self.wait_next(abort_event)
+
+            if dt is None:
+                break
+
+            step(dt)
+
+    def get_stats(self):
+        """
+        :returns: The number of ticks, overruns and skipped ticks since the
+            executor was made, and the mean, standard deviation and maximum
+            of the jitter, latency and tick interval in s over the recent
+            ticks.
+        :rtype: dict
+        """
+        stats = {
+            'ticks'     : self.ticks,
+            'overruns'  : self.overruns,
+            'skipped'   : self.skipped,
+            'period'    : self.period,
+            }
+
+        for name, values in [('jitter', self._jitter),
+            ('latency', self._latency), ('interval', self._intervals)]:
+            values = list(values)
+
+            if len(values) > 0:
+                mean = sum(values)/len(values)
+                std = (sum((val-mean)**2 for val in values)/len(values))**0.5
+                max_val = max(values)
+            else:
+                mean = 0
+                std = 0
+                max_val = 0
+
+            stats['{}_mean'.format(name)] = mean
+            stats['{}_std'.format(name)] = std
+            stats['{}_max'.format(name)] = max_val
+
+        return stats
+
+    def reset_stats(self):
+        self._jitter.clear()
+        self._latency.clear()
+        self._intervals.clear()
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
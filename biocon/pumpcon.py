@@ -27,6 +27,7 @@ import queue
 import logging
 import sys
 import copy
+import math
 import platform
 import datetime
 import ctypes
@@ -2154,13 +2155,100 @@ class HamiltonPSD6Pump(SyringePump):
         self.send_cmd(cmd)
 
 
+class FlowRampScheduler(object):
+    """
+    Plans a flow rate ramp as a short list of setpoint steps, for pumps that
+    have to be ramped by sending new flow rates over the serial link. The
+    steps follow the ideal ramp at the set acceleration, centered on it so
+    that the set flow rate is never further than max_error from the ideal
+    ramp, using as few steps as that allows. A step is at most half its size
+    from the ideal ramp, and rounding it to the resolution adds up to half
+    the resolution, so steps are 2*max_error - resolution. Steps are also
+    never closer together than the link allows, based on the measured
+    command round trip time, so that a ramp leaves time for other commands
+    on the same link. If both can't be met, the link limit wins and the
+    steps get bigger.
+    """
+    def __init__(self, resolution, max_error=None, max_link_use=0.25,
+        min_interval=0.05):
+        """
+        :param float resolution: The smallest flow rate change the pump
+            accepts, in pump base units.
+        :param float max_error: The largest allowed difference between the
+            set flow rate and the ideal ramp, in pump base units. If None or
+            less than the resolution, the resolution is used.
+        :param float max_link_use: Largest fraction of the link time the
+            ramp commands can use.
+        :param float min_interval: Minimum time between steps in s.
+        """
+        self.resolution = resolution
+        self.max_error = max(max_error if max_error is not None else resolution,
+            resolution)
+        self.max_link_use = max_link_use
+        self.min_interval = min_interval
+
+    def get_steps(self, start_rate, target_rate, accel, rtt=0):
+        """
+        :param float start_rate: The current flow rate.
+        :param float target_rate: The flow rate to ramp to.
+        :param float accel: The flow rate acceleration, in flow rate units
+            per minute. 0 goes straight to the target.
+        :param float rtt: The command round trip time in s. Each step is sent
+            half of this early, so it reaches the pump on time.
+
+        :returns: A list of (time, flow rate) tuples, with time in s from
+            the start of the ramp.
+        :rtype: list
+        """
+        delta = target_rate - start_rate
+
+        if delta == 0:
+            return []
+
+        if accel <= 0:
+            return [(0, target_rate)]
+
+        duration = abs(delta)/accel*60.
+
+        step_size = 2*self.max_error - self.resolution
+        num_steps = int(math.ceil(abs(delta)/step_size - 1e-9))
+
+        min_interval = max(self.min_interval, rtt/self.max_link_use)
+        max_steps = max(1, int(duration/min_interval))
+
+        if num_steps > max_steps:
+            logger.debug('Flow ramp limited to %i steps by the serial link, '
+                'error bound %f raised to %f', max_steps, self.max_error,
+                abs(delta)/max_steps/2 + self.resolution/2)
+            num_steps = max_steps
+
+        step_time = duration/num_steps
+        decimals = max(0, int(round(-math.log10(self.resolution))))
+
+        steps = []
+
+        for num in range(1, num_steps+1):
+            if num == num_steps:
+                rate = target_rate
+            else:
+                rate = round(start_rate + delta*num/num_steps, decimals)
+
+            if len(steps) > 0 and rate == steps[-1][1]:
+                continue
+
+            step_start = max(0, (num-0.5)*step_time - rtt/2.)
+            steps.append((step_start, rate))
+
+        return steps
+
+
 class SSINextGenPump(Pump):
     """
     Teledyne SSI Next Gen Pump communication control (e.g. Reaxus LD pumps).
     """
 
     def __init__(self, name, device, comm_lock=None, flow_rate_scale=1,
-        flow_rate_offset=0, scale_type='both'):
+        flow_rate_offset=0, scale_type='both', ramp_max_error=None):
         """
         This makes the initial serial connection, and then sets the MForce
         controller parameters to the correct values.
@@ -2170,9 +2258,15 @@ class SSINextGenPump(Pump):
 
         :param name: A unique identifier for the pump
         :type name: str
+
+        :param ramp_max_error: The largest difference in mL/min allowed
+            between the set flow rate and the ideal ramp when ramping the
+            flow rate. If None, the flow rate precision of the pump is used.
+        :type ramp_max_error: float
         """
 
         self._accel_stop = threading.Event()
+        self._cmd_rtt = 0 #Average command round trip time in s
         self._accel_change = threading.Event()
         self._flow_rate_lock = threading.Lock()
 
@@ -2250,6 +2344,9 @@ class SSINextGenPump(Pump):
 
         ret = self.send_cmd('LM1') #Detected leak does not cause fault
 
+        self._ramp_scheduler = FlowRampScheduler(10**-self._flow_rate_decimals,
+            ramp_max_error)
+
         self.get_status()
         self.get_faults()
 
@@ -2469,11 +2566,18 @@ class SSINextGenPump(Pump):
         logger.debug("Sending pump %s cmd %r", self.name, cmd)
 
         with self.comm_lock:
+            start = time.monotonic()
             ret = self.pump_comm.write(cmd, get_response, '\r', '/')
+            rtt = time.monotonic() - start
 
         if get_response:
             logger.debug("Pump %s returned %r", self.name, ret)
 
+            if self._cmd_rtt == 0:
+                self._cmd_rtt = rtt
+            else:
+                self._cmd_rtt = 0.8*self._cmd_rtt + 0.2*rtt
+
         return ret
 
     def is_moving(self):
@@ -2607,52 +2711,46 @@ class SSINextGenPump(Pump):
         while self._accel_stop.is_set():
             time.sleep(0.01)
 
-        if target_flow_rate > current_flow_rate:
-            mult = 1
-        else:
-            mult = -1
-
-        starting_flow_rate = copy.copy(current_flow_rate)
-
-        start_time = time.monotonic()
-        prev_time = time.monotonic()
-
         if self._flow_rate_acceleration == 0:
             self._send_flow_rate_cmd(target_flow_rate)
             current_flow_rate = target_flow_rate
 
         else:
-            while target_flow_rate != current_flow_rate:
+            # Only the planned steps are sent, the rest of the time the
+            # link is free for status queries
+            steps = self._ramp_scheduler.get_steps(current_flow_rate,
+                target_flow_rate, self._flow_rate_acceleration, self._cmd_rtt)
+            logger.debug('Ramping flow for pump %s in %i steps', self.name,
+                len(steps))
+
+            start_time = time.monotonic()
+            step_num = 0
+
+            while step_num < len(steps):
                 if self._accel_stop.is_set():
                     break
 
                 if self._accel_change.is_set():
-                    starting_flow_rate = current_flow_rate
+                    steps = self._ramp_scheduler.get_steps(current_flow_rate,
+                        target_flow_rate, self._flow_rate_acceleration,
+                        self._cmd_rtt)
                     start_time = time.monotonic()
+                    step_num = 0
                     self._accel_change.clear()
+                    continue
 
-                current_time = time.monotonic()
-
-                time_since_start = current_time - start_time
-                time_since_prev = current_time - prev_time
-
-                expected_flow_rate = starting_flow_rate + mult*self._flow_rate_acceleration*time_since_start/60
-                flow_rate_inc = mult*self._flow_rate_acceleration*time_since_prev/60
+                step_time, next_flow_rate = steps[step_num]
+                delay = start_time + step_time - time.monotonic()
 
-                if abs(expected_flow_rate - current_flow_rate) > abs(flow_rate_inc*1.1):
-                    next_flow_rate = current_flow_rate + flow_rate_inc*1.1
-                else:
-                    next_flow_rate = expected_flow_rate
-
-                if mult > 0 and next_flow_rate > target_flow_rate:
-                    next_flow_rate = target_flow_rate
-                elif mult < 0 and next_flow_rate < target_flow_rate:
-                    next_flow_rate = target_flow_rate
+                if delay > 0:
+                    # Wakes up at least every 0.1 s to check for changes
+                    self._accel_stop.wait(min(delay, 0.1))
+                    continue
 
                 self._send_flow_rate_cmd(next_flow_rate)
 
                 current_flow_rate = next_flow_rate
-                time.sleep(0.01) #Yield for other threads
+                step_num += 1
 
         self._ramping_flow = False
         self._accel_stop.clear()
@@ -3012,6 +3110,9 @@ class OB1Pump(Pump):
         self._PID.sample_time = self._pid_sample_time
         self._PID.output_limits = (self._min_pressure, self._max_pressure)
 
+        self._pid_executor = pid.FixedRateExecutor(self._pid_sample_time)
+        self._prev_dens = 0
+
         self._pid_on_evt = threading.Event()
         self._abort_pid_evt = threading.Event()
 
@@ -3282,29 +3383,29 @@ class OB1Pump(Pump):
         return pressure
 
     def run_PID(self):
-        prev_dens = 0
-        while True:
-            if self._abort_pid_evt.is_set():
-                break
+        self._pid_executor.run(self._PID_step, self._abort_pid_evt,
+            self._pid_on_evt)
 
-            if self._pid_on_evt.is_set():
-                start_t = time.monotonic()
+    def _PID_step(self, dt):
+        fr, dens, temp = self.get_fm_values()
 
-                fr, dens, temp = self.get_fm_values()
-
-                delta_t = time.monotonic() - start_t
+        if dens > 700 and (self._prev_dens/dens < 1.05 and self._prev_dens/dens > 0.95):
+            if dt > 0:
+                pressure = self._PID(fr, dt)
+            else:
+                pressure = self._PID(fr)
 
-                if dens > 700 and (prev_dens/dens < 1.05 and prev_dens/dens > 0.95):
-                    pressure = self._PID(fr)
-                    self._inner_set_pressure(pressure)
+            self._inner_set_pressure(pressure)
 
-                prev_dens = dens
+        self._prev_dens = dens
 
-                while time.monotonic() - start_t < self._pid_sample_time - delta_t:
-                    time.sleep(0.01)
-
-            else:
-                time.sleep(0.1)
+    def get_PID_stats(self):
+        """
+        :returns: The PID loop timing statistics, see
+            :py:meth:`pid.FixedRateExecutor.get_stats`.
+        :rtype: dict
+        """
+        return self._pid_executor.get_stats()
 
     def get_fm_values(self):
         with self._fm_comm_lock:
@@ -3943,12 +4044,8 @@ class SoftPump(Pump):
         self._units = 'mL/min'
         self._pump_base_units = 'mL/s'
 
-        self._dispensing_volume = 0
-        self._aspirating_volume = 0
-
-        self.sim_thread = threading.Thread(target=self._sim_flow)
-        self.sim_thread.daemon = True
-        self.sim_thread.start()
+        # Volume left to move in a dispense or aspirate, in mL
+        self._sim_ledger = utils.VolumeLedger()
 
     @property
     def flow_rate(self):
@@ -3970,6 +4067,9 @@ class SoftPump(Pump):
         rate = self._convert_flow_rate(rate, self.units, self._pump_base_units)
         self._flow_rate = rate
 
+        if self._is_dispensing or self._is_aspirating:
+            self._sim_ledger.set_flow_rate(self._flow_rate)
+
     def is_moving(self):
         """
         Queries the pump about whether or not it's moving.
@@ -3999,13 +4099,12 @@ class SoftPump(Pump):
         """
         vol = self._convert_volume(vol, units, self._pump_base_units.split('/')[0])
 
-        self._dispensing_volume = vol
         self._is_dispensing = True
         self._is_flowing = True
         self._is_aspirating = False
         self._flow_dir = 1
 
-        pass #Should be implimented in each subclass
+        self._start_sim_move(vol)
 
     def aspirate(self, vol, units='uL'):
         """
@@ -4019,39 +4118,32 @@ class SoftPump(Pump):
         """
         vol = self._convert_volume(vol, units, self._pump_base_units.split('/')[0])
 
-        self._aspirating_volume = vol
         self._is_aspirating = True
         self._is_flowing = True
         self._is_dispensing = False
         self._flow_dir = -1
 
-        pass #Should be implimented in each subclass
-
-    def _sim_flow(self):
-        previous_time = time.monotonic()
-
-        while self.connected:
-            flow_rate = self._flow_rate
+        self._start_sim_move(vol)
 
-            if self._is_dispensing:
-                delta_vol = flow_rate*(time.monotonic()-previous_time)
-                previous_time = time.monotonic()
-                self._dispensing_volume = self._dispensing_volume - delta_vol
+    def _start_sim_move(self, vol):
+        # The pump stops itself when the ledger predicts the volume is moved
+        self._sim_ledger.set_volume(vol)
+        self._sim_ledger.set_flow_rate(self._flow_rate)
+        self._sim_ledger.call_at_volume(0, self.stop, hold=True)
 
-                if self._dispensing_volume <= 0:
-                    self.stop()
-
-            elif self._is_aspirating:
-                delta_vol = flow_rate*(time.monotonic()-previous_time)
-                previous_time = time.monotonic()
-                self._aspirating_volume = self._aspirating_volume - delta_vol
-
-                if self._aspirating_volume <= 0:
-                    self.stop()
-            else:
-                previous_time = time.monotonic()
+    def get_remaining_volume(self):
+        """
+        :returns: The volume left to move in the current dispense or
+            aspirate, in the pump volume units.
+        :rtype: float
+        """
+        if self._is_dispensing or self._is_aspirating:
+            vol = max(0, self._sim_ledger.get_volume())
+        else:
+            vol = 0
 
-            time.sleep(0.1)
+        return self._convert_volume(vol, self._pump_base_units.split('/')[0],
+            self.units.split('/')[0])
 
     def stop(self):
         """Stops all pump flow."""
@@ -4060,10 +4152,13 @@ class SoftPump(Pump):
         self._is_aspirating = False
         self._flow_dir = 0
 
+        self._sim_ledger.cancel()
+        self._sim_ledger.set_flow_rate(0)
+
     def disconnect(self):
         """Close any communication connections"""
         self.connected = False
-        self.sim_thread.join()
+        self._sim_ledger.cancel()
 
 class SoftSyringePump(SyringePump):
     """
@@ -4079,6 +4174,9 @@ class SoftSyringePump(SyringePump):
         :param name: A unique identifier for the pump
         :type name: str
         """
+        # Volume in the syringe in mL, made first since the SyringePump init
+        # sets the volume
+        self._sim_ledger = utils.VolumeLedger()
 
         SyringePump.__init__(self, name, device, diameter, max_volume, max_rate,
             syringe_id, dual_syringe=False, comm_lock=comm_lock)
@@ -4088,13 +4186,6 @@ class SoftSyringePump(SyringePump):
         self._units = 'mL/min'
         self._pump_base_units = 'mL/s'
 
-        self._dispensing_volume = 0
-        self._aspirating_volume = 0
-
-        self.sim_thread = threading.Thread(target=self._sim_flow)
-        self.sim_thread.daemon = True
-        self.sim_thread.start()
-
     @property
     def flow_rate(self):
         """
@@ -4118,6 +4209,9 @@ class SoftSyringePump(SyringePump):
 
         self._flow_rate = rate
 
+        if self._is_dispensing:
+            self._sim_ledger.set_flow_rate(self._flow_rate)
+
     @property
     def refill_rate(self):
         """
@@ -4146,6 +4240,9 @@ class SoftSyringePump(SyringePump):
 
         self._refill_rate = rate
 
+        if self._is_aspirating:
+            self._sim_ledger.set_flow_rate(-self._refill_rate)
+
     @property
     def volume(self):
         volume = self._volume
@@ -4160,6 +4257,14 @@ class SoftSyringePump(SyringePump):
             self._pump_base_units.split('/')[0])
         self._volume = volume
 
+    @property
+    def _volume(self):
+        return self._sim_ledger.get_volume()
+
+    @_volume.setter
+    def _volume(self, volume):
+        self._sim_ledger.set_volume(volume)
+
     def is_moving(self):
         """
         Queries the pump about whether or not it's moving.
@@ -4211,12 +4316,16 @@ class SoftSyringePump(SyringePump):
             cont = False
 
         if cont:
-            self._dispensing_volume = vol
             self._is_dispensing = True
             self._is_flowing = True
             self._is_aspirating = False
             self._flow_dir = 1
 
+            # The pump stops itself when the ledger predicts the volume is moved
+            target = self._volume - vol
+            self._sim_ledger.set_flow_rate(self._flow_rate)
+            self._sim_ledger.call_at_volume(target, self.stop, hold=True)
+
     def aspirate_all(self):
         if self._is_flowing or self._is_dispensing or self._is_aspirating:
             logger.debug("Stopping pump %s current motion before aspirating", self.name)
@@ -4256,44 +4365,14 @@ class SoftSyringePump(SyringePump):
             cont = False
 
         if cont:
-            self._aspirating_volume = vol
             self._is_aspirating = True
             self._is_flowing = True
             self._is_dispensing = False
             self._flow_dir = -1
 
-    def _sim_flow(self):
-        previous_time = time.monotonic()
-
-        while self.connected:
-            if self._is_dispensing:
-                flow_rate = self._flow_rate
-
-                delta_vol = flow_rate*(time.monotonic()-previous_time)
-                previous_time = time.monotonic()
-                self._dispensing_volume = self._dispensing_volume - delta_vol
-
-                if self._dispensing_volume <= 0:
-                    self.stop()
-
-                self._volume = self._volume - delta_vol
-
-            elif self._is_aspirating:
-                flow_rate = self._refill_rate
-
-                delta_vol = flow_rate*(time.monotonic()-previous_time)
-                previous_time = time.monotonic()
-                self._aspirating_volume = self._aspirating_volume - delta_vol
-
-                if self._aspirating_volume <= 0:
-                    self.stop()
-
-                self._volume = self._volume + delta_vol
-
-            else:
-                previous_time = time.monotonic()
-
-            time.sleep(0.1)
+            target = self._volume + vol
+            self._sim_ledger.set_flow_rate(-self._refill_rate)
+            self._sim_ledger.call_at_volume(target, self.stop, hold=True)
 
     def set_pump_cal(self, diameter, max_volume, max_rate, syringe_id):
         self.diameter = diameter
@@ -4307,10 +4386,13 @@ class SoftSyringePump(SyringePump):
         self._is_dispensing = False
         self._is_aspirating = False
 
+        self._sim_ledger.cancel()
+        self._sim_ledger.set_flow_rate(0)
+
     def disconnect(self):
         """Close any communication connections"""
         self.connected = False
-        self.sim_thread.join()
+        self._sim_ledger.cancel()
 
 known_pumps = {
     'VICI M50'      : M50Pump,
@@ -4982,6 +5064,12 @@ class PumpCommThread(utils.CommManager):
 
         device = self._connected_devices[name]
 
+        settings = self._get_settings_inner(device)
+
+        self._return_value((name, cmd, settings), comm_name)
+        logger.debug("Pump %s settings are %s", name, settings)
+
+    def _get_settings_inner(self, device):
         try:
             max_pres = device.max_pressure
         except Exception:
@@ -5018,8 +5106,7 @@ class PumpCommThread(utils.CommManager):
             'syringe_id'    : syringe_id,
         }
 
-        self._return_value((name, cmd, settings), comm_name)
-        logger.debug("Pump %s settings are %s", name, settings)
+        return settings
 
     def _get_flow_dir(self, name, **kwargs):
         logger.debug("Getting pump %s flow direction", name)
@@ -5147,6 +5234,23 @@ class PumpCommThread(utils.CommManager):
 
         return status
 
+    def _get_device_snapshot(self, device, settings=False):
+        status = self._get_status_inner(device)
+
+        if settings:
+            status['settings'] = self._get_settings_inner(device)
+
+        return status
+
+    def _get_snapshot_status(self, state):
+        status = {key: val for key, val in state.items() if key != 'settings'}
+        status_vals = [('get_full_status', status)]
+
+        if 'settings' in state:
+            status_vals.append(('get_settings', state['settings']))
+
+        return status_vals
+
     def _send_pump_cmd(self, name, val, get_response=True, **kwargs):
         """
         This method can be used to send an arbitrary command to the pump.
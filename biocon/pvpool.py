@@ -0,0 +1,270 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import sys
+import threading
+import time
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+try:
+    import epics
+except Exception:
+    pass
+
+
+class PVPool(object):
+    """
+    A registry of EPICS PVs shared by the whole program. There is one PV
+    per name, however many panels ask for it, and the pool keeps the latest
+    value of each PV from its monitor. Reads are served from that cache if
+    the PV is connected and the value is recent enough, otherwise the PV is
+    read from the IOC and the cache updated.
+
+    The PVs are made by a factory function, ``epics.get_pv`` by default, so
+    the pool can be run with a simulated backend such as :py:class:`SoftPV`.
+    """
+    def __init__(self, pv_factory=None, max_age=60):
+        """
+        :param pv_factory: Function that takes a PV name and returns a PV
+            with the pyepics PV interface. If None, ``epics.get_pv`` is used.
+        :param float max_age: Default limit on the age in s of a cached
+            value. Older values are read again from the IOC. If the IOC
+            posts monitors only on change a constant value is never updated
+            in the cache, so this is how long a monitored value is trusted.
+        """
+        self.pv_factory = pv_factory
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._pvs = {}
+        self._cache = {}
+
+        self.cache_reads = 0
+        self.ioc_reads = 0
+
+    def get_pv(self, pv_name, timeout=5):
+        """
+        Gets the pool's PV for a name, making it the first time.
+
+        :param str pv_name: The PV name.
+        :param float timeout: Time in s to wait for the PV to connect. If
+            None, doesn't wait.
+
+        :returns: The PV.
+        """
+        with self._lock:
+            pv = self._pvs.get(pv_name, None)
+
+            if pv is None:
+                if self.pv_factory is None:
+                    pv = epics.get_pv(pv_name)
+                else:
+                    pv = self.pv_factory(pv_name)
+
+                self._add(pv_name, pv)
+
+        if timeout is not None and not pv.connected:
+            if not pv.wait_for_connection(timeout):
+                logger.error('Failed to connect to EPICS PV %s', pv_name)
+
+        return pv
+
+    def add_pv(self, pv):
+        """
+        Adds a PV made elsewhere, e.g. by a pyepics Device, to the pool. If
+        the pool already has a PV with that name, the pool's PV is returned.
+
+        :returns: The pool's PV.
+        """
+        with self._lock:
+            pool_pv = self._pvs.get(pv.pvname, None)
+
+            if pool_pv is None:
+                self._add(pv.pvname, pv)
+                pool_pv = pv
+
+        return pool_pv
+
+    def _add(self, pv_name, pv):
+        # Called with the lock held
+        self._pvs[pv_name] = pv
+        self._cache[pv_name] = {}
+
+        pv.connection_callbacks.append(self._on_connection)
+        pv.add_callback(self._on_value)
+
+    def get(self, pv, timeout=2, max_age=None, as_string=False):
+        """
+        Gets the value of a PV, from the cache if possible.
+
+        :param pv: The PV or PV name. A PV not in the pool is added to it.
+        :param float timeout: Time in s to wait if the PV is read from the
+            IOC.
+        :param float max_age: Maximum age in s of a cached value. If None,
+            the pool default is used. 0 always reads from the IOC.
+        :param bool as_string: If True, gets the string value.
+
+        :returns: The value, or None if the PV couldn't be read.
+        """
+        if isinstance(pv, str):
+            pv = self.get_pv(pv, None)
+        else:
+            pv = self.add_pv(pv)
+
+        if max_age is None:
+            max_age = self.max_age
+
+        key = 'char_value' if as_string else 'value'
+
+        with self._lock:
+            cached = self._cache[pv.pvname].get(key, None)
+
+            if (cached is not None and pv.connected
+                and time.monotonic() - cached[1] <= max_age):
+                self.cache_reads += 1
+                return cached[0]
+
+            self.ioc_reads += 1
+
+        value = pv.get(timeout=timeout, use_monitor=False, as_string=as_string)
+
+        if value is not None:
+            with self._lock:
+                self._cache[pv.pvname][key] = (value, time.monotonic())
+
+        return value
+
+    def invalidate(self, pv_name):
+        """
+        Drops the cached values of a PV, so the next read goes to the IOC.
+        """
+        with self._lock:
+            if pv_name in self._cache:
+                self._cache[pv_name] = {}
+
+    def _on_value(self, pvname=None, value=None, char_value=None, **kwargs):
+        # Runs in the channel access thread
+        now = time.monotonic()
+
+        with self._lock:
+            if pvname in self._cache and value is not None:
+                self._cache[pvname]['value'] = (value, now)
+
+                if char_value is not None:
+                    self._cache[pvname]['char_value'] = (char_value, now)
+
+    def _on_connection(self, pvname=None, conn=None, **kwargs):
+        if not conn:
+            logger.info('EPICS PV %s disconnected', pvname)
+            self.invalidate(pvname)
+
+
+class SoftPV(object):
+    """
+    A simulated PV with the parts of the pyepics PV interface used by the
+    pool, for testing without an IOC. Values set with :py:meth:`put` are
+    posted to the callbacks, and reads from the IOC are counted.
+    """
+    def __init__(self, pvname, value=0, connected=True):
+        self.pvname = pvname
+        self.connected = connected
+
+        self.callbacks = {}
+        self.connection_callbacks = []
+
+        self.gets = 0
+
+        self._value = value
+
+    def wait_for_connection(self, timeout=None):
+        return self.connected
+
+    def add_callback(self, callback, **kwargs):
+        index = len(self.callbacks) + 1
+        self.callbacks[index] = (callback, kwargs)
+
+        return index
+
+    def get(self, timeout=None, use_monitor=True, as_string=False):
+        self.gets += 1
+
+        if not self.connected:
+            return None
+
+        if as_string:
+            return str(self._value)
+
+        return self._value
+
+    def put(self, value, wait=False, timeout=None):
+        self._value = value
+
+        for callback, kwargs in list(self.callbacks.values()):
+            callback(pvname=self.pvname, value=value, char_value=str(value),
+                **kwargs)
+
+    def set_connected(self, connected):
+        self.connected = connected
+
+        for callback in self.connection_callbacks:
+            callback(pvname=self.pvname, conn=connected, pv=self)
+
+
+# The pool shared by the program
+pool = PVPool()
+
+
+if __name__ == '__main__':
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    h1 = logging.StreamHandler(sys.stdout)
+    h1.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s')
+    h1.setFormatter(formatter)
+    logger.addHandler(h1)
+
+    # Two panels checking the same four PVs before each of 100 exposures,
+    # with simulated PVs
+    soft_pool = PVPool(pv_factory=SoftPV, max_age=60)
+    names = ['18ID:vac1', '18ID:vac2', '18ID:shutter1', '18ID:shutter2']
+
+    for exp in range(100):
+        for panel in range(2):
+            for name in names:
+                soft_pool.get(name)
+
+        if exp == 50:
+            soft_pool.get_pv(names[0]).put(1)
+
+    print('PVs made: {}'.format(len(soft_pool._pvs)))
+    print('Reads from the cache {}, from the IOC {}'.format(soft_pool.cache_reads,
+        soft_pool.ioc_reads))
+    print('Monitored value: {}'.format(soft_pool.get(names[0])))
+
+    soft_pool.get_pv(names[0]).set_connected(False)
+    print('Value while disconnected: {}'.format(soft_pool.get(names[0])))
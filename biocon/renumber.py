@@ -0,0 +1,401 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import os
+import sys
+import time
+import threading
+import logging
+import select
+import struct
+import ctypes
+import ctypes.util
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+
+class RenameJob(object):
+    """
+    A set of renames in one directory, submitted to a :class:`FileRenamer`.
+    """
+    def __init__(self, data_dir, name_map, timeout, abort_event):
+        self.data_dir = data_dir
+        self.pending = dict(name_map)
+        self.timeout = timeout
+        self.abort_event = abort_event
+
+        self.num_files = len(name_map)
+        self.num_renamed = 0
+        self.timed_out = False
+
+        self.start_time = time.monotonic()
+        self.last_progress = self.start_time
+        self.end_time = None
+
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the job to finish.
+
+        :param float timeout: Maximum time to wait in s.
+
+        :returns: True if the job finished.
+        :rtype: bool
+        """
+        return self._done.wait(timeout)
+
+    def is_done(self):
+        return self._done.is_set()
+
+    @property
+    def throughput(self):
+        """The rename rate in files/s."""
+        if self.end_time is None:
+            end_time = time.monotonic()
+        else:
+            end_time = self.end_time
+
+        elapsed = end_time - self.start_time
+
+        if elapsed > 0:
+            rate = self.num_renamed/elapsed
+        else:
+            rate = 0
+
+        return rate
+
+    def _finish(self):
+        self.end_time = time.monotonic()
+        self._done.set()
+
+
+class FileRenamer(threading.Thread):
+    """
+    Renames detector frames as they're written. Jobs of old name: new name
+    pairs are submitted for a directory. Each pass lists the directory once,
+    and every pending file that is present is renamed with ``os.rename``,
+    which is atomic since both names are in the same directory.
+
+    On Linux, inotify close-write and moved-to events wake the thread as
+    soon as a frame is finished, and the directory is only listed when a
+    job is submitted and every rescan_interval s. Those periodic listings
+    also catch files written by another host over a network mount, which
+    don't generate inotify events. Without inotify the directory is listed
+    every poll_interval s.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+
+    def __init__(self, poll_interval=0.1, rescan_interval=1, use_inotify=True):
+        """
+        :param float poll_interval: Listing interval in s without inotify.
+        :param float rescan_interval: Listing interval in s with inotify.
+        :param bool use_inotify: Whether to use inotify, if available.
+        """
+        threading.Thread.__init__(self, name='FileRenamer')
+        self.daemon = True
+
+        self._poll_interval = poll_interval
+        self._rescan_interval = rescan_interval
+
+        self._jobs = []
+        self._scan_dirs = set()
+        self._last_scan = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self._wake_r, self._wake_w = os.pipe()
+
+        self._inotify_fd = None
+        self._watches = {}
+
+        if use_inotify:
+            libc_name = ctypes.util.find_library('c')
+
+            if libc_name is not None:
+                libc = ctypes.CDLL(libc_name, use_errno=True)
+
+                if hasattr(libc, 'inotify_init1'):
+                    fd = libc.inotify_init1(os.O_CLOEXEC)
+
+                    if fd >= 0:
+                        self._libc = libc
+                        self._inotify_fd = fd
+
+        self.use_inotify = self._inotify_fd is not None
+
+    def submit(self, data_dir, name_map, timeout=10, abort_event=None):
+        """
+        Submits a set of renames in one directory.
+
+        :param str data_dir: The directory the files are in.
+        :param dict name_map: Dictionary of current file name: new file name.
+        :param float timeout: The job finishes if no file has been renamed
+            for this long, in s. With 0 only files already present are
+            renamed.
+        :param threading.Event abort_event: If set, the job finishes.
+
+        :returns: The job, which can be waited on.
+        :rtype: RenameJob
+        """
+        data_dir = os.path.abspath(data_dir)
+        job = RenameJob(data_dir, name_map, timeout, abort_event)
+
+        with self._lock:
+            if self.use_inotify and data_dir not in self._watches.values():
+                wd = self._libc.inotify_add_watch(self._inotify_fd,
+                    os.fsencode(data_dir), self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+
+                if wd >= 0:
+                    self._watches[wd] = data_dir
+                else:
+                    logger.error('Failed to watch %s: %s', data_dir,
+                        os.strerror(ctypes.get_errno()))
+
+            self._jobs.append(job)
+            self._scan_dirs.add(data_dir)
+
+        os.write(self._wake_w, b'\0')
+
+        return job
+
+    def stop(self):
+        self._stop_event.set()
+
+        try:
+            os.write(self._wake_w, b'\0')
+        except OSError:
+            # Already stopped
+            pass
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                events = self._wait_for_events()
+                self._process(events)
+            except Exception:
+                logger.exception('Error renaming files')
+
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+        with self._lock:
+            jobs = self._jobs
+            self._jobs = []
+
+        for job in jobs:
+            job._finish()
+
+    def _wait_for_events(self):
+        fds = [self._wake_r]
+
+        if self.use_inotify:
+            fds.append(self._inotify_fd)
+
+        with self._lock:
+            if len(self._jobs) > 0:
+                timeout = self._poll_interval
+            else:
+                timeout = None
+
+        ready = select.select(fds, [], [], timeout)[0]
+
+        if self._wake_r in ready:
+            os.read(self._wake_r, 4096)
+
+        events = {}
+
+        if self.use_inotify and self._inotify_fd in ready:
+            data = os.read(self._inotify_fd, 65536)
+            offset = 0
+
+            while offset < len(data):
+                wd, mask, cookie, length = struct.unpack_from('iIII', data, offset)
+                offset += struct.calcsize('iIII')
+                name = os.fsdecode(data[offset:offset+length].rstrip(b'\0'))
+                offset += length
+
+                data_dir = self._watches.get(wd)
+
+                if data_dir is not None and name:
+                    events.setdefault(data_dir, set()).add(name)
+
+        return events
+
+    def _process(self, events):
+        now = time.monotonic()
+
+        with self._lock:
+            jobs = list(self._jobs)
+            job_dirs = set(job.data_dir for job in jobs)
+
+            scan_dirs = set()
+
+            for data_dir in job_dirs:
+                if (data_dir in self._scan_dirs or not self.use_inotify
+                    or now - self._last_scan.get(data_dir, 0) >= self._rescan_interval):
+                    scan_dirs.add(data_dir)
+                    self._scan_dirs.discard(data_dir)
+                    self._last_scan[data_dir] = now
+
+        for data_dir in job_dirs:
+            if data_dir in scan_dirs:
+                try:
+                    present = set(os.listdir(data_dir))
+                except OSError:
+                    present = set()
+            else:
+                present = events.get(data_dir, set())
+
+            if len(present) == 0:
+                continue
+
+            for job in jobs:
+                if job.data_dir == data_dir:
+                    self._rename_present(job, present, now)
+
+        finished = []
+
+        for job in jobs:
+            if len(job.pending) == 0:
+                finished.append(job)
+
+            elif job.abort_event is not None and job.abort_event.is_set():
+                finished.append(job)
+
+            elif now - job.last_progress >= job.timeout:
+                job.timed_out = job.timeout > 0
+                finished.append(job)
+
+        if len(finished) > 0:
+            with self._lock:
+                for job in finished:
+                    self._jobs.remove(job)
+
+                self._remove_unused_watches()
+
+            for job in finished:
+                job._finish()
+
+                if job.timed_out:
+                    logger.warning('Timed out renaming files in %s: %i of %i '
+                        'renamed', job.data_dir, job.num_renamed, job.num_files)
+
+                logger.debug('Renamed %i files in %s at %.0f files/s',
+                    job.num_renamed, job.data_dir, job.throughput)
+
+    def _rename_present(self, job, present, now):
+        if len(present) < len(job.pending):
+            ready = [name for name in present if name in job.pending]
+        else:
+            ready = [name for name in job.pending if name in present]
+
+        for name in ready:
+            new_name = job.pending.pop(name)
+
+            try:
+                os.rename(os.path.join(job.data_dir, name),
+                    os.path.join(job.data_dir, new_name))
+            except OSError:
+                # Already renamed, e.g. by an earlier job for the same files
+                continue
+
+            job.num_renamed += 1
+
+        if len(ready) > 0:
+            job.last_progress = now
+
+    def _remove_unused_watches(self):
+        if not self.use_inotify:
+            return
+
+        job_dirs = set(job.data_dir for job in self._jobs)
+
+        for wd, data_dir in list(self._watches.items()):
+            if data_dir not in job_dirs:
+                self._libc.inotify_rm_watch(self._inotify_fd, wd)
+                del self._watches[wd]
+
+
+if __name__ == '__main__':
+    # Renames frames from a synthetic detector writer in a temporary
+    # directory and reports the throughput
+    import tempfile
+    import shutil
+
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    h1 = logging.StreamHandler(sys.stdout)
+    h1.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s')
+    h1.setFormatter(formatter)
+    logger.addHandler(h1)
+
+    num_frames = 5000
+    frame_period = 0.0005
+
+    def write_frames(data_dir, fprefix, num_frames, frame_period, end_time):
+        for i in range(num_frames):
+            fname = os.path.join(data_dir, '{}_{:06d}.tif'.format(fprefix, i+1))
+            with open(fname, 'wb') as f:
+                f.write(b'\0'*1024)
+            time.sleep(frame_period)
+
+        end_time.append(time.monotonic())
+
+    for use_inotify in [True, False]:
+        data_dir = tempfile.mkdtemp()
+
+        renamer = FileRenamer(use_inotify=use_inotify)
+        renamer.start()
+
+        name_map = {'test_{:06d}.tif'.format(i+1): 'test_0001_{:06d}.tif'.format(i+1)
+            for i in range(num_frames)}
+
+        writer_end = []
+
+        writer = threading.Thread(target=write_frames, args=(data_dir, 'test',
+            num_frames, frame_period, writer_end))
+        writer.start()
+
+        job = renamer.submit(data_dir, name_map)
+        job.wait()
+        writer.join()
+
+        renamed = sum(1 for f in os.listdir(data_dir) if f.startswith('test_0001_'))
+
+        print('inotify: {}, renamed {} of {} frames, {:.0f} files/s, '
+            'finished {:.2f} s after the last frame'.format(renamer.use_inotify,
+            renamed, num_frames, job.throughput, job.end_time - writer_end[0]))
+
+        renamer.stop()
+        renamer.join()
+        shutil.rmtree(data_dir)
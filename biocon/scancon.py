@@ -181,6 +181,10 @@ class ScanPanel(wx.Panel):
             'num_scans' : self.num_scans.GetValue(),
             'total_steps' : tot_steps,
             'total_outer_loop_steps'    : tot_outer_loop,
+            'serpentine'    : self.settings['serpentine'],
+            'point_overhead': self.settings['point_overhead'],
+            'motor_ip'      : self.settings['newport_ip'],
+            'motor_port'    : self.settings['newport_port'],
             }
 
         valid = self.validate_scan_values(scan_values)
@@ -218,6 +222,15 @@ class ScanPanel(wx.Panel):
                     step_valid = False
                     error_list.append('step')
 
+                if params['backlash'] == '':
+                    params['backlash'] = 0
+
+                try:
+                    params['backlash'] = float(params['backlash'])
+                except Exception:
+                    step_valid = False
+                    error_list.append('backlash')
+
             if not start_valid or not stop_valid or not step_valid:
                 error_msg = ('Motor {} had invalid {} parameters.'.format(num,
                     ', '.join(error_list)))
@@ -364,6 +377,16 @@ class MotorPanel(wx.Panel):
         type_sizer.Add(self.motor_type, flag=wx.ALIGN_CENTER_VERTICAL|wx.LEFT,
             border=5)
 
+        self.backlash = wx.TextCtrl(advanced_parent, size=(60, -1), value='0',
+            validator=utils.CharValidator('float_neg'))
+        self.backlash.SetToolTip(('Backlash correction distance. Moves always '
+            'finish in the direction of its sign, 0 for no correction.'))
+
+        type_sizer.Add(wx.StaticText(advanced_parent, label='Backlash:'),
+            flag=wx.ALIGN_CENTER_VERTICAL)
+        type_sizer.Add(self.backlash, flag=wx.ALIGN_CENTER_VERTICAL|wx.LEFT,
+            border=5)
+
         self.newport_group = wx.TextCtrl(advanced_parent, size=(60,-1))
         self.newport_index = wx.TextCtrl(advanced_parent, size=(60,-1))
         self.newport_axes = wx.TextCtrl(advanced_parent, size=(60, -1))
@@ -475,6 +498,7 @@ class MotorPanel(wx.Panel):
         np_group = self.newport_group.GetValue()
         np_index = self.newport_index.GetValue()
         np_axes = self.newport_axes.GetValue()
+        backlash = self.backlash.GetValue()
 
         motor_params = {'motor' : motor,
             'start'     : start,
@@ -487,6 +511,7 @@ class MotorPanel(wx.Panel):
             'np_group'  : np_group,
             'np_index'  : np_index,
             'np_axes'   : np_axes,
+            'backlash'  : backlash,
             }
 
         return motor_params
@@ -571,6 +596,8 @@ if __name__ == '__main__':
         'newport_ip'            : '164.54.204.76',
         'newport_port'          : '5001',
         'show_advanced_options' : True,
+        'serpentine'            : False, #Inner motors reverse direction on alternate lines
+        'point_overhead'        : 0.02, #Estimated dead time per point not from motion, in s
         }
 
     app = wx.App()
@@ -0,0 +1,490 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+import numpy as np
+
+
+def get_axis_positions(start, stop, step):
+    """
+    Gets the positions of one scan axis, in scan order from start to stop.
+    The last step is dropped if it would go past stop.
+
+    :param float start: Start position.
+    :param float stop: Stop position.
+    :param float step: Step size, always positive.
+
+    :returns: The positions.
+    :rtype: np.array
+    """
+    if start < stop:
+        positions = np.arange(start, stop+step, step)
+
+        if positions[-1] > stop:
+            positions = positions[:-1]
+    else:
+        positions = np.arange(stop, start+step, step)
+
+        if positions[-1] > start:
+            positions = positions[:-1]
+
+        positions = positions[::-1]
+
+    return positions
+
+
+class ScanAxis(object):
+    """
+    One axis of a grid scan.
+    """
+    def __init__(self, name, motor, positions, backlash=0, speed=None,
+        settle_time=0, move_timeout=None):
+        """
+        :param str name: The axis name used in the log, e.g. 'm1'.
+        :param motor: The motor. It needs move_absolute, get_position
+            and stop methods, and either wait_for_move or is_busy.
+        :param np.array positions: Absolute positions in scan order.
+        :param float backlash: Backlash correction distance. The axis always
+            finishes a move in the direction of the sign of this value, moves
+            in the other direction first go past the target by this much.
+            0 turns backlash correction off.
+        :param float speed: The motor speed, used to estimate dead time. If
+            None the speed is read from the motor if possible.
+        :param float settle_time: Time to wait after each move in s.
+        :param float move_timeout: Maximum time in s to wait for each move.
+            If None, waits until the move is done.
+        """
+        self.name = name
+        self.motor = motor
+        self.positions = np.array(positions, dtype=float)
+        self.backlash = backlash
+        self.settle_time = settle_time
+        self.move_timeout = move_timeout
+
+        if speed is None:
+            try:
+                speed = float(motor.get_speed())
+            except Exception:
+                speed = None
+
+            if speed is not None and speed <= 0:
+                speed = None
+
+        self.speed = speed
+
+    def get_moves(self, current, target):
+        """
+        Gets the positions to move through to get from current to target,
+        with the backlash rule applied.
+
+        :returns: The list of absolute positions to move to, in order.
+        :rtype: list
+        """
+        if current is None or self.backlash == 0 or target == current:
+            return [target]
+
+        if np.sign(target - current) != np.sign(self.backlash):
+            return [target - self.backlash, target]
+
+        return [target]
+
+    def estimate_move_time(self, current, moves):
+        if self.speed is None or current is None:
+            return self.settle_time
+
+        distance = 0
+        for pos in moves:
+            distance += abs(pos - current)
+            current = pos
+
+        return distance/self.speed + self.settle_time
+
+
+class ScanPoint(object):
+    """
+    A point in a planned scan.
+    """
+    def __init__(self, index, indices, positions, moves, est_dead_time):
+        self.index = index
+        self.indices = indices
+        self.positions = positions
+        self.moves = moves
+        self.est_dead_time = est_dead_time
+        self.dead_time = None
+
+
+class ScanPlanner(object):
+    """
+    Plans an N dimensional grid scan up front. The first axis is the
+    outermost. The full point list is computed once, in serpentine order if
+    requested, with the moves each point needs (including backlash
+    correction) and an estimate of the dead time before its exposure. The
+    scan can then be run point by point with :py:meth:`move_to`, and the
+    actual dead time recorded with :py:meth:`set_dead_time` to compare with
+    the estimate.
+    """
+    def __init__(self, axes, serpentine=False, point_overhead=0):
+        """
+        :param list axes: A list of :py:class:`ScanAxis`, outermost first.
+        :param bool serpentine: If True, inner axes reverse direction on
+            alternate lines instead of returning to their start.
+        :param float point_overhead: Fixed dead time per point in s on top
+            of the moves, e.g. for arming the triggers.
+        """
+        self.axes = axes
+        self.serpentine = serpentine
+        self.point_overhead = point_overhead
+
+        self.points = []
+
+    def plan(self, start_positions=None):
+        """
+        Computes the point list.
+
+        :param list start_positions: The current axis positions, used for
+            the moves to the first point. If None, they're read from the
+            motors.
+
+        :returns: The list of :py:class:`ScanPoint`.
+        :rtype: list
+        """
+        if start_positions is None:
+            start_positions = [float(axis.motor.get_position()) for axis in self.axes]
+
+        current = list(start_positions)
+        self.start_positions = list(start_positions)
+        self.points = []
+
+        for index, indices in enumerate(self._get_indices()):
+            positions = OrderedDict()
+            moves = []
+            est_dead_time = self.point_overhead
+
+            for num, axis in enumerate(self.axes):
+                target = float(axis.positions[indices[num]])
+                positions[axis.name] = target
+
+                if current[num] is None or target != current[num]:
+                    axis_moves = axis.get_moves(current[num], target)
+                    moves.append((num, axis_moves))
+                    est_dead_time += axis.estimate_move_time(current[num], axis_moves)
+                    current[num] = target
+
+            self.points.append(ScanPoint(index, indices, positions, moves,
+                est_dead_time))
+
+        return self.points
+
+    def _get_indices(self):
+        sizes = [len(axis.positions) for axis in self.axes]
+        forward = [True]*len(sizes)
+
+        def walk(level):
+            if forward[level]:
+                line = range(sizes[level])
+            else:
+                line = range(sizes[level]-1, -1, -1)
+
+            for i in line:
+                if level == len(sizes)-1:
+                    yield (i,)
+                else:
+                    for rest in walk(level+1):
+                        yield (i,) + rest
+
+                    if self.serpentine:
+                        forward[level+1] = not forward[level+1]
+
+        if len(sizes) > 0 and min(sizes) > 0:
+            for indices in walk(0):
+                yield indices
+
+    def get_segments(self, frames_per_point, max_frames=None):
+        """
+        Splits the point list into consecutive segments that each fit in
+        one detector and counter acquisition.
+
+        :param int frames_per_point: Frames collected at each point.
+        :param int max_frames: Maximum frames per acquisition, or None for
+            no limit.
+
+        :returns: A list of point lists.
+        :rtype: list
+        """
+        if max_frames is None or len(self.points)*frames_per_point <= max_frames:
+            return [self.points]
+
+        points_per_segment = max(1, max_frames//frames_per_point)
+
+        return [self.points[i:i+points_per_segment] for i in
+            range(0, len(self.points), points_per_segment)]
+
+    def move_to(self, point, abort_event=None):
+        """
+        Does the moves for a point, outermost axis first, and waits for
+        each one to finish.
+
+        :param ScanPoint point: The point.
+        :param threading.Event abort_event: If set, motion stops.
+
+        :returns: False if aborted, otherwise True.
+        :rtype: bool
+        """
+        for num, axis_moves in point.moves:
+            axis = self.axes[num]
+
+            for pos in axis_moves:
+                if not self._move_axis(axis, pos, abort_event):
+                    return False
+
+            if axis.settle_time > 0:
+                time.sleep(axis.settle_time)
+
+        return True
+
+    def return_to_start(self, abort_event=None, wait=True):
+        """
+        Moves all axes back to the positions they had when the scan was
+        planned, with the backlash rule applied.
+
+        :param threading.Event abort_event: If set, motion stops.
+        :param bool wait: If False, all axes are sent straight to their start
+            positions without waiting or backlash correction, e.g. after an
+            abort.
+
+        :returns: False if aborted, otherwise True.
+        :rtype: bool
+        """
+        if not wait:
+            for axis, pos in zip(self.axes, self.start_positions):
+                axis.motor.move_absolute(pos)
+
+            return True
+
+        for axis, pos in zip(self.axes, self.start_positions):
+            current = float(axis.motor.get_position())
+
+            for move_pos in axis.get_moves(current, pos):
+                if not self._move_axis(axis, move_pos, abort_event):
+                    return False
+
+        return True
+
+    def _move_axis(self, axis, pos, abort_event):
+        axis.motor.move_absolute(pos)
+
+        return self._wait_for_axis(axis, abort_event)
+
+    def _wait_for_axis(self, axis, abort_event):
+        if hasattr(axis.motor, 'wait_for_move'):
+            done = axis.motor.wait_for_move(axis.move_timeout, abort_event)
+        else:
+            done = self._poll_axis(axis, abort_event)
+
+        if not done:
+            axis.motor.stop()
+
+            if abort_event is None or not abort_event.is_set():
+                logger.error('Scan axis %s timed out after %s s', axis.name,
+                    axis.move_timeout)
+
+        return done
+
+    def _poll_axis(self, axis, abort_event):
+        # For motors without wait_for_move, e.g. MX records
+        start = time.monotonic()
+
+        while axis.motor.is_busy():
+            if (axis.move_timeout is not None
+                and time.monotonic() - start >= axis.move_timeout):
+                return False
+
+            if abort_event is not None:
+                if abort_event.wait(0.01):
+                    return False
+            else:
+                time.sleep(0.01)
+
+        return True
+
+    def set_dead_time(self, point, dead_time):
+        """
+        Records the measured dead time for a point.
+
+        :param ScanPoint point: The point.
+        :param float dead_time: Time in s from the end of the previous
+            point's exposure to the start of this one.
+        """
+        point.dead_time = dead_time
+
+    def get_dead_time_summary(self):
+        """
+        :returns: Total estimated and actual dead time and the number of
+            points with a measured dead time.
+        :rtype: dict
+        """
+        measured = [point for point in self.points if point.dead_time is not None]
+
+        summary = {
+            'num_points'    : len(self.points),
+            'num_measured'  : len(measured),
+            'estimated'     : sum([point.est_dead_time for point in measured]),
+            'actual'        : sum([point.dead_time for point in measured]),
+            }
+
+        if len(measured) > 0:
+            summary['estimated_per_point'] = summary['estimated']/len(measured)
+            summary['actual_per_point'] = summary['actual']/len(measured)
+        else:
+            summary['estimated_per_point'] = 0
+            summary['actual_per_point'] = 0
+
+        return summary
+
+    def log_dead_time(self):
+        summary = self.get_dead_time_summary()
+
+        logger.info(('Scan dead time for %i of %i points: estimated %.3f s '
+            '(%.3f s/point), actual %.3f s (%.3f s/point)'), summary['num_measured'],
+            summary['num_points'], summary['estimated'],
+            summary['estimated_per_point'], summary['actual'],
+            summary['actual_per_point'])
+
+
+class SoftMotor(object):
+    """
+    A simulated motor that moves at a constant speed, for testing scans
+    without hardware.
+    """
+    def __init__(self, name, position=0, speed=1):
+        self.name = name
+        self.speed = speed
+
+        self._start_pos = position
+        self._target = position
+        self._start_time = time.monotonic()
+
+        self.move_history = []
+
+    def get_position(self):
+        elapsed = time.monotonic() - self._start_time
+        distance = self._target - self._start_pos
+
+        if abs(distance) <= self.speed*elapsed:
+            return self._target
+
+        return self._start_pos + np.sign(distance)*self.speed*elapsed
+
+    def get_speed(self):
+        return self.speed
+
+    def move_absolute(self, position):
+        self._start_pos = self.get_position()
+        self._target = float(position)
+        self._start_time = time.monotonic()
+        self.move_history.append(float(position))
+
+    def is_busy(self):
+        return self.get_position() != self._target
+
+    def wait_for_move(self, timeout=None, abort_event=None):
+        start = time.monotonic()
+
+        while self.is_busy():
+            elapsed = time.monotonic() - self._start_time
+            wait_time = abs(self._target - self._start_pos)/self.speed - elapsed
+
+            if timeout is not None:
+                time_left = timeout - (time.monotonic() - start)
+
+                if time_left <= 0:
+                    return False
+
+                wait_time = min(wait_time, time_left)
+
+            wait_time = max(wait_time, 0)
+
+            if abort_event is not None:
+                if abort_event.wait(wait_time):
+                    return False
+            else:
+                time.sleep(wait_time)
+
+        return True
+
+    def stop(self):
+        pos = self.get_position()
+        self._start_pos = pos
+        self._target = pos
+
+
+if __name__ == '__main__':
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    h1 = logging.StreamHandler(sys.stdout)
+    h1.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s')
+    h1.setFormatter(formatter)
+    logger.addHandler(h1)
+
+    # Plans and runs a 3 x 5 serpentine grid with soft motors, backlash
+    # correction on the outer axis, and a simulated exposure at each point
+    m1 = SoftMotor('m1', speed=20)
+    m2 = SoftMotor('m2', speed=50)
+
+    axes = [
+        ScanAxis('m1', m1, get_axis_positions(0, 1, 0.5), backlash=0.1),
+        ScanAxis('m2', m2, get_axis_positions(0, 2, 0.5)),
+        ]
+
+    planner = ScanPlanner(axes, serpentine=True, point_overhead=0.001)
+    points = planner.plan()
+
+    for point in points:
+        print(point.index, point.indices, dict(point.positions), point.moves,
+            '{:.3f}'.format(point.est_dead_time))
+
+    exp_end = time.monotonic()
+
+    for point in points:
+        planner.move_to(point)
+        exp_start = time.monotonic()
+        planner.set_dead_time(point, exp_start - exp_end)
+
+        time.sleep(0.01)
+        exp_end = time.monotonic()
+
+    planner.return_to_start()
+    planner.log_dead_time()
+
+    print('m1 moves: {}'.format(m1.move_history))
+    print('m2 moves: {}'.format(m2.move_history))
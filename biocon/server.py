@@ -76,6 +76,8 @@ class ControlServer(threading.Thread):
         self._device_control = {
             }
 
+        self._snapshot_groups = {}
+
         self._stop_event = threading.Event()
         self.ready_event = threading.Event()
 
@@ -275,6 +277,9 @@ class ControlServer(threading.Thread):
 
                             if device_cmd[0] == 'ping':
                                 answer = 'ping received'
+                            elif device_cmd[0] == 'snapshot':
+                                answer = self._get_snapshot(*device_cmd[1],
+                                    **device_cmd[2])
                             else:
                                 answer = ''
 
@@ -407,6 +412,35 @@ class ControlServer(threading.Thread):
 
         logger.info("Quitting control thread: %s", self.name)
 
+    def _get_snapshot(self, group, names=None, options=None):
+        if group in self._snapshot_groups:
+            devices = self._snapshot_groups[group]
+
+            if names is not None:
+                # Only the requested device types and names
+                devices = {dev_type: (devices[dev_type][0], dev_names)
+                    for dev_type, dev_names in names.items() if dev_type in devices}
+
+            snapshot = utils.get_snapshot(devices, options)
+        else:
+            logger.error('Unknown snapshot group %s', group)
+            snapshot = None
+
+        return (group, 'snapshot', snapshot)
+
+    def add_snapshot_group(self, group, devices):
+        """
+        Adds a named group of devices for the snapshot command, which returns
+        the state of all the devices in the group in one response.
+
+        :param str group: The group name.
+        :param dict devices: Keys are device types (e.g. 'pump'), values are
+            a tuple of the communication thread for that type and a list of
+            device names, or None for all of its connected devices. The
+            threads may belong to other servers.
+        """
+        self._snapshot_groups[group] = devices
+
     def add_comm_to_thread(self, device, name, cmd_q, return_q, status_q):
         thread = self._device_control[device]['thread']
 
@@ -737,6 +771,14 @@ if __name__ == '__main__':
         control_server_fm.ready_event.wait()
         control_server_valve.ready_event.wait()
 
+        # The TR-SAXS flow panel reads all the devices at once through the
+        # pump server
+        control_server_pump.add_snapshot_group('trsaxs', {
+            'pump'  : (control_server_pump.get_comm_thread('pump'), None),
+            'fm'    : (control_server_fm.get_comm_thread('fm'), None),
+            'valve' : (control_server_valve.get_comm_thread('valve'), None),
+            })
+
         fm_comm_thread = control_server_fm.get_comm_thread('fm')
 
         fm_settings = {
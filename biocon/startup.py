@@ -0,0 +1,163 @@
+# coding: utf-8
+#
+#    Project: BioCAT user beamline control software (BioCON)
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import importlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
+
+
+class StartupProfiler(object):
+    """
+    Records where the time goes while the control software starts up, broken
+    down by component and by stage: module import, device connection and
+    panel construction. Stages can be nested, e.g. a panel connecting its
+    devices while it's built, and each stage is only charged the time not
+    spent in the stages nested in it. Only the thread that made the
+    profiler is recorded, measurements from other threads are ignored, and
+    nothing is recorded once startup is finished, e.g. panels opened later.
+    """
+
+    stages = ('import', 'device', 'panel')
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+
+        self.times = OrderedDict()
+        self.marks = OrderedDict()
+
+        self._stack = []
+        self._thread = threading.current_thread()
+        self._finished = False
+
+    @contextmanager
+    def measure(self, component=None, stage='panel'):
+        """
+        Times the enclosed block.
+
+        :param str component: The component, e.g. 'exposure'. If None, the
+            time goes to the component of the enclosing measurement, for
+            use by panels and devices that don't know their component name.
+        :param str stage: One of 'import', 'device' or 'panel'.
+        """
+        if self._finished or threading.current_thread() is not self._thread:
+            yield
+            return
+
+        if component is None:
+            if len(self._stack) > 0:
+                component = self._stack[-1][0]
+            else:
+                component = 'other'
+
+        entry = [component, stage, 0]
+        self._stack.append(entry)
+        start = time.monotonic()
+
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self._stack.pop()
+
+            if len(self._stack) > 0:
+                self._stack[-1][2] += elapsed
+
+            comp_times = self.times.setdefault(component,
+                OrderedDict((name, 0.) for name in self.stages))
+            comp_times[stage] = comp_times.get(stage, 0) + elapsed - entry[2]
+
+    def import_module(self, name, component=None):
+        """
+        Imports a module, timing it as the import stage of the component.
+
+        :param str name: The module name.
+        :param str component: The component the import is for. If None,
+            the module name is used.
+
+        :returns: The module.
+        """
+        if component is None:
+            component = name
+
+        with self.measure(component, 'import'):
+            module = importlib.import_module(name)
+
+        return module
+
+    def mark(self, name):
+        """
+        Records the time since startup for an event, e.g. the window being
+        shown.
+        """
+        self.marks[name] = time.monotonic() - self.start_time
+
+    def finish(self):
+        """
+        Stops recording, once startup is done. Measurements already in
+        progress are still recorded.
+        """
+        self._finished = True
+
+    def get_report(self):
+        """
+        :returns: A table of the time in each stage for each component,
+            with totals, followed by the marks.
+        :rtype: str
+        """
+        lines = ['{:<16}'.format('Startup (s)') + ''.join('{:>9}'.format(stage)
+            for stage in self.stages) + '{:>9}'.format('total')]
+
+        totals = OrderedDict((stage, 0.) for stage in self.stages)
+
+        for component, comp_times in self.times.items():
+            lines.append('{:<16}'.format(component) + ''.join('{:>9.3f}'.format(
+                comp_times[stage]) for stage in self.stages)
+                + '{:>9.3f}'.format(sum(comp_times.values())))
+
+            for stage in self.stages:
+                totals[stage] += comp_times[stage]
+
+        lines.append('{:<16}'.format('all') + ''.join('{:>9.3f}'.format(
+            totals[stage]) for stage in self.stages)
+            + '{:>9.3f}'.format(sum(totals.values())))
+
+        for name, elapsed in self.marks.items():
+            lines.append('{} after {:.3f} s'.format(name, elapsed))
+
+        return '\n'.join(lines)
+
+    def log_report(self):
+        logger.info('Startup timing:\n%s', self.get_report())
+
+
+# The profiler for this process, started when the module is first imported.
+# Imported by biocon first thing so the start time is the launch time.
+profiler = StartupProfiler()
@@ -42,6 +42,7 @@ except Exception:
     pass
 
 import utils
+import pvpool
 import custom_epics_widgets
 
 class ToastMotorPanel(utils.DevicePanel):
@@ -102,13 +103,9 @@ class ToastMotorPanel(utils.DevicePanel):
         self._status_pv_trans = {'0': 'Not Toasting', '1': 'Toasting'}
 
     def _initialize_pv(self, pv_name):
-        pv = epics.get_pv(pv_name)
-        connected = pv.wait_for_connection(5)
+        pv = pvpool.pool.get_pv(pv_name, 5)
 
-        if not connected:
-            logger.error('Failed to connect to EPICS PV %s on startup', pv_name)
-
-        return pv, connected
+        return pv, pv.connected
 
     @EpicsFunction
     def _init_device(self, settings):
@@ -534,15 +531,15 @@ class ToastMotorPanel(utils.DevicePanel):
 
         name = self.settings['device_data']['name']
 
-        units = self.motor_egu_pv.get(as_string=True)
+        units = pvpool.pool.get(self.motor_egu_pv, as_string=True)
 
-        status_val = self.status_pv.get(as_string=True)
+        status_val = pvpool.pool.get(self.status_pv, as_string=True)
         status = self._status_pv_trans[status_val]
 
         metadata['{} state:'.format(name)] = status
-        metadata['{} high endpoint ({}):'.format(name, units)] = self.high_pv.get(as_string=True)
-        metadata['{} low endpoint ({}):'.format(name, units)] = self.low_pv.get(as_string=True)
-        metadata['{} speed ({}/s):'.format(name, units)] = self.motor_speed_pv.get(as_string=True)
+        metadata['{} high endpoint ({}):'.format(name, units)] = pvpool.pool.get(self.high_pv, as_string=True)
+        metadata['{} low endpoint ({}):'.format(name, units)] = pvpool.pool.get(self.low_pv, as_string=True)
+        metadata['{} speed ({}/s):'.format(name, units)] = pvpool.pool.get(self.motor_speed_pv, as_string=True)
 
         return metadata
 
@@ -48,6 +48,8 @@ import valvecon
 import client
 import XPS_C8_drivers as xps_drivers
 import utils
+import center_crl
+import startup
 
 class TRScanPanel(wx.Panel):
     """
@@ -627,17 +629,8 @@ class TRScanPanel(wx.Panel):
                     mtr_positions = gridpoints
 
                 for current_run in range(1, num_runs+1):
-                    start = time.time()
-                    timeout = False
-                    while not motor.is_moving() and not timeout:
-                        time.sleep(0.001) #Waits for motion to start
-                        if time.time()-start>0.1:
-                            timeout = True
-
-                    while motor.is_moving():
-                        if self._abort_event.is_set():
-                            break
-                        time.sleep(0.001)
+                    motor.wait_for_move_start(0.1, self._abort_event)
+                    motor.wait_for_move(abort_event=self._abort_event)
 
                     if self._abort_event.is_set():
                         break
@@ -686,18 +679,8 @@ class TRScanPanel(wx.Panel):
 
         self.test_scan.SetLabel('Run test')
 
-        start = time.time()
-        timeout = False
-        while not motor.is_moving() and not timeout:
-            time.sleep(0.001) #Waits for motion to start
-            if time.time()-start>0.5:
-                timeout = True
-
-        while motor.is_moving():
-            if self._abort_event.is_set():
-                break
-
-            time.sleep(0.001)
+        motor.wait_for_move_start(0.5, self._abort_event)
+        motor.wait_for_move(abort_event=self._abort_event)
 
         motor_con.stop()
         motor_con.join()
@@ -705,17 +688,8 @@ class TRScanPanel(wx.Panel):
     def _run_test_inner(self, motor, motor_type, motor_cmd_q, vect_scan_speed,
         vect_scan_accel, vect_return_speed, vect_return_accel, x_motor, y_motor,
         x_start, x_end, y_start, y_end, current_run, pco_direction):
-        start = time.time()
-        timeout = False
-        while not motor.is_moving() and not timeout:
-            time.sleep(0.001) #Waits for motion to start
-            if time.time()-start>0.1:
-                timeout = True
-
-        while motor.is_moving():
-            if self._abort_event.is_set():
-                return
-            time.sleep(0.001)
+        motor.wait_for_move_start(0.1, self._abort_event)
+        motor.wait_for_move(abort_event=self._abort_event)
 
         if self._abort_event.is_set():
             return
@@ -739,17 +713,8 @@ class TRScanPanel(wx.Panel):
 
         motor_cmd_q.append(('move_absolute', ('TR_motor', (x_end, y_end)), {}))
 
-        start = time.time()
-        timeout = False
-        while not motor.is_moving() and not timeout:
-            time.sleep(0.001) #Waits for motion to start
-            if time.time()-start>0.5:
-                timeout = True
-
-        while motor.is_moving():
-            if self._abort_event.is_set():
-                break
-            time.sleep(0.001)
+        motor.wait_for_move_start(0.5, self._abort_event)
+        motor.wait_for_move(abort_event=self._abort_event)
 
         if motor_type == 'Newport_XPS':
             if pco_direction == 'x':
@@ -1973,6 +1938,10 @@ class TRScanPanel(wx.Panel):
                 'scan_start'    : scan_start,
                 'scan_stop'     : scan_stop,
                 'shutter_pvs'   : shutter_pvs,
+                'adaptive'      : self.settings['center_adaptive'],
+                'fly_scan'      : self.settings['center_fly_scan'],
+                'mcs_pv'        : self.settings['center_mcs_pv'],
+                'mcs_channel'   : self.settings['center_mcs_channel'],
                 'motor_x_name'  : self.settings['motor_x_name'],
                 'motor_y_name'  : self.settings['motor_y_name'],
             }
@@ -1997,6 +1966,10 @@ class TRScanPanel(wx.Panel):
         scan_start = scan_settings['scan_start']
         scan_stop = scan_settings['scan_stop']
         shutter_pvs = scan_settings['shutter_pvs']
+        adaptive = scan_settings['adaptive']
+        fly = scan_settings['fly_scan']
+        mcs_pv_name = scan_settings['mcs_pv']
+        mcs_channel = scan_settings['mcs_channel']
 
         motor_type = scan_settings['motor_type']
         motor = scan_settings['motor']
@@ -2047,11 +2020,20 @@ class TRScanPanel(wx.Panel):
         else:
             motor.move_absolute((alt_pos, start))
 
-        if start < stop:
-            mtr1_positions = np.arange(start, stop+step, step)
+        if fly:
+            positions = []
+        elif adaptive:
+            scan = center_crl.AdaptiveScan(start, stop, step, fw_height)
+            positions = scan.get_next_positions()
         else:
-            mtr1_positions = np.arange(stop, start+step, step)
-            mtr1_positions = mtr1_positions[::-1]
+            if start < stop:
+                mtr1_positions = np.arange(start, stop+step, step)
+            else:
+                mtr1_positions = np.arange(stop, start+step, step)
+                mtr1_positions = mtr1_positions[::-1]
+
+            scaler_vals = np.zeros_like(mtr1_positions)
+            positions = list(enumerate(mtr1_positions))
 
         count_time.put(meas_time)
 
@@ -2060,35 +2042,45 @@ class TRScanPanel(wx.Panel):
             wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
             return
 
-        scaler_vals = np.zeros_like(mtr1_positions)
-
         for shutter in shutter_pvs:
             open_val = shutter['open']
             pv = shutter['pv']
             pv.put(open_val)
 
         print('Centering mixer channel')
-        for num, mtr1_pos in enumerate(mtr1_positions):
-            if mtr1_pos != mtr1_positions[0]:
-                # logger.info('Moving motor 1 position to {}'.format(mtr1_pos))
-                motor.move_positioner_absolute(scan_positioner,
-                    scan_mindex, mtr1_pos)
-            # mtr1.wait_for_motor_stop()
-            # if not motor.is_moving():
-            #     while not motor.is_moving():
-            #         time.sleep(0.01)
-            #         if self._centering_abort_event.is_set():
-            #             motor.stop()
-            #             for shutter in shutter_pvs:
-            #                 close_val = shutter['close']
-            #                 pv = shutter['pv']
-            #                 pv.put(close_val)
-            #             wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
-            #             return
-
-
-            while motor.is_moving():
-                time.sleep(0.01)
+
+        if fly:
+            fly_start = time.time()
+
+            mtr1_positions, scaler_vals = center_crl.fly_scan(motor,
+                scan_positioner, scan_mindex, start, stop, step, meas_time,
+                mcs_pv_name, mcs_channel, accel, speed,
+                self._centering_abort_event)
+
+            if mtr1_positions is None:
+                self.centering_done_event.set()
+                for shutter in shutter_pvs:
+                    close_val = shutter['close']
+                    pv = shutter['pv']
+                    pv.put(close_val)
+                wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
+                return
+
+            print('Fly scan measured {} points in {:.1f} s'.format(
+                len(mtr1_positions), time.time()-fly_start))
+
+        first_point = True
+
+        while len(positions) > 0:
+            for index, mtr1_pos in positions:
+                if not first_point:
+                    # logger.info('Moving motor 1 position to {}'.format(mtr1_pos))
+                    motor.move_positioner_absolute(scan_positioner,
+                        scan_mindex, mtr1_pos)
+                first_point = False
+
+                motor.wait_for_move(abort_event=self._centering_abort_event)
+
                 if self._centering_abort_event.is_set():
                     motor.stop()
                     self.centering_done_event.set()
@@ -2099,30 +2091,63 @@ class TRScanPanel(wx.Panel):
                     wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
                     return
 
-            count_start.put(1,wait=True)
+                count_start.put(1,wait=True)
 
-            while count_start.get() != 0:
-                time.sleep(0.01)
-                if self._centering_abort_event.is_set():
-                    self.centering_done_event.set()
-                    for shutter in shutter_pvs:
-                        close_val = shutter['close']
-                        pv = shutter['pv']
-                        pv.put(close_val)
-                    wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
-                    return
+                while count_start.get() != 0:
+                    time.sleep(0.01)
+                    if self._centering_abort_event.is_set():
+                        self.centering_done_event.set()
+                        for shutter in shutter_pvs:
+                            close_val = shutter['close']
+                            pv = shutter['pv']
+                            pv.put(close_val)
+                        wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
+                        return
+
+                counts = meas_pv.get()
+
+                if adaptive:
+                    scan.add_point(index, counts)
+                else:
+                    scaler_vals[index] = counts
+
+                print('Mtr: {} Cts: {}'.format(mtr1_pos, counts))
 
-            counts = meas_pv.get()
-            scaler_vals[num] = counts
-            print('Mtr: {} Cts: {}'.format(mtr1_pos, counts))
+            if adaptive:
+                positions = scan.get_next_positions()
+            else:
+                positions = []
 
         for shutter in shutter_pvs:
             close_val = shutter['close']
             pv = shutter['pv']
             pv.put(close_val)
 
-        center, fwhm = self._calc_fw_position(mtr1_positions, scaler_vals,
-            fw_height)
+        if adaptive and not fly:
+            center, fwhm = scan.center, scan.fwhm
+            print(scan.get_summary())
+
+            if center is None or fwhm == 0:
+                # Too few points for the adaptive fit, or the peak isn't
+                # bracketed, so fit the measured points as for a uniform scan
+                center, fwhm = self._calc_fw_position(*scan.get_data(),
+                    fw_height=fw_height)
+        else:
+            center, fwhm = self._calc_fw_position(mtr1_positions, scaler_vals,
+                fw_height)
+
+        if center is None:
+            print('Too few points to find the channel center, returning to '
+                'the start')
+
+            if axis.lower() == 'x':
+                motor.move_absolute((initial_pos, initial_pos_alt))
+            else:
+                motor.move_absolute((initial_pos_alt, initial_pos))
+
+            self.centering_done_event.set()
+            wx.CallAfter(self.run_centering.SetLabel, 'Center Mixer')
+            return
 
         print('Found channel center at: {}'.format(center))
 
@@ -2170,7 +2195,13 @@ class TRScanPanel(wx.Panel):
         FW height is the value at which to calulcate the FW. So fw_height
         of 0.5 calcultes FW half max, a fw_height of 0.25 would be FW quarter max,
         and so on.
+
+        Returns None for the center and width if there are too few points to
+        fit.
         """
+        center = None
+        fwhm = None
+
         if mtr_pos is not None and len(mtr_pos)>3:
             y = scaler_vals - np.max(scaler_vals)*fw_height
             if mtr_pos[0]>mtr_pos[1]:
@@ -2328,11 +2359,15 @@ class TRFlowPanel(wx.Panel):
             self.chaotic_mixer = False
 
         self._create_layout()
-        self._init_connections()
-        self._init_values()
-        self._init_valves()
-        self._init_pumps()
-        self._init_flowmeters()
+
+        with startup.profiler.measure(stage='device'):
+            self._init_connections()
+            self._init_values()
+            self._init_valves()
+            self._init_pumps()
+            self._init_flowmeters()
+
+        self.monitor_thread.start()
 
         if self.settings['simulated']:
             self.stop_simulation = threading.Event()
@@ -2433,19 +2468,20 @@ class TRFlowPanel(wx.Panel):
 
         self.stop_valve_monitor = threading.Event()
         self.pause_valve_monitor = threading.Event()
-        self.valve_monitor_thread = threading.Thread(target=self._monitor_valve_position)
-        self.valve_monitor_thread.daemon = True
 
         self.stop_pump_monitor = threading.Event()
         self.pause_pump_monitor = threading.Event()
-        self.pump_monitor_thread = threading.Thread(target=self._monitor_pump_status)
-        self.pump_monitor_thread.daemon = True
 
         self.stop_fm_monitor = threading.Event()
         self.pause_fm_monitor = threading.Event()
         self.pause_fm_den_T_monitor = threading.Event()
-        self.fm_monitor_thread = threading.Thread(target=self._monitor_fm_status)
-        self.fm_monitor_thread.daemon = True
+
+        # Pumps, flow meters and valves are all read by one snapshot command
+        self.monitor_thread = threading.Thread(target=self._monitor_status)
+        self.monitor_thread.daemon = True
+
+        self.status_interval = 1
+        self.status_settings_interval = 5
 
         self.valve_monitor_interval = 2
         self.pump_monitor_interval = 2
@@ -2509,8 +2545,6 @@ class TRFlowPanel(wx.Panel):
 
         logger.info('Valve initializiation successful.')
 
-        self.valve_monitor_thread.start()
-
     def _init_pumps(self):
         logger.info('Initializing pumps on startup')
         pump_list = [
@@ -2565,6 +2599,9 @@ class TRFlowPanel(wx.Panel):
                 else:
                     failed_connections.append(name)
 
+        if not all_init:
+            self.stop_pump_monitor.set()
+
         if not all_init and not self.timeout_event.is_set():
             logger.error('Failed to connect to pumps: %s.',
                 ' '.join(failed_connections))
@@ -2578,8 +2615,6 @@ class TRFlowPanel(wx.Panel):
             dialog.Destroy()
 
         elif all_init:
-            self.pump_monitor_thread.start()
-
             logger.info('Pump initializiation successful')
 
             self._on_flow_change(None)
@@ -2644,8 +2679,6 @@ class TRFlowPanel(wx.Panel):
         else:
             self.stop_fm_monitor.set()
 
-        self.fm_monitor_thread.start()
-
     def _create_layout(self):
 
         basic_flow_box_sizer = wx.StaticBoxSizer(wx.HORIZONTAL, self, 'Flow Controls')
@@ -3641,43 +3674,6 @@ class TRFlowPanel(wx.Panel):
         except Exception:
             traceback.print_exc()
 
-    def _monitor_valve_position(self):
-        logger.info('Starting continuous monitoring of valve positions')
-
-        monitor_cmd = ('get_position_multi', ([valve for valve in self.valves],), {})
-
-        while not self.stop_valve_monitor.is_set():
-            # start_time = time.time()
-            # if (not self.stop_valve_monitor.is_set() and
-            #     not self.pause_valve_monitor.is_set()):
-            #     ret = self._send_valvecmd(monitor_cmd, True)
-
-            #     if (ret is not None and not self.pause_valve_monitor.is_set()):
-            #         for i, name in enumerate(ret[0]):
-            #             wx.CallAfter(self._set_valve_status, name, ret[1][i])
-
-            if len(self.valve_status_q) > 0:
-                new_status = self.valve_status_q.popleft()
-
-                try:
-                    device, cmd, val = new_status
-                except Exception:
-                    device = None
-
-                if device is not None:
-                    if cmd == 'get_position':
-                        wx.CallAfter(self._set_valve_status, device, val)
-            else:
-                time.sleep(0.1)
-
-            # while time.time() - start_time < self.valve_monitor_interval:
-            #     time.sleep(0.1)
-
-            if self.stop_valve_monitor.is_set():
-                break
-
-        logger.info('Stopping continuous monitoring of valve positions')
-
     def start_pump(self, pump_name, start, fixed, dispense, vol, pump_mode,
             units, pump_panel):
         self.pause_pump_monitor.set()
@@ -3904,162 +3900,204 @@ class TRFlowPanel(wx.Panel):
         if syringe_id is not None:
             self.pump_panels[pump_name].set_status_syringe_id(syringe_id)
 
-    def _monitor_pump_status(self):
-        logger.info('Starting continuous monitoring of pump status')
+    def get_device_snapshot(self, settings=False):
+        """
+        Gets the state of the pumps, flow meters and valves in one step.
+        Remotely this is a single snapshot command to the server. Device
+        types whose monitoring has been stopped are left out, and the flow
+        meter density and temperature aren't read while their monitoring is
+        paused.
 
-        monitor_cmd = ('get_status_multi', ([pump for pump in self.pumps],), {})
-        flow_monitor_time = 0
+        :param bool settings: If True, includes the pump settings.
 
-        while not self.stop_pump_monitor.is_set():
-            # start_time = time.time()
-            # if (not self.stop_pump_monitor.is_set() and
-            #     not self.pause_pump_monitor.is_set()):
-            #     self.get_all_pump_status()
+        :returns: The snapshot, as returned by :py:func:`utils.get_snapshot`,
+            or None if it couldn't be read.
+        :rtype: dict
+        """
+        names = {}
 
-            update_status = False
+        if not self.stop_pump_monitor.is_set():
+            names['pump'] = list(self.pumps.keys())
 
-            if len(self.pump_status_q) > 0:
-                new_status = self.pump_status_q.popleft()
+        if not self.stop_fm_monitor.is_set():
+            names['fm'] = list(self.fms.keys())
 
-                try:
-                    device, cmd, val = new_status
-                except Exception:
-                    device = None
-
-                if device is not None:
-                    if cmd == 'get_full_status':
-                        self._set_pump_status(device, val)
-                        update_status = True
-                    elif cmd == 'get_settings':
-                        self._set_pump_settings(device, val)
-            else:
-                time.sleep(0.1)
+        if not self.stop_valve_monitor.is_set():
+            names['valve'] = list(self.valves.keys())
 
-            if self._purging_pumps and update_status:
-                if time.time() - self._purge_refill_start_time > 10:
-                    all_done = True
-                    finished_pumps = []
-                    for pump_name, rate in self.purge_starting_frs.items():
-                        pump_panel = self.pump_panels[pump_name]
+        options = {
+            'pump'  : {'settings': settings},
+            'fm'    : {'den_T': not self.pause_fm_den_T_monitor.is_set()},
+            }
 
-                        moving = pump_panel.moving
-                        if not moving:
-                            wx.CallAfter(pump_panel.change_flowrate, flow_rate=rate)
-                            finished_pumps.append(pump_name)
+        if self.timeout_event.is_set():
+            msg = ('No connection to the flow control server. '
+                'Contact your beamline scientist.')
 
-                        all_done = all_done and not moving
+            wx.CallAfter(self._show_error_dialog, msg, 'Connection error')
 
-                    for pump in finished_pumps:
-                        del self.purge_starting_frs[pump]
+            self.stop_valve_monitor.set()
+            self.stop_pump_monitor.set()
+            self.stop_fm_monitor.set()
 
-                    if all_done:
-                        self._purging_pumps = False
+            snapshot = None
 
-                        if self._changing_buffer:
-                            if self._buffer_change_cycle < self.settings['buffer_change_cycles']:
-                                wx.CallAfter(self.refill_all)
-                                self._buffer_change_cycle += 1
-                            else:
-                                self._changing_buffer = False
-                                wx.CallAfter(self.change_buffer.Enable)
-                                wx.CallAfter(self.stop_change_buffer.Disable)
-                                logger.info('Finished buffer change')
-
-            if self._refilling_pumps and update_status:
-                if time.time() - self._purge_refill_start_time > 10:
-                    all_done = True
-                    for pump_panel in self.pump_panels.values():
-                        moving = pump_panel.moving
-                        all_done = all_done and not moving
-
-                    if all_done:
-                        self._refilling_pumps = False
-
-                        if self._changing_buffer:
-                            if self._buffer_change_cycle < self.settings['buffer_change_cycles']:
-                                wx.CallAfter(self.purge_all)
-                                logger.info('Starting buffer change cycle %s', self._buffer_change_cycle+1)
-                            else:
-                                self._changing_buffer = False
-                                wx.CallAfter(self.change_buffer.Enable)
-                                wx.CallAfter(self.stop_change_buffer.Disable)
-                                logger.info('Finished buffer change')
+        elif self.local_devices:
+            threads = {
+                'pump'  : self.pump_con,
+                'fm'    : self.fm_con,
+                'valve' : self.valve_con,
+                }
 
-            # while time.time() - start_time < self.pump_monitor_interval:
-            #     time.sleep(0.1)
+            devices = {dev_type: (threads[dev_type], dev_names)
+                for dev_type, dev_names in names.items()}
 
-            if update_status and time.time() - flow_monitor_time > 5:
-                wx.CallAfter(self.update_current_flow_time)
-                flow_monitor_time = time.time()
+            snapshot = utils.get_snapshot(devices, options)
 
-            if self.stop_pump_monitor.is_set():
-                break
+        else:
+            # Sent through the pump server, which has the snapshot group
+            cmd = ('snapshot', (self.settings['snapshot_group'],),
+                {'names': names, 'options': options})
 
-        logger.info('Stopping continuous monitoring of pump status')
+            snapshot = utils.send_cmd(cmd, self.pump_cmd_q, self.pump_return_q,
+                self.timeout_event, self.pump_return_lock, True, 'server', True)
 
-    def _monitor_fm_status(self):
-        logger.info('Starting continuous monitoring of flow rate')
+        return snapshot
 
-        flow_cmd = ('get_fr_multi', ([fm for fm in self.fms],), {})
-        all_cmd = ('get_all_multi', ([fm for fm in self.fms],), {})
+    def _monitor_status(self):
+        logger.info('Starting continuous monitoring of device status')
 
-        # monitor_all_time = time.time()
+        settings_time = 0
+        flow_monitor_time = 0
 
-        while not self.stop_fm_monitor.is_set():
-            # start_time = time.time()
-            # if (not self.stop_fm_monitor.is_set() and
-            #     not self.pause_fm_monitor.is_set()):
+        while not self._monitors_stopped():
+            start_time = time.monotonic()
 
-            #     if (time.time()-monitor_all_time < self.fm_monitor_all_interval
-            #         or self.pause_fm_den_T_monitor.is_set()):
-            #         ret = self._send_fmcmd(flow_cmd, True)
+            # Status commands from other device panels still post to these,
+            # they aren't used here
+            self.pump_status_q.clear()
+            self.fm_status_q.clear()
+            self.valve_status_q.clear()
 
-            #         if (ret is not None and not self.pause_fm_monitor.is_set()):
+            get_settings = start_time - settings_time > self.status_settings_interval
 
-            #             for i, name in enumerate(ret[0]):
-            #                 flow_rate = ret[1][i]
-            #                 wx.CallAfter(self._set_fm_values, name,
-            #                     flow_rate=flow_rate)
-            #     else:
-            #         ret = self._send_fmcmd(all_cmd, True)
+            try:
+                snapshot = self.get_device_snapshot(get_settings)
+            except Exception:
+                logger.exception('Failed to get the device status')
+                snapshot = None
 
-            #         if (ret is not None and not self.pause_fm_monitor.is_set()):
+            if snapshot is not None:
+                if get_settings:
+                    settings_time = start_time
 
-            #             for i, name in enumerate(ret[0]):
-            #                 flow_rate = ret[1][i][0]
-            #                 density = ret[1][i][1]
-            #                 T = ret[1][i][2]
-            #                 wx.CallAfter(self._set_fm_values, name,
-            #                     flow_rate=flow_rate, density=density, T=T)
+                update_status = self._set_pump_snapshot(snapshot.get('pump', None))
+                self._set_fm_snapshot(snapshot.get('fm', None))
+                self._set_valve_snapshot(snapshot.get('valve', None))
 
-            #         monitor_all_time = time.time()
+                if update_status:
+                    self._check_purge_refill()
 
-            if len(self.fm_status_q) > 0:
-                new_status = self.fm_status_q.popleft()
+                    if time.time() - flow_monitor_time > 5:
+                        wx.CallAfter(self.update_current_flow_time)
+                        flow_monitor_time = time.time()
 
-                try:
-                    device, cmd, val = new_status
-                except Exception:
-                    device = None
+            while (time.monotonic() - start_time < self.status_interval
+                and not self._monitors_stopped()):
+                time.sleep(0.1)
 
-                if device is not None:
-                    if cmd == 'get_flow_rate':
-                        wx.CallAfter(self._set_fm_values, device,
-                            flow_rate=val)
+        logger.info('Stopping continuous monitoring of device status')
 
-                    elif cmd == 'get_density_and_temperature':
-                        wx.CallAfter(self._set_fm_values, device,
-                            density=val[0], T=val[1])
-            else:
-                time.sleep(0.1)
+    def _monitors_stopped(self):
+        return (self.stop_pump_monitor.is_set() and self.stop_fm_monitor.is_set()
+            and self.stop_valve_monitor.is_set())
 
-            # while time.time() - start_time < self.fm_monitor_interval:
-            #     time.sleep(0.1)
+    def _set_pump_snapshot(self, pump_states):
+        update_status = False
 
-            if self.stop_fm_monitor.is_set():
-                break
+        if (pump_states is not None and not self.stop_pump_monitor.is_set()
+            and not self.pause_pump_monitor.is_set()):
+            for name, state in pump_states.items():
+                if state is not None and name in self.pumps:
+                    self._set_pump_status(name, state)
+                    update_status = True
+
+                    if 'settings' in state:
+                        self._set_pump_settings(name, state['settings'])
+
+        return update_status
 
-        logger.info('Stopping continuous monitoring of flow rate')
+    def _set_fm_snapshot(self, fm_states):
+        if (fm_states is not None and not self.stop_fm_monitor.is_set()
+            and not self.pause_fm_monitor.is_set()):
+            for name, state in fm_states.items():
+                if state is not None and name in self.fms:
+                    if ('density' not in state
+                        or self.pause_fm_den_T_monitor.is_set()):
+                        wx.CallAfter(self._set_fm_values, name,
+                            flow_rate=state['flow_rate'])
+                    else:
+                        wx.CallAfter(self._set_fm_values, name,
+                            flow_rate=state['flow_rate'],
+                            density=state['density'], T=state['temperature'])
+
+    def _set_valve_snapshot(self, valve_states):
+        if (valve_states is not None and not self.stop_valve_monitor.is_set()
+            and not self.pause_valve_monitor.is_set()):
+            for name, state in valve_states.items():
+                if state is not None and name in self.valves:
+                    wx.CallAfter(self._set_valve_status, name, state['position'])
+
+    def _check_purge_refill(self):
+        if self._purging_pumps:
+            if time.time() - self._purge_refill_start_time > 10:
+                all_done = True
+                finished_pumps = []
+                for pump_name, rate in self.purge_starting_frs.items():
+                    pump_panel = self.pump_panels[pump_name]
+
+                    moving = pump_panel.moving
+                    if not moving:
+                        wx.CallAfter(pump_panel.change_flowrate, flow_rate=rate)
+                        finished_pumps.append(pump_name)
+
+                    all_done = all_done and not moving
+
+                for pump in finished_pumps:
+                    del self.purge_starting_frs[pump]
+
+                if all_done:
+                    self._purging_pumps = False
+
+                    if self._changing_buffer:
+                        if self._buffer_change_cycle < self.settings['buffer_change_cycles']:
+                            wx.CallAfter(self.refill_all)
+                            self._buffer_change_cycle += 1
+                        else:
+                            self._changing_buffer = False
+                            wx.CallAfter(self.change_buffer.Enable)
+                            wx.CallAfter(self.stop_change_buffer.Disable)
+                            logger.info('Finished buffer change')
+
+        if self._refilling_pumps:
+            if time.time() - self._purge_refill_start_time > 10:
+                all_done = True
+                for pump_panel in self.pump_panels.values():
+                    moving = pump_panel.moving
+                    all_done = all_done and not moving
+
+                if all_done:
+                    self._refilling_pumps = False
+
+                    if self._changing_buffer:
+                        if self._buffer_change_cycle < self.settings['buffer_change_cycles']:
+                            wx.CallAfter(self.purge_all)
+                            logger.info('Starting buffer change cycle %s', self._buffer_change_cycle+1)
+                        else:
+                            self._changing_buffer = False
+                            wx.CallAfter(self.change_buffer.Enable)
+                            wx.CallAfter(self.stop_change_buffer.Disable)
+                            logger.info('Finished buffer change')
 
     def _set_fm_values(self, fm_name, flow_rate=None, density=None, T=None):
         if fm_name == self.outlet_fm_name:
@@ -4695,9 +4733,7 @@ class TRFlowPanel(wx.Panel):
         self.stop_fm_monitor.set()
 
         try:
-            self.valve_monitor_thread.join(5)
-            self.pump_monitor_thread.join(5)
-            self.fm_monitor_thread.join(5)
+            self.monitor_thread.join(5)
         except Exception:
             pass
 
@@ -5634,6 +5670,10 @@ default_trsaxs_settings = {
     # 'center_stop'           : 0.15,
     # 'center_step'           : 0.005,
     'center_offset'         : 0,
+    'center_adaptive'       : False,
+    'center_fly_scan'       : False, # Needs XPS position compare wired to the MCS LNE input
+    'center_mcs_pv'         : '18ID:mcs',
+    'center_mcs_channel'    : 'mca4',
     'center_mixer'          : True,
     # 'center_mixer'          : False,
     'remote_pump_ip'        : '164.54.204.175',
@@ -5642,6 +5682,7 @@ default_trsaxs_settings = {
     'remote_fm_port'        : '5557',
     'remote_valve_ip'       : '164.54.204.175',
     'remote_valve_port'     : '5558',
+    'snapshot_group'        : 'trsaxs', # Server device group read by the flow panel
     'device_communication'  : 'remote',
     # 'injection_valve'       : [{'name': 'Injection', 'args': ['Rheodyne', 'COM16'],  #Chaotic flow
     #                             'kwargs': {'positions' : 2}},],
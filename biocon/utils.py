@@ -39,6 +39,7 @@ from matplotlib.backends.backend_wxagg import NavigationToolbar2WxAgg
 import numpy as np
 
 import client
+import startup
 
 class CharValidator(wx.Validator):
     ''' Validates data as it is entered into the text controls. '''
@@ -975,6 +976,67 @@ class CommManager(threading.Thread):
 
         logger.debug('Removed status command')
 
+    def _get_snapshot(self, names=None, **kwargs):
+        """
+        Gets the state of several connected devices. This runs in the calling
+        thread, so it must be called with the queue lock held, as
+        :py:func:`get_snapshot` does, so no command runs on the devices
+        while they're read. Status commands that read the same values are
+        answered from the snapshot, see :py:meth:`_post_snapshot_status`.
+
+        :param list names: The device names. If None, all connected devices.
+
+        :returns: A dictionary of device states by name. The state is None
+            if the device isn't connected or couldn't be read.
+        :rtype: collections.OrderedDict
+        """
+        if names is None:
+            names = list(self._connected_devices.keys())
+
+        snapshot = OrderedDict()
+
+        for name in names:
+            device = self._connected_devices.get(name, None)
+
+            if device is not None:
+                try:
+                    state = self._get_device_snapshot(device, **kwargs)
+                except Exception:
+                    logger.exception('Failed to get the state of %s', name)
+                    state = None
+            else:
+                state = None
+
+            if state is not None:
+                self._post_snapshot_status(name, state)
+
+            snapshot[name] = state
+
+        return snapshot
+
+    def _get_device_snapshot(self, device, **kwargs):
+        return None #Set for each device type
+
+    def _get_snapshot_status(self, state):
+        # Returns a list of (status command, value) pairs for the values in a
+        # device snapshot state. Set for each device type.
+        return []
+
+    def _post_snapshot_status(self, name, state):
+        # Status commands for values that were just read in a snapshot get
+        # the snapshot value instead of reading the device again. They're
+        # held off for an extra period, so while snapshots keep coming they
+        # don't run at all, and they start again if the snapshots stop.
+        now = time.monotonic()
+
+        for cmd, val in self._get_snapshot_status(state):
+            cmd_key = '{}_{}'.format(cmd, name)
+
+            if cmd_key in self._status_cmds:
+                self._return_value((name, cmd, val), 'status')
+                period = self._status_cmds[cmd_key]['period']
+                self._status_cmds[cmd_key]['last_run'] = now + period
+
     def _example_command(self, name, **kwargs):
         """
         Commands need to take in 0 or more arguments, 0 or more key word agruments,
@@ -1153,7 +1215,9 @@ class DevicePanel(wx.Panel):
         self._stop_status = threading.Event()
 
         self._create_layout()
-        self._init_device(settings)
+
+        with startup.profiler.measure(stage='device'):
+            self._init_device(settings)
 
         # Dictionary of status settings that should be defined. If a status
         # response is returned, the command name is used as a key and the
@@ -1260,6 +1324,39 @@ class DevicePanel(wx.Panel):
         """Device specific stuff goes here"""
         pass
 
+def get_snapshot(devices, options=None):
+    """
+    Gets the state of devices on one or more communication threads in one
+    call. Each thread's devices are read with only that thread's queue lock
+    held, so no command changes one of its devices part way through, but
+    other threads keep running their commands. The device types are read
+    one after the other, and the time each was read is recorded.
+
+    :param dict devices: Keys are device types (e.g. 'pump'), values are a
+        tuple of the :py:class:`CommManager` for that type and a list of device
+        names, or None for all of its connected devices.
+    :param dict options: Keys are device types, values are dictionaries of
+        keyword arguments for that type's device state, e.g.
+        ``{'pump': {'settings': True}}``.
+
+    :returns: A dictionary where the keys are the device types, with
+        dictionaries of device states by name, and 'time', a dictionary of
+        the time each device type was read.
+    :rtype: dict
+    """
+    if options is None:
+        options = {}
+
+    snapshot = {'time': {}}
+
+    for dev_type, (thread, names) in devices.items():
+        with thread._queue_lock:
+            snapshot['time'][dev_type] = time.time()
+            snapshot[dev_type] = thread._get_snapshot(names,
+                **options.get(dev_type, {}))
+
+    return snapshot
+
 def send_cmd(cmd, cmd_q, return_q, timeout_event, return_lock, remote,
     remote_dev, get_response=False, is_status=False, status_period=1,
     add_status=True):
@@ -1735,55 +1832,293 @@ elveflow_errors = {
     }
 
 
+class VolumeLedger(object):
+    """
+    Tracks a volume that changes at a piecewise constant flow rate, such as
+    the liquid left in a buffer bottle or syringe. Instead of integrating the
+    flow in a polling loop, the ledger records the volume and time at each
+    flow rate change and computes the volume at any later time from the
+    current rate. A callback can be set for when the volume reaches a
+    target, which is run by a single timer set for the predicted time and
+    reset whenever the rate or volume changes.
+
+    The flow rate is in volume units per second, positive flow decreases
+    the volume.
+    """
+    def __init__(self, volume=0, flow_rate=0, time_fn=time.monotonic,
+        history=1000):
+        """
+        :param float volume: The starting volume.
+        :param float flow_rate: The starting flow rate in volume units/s.
+        :param time_fn: The clock, returning time in s.
+        :param int history: How many flow rate changes to keep in
+            ``changes``.
+        """
+        self._time_fn = time_fn
+
+        self._lock = threading.Lock()
+
+        self._time = time_fn()
+        self._volume = float(volume)
+        self._flow_rate = float(flow_rate)
+        self._moved = 0.
+
+        # (time, volume, flow rate) at each change
+        self.changes = deque(maxlen=history)
+        self.changes.append((self._time, self._volume, self._flow_rate))
+
+        self._target = None
+        self._callback = None
+        self._hold = False
+        self._timer = None
+        self._timer_id = 0
+
+    def _fold(self, now):
+        # Called with the lock held, moves the reference point to now
+        delta_vol = self._flow_rate*(now - self._time)
+        self._volume -= delta_vol
+        self._moved += delta_vol
+        self._time = now
+
+    def set_flow_rate(self, flow_rate):
+        """
+        :param float flow_rate: The new flow rate in volume units/s.
+        """
+        with self._lock:
+            now = self._time_fn()
+            self._fold(now)
+            self._flow_rate = float(flow_rate)
+            self.changes.append((now, self._volume, self._flow_rate))
+            self._schedule()
+
+    def set_volume(self, volume):
+        """
+        Sets the volume now, e.g. when a bottle is refilled.
+        """
+        with self._lock:
+            now = self._time_fn()
+            self._fold(now)
+            self._volume = float(volume)
+            self.changes.append((now, self._volume, self._flow_rate))
+            self._schedule()
+
+    def get_volume(self):
+        with self._lock:
+            return self._volume - self._flow_rate*(self._time_fn() - self._time)
+
+    def get_moved(self):
+        """
+        :returns: The net volume moved out since the ledger was made.
+        :rtype: float
+        """
+        with self._lock:
+            return self._moved + self._flow_rate*(self._time_fn() - self._time)
+
+    def get_flow_rate(self):
+        with self._lock:
+            return self._flow_rate
+
+    def get_time_to_volume(self, target):
+        """
+        :param float target: The target volume.
+
+        :returns: The time in s until the volume reaches the target at the
+            current flow rate, or None if it never will.
+        :rtype: float
+        """
+        with self._lock:
+            return self._get_time_to_volume(target, self._time_fn())
+
+    def _get_time_to_volume(self, target, now):
+        if self._flow_rate == 0:
+            return None
+
+        volume = self._volume - self._flow_rate*(now - self._time)
+        delta_t = (volume - target)/self._flow_rate
+
+        if delta_t < 0:
+            return None
+
+        return delta_t
+
+    def call_at_volume(self, target, callback, hold=False):
+        """
+        Calls the callback once, from a timer thread, when the volume reaches
+        the target. Replaces any callback already set.
+
+        :param float target: The target volume.
+        :param callback: Function with no arguments.
+        :param bool hold: If True, the flow rate is set to 0 at the moment
+            the target is reached, so the volume stops exactly at the target
+            whatever the timer latency, as for a pump that stops itself at
+            the end of a move.
+        """
+        with self._lock:
+            self._target = float(target)
+            self._callback = callback
+            self._hold = hold
+            self._schedule()
+
+    def cancel(self):
+        """Cancels the target callback."""
+        with self._lock:
+            self._target = None
+            self._callback = None
+            self._schedule()
+
+    def _schedule(self):
+        # Called with the lock held
+        self._timer_id += 1
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._callback is None:
+            return
+
+        delta_t = self._get_time_to_volume(self._target, self._time_fn())
+
+        if delta_t is not None:
+            self._timer = threading.Timer(delta_t, self._on_timer,
+                args=(self._timer_id,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self, timer_id):
+        with self._lock:
+            if timer_id != self._timer_id or self._callback is None:
+                # Superseded by a later change
+                return
+
+            now = self._time_fn()
+            delta_t = self._get_time_to_volume(self._target, now)
+
+            if delta_t is not None and delta_t > 0:
+                # Timer ran early, try again
+                self._schedule()
+                return
+
+            if self._hold and self._flow_rate != 0:
+                end_time = self._time + (self._volume - self._target)/self._flow_rate
+                self._fold(end_time)
+                self._volume = self._target
+                self._flow_rate = 0.
+                self.changes.append((end_time, self._volume, self._flow_rate))
+
+            callback = self._callback
+            self._target = None
+            self._callback = None
+            self._timer = None
+
+        callback()
+
+
 class BufferMonitor(object):
     """
     Class for monitoring buffer levels. This is designed as an addon for an
-    hplc class, and requires methods for getting the flow rate to be defined
-    elsewhere.
+    hplc or coflow class. The volume of the active buffer is kept in a
+    :py:class:`VolumeLedger`, so it is computed from the flow rate when it's
+    read rather than integrated in a monitoring thread. The owner either
+    sends the flow rate with :py:meth:`set_flow_rate` whenever it changes,
+    or provides a function for getting the flow rate, which is read each
+    time the buffer info is read or changed.
     """
-    def __init__(self, flow_rate_getter):
+    def __init__(self, flow_rate_getter=None, empty_callback=None):
         """
         Initializes the buffer monitor class
 
         Parameters
         ----------
         flow_rate_getter: func
-            A function that returns the flow rate of interest for monitoring.
+            A function that returns the flow rate of interest for monitoring
+            in mL/min. If None, the flow rate must be set with set_flow_rate.
+        empty_callback: func
+            A function called with the buffer position when the active
+            buffer is predicted to run out. If None, a warning is logged.
         """
         self._get_buffer_flow_rate = flow_rate_getter
+        self._empty_callback = empty_callback
 
         self._active_buffer_position = None
-        self._previous_flow_rate = None
         self._buffers = {}
 
         self._buffer_lock = threading.Lock()
-        self._terminate_buffer_monitor = threading.Event()
-        self._buffer_monitor_thread = threading.Thread(target=self._buffer_monitor)
-        self._buffer_monitor_thread.daemon = True
-        self._buffer_monitor_thread.start()
+        self._ledger = VolumeLedger()
 
-    def _buffer_monitor(self):
-        while not self._terminate_buffer_monitor.is_set():
-            with self._buffer_lock:
-                if self._active_buffer_position is not None:
-                    if self._previous_flow_rate is None:
-                        self._previous_flow_rate = self._get_buffer_flow_rate()
-                        previous_time = time.monotonic()
+    def _update_flow_rate(self):
+        # Called with the buffer lock held
+        if self._get_buffer_flow_rate is not None:
+            try:
+                flow_rate = self._get_buffer_flow_rate()
+            except Exception:
+                logger.debug('Failed to get the buffer monitor flow rate')
+                flow_rate = None
+
+            if flow_rate is not None:
+                self._ledger.set_flow_rate(float(flow_rate)/60.)
+
+    def _get_active_volume(self):
+        # Called with the buffer lock held
+        return max(0, self._ledger.get_volume())
+
+    def _store_active_volume(self):
+        # Called with the buffer lock held
+        if (self._active_buffer_position is not None
+            and self._active_buffer_position in self._buffers):
+            self._buffers[self._active_buffer_position]['vol'] = self._get_active_volume()
+
+    def _load_active_volume(self):
+        # Called with the buffer lock held
+        if (self._active_buffer_position is not None
+            and self._active_buffer_position in self._buffers):
+            self._ledger.set_volume(self._buffers[self._active_buffer_position]['vol'])
+            self._ledger.call_at_volume(0, self._on_buffer_empty)
+        else:
+            self._ledger.cancel()
+            self._ledger.set_volume(0)
+
+    def _on_buffer_empty(self):
+        with self._buffer_lock:
+            position = self._active_buffer_position
 
-                    current_flow = self._get_buffer_flow_rate()
-                    current_time = time.monotonic()
+        if self._empty_callback is not None:
+            self._empty_callback(position)
+        else:
+            logger.warning('Buffer in position %s is predicted to be empty',
+                position)
+
+    def set_flow_rate(self, flow_rate):
+        """
+        Sets the flow rate out of the active buffer
+
+        Parameters
+        ----------
+        flow_rate: float
+            The flow rate in mL/min
+        """
+        with self._buffer_lock:
+            self._ledger.set_flow_rate(float(flow_rate)/60.)
 
-                    delta_vol = (((current_flow + self._previous_flow_rate)/2./60.)
-                        *(current_time-previous_time))
+    def get_time_remaining(self):
+        """
+        Gets the time until the active buffer runs out at the current flow
+        rate
 
-                    if self._active_buffer_position in self._buffers:
-                        new_vol = max(0, self._buffers[self._active_buffer_position]['vol'] - delta_vol)
-                        self._buffers[self._active_buffer_position]['vol'] = new_vol
+        Returns
+        -------
+        time_remaining: float
+            The time in s, or None if there's no active buffer or it isn't
+            being used.
+        """
+        with self._buffer_lock:
+            self._update_flow_rate()
 
-                    self._previous_flow_rate = current_flow
-                    previous_time = current_time
+            if (self._active_buffer_position is None
+                or self._active_buffer_position not in self._buffers):
+                return None
 
-            time.sleep(0.1)
+            return self._ledger.get_time_to_volume(0)
 
     def get_buffer_info(self, position):
         """
@@ -1804,9 +2139,14 @@ class BufferMonitor(object):
         with self._buffer_lock:
             position = str(position)
             vals = self._buffers[position]
-            vol = vals['vol']
             descrip = vals['descrip']
 
+            if position == self._active_buffer_position:
+                self._update_flow_rate()
+                vol = self._get_active_volume()
+            else:
+                vol = vals['vol']
+
         return vol, descrip
 
     def get_all_buffer_info(self):
@@ -1821,6 +2161,8 @@ class BufferMonitor(object):
             description ('descrip').
         """
         with self._buffer_lock:
+            self._update_flow_rate()
+            self._store_active_volume()
             buffers = copy.deepcopy(self._buffers)
         return buffers
 
@@ -1840,7 +2182,7 @@ class BufferMonitor(object):
 
             if position == self._active_buffer_position:
                 self._active_buffer_position = None
-                self._previous_flow_rate = None
+                self._load_active_volume()
 
     def set_buffer_info(self, position, volume, descrip):
         """
@@ -1859,6 +2201,10 @@ class BufferMonitor(object):
             position = str(position)
             self._buffers[position] = {'vol': float(volume), 'descrip': descrip}
 
+            if position == self._active_buffer_position:
+                self._update_flow_rate()
+                self._load_active_volume()
+
     def set_active_buffer_position(self, position):
         """
         Sets the active buffer position
@@ -1869,12 +2215,14 @@ class BufferMonitor(object):
             The buffer position (e.g. 1 or A)
         """
         with self._buffer_lock:
+            self._update_flow_rate()
+            self._store_active_volume()
             self._active_buffer_position = str(position)
-            self._previous_flow_rate = None
+            self._load_active_volume()
 
     def stop_monitor(self):
-        self._terminate_buffer_monitor.set()
-        self._buffer_monitor_thread.join()
+        with self._buffer_lock:
+            self._ledger.cancel()
 
 
 class BufferEntryDialog(wx.Dialog):
@@ -778,6 +778,12 @@ class ValveCommThread(utils.CommManager):
 
         logger.debug("Valve %s position: %s", name, val)
 
+    def _get_device_snapshot(self, device):
+        return {'position': device.get_position()}
+
+    def _get_snapshot_status(self, state):
+        return [('get_position', state['position'])]
+
     def _get_position_multiple(self, names, **kwargs):
         logger.debug("Getting multiple valve positions")
 
@@ -0,0 +1,166 @@
+# coding: utf-8
+#
+#    Project: BioCAT user data transfer
+#             https://github.com/biocatiit/beamline-control-user
+#
+#
+#    Principal author:       Jesse Hopkins
+#
+#    This is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This software is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this software.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Local benchmark of the data transfer copy engine. Builds a synthetic tree
+of detector frames, then times a full copy and an up to date re-sync with
+the :class:`transfer.TransferService` for each number of workers, and with
+rsync -a if it's installed. Run with --help for the options, e.g.
+
+python benchmark.py --frames 100000 --frame-size 32768 --workers 1,4,8
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+from builtins import object, range, map
+from io import open
+
+import os
+import time
+import argparse
+import tempfile
+import shutil
+import subprocess
+import hashlib
+import random
+
+import transfer
+
+
+def make_tree(root, num_frames, frame_size, frames_per_dir):
+    """
+    Makes the synthetic source tree, one directory per experiment.
+    """
+    block = os.urandom(frame_size)
+
+    for num in range(num_frames):
+        exp_dir = os.path.join(root, 'exp_{:04}'.format(num//frames_per_dir))
+
+        if num % frames_per_dir == 0:
+            os.makedirs(exp_dir)
+
+        # Unique header so no two frames are identical
+        with open(os.path.join(exp_dir, 'frame_{:06}.tif'.format(num)), 'wb') as f:
+            f.write('{:016}'.format(num).encode())
+            f.write(block[16:])
+
+def run_engine(source, dest, num_workers, manifest_dir):
+    service = transfer.TransferService(source, dest, num_workers, watch=False,
+        manifest_dir=manifest_dir)
+
+    start = time.time()
+    service.start()
+
+    while not service.is_idle():
+        time.sleep(0.01)
+
+    elapsed = time.time() - start
+    service.stop()
+
+    return elapsed
+
+def run_rsync(source, dest):
+    start = time.time()
+    subprocess.check_call(['rsync', '-a', source, dest])
+
+    return time.time() - start
+
+def verify(source, dest, num_checks, manifest_dir):
+    """
+    Checks a random sample of the copied frames against the source.
+    """
+    manifest = transfer.Manifest(transfer.get_manifest_path(os.path.join(dest,
+        os.path.basename(source)), manifest_dir))
+    copied = manifest.get_all()
+    manifest.close()
+
+    paths = random.sample(sorted(copied.keys()), min(num_checks, len(copied)))
+
+    for rel_path in paths:
+        with open(os.path.join(source, rel_path), 'rb') as f:
+            src_md5 = hashlib.md5(f.read()).hexdigest()
+
+        with open(os.path.join(dest, os.path.basename(source), rel_path), 'rb') as f:
+            dst_md5 = hashlib.md5(f.read()).hexdigest()
+
+        if src_md5 != dst_md5:
+            return False
+
+    return True
+
+def report(name, num_frames, total_bytes, elapsed):
+    print('{:<24} {:>8.2f} s {:>10.0f} files/s {:>8.1f} MB/s'.format(name,
+        elapsed, num_frames/elapsed, total_bytes/elapsed/1e6))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the data transfer copy engine')
+    parser.add_argument('--frames', type=int, default=100000,
+        help='Number of detector frames')
+    parser.add_argument('--frame-size', type=int, default=32768,
+        help='Frame size in bytes')
+    parser.add_argument('--frames-per-dir', type=int, default=1000,
+        help='Frames per experiment directory')
+    parser.add_argument('--workers', default='1,4,8',
+        help='Comma separated numbers of workers to test')
+    parser.add_argument('--tmpdir', default=None,
+        help='Directory for the synthetic tree (default system temp)')
+    parser.add_argument('--no-rsync', action='store_true',
+        help="Don't compare with rsync")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='transfer_benchmark_', dir=args.tmpdir)
+    source = os.path.join(root, 'Pilatus1M')
+    manifest_dir = os.path.join(root, 'manifests')
+    total_bytes = args.frames*args.frame_size
+
+    try:
+        print('Making {} frames of {} bytes in {}'.format(args.frames,
+            args.frame_size, source))
+
+        start = time.time()
+        make_tree(source, args.frames, args.frame_size, args.frames_per_dir)
+        print('Made tree in {:.1f} s\n'.format(time.time()-start))
+
+        for num_workers in [int(w) for w in args.workers.split(',')]:
+            dest = os.path.join(root, 'dest_{}'.format(num_workers))
+            os.makedirs(dest)
+
+            elapsed = run_engine(source, dest, num_workers, manifest_dir)
+            report('engine, {} workers'.format(num_workers), args.frames,
+                total_bytes, elapsed)
+
+            elapsed = run_engine(source, dest, num_workers, manifest_dir)
+            print('{:<24} {:>8.2f} s'.format('  re-sync', elapsed))
+
+            print('{:<24} {}'.format('  verified',
+                verify(source, dest, 100, manifest_dir)))
+
+            shutil.rmtree(dest)
+
+        if not args.no_rsync and shutil.which('rsync') is not None:
+            dest = os.path.join(root, 'dest_rsync')
+            os.makedirs(dest)
+
+            report('rsync -a', args.frames, total_bytes, run_rsync(source, dest))
+            print('{:<24} {:>8.2f} s'.format('  re-sync', run_rsync(source, dest)))
+
+    finally:
+        shutil.rmtree(root)
@@ -24,23 +24,794 @@ from builtins import object, range, map
 from io import open
 
 import os
+import sys
 import time
-import subprocess
 import threading
+import shutil
+import queue
+import collections
+import logging
+import hashlib
+import sqlite3
+import json
+import itertools
+import select
+import struct
+import ctypes
+import ctypes.util
+
+if __name__ != '__main__':
+    logger = logging.getLogger(__name__)
 
 import wx
 
 
+# Manifests are kept on local disk rather than next to the destination,
+# which is usually a network mount where SQLite locking and WAL don't work.
+default_manifest_dir = os.path.join(os.path.expanduser('~'), '.biocat_transfer')
+
+def get_manifest_path(dest, manifest_dir=None):
+    """
+    Gets the manifest path for a destination.
+
+    :param str dest: The destination directory the files are copied into,
+        i.e. dest/<source directory name>.
+    :param str manifest_dir: The directory the manifests are kept in. If
+        None, the default local manifest directory is used.
+
+    :returns: The manifest path.
+    :rtype: str
+    """
+    if manifest_dir is None:
+        manifest_dir = default_manifest_dir
+
+    dest = os.path.abspath(dest)
+    dest_hash = hashlib.md5(dest.encode('utf-8')).hexdigest()[:12]
+
+    return os.path.join(manifest_dir, '{}_{}_manifest.db'.format(
+        os.path.basename(dest), dest_hash))
+
+
+class Manifest(object):
+    """
+    Persistent record of every transferred file (path, size, mtime and
+    checksum), kept in a SQLite database on local disk. A file only
+    needs to be copied if it isn't in the manifest or its size or
+    modification time changed.
+
+    Additions are committed at most every commit_interval seconds (and on
+    close). If the program dies, the last few files are just copied again.
+    """
+    def __init__(self, db_path, commit_interval=1):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        self._commit_interval = commit_interval
+        self._last_commit = time.time()
+
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS files (path TEXT '
+                'PRIMARY KEY, size INTEGER, mtime REAL, checksum TEXT, '
+                'transferred REAL)')
+            self._conn.commit()
+
+    def get_all(self):
+        """
+        :returns: A dictionary of path: (size, mtime) for all files in the
+            manifest.
+        :rtype: dict
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT path, size, mtime FROM files').fetchall()
+
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def get_dir(self, rel_dir):
+        """
+        Gets just the files under a directory, using the path index, so a
+        rescan of a new directory doesn't have to read the whole manifest.
+
+        :param str rel_dir: The directory, relative to the source.
+
+        :returns: A dictionary of path: (size, mtime) for the files in the
+            manifest under the directory.
+        :rtype: dict
+        """
+        # Every path under the directory sorts between these
+        low = rel_dir + os.sep
+        high = rel_dir + chr(ord(os.sep)+1)
+
+        with self._lock:
+            rows = self._conn.execute('SELECT path, size, mtime FROM files '
+                'WHERE path >= ? AND path < ?', (low, high)).fetchall()
+
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def is_current(self, path, size, mtime):
+        with self._lock:
+            row = self._conn.execute('SELECT size, mtime FROM files WHERE '
+                'path=?', (path,)).fetchone()
+
+        return row is not None and row[0] == size and row[1] == mtime
+
+    def add(self, path, size, mtime, checksum):
+        with self._lock:
+            now = time.time()
+
+            self._conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                (path, size, mtime, checksum, now))
+
+            if now - self._last_commit > self._commit_interval:
+                self._conn.commit()
+                self._last_commit = now
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class FileWatcher(threading.Thread):
+    """
+    Reports files in the source tree once they have been written. On Linux
+    this uses inotify close-write and moved-to events, so nothing is ever
+    rescanned. If inotify isn't available, or use_inotify is False (for
+    example a network mount written to by another host, which doesn't
+    generate inotify events), it instead polls. Polling only lists the
+    directories whose modification time changed, and reports a file once
+    its size and mtime have been stable for settle_time.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    def __init__(self, source, callback, rescan_callback, use_inotify=True,
+        poll_interval=1, settle_time=2):
+        """
+        :param str source: The directory to watch.
+        :param function callback: Called with the full path of each written
+            file. When polling, the file modification time is also passed,
+            so the settle time counts toward the transfer lag.
+        :param function rescan_callback: Called with a directory path when
+            events for it may have been missed and it needs to be scanned.
+        :param bool use_inotify: Whether to use inotify, if available.
+        :param float poll_interval: Polling interval in s, if not using
+            inotify.
+        :param float settle_time: Time in s a file has to be unchanged before
+            it's reported, if not using inotify.
+        """
+        threading.Thread.__init__(self, name='FileWatcher')
+        self.daemon = True
+
+        self.source = source
+        self._callback = callback
+        self._rescan_callback = rescan_callback
+        self._poll_interval = poll_interval
+        self._settle_time = settle_time
+
+        self._stop_event = threading.Event()
+
+        self._libc = None
+
+        if use_inotify:
+            libc_name = ctypes.util.find_library('c')
+
+            if libc_name is not None:
+                libc = ctypes.CDLL(libc_name, use_errno=True)
+                if hasattr(libc, 'inotify_init1'):
+                    self._libc = libc
+
+        self.use_inotify = self._libc is not None
+
+    def run(self):
+        if self.use_inotify:
+            self._run_inotify()
+        else:
+            self._run_poll()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run_inotify(self):
+        fd = self._libc.inotify_init1(os.O_CLOEXEC)
+
+        if fd < 0:
+            logger.error('Failed to start inotify, falling back to polling')
+            self.use_inotify = False
+            self._run_poll()
+            return
+
+        self._watches = {}
+
+        try:
+            self._add_tree(fd, self.source)
+
+            while not self._stop_event.is_set():
+                ready = select.select([fd], [], [], 0.5)[0]
+
+                if ready:
+                    self._read_events(fd, os.read(fd, 65536))
+        finally:
+            os.close(fd)
+
+    def _add_tree(self, fd, top):
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+
+        for dirpath, dirnames, filenames in os.walk(top):
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(dirpath), mask)
+
+            if wd < 0:
+                logger.error('Failed to watch %s: %s', dirpath,
+                    os.strerror(ctypes.get_errno()))
+            else:
+                self._watches[wd] = dirpath
+
+    def _read_events(self, fd, data):
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, cookie, length = struct.unpack_from('iIII', data, offset)
+            offset += struct.calcsize('iIII')
+            name = os.fsdecode(data[offset:offset+length].rstrip(b'\0'))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                logger.warning('inotify event queue overflowed, rescanning')
+                self._rescan_callback(self.source)
+                continue
+
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            dirpath = self._watches.get(wd)
+
+            if dirpath is None:
+                continue
+
+            path = os.path.join(dirpath, name)
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # Files may already be in the directory before the
+                    # watch on it is added
+                    self._add_tree(fd, path)
+                    self._rescan_callback(path)
+
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                self._callback(path)
+
+    def _run_poll(self):
+        dir_mtimes = {}
+        dir_files = {}
+        candidates = {}
+        first = True
+
+        while not self._stop_event.is_set():
+            for dirpath, dirnames, filenames in os.walk(self.source):
+                try:
+                    mtime = os.stat(dirpath).st_mtime
+                except OSError:
+                    continue
+
+                if dir_mtimes.get(dirpath) != mtime:
+                    dir_mtimes[dirpath] = mtime
+
+                    filenames = set(filenames)
+
+                    # Files already present are found by the service's
+                    # startup scan
+                    if not first:
+                        for fname in filenames - dir_files.get(dirpath, set()):
+                            candidates[os.path.join(dirpath, fname)] = None
+
+                    dir_files[dirpath] = filenames
+
+            first = False
+
+            now = time.time()
+
+            for path in list(candidates.keys()):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    del candidates[path]
+                    continue
+
+                state = candidates[path]
+
+                if state is None or state[0] != (st.st_size, st.st_mtime):
+                    candidates[path] = ((st.st_size, st.st_mtime), now)
+                elif now - state[1] >= self._settle_time:
+                    del candidates[path]
+                    self._callback(path, st.st_mtime)
+
+            self._stop_event.wait(self._poll_interval)
+
+
+class TransferService(object):
+    """
+    Copies files from the source to the destination as they're written,
+    using a bounded pool of worker threads. Like ``rsync -a source dest``,
+    files end up in dest/<source directory name>.
+
+    On start, one scan of the source finds any files that changed while the
+    service wasn't running. After that the :class:`FileWatcher` reports new
+    files and the :class:`Manifest` records what has been copied. With
+    watch=False only the startup scan is done, for a one-off backup. With
+    verify_dest=True, files in the manifest are also checked against the
+    destination, so ones deleted or truncated there are copied again.
+
+    Waiting files are copied newest experiment first: files are ordered by
+    the modification time of the top level directory they're in when it was
+    first seen, then in the order they were found.
+    """
+    def __init__(self, source, dest, num_workers=4, use_inotify=True,
+        watch=True, chunk_size=8*1024*1024, verify_dest=False,
+        manifest_dir=None):
+        self.source = os.path.abspath(source)
+        self.dest = os.path.join(os.path.abspath(dest),
+            os.path.basename(self.source.rstrip(os.sep)))
+
+        self.num_workers = num_workers
+        self.watch = watch
+        self.verify_dest = verify_dest
+        self.chunk_size = chunk_size
+
+        if not os.path.exists(self.dest):
+            os.makedirs(self.dest)
+
+        self.manifest_path = get_manifest_path(self.dest, manifest_dir)
+
+        if not os.path.exists(os.path.dirname(self.manifest_path)):
+            os.makedirs(os.path.dirname(self.manifest_path))
+
+        if not os.path.exists(self.manifest_path):
+            self._import_old_manifest()
+
+        self.manifest = Manifest(self.manifest_path)
+
+        self._file_q = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._dir_times = {}
+        self._dest_dirs = set()
+        self._scans = 0
+        self._pending = {}
+        self._in_progress = set()
+        self._requeue = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self._copied = collections.deque()
+        self._lags = collections.deque(maxlen=100)
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self.errors = 0
+
+        self._watcher = FileWatcher(self.source, self._on_file, self._on_rescan,
+            use_inotify)
+
+        self._workers = []
+
+    def _import_old_manifest(self):
+        # Manifests used to be kept next to the destination. Copying an old
+        # one saves copying everything again.
+        old_path = os.path.join(os.path.dirname(self.dest),
+            '.{}_transfer_manifest.db'.format(os.path.basename(self.dest)))
+
+        if not os.path.exists(old_path):
+            return
+
+        try:
+            old_conn = sqlite3.connect(old_path)
+            new_conn = sqlite3.connect(self.manifest_path)
+
+            with new_conn:
+                old_conn.backup(new_conn)
+
+            old_conn.close()
+            new_conn.close()
+
+            logger.info('Copied the transfer manifest from %s to %s', old_path,
+                self.manifest_path)
+
+        except sqlite3.Error:
+            logger.exception('Failed to copy the transfer manifest from %s',
+                old_path)
+
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+
+    def start(self):
+        if self.watch:
+            self._watcher.start()
+
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker,
+                name='TransferWorker{}'.format(i))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+        self._on_rescan(self.source)
+
+        if not self.watch:
+            mode = 'single pass'
+        elif self._watcher.use_inotify:
+            mode = 'inotify'
+        else:
+            mode = 'polling'
+
+        logger.info('Started transfer from %s to %s with %i workers (%s)',
+            self.source, self.dest, self.num_workers, mode)
+
+    def stop(self):
+        """
+        Stops the service. Copies in progress stop after their current
+        chunk, and resume from there the next time the service runs.
+        """
+        self._stop_event.set()
+        self._watcher.stop()
+
+        for worker in self._workers:
+            worker.join(5)
+
+        self.manifest.close()
+
+        logger.info('Stopped transfer from %s to %s', self.source, self.dest)
+
+    def is_idle(self):
+        """
+        :returns: True if no scan is running and no files are waiting or
+            being copied.
+        :rtype: bool
+        """
+        with self._lock:
+            idle = (self._scans == 0 and len(self._pending) == 0
+                and len(self._in_progress) == 0)
+
+        return idle
+
+    def get_status(self):
+        """
+        :returns: A dictionary of the transfer throughput (bytes/s, over the
+            last 10 s), backlog (number of files waiting or being copied),
+            the last and maximum lag (s) between a file being written and
+            it being copied for the last 100 files, files copied and errors.
+        :rtype: dict
+        """
+        now = time.time()
+
+        with self._lock:
+            while len(self._copied) > 0 and now - self._copied[0][0] > 10:
+                self._copied.popleft()
+
+            recent_bytes = sum(c[1] for c in self._copied)
+            backlog = len(self._pending) + len(self._in_progress)
+
+            if len(self._lags) > 0:
+                last_lag = self._lags[-1]
+                max_lag = max(self._lags)
+            else:
+                last_lag = 0
+                max_lag = 0
+
+            status = {
+                'throughput'    : recent_bytes/10.,
+                'backlog'       : backlog,
+                'last_lag'      : last_lag,
+                'max_lag'       : max_lag,
+                'files_copied'  : self.files_copied,
+                'errors'        : self.errors,
+                }
+
+        return status
+
+    def _on_file(self, path, detected=None):
+        if detected is None:
+            detected = time.time()
+
+        rel_path = os.path.relpath(path, self.source)
+
+        with self._lock:
+            if rel_path in self._pending:
+                return
+
+            if rel_path in self._in_progress:
+                # Copy it again once the current copy finishes
+                self._requeue.add(rel_path)
+                return
+
+            self._pending[rel_path] = detected
+
+        self._file_q.put((-self._get_dir_time(rel_path), next(self._seq),
+            rel_path))
+
+    def _get_dir_time(self, rel_path):
+        if os.sep not in rel_path:
+            # Files at the top level of the source go last
+            return 0
+
+        top = rel_path.split(os.sep, 1)[0]
+
+        with self._lock:
+            dir_time = self._dir_times.get(top)
+
+        if dir_time is None:
+            try:
+                dir_time = os.stat(os.path.join(self.source, top)).st_mtime
+            except OSError:
+                dir_time = time.time()
+
+            with self._lock:
+                dir_time = self._dir_times.setdefault(top, dir_time)
+
+        return dir_time
+
+    def _on_rescan(self, top):
+        with self._lock:
+            self._scans += 1
+
+        scan_thread = threading.Thread(target=self._scan, args=(top,),
+            name='TransferScan')
+        scan_thread.daemon = True
+        scan_thread.start()
+
+    def _scan(self, top):
+        try:
+            rel_top = os.path.relpath(top, self.source)
+
+            if rel_top == os.curdir:
+                transferred = self.manifest.get_all()
+            else:
+                transferred = self.manifest.get_dir(rel_top)
+
+            self._scan_tree(top, transferred)
+        finally:
+            with self._lock:
+                self._scans -= 1
+
+    def _scan_tree(self, top, transferred):
+        for dirpath, dirnames, filenames in os.walk(top):
+            if self._stop_event.is_set():
+                break
+
+            for fname in filenames:
+                path = os.path.join(dirpath, fname)
+                rel_path = os.path.relpath(path, self.source)
+
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+
+                if (transferred.get(rel_path) != (st.st_size, st.st_mtime)
+                    or (self.verify_dest and not self._dest_matches(rel_path, st))):
+                    self._on_file(path, st.st_mtime)
+
+    def _dest_matches(self, rel_path, st):
+        try:
+            dst_st = os.stat(os.path.join(self.dest, rel_path))
+        except OSError:
+            return False
+
+        return dst_st.st_size == st.st_size
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                priority, seq, rel_path = self._file_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                detected = self._pending.pop(rel_path, time.time())
+                self._in_progress.add(rel_path)
+
+            try:
+                self._transfer_file(rel_path, detected)
+            except Exception:
+                logger.exception('Failed to transfer %s', rel_path)
+                with self._lock:
+                    self.errors += 1
+            finally:
+                with self._lock:
+                    self._in_progress.discard(rel_path)
+                    requeue = rel_path in self._requeue
+                    self._requeue.discard(rel_path)
+
+            if requeue:
+                self._on_file(os.path.join(self.source, rel_path), detected)
+
+    def _transfer_file(self, rel_path, detected):
+        src = os.path.join(self.source, rel_path)
+        dst = os.path.join(self.dest, rel_path)
+
+        try:
+            st = os.stat(src)
+        except OSError:
+            # Deleted before it could be copied
+            return
+
+        if (self.manifest.is_current(rel_path, st.st_size, st.st_mtime)
+            and (not self.verify_dest or self._dest_matches(rel_path, st))):
+            return
+
+        dst_dir = os.path.dirname(dst)
+        if dst_dir not in self._dest_dirs:
+            os.makedirs(dst_dir, exist_ok=True)
+            self._dest_dirs.add(dst_dir)
+
+        checksum = copy_file(src, dst, self._stop_event, self.chunk_size)
+
+        if checksum is None:
+            return
+
+        new_st = os.stat(src)
+
+        if (new_st.st_size, new_st.st_mtime) != (st.st_size, st.st_mtime):
+            # Changed while being copied, so copy it again
+            with self._lock:
+                self._requeue.add(rel_path)
+            return
+
+        self.manifest.add(rel_path, st.st_size, st.st_mtime, checksum)
+
+        now = time.time()
+
+        with self._lock:
+            self.files_copied += 1
+            self.bytes_copied += st.st_size
+            self._copied.append((now, st.st_size))
+            self._lags.append(now - detected)
+
+
+def copy_file(src, dst, abort_event=None, chunk_size=8*1024*1024):
+    """
+    Copies a file in chunks, computing the checksum as the data is read.
+    The data goes to dst.part, which is only renamed to dst once complete,
+    so the destination never holds a partial file. Permissions and times
+    are copied as with ``rsync -a``. Before the rename, the size of dst.part
+    is checked against the data copied, and if it doesn't match the copy
+    fails and starts over next time.
+
+    If the copy is aborted, the .part file is kept. For files larger than
+    one chunk, a dst.part.state file also records the source size and
+    mtime and the MD5 of each chunk written. The next copy of the same
+    unchanged source then resumes after the last complete chunk instead of
+    starting over.
+
+    The checksum is the MD5 of the file for files of up to one chunk. For
+    larger files it's the MD5 of the concatenated chunk MD5s followed by
+    the number of chunks (e.g. '<md5>-3'), so a resumed copy doesn't have
+    to re-read what it already copied.
+
+    :param str src: The source file path.
+    :param str dst: The destination file path.
+    :param threading.Event abort_event: If set, the copy is stopped after
+        the current chunk.
+    :param int chunk_size: The chunk size in bytes.
+
+    :returns: The checksum of the file, or None if the copy was aborted.
+    :rtype: str
+
+    :raises IOError: If dst.part doesn't have all of the data copied.
+    """
+    part = '{}.part'.format(dst)
+    state_path = '{}.state'.format(part)
+
+    st = os.stat(src)
+    state = {'size': st.st_size, 'mtime': st.st_mtime, 'chunk_size': chunk_size,
+        'digests': []}
+
+    offset = 0
+    has_state = os.path.exists(state_path)
+
+    if has_state and os.path.exists(part):
+        try:
+            with open(state_path, 'r') as f:
+                old_state = json.load(f)
+        except Exception:
+            old_state = None
+
+        if (old_state is not None and old_state['size'] == state['size']
+            and old_state['mtime'] == state['mtime']
+            and old_state['chunk_size'] == chunk_size):
+            offset = len(old_state['digests'])*chunk_size
+
+            if os.path.getsize(part) >= offset:
+                state = old_state
+            else:
+                offset = 0
+
+    if offset > 0:
+        logger.debug('Resuming copy of %s at %i bytes', src, offset)
+        fdst = open(part, 'r+b')
+        fdst.truncate(offset)
+        fdst.seek(offset)
+    else:
+        fdst = open(part, 'wb')
+
+    aborted = False
+    copied = offset
+
+    with open(src, 'rb') as fsrc, fdst:
+        fsrc.seek(offset)
+
+        while True:
+            chunk = fsrc.read(chunk_size)
+
+            if not chunk:
+                break
+
+            fdst.write(chunk)
+            copied += len(chunk)
+            state['digests'].append(hashlib.md5(chunk).hexdigest())
+
+            if st.st_size > chunk_size:
+                # The chunk has to reach the file before the state says so
+                fdst.flush()
+                with open(state_path, 'w') as f:
+                    json.dump(state, f)
+
+            if abort_event is not None and abort_event.is_set():
+                aborted = True
+                break
+
+    if aborted:
+        return None
+
+    part_size = os.path.getsize(part)
+
+    if part_size != copied:
+        # Don't resume from a part file that's missing data
+        os.remove(part)
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        raise IOError('Copy of {} is incomplete, {} of {} bytes '
+            'written'.format(src, part_size, copied))
+
+    digests = state['digests']
+
+    if len(digests) <= 1:
+        if len(digests) == 1:
+            checksum = digests[0]
+        else:
+            checksum = hashlib.md5().hexdigest()
+    else:
+        checksum = '{}-{}'.format(hashlib.md5(b''.join(bytes.fromhex(d)
+            for d in digests)).hexdigest(), len(digests))
+
+    shutil.copystat(src, part)
+    os.replace(part, dst)
+
+    if has_state or st.st_size > chunk_size:
+        os.remove(state_path)
+
+    return checksum
+
+
 class TransferFrame(wx.Frame):
     def __init__(self, *args, **kwargs):
         super(TransferFrame, self).__init__(*args, **kwargs)
 
         self.source = ''
         self.dest = ''
-        self.interval = ''
+        self.num_workers = 4
 
         self.backup_in_progress = False
 
+        self.transfer_service = None
+        self.backup_service = None
+
         self.auto_timer = wx.Timer()
         self.auto_timer.Bind(wx.EVT_TIMER, self._on_auto_timer)
 
@@ -79,7 +850,7 @@ class TransferFrame(wx.Frame):
         dir_sizer.Add(dest_browse)
 
 
-        self.interval_ctrl = wx.TextCtrl(self, value='5', size=(60, -1))
+        self.workers_ctrl = wx.TextCtrl(self, value='4', size=(60, -1))
 
         self.start_auto_btn = wx.Button(self, label='Start Automatic Backup')
         self.start_auto_btn.Bind(wx.EVT_BUTTON, self._on_start_auto)
@@ -95,8 +866,8 @@ class TransferFrame(wx.Frame):
 
 
         timer_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        timer_sizer.Add(wx.StaticText(self, label='Backup Interval (min.):'))
-        timer_sizer.Add(self.interval_ctrl, border=5, flag=wx.LEFT)
+        timer_sizer.Add(wx.StaticText(self, label='Parallel copies:'))
+        timer_sizer.Add(self.workers_ctrl, border=5, flag=wx.LEFT)
 
         auto_sizer = wx.BoxSizer(wx.HORIZONTAL)
         auto_sizer.Add(self.start_auto_btn)
@@ -115,8 +886,24 @@ class TransferFrame(wx.Frame):
         font = wx.Font(22, wx.DEFAULT, wx.NORMAL, wx.BOLD)
         self.status.SetFont(font)
 
+        self.throughput = wx.StaticText(self, label='')
+        self.backlog = wx.StaticText(self, label='')
+        self.lag = wx.StaticText(self, label='')
+        self.files_copied = wx.StaticText(self, label='')
+
+        stats_sizer = wx.FlexGridSizer(rows=4, cols=2, hgap=5, vgap=5)
+        stats_sizer.Add(wx.StaticText(self, label='Throughput:'))
+        stats_sizer.Add(self.throughput)
+        stats_sizer.Add(wx.StaticText(self, label='Backlog:'))
+        stats_sizer.Add(self.backlog)
+        stats_sizer.Add(wx.StaticText(self, label='Lag (last/max):'))
+        stats_sizer.Add(self.lag)
+        stats_sizer.Add(wx.StaticText(self, label='Files copied:'))
+        stats_sizer.Add(self.files_copied)
+
         status_sizer = wx.StaticBoxSizer(wx.StaticBox(self, label='Status'), wx.VERTICAL)
         status_sizer.Add(self.status, 1, border=5, flag=wx.ALL|wx.EXPAND)
+        status_sizer.Add(stats_sizer, border=5, flag=wx.ALL)
 
 
         top_sizer = wx.BoxSizer(wx.VERTICAL)
@@ -158,11 +945,9 @@ class TransferFrame(wx.Frame):
         self.source = self.source_dir.GetValue()
         self.dest = self.dest_dir.GetValue()
 
-        try:
-            self.interval = float(self.interval_ctrl.GetValue())
-        except ValueError:
-            msg = 'You must have a number for the backup interval.'
-            wx.MessageBox(msg, 'Select backup interval')
+        num_workers = self._get_num_workers()
+
+        if num_workers is None:
             return
 
         if self.source == '':
@@ -175,18 +960,32 @@ class TransferFrame(wx.Frame):
             wx.MessageBox(msg, 'Select destination directory')
             return
 
+        if not os.path.exists(self.source):
+            msg = 'The source directory no longer exists.'
+            wx.MessageBox(msg, 'Source directory missing')
+            return
+
+        elif not os.path.exists(self.dest):
+            msg = 'The destination directory no longer exists.'
+            wx.MessageBox(msg, 'Destination directory missing')
+            return
+
+        self.transfer_service = TransferService(self.source, self.dest,
+            num_workers)
+        self.transfer_service.start()
+
         self.auto_timer.Start(1000)
-        self.start_time = time.time()
 
         self.start_manual_btn.Disable()
         self.start_auto_btn.Disable()
         self.stop_manual_btn.Enable()
         self.stop_auto_btn.Enable()
 
-        self._backup()
+        self.status.SetLabel('Transferring')
 
     def _on_stop_auto(self, event):
         self.auto_timer.Stop()
+        self._stop_transfer_service()
 
         if not self.backup_in_progress:
             self.start_manual_btn.Enable()
@@ -195,11 +994,29 @@ class TransferFrame(wx.Frame):
             self.stop_auto_btn.Disable()
             self.status.SetLabel('Ready')
 
+    def _get_num_workers(self):
+        try:
+            num_workers = max(1, int(self.workers_ctrl.GetValue()))
+        except ValueError:
+            msg = 'You must have an integer for the number of parallel copies.'
+            wx.MessageBox(msg, 'Select parallel copies')
+            num_workers = None
+
+        return num_workers
+
+    def _stop_transfer_service(self):
+        if self.transfer_service is not None:
+            self.transfer_service.stop()
+            self.transfer_service = None
+
     def _on_start_manual(self, event):
 
         self.source = self.source_dir.GetValue()
         self.dest = self.dest_dir.GetValue()
-        self.interval = float(self.interval_ctrl.GetValue())
+        self.num_workers = self._get_num_workers()
+
+        if self.num_workers is None:
+            return
 
         if self.source == '':
             msg = 'You must pick a source directory.'
@@ -224,9 +1041,9 @@ class TransferFrame(wx.Frame):
         print(self.backup_in_progress)
 
         if self.backup_in_progress:
-            msg = ('This will stop the active backup immediately. This could lead to '
-                'some files not being transfered, or being corrupted at the desination. '
-                'Proceed?')
+            msg = ('This will stop the active backup immediately. Files that '
+                'were being copied will resume from where they stopped on the '
+                'next backup. Proceed?')
             dlg = wx.MessageDialog(self, msg, 'Are you sure?',
                 style=wx.CANCEL_DEFAULT|wx.OK|wx.CANCEL|wx.ICON_EXCLAMATION)
 
@@ -234,6 +1051,7 @@ class TransferFrame(wx.Frame):
                 return
 
         self.auto_timer.Stop()
+        self._stop_transfer_service()
 
         self._stop_backup()
 
@@ -243,13 +1061,22 @@ class TransferFrame(wx.Frame):
         return
 
     def _on_auto_timer(self, event):
+        if self.transfer_service is not None:
+            self._show_status(self.transfer_service)
+
+    def _show_status(self, service):
+        status = service.get_status()
 
-        if time.time() - self.start_time >= 60*self.interval and not self.backup_in_progress:
-            self.start_time = time.time()
-            self._backup()
-        elif not self.backup_in_progress:
-            m, sec = divmod(60*self.interval - (time.time() - self.start_time), 60)
-            self.status.SetLabel('Next backup in {0:.0f}:{1:02.0f}'.format(m, sec))
+        self.throughput.SetLabel('{:.1f} MB/s'.format(status['throughput']/1e6))
+        self.backlog.SetLabel('{} files'.format(status['backlog']))
+        self.lag.SetLabel('{:.1f} s / {:.1f} s'.format(status['last_lag'],
+            status['max_lag']))
+
+        if status['errors'] > 0:
+            self.files_copied.SetLabel('{} ({} errors)'.format(
+                status['files_copied'], status['errors']))
+        else:
+            self.files_copied.SetLabel('{}'.format(status['files_copied']))
 
     def _backup(self):
         if not os.path.exists(self.source):
@@ -270,7 +1097,7 @@ class TransferFrame(wx.Frame):
 
         self.backup_in_progress = True
         self.abort_event.clear()
-        self.backup_thread = threading.Thread(target=self._run_rsync)
+        self.backup_thread = threading.Thread(target=self._run_backup)
         self.backup_thread.daemon = True
         self.backup_thread.start()
         self.backup_timer.Start(1000)
@@ -278,6 +1105,9 @@ class TransferFrame(wx.Frame):
         return
 
     def _on_backup_timer(self, event):
+        if self.backup_service is not None:
+            self._show_status(self.backup_service)
+
         if not self.backup_in_progress and not self.auto_timer.IsRunning():
             self.start_manual_btn.Enable()
             self.start_auto_btn.Enable()
@@ -291,22 +1121,25 @@ class TransferFrame(wx.Frame):
     def _stop_backup(self):
         self.abort_event.set()
 
-    def _run_rsync(self):
-        rsync_proc = subprocess.Popen(['rsync', '-av', self.source, self.dest])
+    def _run_backup(self):
+        self.backup_service = TransferService(self.source, self.dest,
+            self.num_workers, watch=False, verify_dest=True)
+        self.backup_service.start()
 
-        while rsync_proc.poll() == None:
+        while not self.backup_service.is_idle():
             if self.abort_event.is_set():
-                rsync_proc.terminate()
                 break
             time.sleep(.1)
 
+        self.backup_service.stop()
+
         self.backup_in_progress = False
 
     def _on_closewindow(self, evt):
         if evt.CanVeto() and self.backup_in_progress:
-            msg = ('This will stop the active backup immediately. This could lead to '
-                'some files not being transfered, or being corrupted at the desination. '
-                'Proceed?')
+            msg = ('This will stop the active backup immediately. Files that '
+                'were being copied will resume from where they stopped on the '
+                'next backup. Proceed?')
             dlg = wx.MessageDialog(self, msg, 'Are you sure?',
                 style=wx.CANCEL_DEFAULT|wx.OK|wx.CANCEL|wx.ICON_EXCLAMATION)
 
@@ -316,18 +1149,19 @@ class TransferFrame(wx.Frame):
                 self._stop_backup()
 
         self.auto_timer.Stop()
+        self._stop_transfer_service()
         self.Destroy()
         return
 
 
 if __name__ == '__main__':
-    # logger = logging.getLogger(__name__)
-    # logger.setLevel(logging.DEBUG)
-    # h1 = logging.StreamHandler(sys.stdout)
-    # h1.setLevel(logging.DEBUG)
-    # formatter = logging.Formatter('%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s')
-    # h1.setFormatter(formatter)
-    # logger.addHandler(h1)
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    h1 = logging.StreamHandler(sys.stdout)
+    h1.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s')
+    h1.setFormatter(formatter)
+    logger.addHandler(h1)
 
     app = wx.App()
     # logger.debug('Setting up wx app')
@@ -38,12 +38,14 @@ class plot_gui(wx.Frame):
         self.x = self.y = self.z = None
         self.manualIntensity = False
         self.plotting = False
-        x_step = y_step = None
+        x_start = x_end = x_step = None
+        y_start = y_end = y_step = None
         if xlim is not None:
-            x_step = xlim[2]
+            x_start, x_end, x_step = xlim
         if ylim is not None:
-            y_step = ylim[2]
-        self.plotter = Plotter(self.motor_x, self.motor_y, formula, x_step, y_step)
+            y_start, y_end, y_step = ylim
+        self.plotter = Plotter(self.motor_x, self.motor_y, formula, x_step, y_step,
+            x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end)
 
     def initUI(self):
         """Initialize all gui"""
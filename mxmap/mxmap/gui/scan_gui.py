@@ -239,6 +239,11 @@ class scan_gui(wx.Frame):
         grid_sizer.Add(wx.StaticText(parent=self.panel, label="Step size:"), pos=(4, 4), span=(1, 1))
         grid_sizer.Add(self.motory_step, pos=(4, 5), span=(1, 1))
 
+        # Serpentine rows are all scanned by one MX scan record
+        self.serpentine = wx.CheckBox(self.panel, label='Serpentine scan (single output file)')
+        self.serpentine.SetValue(False)
+        grid_sizer.Add(self.serpentine, pos=(5, 0), span=(1, 6))
+
         motor_sizer.Add(grid_sizer)
         return motor_sizer
 
@@ -479,7 +484,8 @@ class scan_gui(wx.Frame):
                 'scalers' : scalers,
                 'dwell_time' : self.dwell_time.GetValue(),
                 'detector' : detector,
-                'timer' : self.timer
+                'timer' : self.timer,
+                'serpentine' : self.serpentine.GetValue(),
             }
 
             self.plot_panel = plot_gui(motor_x=params['x_motor'],
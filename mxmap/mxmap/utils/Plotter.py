@@ -1,72 +1,246 @@
 from os.path import exists
 
-import pandas as pd
 import numpy as np
 
-from formula import calculate
+from formula import compile_formula
 
 class Plotter(object):
     """
     A class to process scan data from a :mod:`Scanner` scan, and send it to a plot
+
+    Scan points are stored in a grid indexed by the x and y step positions,
+    which is filled in place as each row is read. The plotted intensity is
+    calculated for each row as it is read, so updating the plot doesn't
+    require reprocessing the whole map.
     """
-    def __init__(self, motor_x, motor_y, formula, x_step=None, y_step=None, columns=None):
+    def __init__(self, motor_x, motor_y, formula, x_step=None, y_step=None,
+        columns=None, x_start=None, x_end=None, y_start=None, y_end=None):
         """
         Initializes the plotter
 
         :param str motor_x: The x motor name.
         :param str motor_y: The y motor name.
         :param str formula: The plot formula.
-        :param float x_step: The step size in x.
-        :param float y_step: The step size in y.
+        :param float x_step: The step size in x. If None, it is determined
+            from the data.
+        :param float y_step: The step size in y. If None, it is determined
+            from the data.
         :param columns: The column names. Defaults to None.
+        :param float x_start: The x start position. If this, x_end and
+            x_step are all known the grid is allocated at the full scan size.
+        :param float x_end: The x end position.
+        :param float y_start: The y start position.
+        :param float y_end: The y end position.
         """
         self.motor_x = motor_x
         self.motor_y = motor_y
-        self.formula = formula
+        self._formula = formula
         self.columns = columns
-        self.scandata = None
         self.x_step = x_step
         self.y_step = y_step
 
+        self._x_axis = GridAxis(x_start, x_step, x_end)
+        self._y_axis = GridAxis(y_start, y_step, y_end)
+
+        self._values = None
+        self._filled = None
+        self._z = None
+        self._bounds = None
+
+        # Read position, lines read and columns for each file, so a file
+        # that's still being written is only parsed from where the last
+        # read stopped
+        self._files = {}
+
+        # Incremented whenever the plotted data changes, so getXYZ can
+        # return the previous result if nothing changed.
+        self._version = 0
+        self._xyz = None
+        self._xyz_version = None
+
+    @property
+    def formula(self):
+        """
+        The plot formula. Setting it recalculates the intensity for all of
+        the points read so far.
+        """
+        return self._formula
+
+    @formula.setter
+    def formula(self, formula):
+        if formula == self._formula:
+            return
+
+        self._formula = formula
+        self._version += 1
+
+        if self._values is not None:
+            self._z[self._filled] = self._calc_z(self._values[self._filled])
+
     def read(self, full_path):
         """
-        Read scan data file and encapsulate data
+        Read scan data file and encapsulate data. A file that's read again,
+        such as a serpentine scan file while it's being written, is only
+        read from the end of the last complete line read before.
 
         :param str full_path: The path to the scan data file.
 
-        :returns: True if the file exists, False otherwise.
+        :returns: True if new data was read, False otherwise.
         :rtype: bool
         """
         if not exists(full_path):
             print(str(full_path)+ " does not exist")
             return False
 
+        file_state = self._files.get(full_path)
+
+        if file_state is None:
+            file_state = {'offset': 0, 'lines': 0, 'columns': None}
+            self._files[full_path] = file_state
+
+        with open(full_path, 'rb') as f:
+            f.seek(0, 2)
+
+            if f.tell() < file_state['offset']:
+                # The file was rewritten, so read it from the start
+                file_state['offset'] = 0
+                file_state['lines'] = 0
+
+            f.seek(file_state['offset'])
+            new_text = f.read()
+
+        # The last line may not be complete yet, it's read next time
+        end = new_text.rfind(b'\n') + 1
+
+        if end == 0:
+            return False
+
+        lines = new_text[:end].decode('utf-8').splitlines()
+
+        file_state['offset'] += end
+        file_state['lines'] += len(lines)
+
         # Load data
-        data = np.loadtxt(full_path)
+        data = np.loadtxt(lines, ndmin=2)
+
+        if data.size == 0:
+            return False
 
         # Number of column
         n_cols = data.shape[1]
 
         # Get Column names
-        self.columns = get_cols(full_path)
+        if file_state['columns'] is None:
+            file_state['columns'] = get_cols(full_path)
 
         # Remove detectors
-        self.columns = self.columns[:n_cols]
+        self.columns = file_state['columns'][:n_cols]
 
-        # Put/Add data to pandas dataframe
-        scandata = pd.DataFrame(data, columns=self.columns)
-        if self.scandata is None:
-            self.scandata = scandata
-        else:
-            self.scandata = pd.concat([self.scandata, scandata])
+        x_pos = data[:, self.columns.index(self.motor_x)]
+        y_pos = data[:, self.columns.index(self.motor_y)]
 
-        # sort data by motory and motorx position
-        self.scandata = self.scandata.sort_values(by=[self.motor_y, self.motor_x]) # TODO
+        x_shift = self._x_axis.update(x_pos)
+        y_shift = self._y_axis.update(y_pos)
+
+        self._resize(x_shift, y_shift, n_cols)
+
+        x_ind = self._x_axis.index(x_pos)
+        y_ind = self._y_axis.index(y_pos)
+
+        # Keep the first value read at each position
+        new = ~self._filled[y_ind, x_ind]
+        x_ind = x_ind[new]
+        y_ind = y_ind[new]
+        data = data[new]
+
+        if len(data) > 0:
+            self._values[y_ind, x_ind] = data
+            self._filled[y_ind, x_ind] = True
+            self._z[y_ind, x_ind] = self._calc_z(data)
+
+            bounds = [x_ind.min(), x_ind.max(), y_ind.min(), y_ind.max()]
+
+            if self._bounds is not None:
+                bounds = [min(bounds[0], self._bounds[0]),
+                    max(bounds[1], self._bounds[1]),
+                    min(bounds[2], self._bounds[2]),
+                    max(bounds[3], self._bounds[3])]
+
+            self._bounds = bounds
+            self._version += 1
 
-        # Remove duplicate data
-        self.scandata = self.scandata.drop_duplicates(keep='first')
         return True
 
+    def _resize(self, x_shift, y_shift, n_cols):
+        """
+        Makes sure the data grid covers the current extent of both axes.
+        Existing data is offset by ``x_shift`` and ``y_shift`` if the start
+        of an axis moved. The grid grows by doubling, so adding rows is
+        cheap on average.
+        """
+        nx = self._x_axis.size
+        ny = self._y_axis.size
+
+        if self._values is not None:
+            old_ny, old_nx = self._filled.shape
+
+            if (x_shift == 0 and y_shift == 0 and nx <= old_nx and ny <= old_ny
+                and self._values.shape[2] == n_cols):
+                return
+
+            if nx > old_nx:
+                nx = max(nx, 2*old_nx)
+            else:
+                nx = old_nx + x_shift
+
+            if ny > old_ny:
+                ny = max(ny, 2*old_ny)
+            else:
+                ny = old_ny + y_shift
+
+        values = np.zeros((ny, nx, n_cols))
+        filled = np.zeros((ny, nx), dtype=bool)
+        z = np.zeros((ny, nx))
+
+        if self._values is not None:
+            if self._values.shape[2] == n_cols:
+                values[y_shift:y_shift+old_ny, x_shift:x_shift+old_nx] = self._values
+                filled[y_shift:y_shift+old_ny, x_shift:x_shift+old_nx] = self._filled
+                z[y_shift:y_shift+old_ny, x_shift:x_shift+old_nx] = self._z
+
+                if self._bounds is not None:
+                    self._bounds = [self._bounds[0]+x_shift,
+                        self._bounds[1]+x_shift, self._bounds[2]+y_shift,
+                        self._bounds[3]+y_shift]
+            else:
+                # The columns changed, so the old data can't be kept
+                self._bounds = None
+
+        self._values = values
+        self._filled = filled
+        self._z = z
+
+    def _calc_z(self, data):
+        """
+        Calculates the intensity from the formula.
+
+        :param np.array data: The scan data, with the columns in the last
+            dimension.
+
+        :returns: The calculated intensity for each point.
+        :rtype: np.array
+        """
+        d = {}
+        for i, c in enumerate(self.columns):
+            d[c] = data[..., i]
+
+        z = compile_formula(self._formula)(d)
+        z = np.array(np.broadcast_to(z, data.shape[:-1]), dtype=float)
+
+        z[np.isinf(z)] = 0.
+
+        return z
+
     def getXYZ(self):
         """
         Create map from scan data.
@@ -78,39 +252,33 @@ class Plotter(object):
         :rtype: np.array, np.array, np.array
         """
 
-        if self.scandata is not None:
-            scan_data = self.scandata.copy()
-            x = sorted(list(set(np.array(scan_data[self.motor_x]))))
-            y = sorted(list(set(np.array(scan_data[self.motor_y]))))
+        if self._xyz_version == self._version:
+            return self._xyz
+
+        if self._bounds is not None:
+            x0, x1, y0, y1 = self._bounds
+
+            x = list(self._x_axis.get_positions(x0, x1+1))
+            y = list(self._y_axis.get_positions(y0, y1+1))
 
             # Set x and y step if they're available
             if self.x_step is not None:
                 xs = self.x_step
             else:
-                if len(x) > 1:
-                    xs = x[1] - x[0]
+                if self._x_axis.step is not None:
+                    xs = self._x_axis.step
                 else:
                     xs = 1
 
             if self.y_step is not None:
                 ys = self.y_step
             else:
-                if len(y) > 1:
-                    ys = y[1] - y[0]
+                if self._y_axis.step is not None:
+                    ys = self._y_axis.step
                 else:
                     ys = xs
 
-            # Cauculate new data from formula
-            d = {}
-            for c in self.columns:
-                d[c] = np.array(scan_data[c])
-
-            z = calculate(self.formula, d)
-
-            # Reshape for displaying
-            z = np.reshape(z, (len(y), len(x)))
-
-            z[np.isinf(z)] = 0.
+            z = self._z[y0:y1+1, x0:x1+1]
 
             # Add 1 row and 1 column to support pcolormesh (pcolormesh requires 1 extra row and column to display)
             if xs > 0:
@@ -125,9 +293,103 @@ class Plotter(object):
 
             x_coor, y_coor = np.meshgrid(x, y)
 
-            return x_coor, y_coor, z
+            self._xyz = (x_coor, y_coor, z)
+        else:
+            self._xyz = (None, None, None)
+
+        self._xyz_version = self._version
+
+        return self._xyz
+
+class GridAxis(object):
+    """
+    Maps the motor positions along one axis of the map onto grid indices.
+    Index 0 is at ``origin`` and indices increase by ``step``, which is
+    always positive. If the step isn't given it is taken from the smallest
+    spacing of the first positions read.
+    """
+    def __init__(self, start=None, step=None, end=None):
+        """
+        Initializes the axis.
+
+        :param float start: The scan start position. Defaults to None.
+        :param float step: The scan step size. Defaults to None.
+        :param float end: The scan end position. Defaults to None.
+        """
+        if step:
+            self.step = abs(float(step))
+        else:
+            self.step = None
+
+        if start is not None and end is not None and self.step is not None:
+            self.origin = float(min(start, end))
+            self.size = int(round(abs(end - start)/self.step)) + 1
         else:
-            return None, None, None
+            self.origin = start
+            self.size = 0
+
+    def update(self, positions):
+        """
+        Extends the axis to cover the positions.
+
+        :param np.array positions: The positions read.
+
+        :returns: The number of grid points added before the previous origin.
+        :rtype: int
+        """
+        positions = np.unique(positions)
+
+        if self.origin is None:
+            self.origin = float(positions[0])
+
+        if self.step is None:
+            spacing = np.diff(np.unique(np.append(positions, self.origin)))
+            spacing = spacing[spacing > 0]
+
+            if len(spacing) > 0:
+                self.step = float(spacing.min())
+
+        shift = 0
+
+        if self.step is not None:
+            low = int(round((positions[0] - self.origin)/self.step))
+
+            if low < 0:
+                shift = -low
+                self.origin = self.origin - shift*self.step
+
+            high = int(round((positions[-1] - self.origin)/self.step)) + 1
+
+            self.size = max(self.size + shift, high)
+
+        else:
+            self.size = max(self.size, 1)
+
+        return shift
+
+    def index(self, positions):
+        """
+        :param np.array positions: The positions to index.
+
+        :returns: The grid index of each position.
+        :rtype: np.array
+        """
+        if self.step is None:
+            return np.zeros(len(positions), dtype=int)
+
+        return np.round((positions - self.origin)/self.step).astype(int)
+
+    def get_positions(self, start, stop):
+        """
+        :param int start: The first grid index.
+        :param int stop: One past the last grid index.
+
+        :returns: The positions of the grid points from start to stop.
+        :rtype: np.array
+        """
+        step = self.step if self.step is not None else 0
+
+        return self.origin + step*np.arange(start, stop)
 
 def get_cols(full_path):
     """
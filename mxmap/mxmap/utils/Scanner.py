@@ -1,5 +1,6 @@
 from os.path import join
 import multiprocessing
+import time
 try:
     import queue
 except ImportError:
@@ -38,6 +39,9 @@ class Scanner(multiprocessing.Process):
         self._abort_event = abort_event
         self._stop_event = multiprocessing.Event()
 
+        self._live_file = None
+        self._last_live_update = 0
+
         Mp.set_user_interrupt_function(self._stop_scan)
 
         self._commands = {'start_mxdb'  : self._start_mxdb,
@@ -55,9 +59,15 @@ class Scanner(multiprocessing.Process):
         """
         while True:
             try:
-                cmd, args, kwargs = self.command_queue.get_nowait()
-                print(cmd)
+                # None is sent by stop to wake the process
+                cmd_item = self.command_queue.get(timeout=0.1)
             except queue.Empty:
+                cmd_item = None
+
+            if cmd_item is not None:
+                cmd, args, kwargs = cmd_item
+                print(cmd)
+            else:
                 cmd = None
 
             if self._abort_event.is_set():
@@ -94,7 +104,8 @@ class Scanner(multiprocessing.Process):
         print("Database has been set up")
 
     def _set_devices(self, dir_path, x_motor, x_start, x_step, x_end, y_motor, y_start,
-        y_step, y_end, scalers, dwell_time, detector, timer=None, file_name='output'):
+        y_step, y_end, scalers, dwell_time, detector, timer=None, file_name='output',
+        serpentine=False):
         """
         Sets the parameters for the scan.
 
@@ -112,6 +123,10 @@ class Scanner(multiprocessing.Process):
         :param str timer: The name of the timer to be used for the scan.
         :param str detector: The name of the detector to be used for the scan.
         :param str file_name: The scan name (and output name) for the scan.
+        :param bool serpentine: If True, the whole map is done as a single
+            scan, with alternate rows scanned in opposite directions, and
+            written to a single output file. Otherwise each row is a
+            separate scan with its own output file.
         """
         self.dir_path = dir_path
 
@@ -132,6 +147,7 @@ class Scanner(multiprocessing.Process):
         self.x_nsteps = abs(int(np.floor((self.x_end - self.x_start) / self.x_step))) + 1
         self.timer = timer
         self.output = file_name
+        self.serpentine = serpentine
 
     def _run_scan(self):
         """
@@ -150,18 +166,57 @@ class Scanner(multiprocessing.Process):
             self.return_queue.put_nowait(['stop_live_plotting'])
             return
 
-        for i in range(self.y_nsteps):
-            self.mx_database.wait_for_messages(0.001)
-            self._scan(name, i)
-            if self._abort_event.is_set():
-                self.return_queue.put_nowait(['stop_live_plotting'])
-                return
+        start = time.time()
+
+        if self.serpentine:
+            setup_times = [self._serpentine_scan(name)]
+
+        else:
+            setup_times = []
+
+            for i in range(self.y_nsteps):
+                self.mx_database.wait_for_messages(0.001)
+                setup_times.append(self._scan(name, i))
+                if self._abort_event.is_set():
+                    self.return_queue.put_nowait(['stop_live_plotting'])
+                    return
+
+        if self._abort_event.is_set():
+            self.return_queue.put_nowait(['stop_live_plotting'])
+            return
+
+        self._print_summary(time.time() - start, setup_times)
 
         print("All scans are performed. Output files are at %s" %(self.dir_path))
 
         self.return_queue.put_nowait(['stop_live_plotting'])
         return
 
+    def _print_summary(self, total_time, setup_times):
+        """
+        Prints the scan timing. The dead time is the time not spent counting,
+        which includes record setup, file setup and motor moves.
+
+        :param float total_time: The total scan time.
+        :param list setup_times: The time spent creating the scan record(s).
+        """
+        num_points = self.x_nsteps*self.y_nsteps
+        dead_time = (total_time - num_points*self.dwell_time)/self.y_nsteps
+
+        print("Scanned %d rows of %d points in %.1f s" % (self.y_nsteps,
+            self.x_nsteps, total_time))
+        print("Dead time per row: %.3f s" % (dead_time))
+
+        if self.serpentine:
+            print("Record setup: %.3f s, done once. Estimated saving over "
+                "a scan record per row: %.1f s." % (setup_times[0],
+                setup_times[0]*(self.y_nsteps-1)))
+            print("Return move distance avoided: %g" % ((self.y_nsteps-1)
+                *abs(self.x_end - self.x_start)))
+        else:
+            print("Record setup per row: %.3f s mean, %.1f s total" % (
+                np.mean(setup_times), np.sum(setup_times)))
+
     def _get_devices(self, scaler_fields, det_fields):
         """
         Gets a list of all of the relevant devices and returns them to populate
@@ -205,21 +260,19 @@ class Scanner(multiprocessing.Process):
 
         self.return_queue.put_nowait([xmotor_list, ymotor_list, scaler_list, detector_list])
 
-    def _scan(self, name, row):
+    def _get_scan_description(self, scan_name, scan_type, datafile_name):
         """
-        Creae a scan record and carry out the scan.
+        Creates the part of the scan record description that is common to
+        linear and list scans.
 
-        :param str name: The base name of the scan.
-        :param str row: The current row of the scan.
-        """
-
-        scan_name = name + str(row)
-        print("Scanning %s" % (scan_name))
+        :param str scan_name: The name of the scan record.
+        :param str scan_type: The MX scan type, e.g. 'linear_scan motor_scan'.
+        :param str datafile_name: The full path of the scan data file.
 
-        # Generate description
-        y = self.y_start + self.y_step * row
-
-        description = ("%s scan linear_scan motor_scan \"\" \"\" " % (scan_name))
+        :returns: The scan description up to the plot arguments.
+        :rtype: str
+        """
+        description = ("%s scan %s \"\" \"\" " % (scan_name, scan_type))
 
         num_scans = 1
         num_motors = 2
@@ -255,14 +308,38 @@ class Scanner(multiprocessing.Process):
                 "%x %f %s \"%f %s\" " % (scan_flags, settling_time, measurement_type, measurement_time, timer_name))
 
         datafile_description = "sff"
-        file_name = self.output + '.' + str(row).zfill(4)
-        datafile_name = join(self.dir_path, file_name)
         plot_description = "none"
         plot_arguments = "$f[0]"
 
         description = description + (
                 "%s %s %s %s " % (datafile_description, datafile_name, plot_description, plot_arguments))
 
+        return description
+
+    def _scan(self, name, row):
+        """
+        Creae a scan record and carry out the scan.
+
+        :param str name: The base name of the scan.
+        :param str row: The current row of the scan.
+
+        :returns: The time taken to set up the scan record.
+        :rtype: float
+        """
+        start = time.time()
+
+        scan_name = name + str(row)
+        print("Scanning %s" % (scan_name))
+
+        # Generate description
+        y = self.y_start + self.y_step * row
+
+        file_name = self.output + '.' + str(row).zfill(4)
+        datafile_name = join(self.dir_path, file_name)
+
+        description = self._get_scan_description(scan_name,
+            'linear_scan motor_scan', datafile_name)
+
         description = description + ("%f " % (self.x_start))
         description = description + ("%f " % (y))
 
@@ -282,12 +359,82 @@ class Scanner(multiprocessing.Process):
 
         self.mx_database.wait_for_messages(0.001)
 
+        setup_time = time.time() - start
+
         scan.perform_scan()
 
         print("%s has been performed" % (scan_name))
 
         self.return_queue.put_nowait([datafile_name])
 
+        return setup_time
+
+    def _serpentine_scan(self, name):
+        """
+        Creates a single list scan record covering the whole map and carries
+        out the scan. Alternate rows are scanned in opposite directions, so
+        no row has to return to the x start position. While the scan runs,
+        the output file is periodically sent for live plotting.
+
+        :param str name: The base name of the scan.
+
+        :returns: The time taken to set up the scan record.
+        :rtype: float
+        """
+        start = time.time()
+
+        scan_name = name + '0'
+        print("Scanning %s" % (scan_name))
+
+        x_positions = self.x_start + self.x_step*np.arange(self.x_nsteps)
+
+        position_file = join(self.dir_path, self.output + '.positions')
+
+        with open(position_file, 'w') as f:
+            for row in range(self.y_nsteps):
+                y = self.y_start + self.y_step * row
+
+                if row % 2 == 0:
+                    row_positions = x_positions
+                else:
+                    row_positions = x_positions[::-1]
+
+                for x in row_positions:
+                    f.write("%f %f\n" % (x, y))
+
+        datafile_name = join(self.dir_path, self.output + '.map')
+
+        description = self._get_scan_description(scan_name,
+            'list_scan file_list_scan', datafile_name)
+
+        description = description + ("%s " % (position_file))
+
+        print("Description = %s" % (description))
+
+        self.mx_database.create_record_from_description(description)
+
+        scan = self.mx_database.get_record(scan_name)
+
+        scan.finish_record_initialization()
+
+        self.mx_database.wait_for_messages(0.001)
+
+        setup_time = time.time() - start
+
+        self._live_file = datafile_name
+        self._last_live_update = time.time()
+
+        try:
+            scan.perform_scan()
+        finally:
+            self._live_file = None
+
+        print("%s has been performed" % (scan_name))
+
+        self.return_queue.put_nowait([datafile_name])
+
+        return setup_time
+
     def _abort(self):
         """Clears the ``command_queue`` and aborts all current actions."""
         while True:
@@ -301,6 +448,7 @@ class Scanner(multiprocessing.Process):
     def stop(self):
         """Stops the thread cleanly."""
         self._stop_event.set()
+        self.command_queue.put_nowait(None)
 
     def _stop_scan(self):
         """
@@ -311,4 +459,11 @@ class Scanner(multiprocessing.Process):
             anything.
         :rtype: int
         """
+        # A serpentine scan is a single record, so this is the only place
+        # the partial output can be sent for live plotting while it runs
+        if (self._live_file is not None
+            and time.time() - self._last_live_update > 1):
+            self.return_queue.put_nowait([self._live_file])
+            self._last_live_update = time.time()
+
         return int(self._abort_event.is_set())
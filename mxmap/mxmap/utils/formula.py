@@ -1,3 +1,105 @@
+import ast
+import numbers
+
+import numpy as np
+
+# Functions that can be used in a formula, e.g. "log(It/Io)"
+functions = {
+    'abs'       : np.abs,
+    'sqrt'      : np.sqrt,
+    'exp'       : np.exp,
+    'log'       : np.log,
+    'log10'     : np.log10,
+    'sin'       : np.sin,
+    'cos'       : np.cos,
+    'tan'       : np.tan,
+    'arcsin'    : np.arcsin,
+    'arccos'    : np.arccos,
+    'arctan'    : np.arctan,
+    'minimum'   : np.minimum,
+    'maximum'   : np.maximum,
+    }
+
+_allowed_nodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name,
+    ast.Load, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Pow, ast.USub, ast.UAdd)
+
+_compiled_formulas = {}
+
+class Formula(object):
+    """
+    A plot formula, parsed and checked once so it can be evaluated repeatedly
+    on numpy arrays. Only arithmetic, numbers, variable names, and the
+    functions in ``functions`` are allowed.
+    """
+    def __init__(self, formula):
+        """
+        Parses the formula.
+
+        :param str formula: Formula e.g. "(x+y)/10"
+
+        :raises SyntaxError: If the formula can't be parsed.
+        :raises ValueError: If the formula contains anything other than the
+            allowed operations.
+        """
+        self.formula = formula
+
+        tree = ast.parse(formula.strip(), mode='eval')
+
+        self.variables = set()
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                if node.id not in functions:
+                    self.variables.add(node.id)
+
+            elif isinstance(node, ast.Call):
+                if (not isinstance(node.func, ast.Name)
+                    or node.func.id not in functions
+                    or len(node.keywords) > 0):
+                    raise ValueError('Unsupported function in formula: %s' % formula)
+
+            elif not isinstance(node, _allowed_nodes) and not _is_number(node):
+                raise ValueError('Unsupported operation in formula: %s' % formula)
+
+        self._code = compile(tree, '<formula>', 'eval')
+
+    def __call__(self, d):
+        """
+        Calculate value from the formula
+
+        :param dict d: Formula variables e.g. {'x':10, 'y':20}
+
+        :returns: calculated result e.g. (10+20)/10 = 3
+        :rtype: float or np.array
+        """
+        namespace = dict(functions)
+        namespace.update(d)
+
+        return eval(self._code, {'__builtins__': {}}, namespace)
+
+def _is_number(node):
+    if hasattr(ast, 'Constant') and isinstance(node, ast.Constant):
+        return (isinstance(node.value, numbers.Number)
+            and not isinstance(node.value, bool))
+
+    return isinstance(node, getattr(ast, 'Num', ()))
+
+def compile_formula(formula):
+    """
+    Returns the parsed formula, reusing it if the same formula was already
+    parsed.
+
+    :param str formula: Formula e.g. "(x+y)/10"
+
+    :returns: The parsed formula.
+    :rtype: Formula
+    """
+    if formula not in _compiled_formulas:
+        _compiled_formulas[formula] = Formula(formula)
+
+    return _compiled_formulas[formula]
+
 def calculate(formula, d):
     """
     Calculate value from string of formula
@@ -8,5 +110,4 @@ def calculate(formula, d):
     :returns: calculated result e.g. (10+20)/10 = 3
     :rtype: float
     """
-    locals().update(d)
-    return eval(formula)
+    return compile_formula(formula)(d)